@@ -0,0 +1 @@
+# Módulo de benchmarks da aplicação 
\ No newline at end of file
@@ -0,0 +1,103 @@
+"""
+Benchmark do engine rápido de DOCX contra o caminho via python-docx
+
+Uso:
+    python benchmarks/bench_docx.py [--paragraphs 2000] [--tables 50] [--repeat 5]
+"""
+import os
+import sys
+import io
+import time
+import json
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import docx
+from docx.enum.text import WD_UNDERLINE
+from PIL import Image
+
+from src.routes.extractor import extract_text_from_docx, extract_text_from_docx_python_docx
+
+
+def build_docx(path, paragraphs=2000, tables=50, rows=20, cols=6):
+    """Gera um .docx sintético com runs formatados, tabelas mescladas e imagem"""
+    document = docx.Document()
+    document.core_properties.title = 'Benchmark DOCX'
+    document.core_properties.author = 'bench'
+
+    underlines = [None, True, False, WD_UNDERLINE.DOUBLE]
+    for i in range(paragraphs):
+        paragraph = document.add_paragraph()
+        for j in range(4):
+            run = paragraph.add_run(f"Parágrafo {i} trecho {j} ")
+            run.bold = (i + j) % 3 == 0 or None
+            run.italic = (i + j) % 5 == 0
+            run.underline = underlines[(i + j) % len(underlines)]
+        if i % 50 == 0:
+            paragraph.add_run().add_break()
+            paragraph.add_run('\tapós tabulação')
+        if i % 25 == 0:
+            document.add_paragraph('')
+
+        if tables and i % max(1, paragraphs // tables) == 0:
+            table = document.add_table(rows=rows, cols=cols)
+            for r, row in enumerate(table.rows):
+                for c, cell in enumerate(row.cells):
+                    cell.text = f"L{r}C{c}"
+            table.cell(0, 0).merge(table.cell(0, 1))
+            table.cell(1, 2).merge(table.cell(3, 2))
+            table.cell(2, 0).add_table(rows=1, cols=2)
+
+    image = io.BytesIO()
+    Image.new('RGB', (320, 240), (200, 30, 30)).save(image, format='PNG')
+    image.seek(0)
+    document.add_picture(image)
+    document.save(path)
+
+
+def time_call(func, path, repeat):
+    """Executa func(path) repeat vezes e retorna (melhor tempo, resultado)"""
+    best = None
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(path)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--paragraphs', type=int, default=2000)
+    parser.add_argument('--tables', type=int, default=50)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, 'bench.docx')
+        build_docx(path, paragraphs=args.paragraphs, tables=args.tables)
+
+        fast_time, fast_result = time_call(extract_text_from_docx, path, args.repeat)
+        slow_time, slow_result = time_call(extract_text_from_docx_python_docx, path, args.repeat)
+
+        identical = json.dumps(fast_result, sort_keys=True) == json.dumps(slow_result, sort_keys=True)
+
+        print(json.dumps({
+            'file_size_bytes': os.path.getsize(path),
+            'paragraphs': args.paragraphs,
+            'tables': args.tables,
+            'fast_seconds': round(fast_time, 4),
+            'python_docx_seconds': round(slow_time, 4),
+            'speedup': round(slow_time / fast_time, 2) if fast_time else None,
+            'identical_output': identical
+        }, indent=2))
+
+        if not identical:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,132 @@
+"""
+Benchmark da serialização das respostas: provider padrão (InstrumentedJSONProvider)
+contra o FastJSONProvider
+
+Serializa os resultados reais das extrações do corpus sintético e um resultado
+com tipos numpy/pandas, medindo o tempo até o corpo completo, o tempo até o
+primeiro bloco (streaming) e o pico de memória Python (tracemalloc).
+
+Uso:
+    python benchmarks/bench_json.py [--scale 0.25] [--repeat 5] [--documents pdf_digital xlsx_wide]
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+
+from benchmarks.corpus import generate_corpus
+from src.services.json_provider import FastJSONProvider, InstrumentedJSONProvider
+
+PROVIDERS = (('default', InstrumentedJSONProvider), ('fast', FastJSONProvider))
+
+
+def numpy_payload(rows=20000):
+    """Resultado no formato de planilha com escalares numpy e NaN (como describe()/null_counts brutos)"""
+    import numpy as np
+    import pandas as pd
+
+    frame = pd.DataFrame({
+        'valor': np.arange(rows, dtype='int64'),
+        'preco': np.linspace(0, 1000, rows),
+        'nome': [f'item_{i}' for i in range(rows)]
+    })
+    frame.loc[::7, 'preco'] = np.nan
+    return {
+        'success': True,
+        'data': {
+            'null_counts': {column: np.int64(count) for column, count in frame.isnull().sum().items()},
+            'numeric_stats': {column: {k: np.float64(v) for k, v in stats.items()}
+                              for column, stats in frame.describe().to_dict().items()},
+            'rows': frame.to_dict('records')
+        }
+    }
+
+
+def measure(app, payload, repeat):
+    """Tempo total, tempo até o primeiro bloco, bytes e pico de memória de app.json.response(payload)"""
+    totals = []
+    first_chunks = []
+    size = 0
+    with app.test_request_context():
+        for _ in range(repeat):
+            start = time.perf_counter()
+            response = app.json.response(payload)
+            first = None
+            size = 0
+            for chunk in response.iter_encoded():
+                if first is None:
+                    first = time.perf_counter() - start
+                size += len(chunk)
+            totals.append(time.perf_counter() - start)
+            first_chunks.append(first)
+
+        tracemalloc.start()
+        response = app.json.response(payload)
+        for _ in response.iter_encoded():
+            pass
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+    return {
+        'total_ms': round(min(totals) * 1000, 2),
+        'first_chunk_ms': round(min(first_chunks) * 1000, 2),
+        'bytes': size,
+        'peak_python_mb': round(peak / (1024 * 1024), 2)
+    }
+
+
+def supports(provider_class, payload):
+    app = Flask(__name__)
+    app.json = provider_class(app)
+    try:
+        app.json.dumps(payload)
+        return True
+    except (TypeError, ValueError):
+        return False
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scale', type=float, default=0.25)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--documents', nargs='*', default=['pdf_digital', 'pdf_scanned', 'docx_tables', 'xlsx_wide', 'csv_tall'])
+    args = parser.parse_args()
+
+    os.environ.setdefault('EXTRACTION_SANDBOX', '0')
+    from src.routes.extractor import run_extractor
+
+    payloads = []
+    with tempfile.TemporaryDirectory() as corpus_dir:
+        for document in generate_corpus(corpus_dir, scale=args.scale, seed=args.seed, only=args.documents):
+            result = run_extractor(document['format'], document['path'])
+            payloads.append((document['name'], {'success': True, 'data': result}))
+    payloads.append(('numpy_rows', numpy_payload()))
+
+    report = []
+    for name, payload in payloads:
+        entry = {'payload': name}
+        for label, provider_class in PROVIDERS:
+            if not supports(provider_class, payload):
+                entry[label] = 'não serializável'
+                continue
+            app = Flask(__name__)
+            app.json = provider_class(app)
+            entry[label] = measure(app, payload, args.repeat)
+        if isinstance(entry['default'], dict):
+            entry['speedup'] = round(entry['default']['total_ms'] / max(entry['fast']['total_ms'], 0.001), 2)
+        report.append(entry)
+        print(f"{name}: {entry['default']} -> {entry['fast']}", file=sys.stderr)
+
+    print(json.dumps(report, indent=2, ensure_ascii=False))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,126 @@
+"""
+Benchmark do escalonador de extrações: latência de documentos pequenos sob carga de lote
+
+Threads de fundo enviam lotes de PDFs grandes para /api/extract/bulk enquanto
+uma thread envia documentos pequenos para /api/extract em sequência. Cada
+configuração roda em um processo próprio (as variáveis de ambiente são lidas
+no import): sem controle de admissão e com as faixas interativa/batch.
+
+Uso:
+    python benchmarks/bench_scheduler.py [--duration 20] [--batch-clients 2] [--batch-pages 300]
+"""
+import io
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import tempfile
+import threading
+import subprocess
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.corpus import build_digital_pdf, build_txt
+from benchmarks.run_suite import percentile
+
+CONFIGURATIONS = (
+    ('sem_admissao', {'ADMISSION_CONTROL': '0'}),
+    ('faixas', {'ADMISSION_CONTROL': '1'})
+)
+
+
+def run_load(args):
+    """Executa a carga no processo atual e devolve as latências dos documentos pequenos"""
+    from main import app
+
+    corpus_dir = tempfile.mkdtemp(prefix='bench-scheduler-')
+    small_path = os.path.join(corpus_dir, 'pequeno.txt')
+    build_txt(small_path, random.Random(args.seed), 8 * 1024)
+    small = open(small_path, 'rb').read()
+
+    # PDFs distintos por cliente, para não serem coalescidos pelo single-flight
+    batches = []
+    for client in range(args.batch_clients):
+        files = []
+        for index in range(3):
+            path = os.path.join(corpus_dir, f'lote_{client}_{index}.pdf')
+            build_digital_pdf(path, random.Random(f'{args.seed}:{client}:{index}'), pages=args.batch_pages)
+            files.append(open(path, 'rb').read())
+        batches.append(files)
+
+    stop = threading.Event()
+    batch_counts = []
+
+    def batch_client(files):
+        client = app.test_client()
+        completed = 0
+        while not stop.is_set():
+            client.post('/api/extract/bulk', data={
+                'files': [(io.BytesIO(data), f'lote_{index}.pdf') for index, data in enumerate(files)]
+            }, content_type='multipart/form-data')
+            completed += 1
+        batch_counts.append(completed)
+
+    threads = [threading.Thread(target=batch_client, args=(files,)) for files in batches]
+    for thread in threads:
+        thread.start()
+    time.sleep(args.warmup)
+
+    client = app.test_client()
+    latencies = []
+    statuses = {}
+    deadline = time.monotonic() + args.duration
+    while time.monotonic() < deadline:
+        start = time.perf_counter()
+        response = client.post('/api/extract', data={'file': (io.BytesIO(small), 'pequeno.txt')},
+                               content_type='multipart/form-data')
+        latencies.append((time.perf_counter() - start) * 1000)
+        statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+        time.sleep(args.interval)
+
+    stop.set()
+    for thread in threads:
+        thread.join()
+
+    return {
+        'small_requests': len(latencies),
+        'small_p50_ms': round(percentile(latencies, 50), 1),
+        'small_p95_ms': round(percentile(latencies, 95), 1),
+        'small_max_ms': round(max(latencies), 1),
+        'statuses': statuses,
+        'batches_completed': sum(batch_counts)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--duration', type=float, default=20, help='Duração da medição (s)')
+    parser.add_argument('--warmup', type=float, default=2, help='Carga de lote antes da medição (s)')
+    parser.add_argument('--interval', type=float, default=0.05, help='Pausa entre documentos pequenos (s)')
+    parser.add_argument('--batch-clients', type=int, default=2)
+    parser.add_argument('--batch-pages', type=int, default=300)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(run_load(args)))
+        return
+
+    report = {}
+    for label, overrides in CONFIGURATIONS:
+        env = dict(os.environ, SINGLE_FLIGHT='0', **overrides)
+        completed = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), '--child'] + sys.argv[1:],
+            env=env, capture_output=True, text=True, check=True
+        )
+        report[label] = json.loads(completed.stdout.strip().splitlines()[-1])
+        print(f"{label}: {report[label]}", file=sys.stderr)
+
+    print(json.dumps(report, indent=2, ensure_ascii=False))
+
+
+if __name__ == '__main__':
+    main()
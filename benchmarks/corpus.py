@@ -0,0 +1,232 @@
+"""
+Gerador de corpus sintético e reprodutível para os benchmarks
+
+Gera, sem acesso à rede, PDFs digitais e "escaneados", DOCX e PPTX com
+tabelas e mídia, planilhas/CSVs largos e altos e um TXT grande. O mesmo seed
+e a mesma escala produzem sempre os mesmos documentos.
+
+Uso:
+    python benchmarks/corpus.py --output /tmp/corpus [--scale 1.0] [--seed 42]
+"""
+import os
+import io
+import sys
+import json
+import random
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pymupdf
+import openpyxl
+from PIL import Image, ImageDraw
+from pptx import Presentation
+from pptx.util import Inches
+
+from benchmarks.bench_docx import build_docx
+
+WORDS = (
+    'documento extração texto página tabela imagem relatório análise dados valor '
+    'contrato cliente período total resultado processo sistema arquivo conteúdo seção'
+).split()
+
+
+def _sentence(rng, words=12):
+    return ' '.join(rng.choice(WORDS) for _ in range(words)).capitalize() + '.'
+
+
+def _scaled(value, scale, minimum=1):
+    return max(minimum, int(value * scale))
+
+
+def _noise_png(rng, width, height):
+    """PNG em tons de cinza com ruído determinístico (simula uma digitalização)"""
+    pixels = bytes(rng.randrange(200, 256) if rng.random() > 0.05 else rng.randrange(0, 80)
+                   for _ in range(width * height))
+    buffer = io.BytesIO()
+    Image.frombytes('L', (width, height), pixels).save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
+def _solid_png(color, width=320, height=240):
+    buffer = io.BytesIO()
+    Image.new('RGB', (width, height), color).save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
+def build_digital_pdf(path, rng, pages=40):
+    """PDF com texto em todas as páginas e algumas imagens embutidas"""
+    image = _solid_png((30, 120, 200))
+    with pymupdf.open() as doc:
+        doc.set_metadata({'title': 'Benchmark PDF digital', 'author': 'bench'})
+        for page_number in range(pages):
+            page = doc.new_page()
+            text = '\n'.join(_sentence(rng) for _ in range(35))
+            page.insert_textbox(pymupdf.Rect(50, 50, 550, 780), text, fontsize=9)
+            if page_number % 5 == 0:
+                page.insert_image(pymupdf.Rect(400, 650, 560, 770), stream=image)
+        doc.save(path, garbage=3, deflate=True)
+
+
+def build_scanned_pdf(path, rng, pages=6):
+    """PDF sem texto, cada página coberta por uma imagem ruidosa (simula um documento digitalizado)"""
+    with pymupdf.open() as doc:
+        for _ in range(pages):
+            page = doc.new_page()
+            page.insert_image(page.rect, stream=_noise_png(rng, 425, 550))
+        doc.save(path, garbage=3, deflate=True)
+
+
+def _scanned_page_png(rng, width, height, lines):
+    """Página digitalizada clara com ruído leve e `lines` faixas escuras simulando linhas de texto"""
+    pixels = bytes(rng.randrange(225, 256) if rng.random() > 0.002 else rng.randrange(0, 80)
+                   for _ in range(width * height))
+    image = Image.frombytes('L', (width, height), pixels)
+    draw = ImageDraw.Draw(image)
+    for line in range(lines):
+        top = height // 10 + line * 24
+        draw.rectangle([width // 10, top, width - width // 10 - rng.randrange(0, width // 3), top + 8], fill=30)
+    buffer = io.BytesIO()
+    image.save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
+def build_scanned_pdf_with_blanks(path, rng, pages=12):
+    """PDF digitalizado com versos em branco intercalados (separadores de lote)"""
+    with pymupdf.open() as doc:
+        for page_number in range(pages):
+            page = doc.new_page()
+            lines = 30 if page_number % 2 == 0 else 0
+            page.insert_image(page.rect, stream=_scanned_page_png(rng, 425, 550, lines))
+        doc.save(path, garbage=3, deflate=True)
+
+
+def build_pptx(path, rng, slides=40):
+    """Apresentação com títulos, caixas de texto, tabelas e imagens repetidas"""
+    presentation = Presentation()
+    images = [_solid_png((200, 30, 30)), _solid_png((30, 200, 30))]
+    for slide_number in range(slides):
+        slide = presentation.slides.add_slide(presentation.slide_layouts[1])
+        slide.shapes.title.text = f"Slide {slide_number + 1}: {_sentence(rng, 4)}"
+        slide.placeholders[1].text = '\n'.join(_sentence(rng) for _ in range(4))
+        if slide_number % 3 == 0:
+            table = slide.shapes.add_table(5, 4, Inches(1), Inches(4), Inches(6), Inches(2)).table
+            for row in range(5):
+                for col in range(4):
+                    table.cell(row, col).text = f"{rng.choice(WORDS)} {row}.{col}"
+        if slide_number % 4 == 0:
+            slide.shapes.add_picture(io.BytesIO(images[slide_number % 2]), Inches(7), Inches(5), Inches(2))
+    presentation.save(path)
+
+
+def build_xlsx(path, rng, rows, columns):
+    """Planilha com colunas numéricas e textuais (modo write_only)"""
+    workbook = openpyxl.Workbook(write_only=True)
+    sheet = workbook.create_sheet('Dados')
+    sheet.append([f"coluna_{col}" for col in range(columns)])
+    for row in range(rows):
+        sheet.append([
+            rng.randint(0, 10000) if col % 3 else f"{rng.choice(WORDS)}_{row}"
+            for col in range(columns)
+        ])
+    workbook.save(path)
+
+
+def build_csv(path, rng, rows, columns):
+    """CSV com colunas numéricas e textuais"""
+    with open(path, 'w', encoding='utf-8') as csv_file:
+        csv_file.write(','.join(f"coluna_{col}" for col in range(columns)) + '\n')
+        for row in range(rows):
+            csv_file.write(','.join(
+                str(rng.randint(0, 10000)) if col % 3 else f"{rng.choice(WORDS)}_{row}"
+                for col in range(columns)
+            ) + '\n')
+
+
+def build_txt(path, rng, size_bytes):
+    """Texto UTF-8 com acentuação até atingir aproximadamente size_bytes"""
+    paragraph_pool = ['\n'.join(_sentence(rng) for _ in range(5)) for _ in range(64)]
+    written = 0
+    with open(path, 'w', encoding='utf-8') as txt_file:
+        while written < size_bytes:
+            chunk = rng.choice(paragraph_pool) + '\n\n'
+            txt_file.write(chunk)
+            written += len(chunk.encode('utf-8'))
+
+
+def build_png(path, rng, width=800, height=600):
+    """Imagem PNG ruidosa"""
+    with open(path, 'wb') as png_file:
+        png_file.write(_noise_png(rng, width, height))
+
+
+def corpus_specs(scale=1.0):
+    """Lista (nome, extensão, descrição, construtor) dos documentos do corpus"""
+    return [
+        ('pdf_digital', 'pdf', 'PDF digital com texto e imagens',
+         lambda path, rng: build_digital_pdf(path, rng, pages=_scaled(40, scale))),
+        ('pdf_scanned', 'pdf', 'PDF escaneado (páginas-imagem, sem texto)',
+         lambda path, rng: build_scanned_pdf(path, rng, pages=_scaled(6, scale))),
+        ('pdf_scanned_blanks', 'pdf', 'PDF escaneado com versos em branco intercalados',
+         lambda path, rng: build_scanned_pdf_with_blanks(path, rng, pages=_scaled(12, scale))),
+        ('docx_tables', 'docx', 'DOCX com runs formatados, tabelas mescladas e imagem',
+         lambda path, rng: build_docx(path, paragraphs=_scaled(800, scale), tables=_scaled(20, scale))),
+        ('pptx_media', 'pptx', 'PPTX com tabelas e imagens repetidas',
+         lambda path, rng: build_pptx(path, rng, slides=_scaled(40, scale))),
+        ('xlsx_tall', 'xlsx', 'Planilha alta (muitas linhas, poucas colunas)',
+         lambda path, rng: build_xlsx(path, rng, rows=_scaled(20000, scale), columns=6)),
+        ('xlsx_wide', 'xlsx', 'Planilha larga (poucas linhas, muitas colunas)',
+         lambda path, rng: build_xlsx(path, rng, rows=_scaled(200, scale), columns=200)),
+        ('csv_tall', 'csv', 'CSV alto',
+         lambda path, rng: build_csv(path, rng, rows=_scaled(50000, scale), columns=6)),
+        ('csv_wide', 'csv', 'CSV largo',
+         lambda path, rng: build_csv(path, rng, rows=_scaled(500, scale), columns=300)),
+        ('txt_large', 'txt', 'TXT grande em UTF-8',
+         lambda path, rng: build_txt(path, rng, size_bytes=_scaled(8 * 1024 * 1024, scale))),
+        ('png_photo', 'png', 'Imagem PNG',
+         lambda path, rng: build_png(path, rng))
+    ]
+
+
+def generate_corpus(output_dir, scale=1.0, seed=42, only=None):
+    """
+    Gera o corpus em output_dir
+
+    Cada documento usa um gerador aleatório derivado do seed e do próprio nome,
+    então filtrar documentos com 'only' não altera o conteúdo dos demais.
+
+    Returns:
+        Lista de dicionários com name, format, description, path e size_bytes
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    documents = []
+
+    for name, extension, description, builder in corpus_specs(scale):
+        if only and name not in only:
+            continue
+        path = os.path.join(output_dir, f"{name}.{extension}")
+        builder(path, random.Random(f"{seed}:{name}"))
+        documents.append({
+            'name': name,
+            'format': extension,
+            'description': description,
+            'path': path,
+            'size_bytes': os.path.getsize(path)
+        })
+
+    return documents
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--output', required=True, help='Diretório de saída do corpus')
+    parser.add_argument('--scale', type=float, default=1.0)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    documents = generate_corpus(args.output, scale=args.scale, seed=args.seed)
+    print(json.dumps(documents, indent=2, ensure_ascii=False))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,301 @@
+"""
+Suíte de benchmarks dos extratores e endpoints sobre o corpus sintético
+
+Para cada documento do corpus mede a extração direta (run_extractor, com o
+governador de recursos) e os endpoints /api/extract e /api/extract/data via
+test client do Flask. Cada caso roda em um processo próprio para que o pico
+de RSS seja isolado. Os resultados são gravados em JSON para comparação.
+
+Uso:
+    python benchmarks/run_suite.py [--scale 0.25] [--repeat 5] [--output results.json]
+    python benchmarks/run_suite.py --compare baseline.json --output atual.json
+    python benchmarks/run_suite.py --startup-budget-ms 1500 --modes
+    python benchmarks/run_suite.py --fields text --compare completo.json
+
+Antes dos casos, o tempo de startup (import do app e de cada backend de
+extração) é medido em processos Python novos; acima de --startup-budget-ms
+a execução termina com código 1.
+
+Com --fields, cada caso pede apenas os campos informados (opção 'fields');
+comparar com uma execução sem --fields mostra o ganho de pedidos só de texto.
+"""
+import os
+import io
+import sys
+import json
+import math
+import time
+import base64
+import argparse
+import platform
+import subprocess
+import datetime
+import tempfile
+import multiprocessing
+
+try:
+    import resource
+except ImportError:  # Windows: pico de RSS indisponível
+    resource = None
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.corpus import generate_corpus
+
+MODES = ('extractor', 'endpoint:/api/extract', 'endpoint:/api/extract/data')
+
+# Backends de extração carregados sob demanda (ver src.services.backends)
+STARTUP_BACKENDS = ('pymupdf', 'docx', 'pptx', 'pandas', 'openpyxl', 'PIL.Image', 'requests')
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def percentile(values, pct):
+    """Percentil pelo método nearest-rank"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100.0 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def peak_rss_mb():
+    """Maior RSS do processo atual e dos workers já finalizados, em MB"""
+    if resource is None:
+        return None
+    self_peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    children_peak = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    divisor = 1024 * 1024 if sys.platform == 'darwin' else 1024  # bytes no macOS, KB no Linux
+    return round(max(self_peak, children_peak) / divisor, 1)
+
+
+def _import_ms(module):
+    """Tempo de import de um módulo em um interpretador novo, em ms"""
+    code = (
+        "import time, importlib; start = time.perf_counter(); "
+        f"importlib.import_module({module!r}); print((time.perf_counter() - start) * 1000)"
+    )
+    env = dict(os.environ, PRELOAD_BACKENDS='')
+    completed = subprocess.run([sys.executable, '-c', code], cwd=PROJECT_DIR, env=env,
+                               capture_output=True, text=True, check=True)
+    return float(completed.stdout.strip().splitlines()[-1])
+
+
+def measure_startup(repeat=3):
+    """Mediana do import do app (main) e de cada backend, cada um em um processo novo"""
+    def median_ms(module):
+        return round(percentile([_import_ms(module) for _ in range(repeat)], 50), 1)
+
+    return {
+        'app_import_ms': median_ms('main'),
+        'backends_import_ms': {module: median_ms(module) for module in STARTUP_BACKENDS}
+    }
+
+
+def make_call(app, mode, document, fields=None):
+    """Função sem argumentos que executa uma vez o caso e retorna (ok, bytes da resposta)"""
+    from src.routes.extractor import run_extractor
+    from src.services.fields import parse_fields
+
+    path = document['path']
+    extension = document['format']
+    filename = os.path.basename(path)
+
+    if mode == 'extractor':
+        options = {'fields': parse_fields(fields)} if fields else None
+
+        def call():
+            result = run_extractor(extension, path, options)
+            return True, len(app.json.dumps(result))
+        return call
+
+    with open(path, 'rb') as source:
+        content = source.read()
+    client = app.test_client()
+    extra = {'fields': fields} if fields else {}
+
+    if mode == 'endpoint:/api/extract':
+        def call():
+            response = client.post(
+                '/api/extract', data={'file': (io.BytesIO(content), filename), **extra},
+                content_type='multipart/form-data'
+            )
+            return response.status_code == 200, len(response.get_data())
+        return call
+
+    encoded = base64.b64encode(content).decode('ascii')
+
+    def call():
+        response = client.post('/api/extract/data', json={'filename': filename, 'file_data': encoded, **extra})
+        return response.status_code == 200, len(response.get_data())
+    return call
+
+
+def _case_worker(conn, app, mode, document, repeat, warmup, fields):
+    """Executa um caso em um processo isolado e devolve as medições"""
+    try:
+        call = make_call(app, mode, document, fields)
+        for _ in range(warmup):
+            call()
+
+        latencies = []
+        errors = 0
+        response_bytes = None
+        for _ in range(repeat):
+            start = time.perf_counter()
+            ok, size = call()
+            latencies.append(time.perf_counter() - start)
+            errors += 0 if ok else 1
+            response_bytes = size
+
+        conn.send({'latencies': latencies, 'errors': errors, 'response_bytes': response_bytes,
+                   'peak_rss_mb': peak_rss_mb()})
+    except Exception as error:
+        conn.send({'error': str(error)})
+    finally:
+        conn.close()
+
+
+def run_case(app, mode, document, repeat, warmup, fields=None):
+    """Roda um caso em processo próprio (fork) e resume as medições"""
+    context = multiprocessing.get_context('fork')
+    parent_conn, child_conn = context.Pipe(duplex=False)
+    process = context.Process(target=_case_worker, args=(child_conn, app, mode, document, repeat, warmup, fields))
+    process.start()
+    child_conn.close()
+    try:
+        measurement = parent_conn.recv()
+    except EOFError:
+        measurement = {'error': f'processo do caso encerrado (exitcode {process.exitcode})'}
+    process.join()
+
+    case = {
+        'case': f"{document['name']}/{mode}",
+        'document': document['name'],
+        'format': document['format'],
+        'mode': mode,
+        'input_bytes': document['size_bytes']
+    }
+    if 'error' in measurement:
+        case['error'] = measurement['error']
+        return case
+
+    latencies = measurement['latencies']
+    total = sum(latencies)
+    case.update({
+        'runs': len(latencies),
+        'errors': measurement['errors'],
+        'latency_ms': {
+            'min': round(min(latencies) * 1000, 2),
+            'mean': round(total / len(latencies) * 1000, 2),
+            'p50': round(percentile(latencies, 50) * 1000, 2),
+            'p95': round(percentile(latencies, 95) * 1000, 2),
+            'max': round(max(latencies) * 1000, 2)
+        },
+        'throughput': {
+            'docs_per_second': round(len(latencies) / total, 3) if total else None,
+            'mb_per_second': round(document['size_bytes'] * len(latencies) / total / (1024 * 1024), 3) if total else None
+        },
+        'peak_rss_mb': measurement['peak_rss_mb'],
+        'response_bytes': measurement['response_bytes']
+    })
+    return case
+
+
+def compare(results, baseline, threshold):
+    """Compara p50/p95 com um resultado anterior; retorna os casos que regrediram"""
+    previous = {case['case']: case for case in baseline.get('results', []) if 'latency_ms' in case}
+    regressions = []
+    print(f"{'caso':55} {'p50 ant.':>10} {'p50':>10} {'razão':>7}", file=sys.stderr)
+    for case in results:
+        old = previous.get(case['case'])
+        if old is None or 'latency_ms' not in case:
+            continue
+        ratio = case['latency_ms']['p50'] / old['latency_ms']['p50'] if old['latency_ms']['p50'] else None
+        marker = ''
+        if ratio is not None and ratio > threshold:
+            regressions.append(case['case'])
+            marker = '  <- regressão'
+        ratio_text = f"{ratio:.2f}" if ratio is not None else '-'
+        print(f"{case['case']:55} {old['latency_ms']['p50']:>10} {case['latency_ms']['p50']:>10} {ratio_text:>7}{marker}", file=sys.stderr)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scale', type=float, default=0.25, help='Escala do corpus (1.0 = tamanho completo)')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--warmup', type=int, default=1)
+    parser.add_argument('--documents', nargs='*', help='Subconjunto de documentos do corpus (ex.: pdf_digital txt_large)')
+    parser.add_argument('--modes', nargs='*', choices=MODES, default=list(MODES))
+    parser.add_argument('--corpus-dir', help='Diretório do corpus (padrão: temporário)')
+    parser.add_argument('--output', help='Arquivo JSON de saída (padrão: stdout)')
+    parser.add_argument('--compare', help='JSON de uma execução anterior para comparação')
+    parser.add_argument('--threshold', type=float, default=1.2, help='Razão de p50 considerada regressão')
+    parser.add_argument('--fields', help="Campos pedidos em cada caso (ex.: 'text,stats.page_count')")
+    parser.add_argument('--startup-budget-ms', type=float, default=1500,
+                        help='Orçamento para o import do app (0 desativa a verificação)')
+    parser.add_argument('--startup-repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    startup = measure_startup(args.startup_repeat)
+    startup['budget_ms'] = args.startup_budget_ms or None
+    startup['over_budget'] = bool(args.startup_budget_ms) and startup['app_import_ms'] > args.startup_budget_ms
+    print(f"startup: import do app {startup['app_import_ms']}ms (orçamento {startup['budget_ms']}ms)", file=sys.stderr)
+
+    from main import app
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        corpus_dir = args.corpus_dir or tmp_dir
+        documents = generate_corpus(corpus_dir, scale=args.scale, seed=args.seed, only=args.documents)
+
+        results = []
+        for document in documents:
+            for mode in args.modes:
+                case = run_case(app, mode, document, args.repeat, args.warmup, args.fields)
+                results.append(case)
+                summary = case.get('error') or f"p50 {case['latency_ms']['p50']}ms p95 {case['latency_ms']['p95']}ms"
+                print(f"{case['case']}: {summary}", file=sys.stderr)
+
+    report = {
+        'generated_at': datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        'environment': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'sandbox': os.environ.get('EXTRACTION_SANDBOX', '1') != '0'
+        },
+        'config': {
+            'scale': args.scale,
+            'seed': args.seed,
+            'repeat': args.repeat,
+            'warmup': args.warmup,
+            'fields': args.fields
+        },
+        'startup': startup,
+        'results': results
+    }
+
+    output = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as output_file:
+            output_file.write(output)
+    else:
+        print(output)
+
+    failed = startup['over_budget']
+    if failed:
+        print(f"startup acima do orçamento: {startup['app_import_ms']}ms > {args.startup_budget_ms}ms", file=sys.stderr)
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as baseline_file:
+            regressions = compare(results, json.load(baseline_file), args.threshold)
+        failed = failed or bool(regressions)
+
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
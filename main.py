@@ -7,17 +7,33 @@ from flask import Flask, send_from_directory
 from flask_cors import CORS
 from src.models.user import db
 from src.routes.user import user_bp
-from src.routes.extractor import extractor_bp
+from src.routes.extractor import extractor_bp, warm_up_backends
+from src.routes.metrics import metrics_bp
+from src.services import api_keys, compression
+from src.services.json_provider import FastJSONProvider
+from src.services.uploads import StreamingRequest
 
 app = Flask(__name__, static_folder=os.path.join(os.path.dirname(__file__), 'static'))
+app.json = FastJSONProvider(app)
+# Uploads multipart gravados direto em disco, com limites por extensão aplicados durante o recebimento
+app.request_class = StreamingRequest
 app.config['SECRET_KEY'] = 'asdf#FGSgvasgf$5$WGT'
 app.config['MAX_CONTENT_LENGTH'] = 50 * 1024 * 1024  # 50MB max file size
 
 # Habilitar CORS para todas as rotas
 CORS(app)
 
+# Compressão gzip/br/zstd das respostas; registrada antes do metrics_bp para rodar depois dele
+# (hooks after_request executam em ordem inversa), assim as métricas veem o corpo original
+compression.init_app(app)
+
 app.register_blueprint(user_bp, url_prefix='/api')
 app.register_blueprint(extractor_bp, url_prefix='/api')
+app.register_blueprint(metrics_bp)
+
+# Bibliotecas de extração são importadas no primeiro uso; PRELOAD_BACKENDS (ex.: "pdf,docx" ou "all")
+# antecipa o import para o startup, antes de os workers de extração serem criados
+warm_up_backends(os.environ.get('PRELOAD_BACKENDS', ''))
 
 # uncomment if you need to use database
 app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(os.path.dirname(__file__), 'database', 'app.db')}"
@@ -26,6 +42,9 @@ db.init_app(app)
 with app.app_context():
     db.create_all()
 
+# Contadores de uso das chaves de API gravados em lote, fora do caminho das requisições
+api_keys.init_app(app)
+
 @app.route('/', defaults={'path': ''})
 @app.route('/<path:path>')
 def serve(path):
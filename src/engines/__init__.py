@@ -0,0 +1 @@
+# Módulo de engines de extração 
\ No newline at end of file
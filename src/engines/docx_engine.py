@@ -0,0 +1,330 @@
+import datetime
+import logging
+import zipfile
+
+from lxml import etree
+
+from src.engines.ooxml import (
+    REL_OFFICE_DOCUMENT, XML_PARSER_OPTIONS, extract_media_images,
+    find_package_part, read_core_properties
+)
+from src.services import deadline, timing
+from src.services.fields import wants
+
+logger = logging.getLogger(__name__)
+
+W_NS = 'http://schemas.openxmlformats.org/wordprocessingml/2006/main'
+
+W_BODY = f'{{{W_NS}}}body'
+W_P = f'{{{W_NS}}}p'
+W_R = f'{{{W_NS}}}r'
+W_T = f'{{{W_NS}}}t'
+W_TAB = f'{{{W_NS}}}tab'
+W_PTAB = f'{{{W_NS}}}ptab'
+W_BR = f'{{{W_NS}}}br'
+W_CR = f'{{{W_NS}}}cr'
+W_NO_BREAK_HYPHEN = f'{{{W_NS}}}noBreakHyphen'
+W_HYPERLINK = f'{{{W_NS}}}hyperlink'
+W_RPR = f'{{{W_NS}}}rPr'
+W_B = f'{{{W_NS}}}b'
+W_I = f'{{{W_NS}}}i'
+W_U = f'{{{W_NS}}}u'
+W_TBL = f'{{{W_NS}}}tbl'
+W_TR = f'{{{W_NS}}}tr'
+W_TRPR = f'{{{W_NS}}}trPr'
+W_GRID_BEFORE = f'{{{W_NS}}}gridBefore'
+W_TC = f'{{{W_NS}}}tc'
+W_TCPR = f'{{{W_NS}}}tcPr'
+W_GRID_SPAN = f'{{{W_NS}}}gridSpan'
+W_VMERGE = f'{{{W_NS}}}vMerge'
+W_VAL = f'{{{W_NS}}}val'
+W_TYPE = f'{{{W_NS}}}type'
+
+# Texto equivalente dos elementos de conteúdo de um run (mesma regra do python-docx)
+RUN_CHAR_ELEMENTS = {
+    W_TAB: '\t',
+    W_PTAB: '\t',
+    W_CR: '\n',
+    W_NO_BREAK_HYPHEN: '-'
+}
+
+ON_OFF_TRUE = ('1', 'true', 'on')
+
+
+def run_text(r):
+    """Texto de um elemento w:r"""
+    parts = []
+    for child in r:
+        tag = child.tag
+        if tag == W_T:
+            parts.append(child.text or '')
+        elif tag == W_BR:
+            if child.get(W_TYPE, 'textWrapping') == 'textWrapping':
+                parts.append('\n')
+        elif tag in RUN_CHAR_ELEMENTS:
+            parts.append(RUN_CHAR_ELEMENTS[tag])
+    return ''.join(parts)
+
+
+def paragraph_text(p):
+    """Texto de um elemento w:p, incluindo o texto visível de hyperlinks"""
+    parts = []
+    for child in p:
+        if child.tag == W_R:
+            parts.append(run_text(child))
+        elif child.tag == W_HYPERLINK:
+            parts.extend(run_text(r) for r in child if r.tag == W_R)
+    return ''.join(parts)
+
+
+def on_off_value(rpr, tag):
+    """Valor tri-state (True/False/None) de uma propriedade on/off do run (w:b, w:i)"""
+    if rpr is None:
+        return None
+    element = rpr.find(tag)
+    if element is None:
+        return None
+    return element.get(W_VAL, 'true') in ON_OFF_TRUE
+
+
+def underline_value(rpr):
+    """Valor de sublinhado no mesmo formato de Run.underline do python-docx"""
+    if rpr is None:
+        return None
+    element = rpr.find(W_U)
+    if element is None:
+        return None
+    val = element.get(W_VAL)
+    if val is None:
+        return None
+    if val == 'single':
+        return True
+    if val == 'none':
+        return False
+
+    from docx.enum.text import WD_UNDERLINE
+    return WD_UNDERLINE.from_xml(val)
+
+
+def paragraph_runs(p):
+    """Informações de formatação dos runs diretos do parágrafo"""
+    runs_info = []
+    for r in p:
+        if r.tag != W_R:
+            continue
+        text = run_text(r)
+        if text.strip():
+            rpr = r.find(W_RPR)
+            runs_info.append({
+                'text': text,
+                'bold': on_off_value(rpr, W_B),
+                'italic': on_off_value(rpr, W_I),
+                'underline': underline_value(rpr)
+            })
+    return runs_info
+
+
+def cell_text(tc):
+    """Texto de uma célula (parágrafos diretos separados por quebra de linha)"""
+    return '\n'.join(paragraph_text(p) for p in tc if p.tag == W_P)
+
+
+def _int_property(parent, container_tag, tag, default):
+    """Lê um atributo inteiro w:val de parent/container/tag"""
+    container = parent.find(container_tag)
+    if container is None:
+        return default
+    element = container.find(tag)
+    if element is None:
+        return default
+    try:
+        return int(element.get(W_VAL))
+    except (TypeError, ValueError):
+        return default
+
+
+def table_rows(tbl):
+    """
+    Linhas de uma tabela com as mesmas regras de Row.cells do python-docx:
+    células com gridSpan se repetem e continuações de vMerge herdam a célula de cima
+    """
+    rows = []
+    previous_grid = {}
+
+    for tr in tbl:
+        if tr.tag != W_TR:
+            continue
+
+        grid = {}
+        offset = _int_property(tr, W_TRPR, W_GRID_BEFORE, 0)
+        row_cells = []
+
+        for tc in tr:
+            if tc.tag != W_TC:
+                continue
+
+            span = _int_property(tc, W_TCPR, W_GRID_SPAN, 1)
+            tcpr = tc.find(W_TCPR)
+            vmerge = tcpr.find(W_VMERGE) if tcpr is not None else None
+
+            text = None
+            if vmerge is not None and vmerge.get(W_VAL, 'continue') == 'continue':
+                # Continuação de mesclagem vertical: texto da célula de origem
+                text = previous_grid.get(offset)
+            if text is None:
+                text = cell_text(tc).strip()
+
+            grid[offset] = text
+            for _ in range(span):
+                if text:
+                    row_cells.append(text)
+            offset += span
+
+        previous_grid = grid
+        if row_cells:
+            rows.append(row_cells)
+
+    return rows
+
+
+def _release(element):
+    """Libera a memória de um elemento já processado e de seus irmãos anteriores"""
+    element.clear()
+    parent = element.getparent()
+    if parent is not None:
+        while element.getprevious() is not None:
+            del parent[0]
+
+
+def parse_document_xml(stream, include_content=True, include_runs=True):
+    """
+    Percorre word/document.xml em streaming coletando parágrafos e tabelas do corpo
+
+    Args:
+        include_content: Se False, apenas parágrafos e tabelas são contados (sem texto)
+        include_runs: Se False, a formatação dos runs não é montada ('runs' vazio)
+
+    Returns:
+        Tupla (parágrafos com texto, tabelas, total de parágrafos, total de tabelas,
+        se a leitura parou no prazo da requisição)
+    """
+    text_content = []
+    tables_data = []
+    paragraph_count = 0
+    table_count = 0
+    truncated = False
+
+    context = etree.iterparse(stream, events=('end',), tag=(W_P, W_TBL), **XML_PARSER_OPTIONS)
+
+    for _, element in context:
+        parent = element.getparent()
+        if parent is None or parent.tag != W_BODY:
+            # Parágrafos/tabelas aninhados são tratados junto com a tabela de nível superior
+            continue
+
+        if deadline.reached():
+            truncated = True
+            break
+
+        if element.tag == W_P:
+            paragraph_count += 1
+            text = paragraph_text(element) if include_content else ''
+            if text.strip():
+                text_content.append({
+                    'type': 'paragraph',
+                    'text': text,
+                    'runs': paragraph_runs(element) if include_runs else []
+                })
+        else:
+            table_count += 1
+            rows = table_rows(element) if include_content else None
+            if rows:
+                tables_data.append({
+                    'table_index': table_count,
+                    'rows': rows,
+                    'text': '\n'.join([' | '.join(row) for row in rows])
+                })
+
+        _release(element)
+
+    del context
+    return text_content, tables_data, paragraph_count, table_count, truncated
+
+
+def docx_metadata(zip_file):
+    """Metadados do documento a partir de docProps/core.xml"""
+    core_properties = read_core_properties(zip_file)
+    if core_properties is None:
+        # Mesmo comportamento do python-docx quando o pacote não possui core.xml
+        return {
+            'title': 'Word Document',
+            'author': '',
+            'subject': '',
+            'created': None,
+            'modified': datetime.datetime.now(datetime.timezone.utc).isoformat()
+        }
+
+    return {
+        'title': core_properties['title'] or '',
+        'author': core_properties['author'] or '',
+        'subject': core_properties['subject'] or '',
+        'created': core_properties['created'].isoformat() if core_properties['created'] else None,
+        'modified': core_properties['modified'].isoformat() if core_properties['modified'] else None
+    }
+
+
+def parse_docx(file_path, include_image_data=True, fields=None):
+    """
+    Extrai parágrafos, formatação, tabelas, mídia e metadados de um .docx
+    abrindo o pacote ZIP uma única vez
+
+    Args:
+        file_path: Caminho do arquivo
+        include_image_data: Se False, a mídia é descrita apenas pelo cabeçalho (sem base64)
+        fields: FieldSelection opcional; partes que nenhum campo pedido usa
+            (formatação dos runs, mídia, metadados) não são processadas
+
+    Returns:
+        Dicionário com 'paragraphs', 'tables', 'images', 'metadata',
+        'paragraph_count', 'table_count' e 'truncated' (corpo lido só em parte
+        porque o prazo da requisição acabou)
+    """
+    with zipfile.ZipFile(file_path, 'r') as docx_zip:
+        document_name = find_package_part(docx_zip, REL_OFFICE_DOCUMENT, 'word/document.xml')
+        if document_name is None:
+            raise Exception("Arquivo não contém word/document.xml")
+
+        # O texto combinado e suas estatísticas dependem de parágrafos, tabelas e da contagem de mídias
+        text_wanted = wants(fields, 'text', 'stats.character_count', 'stats.word_count')
+        include_content = text_wanted or wants(fields, 'paragraphs', 'tables')
+
+        with docx_zip.open(document_name) as stream, timing.span('document_xml'):
+            text_content, tables_data, paragraph_count, table_count, truncated = parse_document_xml(
+                stream, include_content=include_content, include_runs=wants(fields, 'paragraphs.runs')
+            )
+
+        images = []
+        if text_wanted or wants(fields, 'images', 'stats.image_count'):
+            with timing.span('media'):
+                try:
+                    images = extract_media_images(
+                        docx_zip, 'word/media/',
+                        include_data=include_image_data and wants(fields, 'images.data')
+                    )
+                except Exception as image_error:
+                    logger.warning(f"Erro ao extrair imagens do Word: {image_error}")
+
+        metadata = {}
+        if wants(fields, 'metadata'):
+            with timing.span('metadata'):
+                metadata = docx_metadata(docx_zip)
+
+    return {
+        'paragraphs': text_content,
+        'tables': tables_data,
+        'images': images,
+        'metadata': metadata,
+        'paragraph_count': paragraph_count,
+        'table_count': table_count,
+        'truncated': truncated
+    }
@@ -0,0 +1,199 @@
+import struct
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Leitura inicial do cabeçalho e limite de leitura progressiva (em bytes)
+PROBE_INITIAL_SIZE = 4 * 1024
+PROBE_MAX_SIZE = 256 * 1024
+
+# Assinaturas reconhecidas pelo prober
+PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+JPEG_SIGNATURE = b'\xff\xd8\xff'
+GIF_SIGNATURES = (b'GIF87a', b'GIF89a')
+BMP_SIGNATURE = b'BM'
+TIFF_SIGNATURES = (b'II*\x00', b'MM\x00*')
+WMF_PLACEABLE_SIGNATURE = b'\xd7\xcd\xc6\x9a\x00\x00'
+EMF_SIGNATURE = b'\x01\x00\x00\x00'
+
+# Marcadores SOF do JPEG (exceto DHT, JPG e DAC)
+JPEG_SOF_MARKERS = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+
+BMP_HEADER_SIZES = (40, 52, 56, 64, 108, 124)
+
+
+def is_known_signature(header):
+    """Verifica se o cabeçalho começa com uma assinatura suportada pelo prober"""
+    return (
+        header.startswith(PNG_SIGNATURE)
+        or header.startswith(JPEG_SIGNATURE)
+        or header.startswith(GIF_SIGNATURES)
+        or header.startswith(BMP_SIGNATURE)
+        or header.startswith(TIFF_SIGNATURES)
+        or header.startswith(WMF_PLACEABLE_SIGNATURE)
+        or (header.startswith(EMF_SIGNATURE) and header[40:44] == b' EMF')
+    )
+
+
+def _probe_png(header):
+    if len(header) < 24 or header[12:16] != b'IHDR':
+        return None
+    width, height = struct.unpack('>II', header[16:24])
+    return 'PNG', width, height
+
+
+def _probe_jpeg(header):
+    pos = 2
+    length = len(header)
+    while pos + 4 <= length:
+        if header[pos] != 0xFF:
+            return None
+        marker = header[pos + 1]
+        if marker == 0xFF:
+            # Bytes de preenchimento entre segmentos
+            pos += 1
+            continue
+        if marker in (0xD8, 0x01) or 0xD0 <= marker <= 0xD7:
+            pos += 2
+            continue
+        segment_length = struct.unpack('>H', header[pos + 2:pos + 4])[0]
+        if marker in JPEG_SOF_MARKERS:
+            if pos + 9 > length:
+                return None
+            height, width = struct.unpack('>HH', header[pos + 5:pos + 9])
+            return 'JPEG', width, height
+        if marker == 0xDA:
+            return None
+        pos += 2 + segment_length
+    return None
+
+
+def _probe_gif(header):
+    if len(header) < 10:
+        return None
+    width, height = struct.unpack('<HH', header[6:10])
+    return 'GIF', width, height
+
+
+def _probe_bmp(header):
+    if len(header) < 26:
+        return None
+    header_size = struct.unpack('<I', header[14:18])[0]
+    if header_size == 12:
+        width, height = struct.unpack('<HH', header[18:22])
+    elif header_size in BMP_HEADER_SIZES:
+        width, height = struct.unpack('<Ii', header[18:26])
+        height = abs(height)
+    else:
+        return None
+    return 'BMP', width, height
+
+
+def _probe_tiff(header):
+    endian = '<' if header.startswith(b'II') else '>'
+    if len(header) < 8:
+        return None
+    ifd_offset = struct.unpack(endian + 'I', header[4:8])[0]
+    if ifd_offset + 2 > len(header):
+        return None
+
+    entry_count = struct.unpack(endian + 'H', header[ifd_offset:ifd_offset + 2])[0]
+    entries_end = ifd_offset + 2 + entry_count * 12
+    if entries_end > len(header):
+        return None
+
+    width = height = None
+    for index in range(entry_count):
+        entry = ifd_offset + 2 + index * 12
+        tag, field_type = struct.unpack(endian + 'HH', header[entry:entry + 4])
+        if tag not in (256, 257):
+            continue
+        if field_type == 3:  # SHORT
+            value = struct.unpack(endian + 'H', header[entry + 8:entry + 10])[0]
+        elif field_type == 4:  # LONG
+            value = struct.unpack(endian + 'I', header[entry + 8:entry + 12])[0]
+        else:
+            return None
+        if tag == 256:
+            width = value
+        else:
+            height = value
+
+    if width is None or height is None:
+        return None
+    return 'TIFF', width, height
+
+
+def _probe_wmf(header):
+    # Mesmas regras do WmfImagePlugin do Pillow (metafile "placeable", 72 DPI)
+    if len(header) < 26 or header[22:26] != b'\x01\x00\t\x00':
+        return None
+    x0, y0, x1, y1 = struct.unpack('<hhhh', header[6:14])
+    inch = struct.unpack('<H', header[14:16])[0]
+    if inch == 0:
+        return None
+    return 'WMF', (x1 - x0) * 72 // inch, (y1 - y0) * 72 // inch
+
+
+def _probe_emf(header):
+    if len(header) < 44:
+        return None
+    x0, y0, x1, y1 = struct.unpack('<iiii', header[8:24])
+    # O Pillow identifica metafiles EMF com o formato "WMF"
+    return 'WMF', x1 - x0, y1 - y0
+
+
+def probe_image_header(header):
+    """
+    Determina formato e dimensões de uma imagem apenas pelos bytes de cabeçalho
+
+    Returns:
+        Tupla (formato, largura, altura) com os mesmos nomes de formato do Pillow,
+        ou None se o formato não for reconhecido ou o cabeçalho estiver incompleto
+    """
+    try:
+        if header.startswith(PNG_SIGNATURE):
+            return _probe_png(header)
+        if header.startswith(JPEG_SIGNATURE):
+            return _probe_jpeg(header)
+        if header.startswith(GIF_SIGNATURES):
+            return _probe_gif(header)
+        if header.startswith(BMP_SIGNATURE):
+            return _probe_bmp(header)
+        if header.startswith(TIFF_SIGNATURES):
+            return _probe_tiff(header)
+        if header.startswith(WMF_PLACEABLE_SIGNATURE):
+            return _probe_wmf(header)
+        if header.startswith(EMF_SIGNATURE) and header[40:44] == b' EMF':
+            return _probe_emf(header)
+    except struct.error as probe_error:
+        logger.debug(f"Cabeçalho de imagem truncado: {probe_error}")
+    return None
+
+
+def probe_zip_member(zip_file, member_name, initial_size=PROBE_INITIAL_SIZE, max_size=PROBE_MAX_SIZE):
+    """
+    Lê apenas o início de um membro do ZIP para obter formato e dimensões
+
+    A leitura começa com initial_size bytes e dobra enquanto o formato for
+    reconhecido mas o cabeçalho ainda não contiver as dimensões (ex.: JPEG com
+    EXIF grande), até max_size.
+
+    Returns:
+        Tupla (formato, largura, altura) ou None
+    """
+    with zip_file.open(member_name) as stream:
+        header = stream.read(initial_size)
+        if not is_known_signature(header):
+            return None
+
+        while True:
+            probed = probe_image_header(header)
+            if probed is not None:
+                return probed
+            if len(header) >= max_size:
+                return None
+            more = stream.read(len(header))
+            if not more:
+                return None
+            header += more
@@ -0,0 +1,260 @@
+import os
+import re
+import time
+import shutil
+import hashlib
+import logging
+import tempfile
+import subprocess
+from contextlib import contextmanager
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from src.engines.page_render import render_page
+from src.services import deadline, timing
+from src.services.disk_cache import DiskCache, ensure_private_directory
+
+try:
+    import fcntl
+except ImportError:  # Windows: sem limite entre processos, só o pool de cada extração
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# Binário do Tesseract (caminho ou nome no PATH)
+TESSERACT_CMD = os.environ.get('TESSERACT_CMD', 'tesseract')
+
+# OCR habilitado quando o binário existe (OCR_ENABLED=0 desliga)
+OCR_ENABLED = os.environ.get('OCR_ENABLED', '1') != '0'
+
+# Resolução das páginas enviadas ao OCR: o Tesseract rende melhor perto de 300 DPI,
+# independente do DPI usado nas imagens de visualização
+OCR_DPI = int(os.environ.get('OCR_DPI', '300'))
+
+# Idioma padrão (modelos traineddata instalados, combinados com '+')
+OCR_DEFAULT_LANG = os.environ.get('OCR_LANG', 'por+eng')
+
+# Tempo máximo (s) do OCR de uma extração, e teto aceito por requisição
+OCR_DEFAULT_TIMEOUT = float(os.environ.get('OCR_TIMEOUT', '60'))
+OCR_MAX_TIMEOUT = 300
+
+# Processos tesseract simultâneos por extração
+OCR_WORKERS = int(os.environ.get('OCR_WORKERS', min(4, os.cpu_count() or 1)))
+
+# Processos tesseract simultâneos no host, somando todas as extrações (0 desliga o limite)
+OCR_MAX_PROCESSES = int(os.environ.get('OCR_MAX_PROCESSES', os.cpu_count() or 1))
+
+# Diretório das vagas do limite do host (um arquivo com flock por vaga)
+OCR_SLOTS_DIR = os.environ.get('OCR_SLOTS_DIR', os.path.join(tempfile.gettempdir(), 'extractor-ocr-slots'))
+
+# Intervalo máximo entre tentativas de obter uma vaga
+OCR_SLOT_POLL_MAX_INTERVAL = 0.1
+
+# Cache do texto reconhecido, por hash do raster (compartilhado entre workers)
+OCR_CACHE = DiskCache(
+    'ocr',
+    os.environ.get('OCR_CACHE_DIR', os.path.join(tempfile.gettempdir(), 'extractor-ocr-cache')),
+    int(os.environ.get('OCR_CACHE_MAX_MB', '64')) * 1024 * 1024
+)
+
+# Páginas com menos caracteres que isto na camada de texto são enviadas ao OCR
+OCR_MIN_TEXT_CHARS = 50
+
+LANG_PATTERN = re.compile(r'^[A-Za-z_]+(\+[A-Za-z_]+)*$')
+
+_available = None
+
+
+def is_available():
+    """Verifica (uma vez) se o OCR está habilitado e o binário do Tesseract existe"""
+    global _available
+    if _available is None:
+        _available = OCR_ENABLED and shutil.which(TESSERACT_CMD) is not None
+        if OCR_ENABLED and not _available:
+            logger.info(f"Tesseract não encontrado ({TESSERACT_CMD}); OCR desabilitado")
+    return _available
+
+
+def normalize_lang(value):
+    """Idioma do OCR informado na requisição ('por', 'por+eng'), ou None se inválido"""
+    if value is None:
+        return None
+    value = str(value).strip()
+    return value if LANG_PATTERN.match(value) else None
+
+
+def normalize_timeout(value):
+    """Tempo máximo do OCR em segundos (limitado a OCR_MAX_TIMEOUT), ou None se inválido"""
+    try:
+        timeout = float(value)
+    except (TypeError, ValueError):
+        return None
+    if timeout <= 0:
+        return None
+    return min(timeout, OCR_MAX_TIMEOUT)
+
+
+def cache_key(raster, lang, dpi=None):
+    """Chave do cache: hash do raster e dos parâmetros que mudam o resultado"""
+    digest = hashlib.sha256(raster)
+    digest.update(f'|{lang}|{dpi}'.encode())
+    return digest.hexdigest()
+
+
+def _try_slot():
+    """Arquivo da primeira vaga livre (com o flock obtido), ou None se todas estiverem ocupadas"""
+    first = os.getpid() % OCR_MAX_PROCESSES
+    for offset in range(OCR_MAX_PROCESSES):
+        slot_path = os.path.join(OCR_SLOTS_DIR, f'slot-{(first + offset) % OCR_MAX_PROCESSES}.lock')
+        slot_file = open(slot_path, 'a+')
+        try:
+            fcntl.flock(slot_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return slot_file
+        except BlockingIOError:
+            slot_file.close()
+    return None
+
+
+@contextmanager
+def tesseract_slot(timeout):
+    """
+    Reserva uma das OCR_MAX_PROCESSES vagas de tesseract do host durante o bloco
+
+    Cada extração roda em um worker próprio, então um semáforo do processo não
+    limitaria nada: as vagas são arquivos com flock, liberados pelo kernel
+    quando o processo termina, mesmo se o governor matar o worker. Produz o
+    tempo que resta do timeout depois da espera; sem vaga dentro do prazo,
+    lança subprocess.TimeoutExpired. Se o diretório das vagas não puder ser
+    usado, o OCR roda sem o limite do host.
+    """
+    if fcntl is None or OCR_MAX_PROCESSES <= 0:
+        yield timeout
+        return
+    try:
+        ensure_private_directory(OCR_SLOTS_DIR)
+    except OSError as slot_error:
+        logger.warning(f"Vagas de OCR indisponíveis ({slot_error}); tesseract sem limite no host")
+        yield timeout
+        return
+
+    limit = time.monotonic() + timeout
+    interval = 0.005
+    slot_file = _try_slot()
+    while slot_file is None:
+        remaining = limit - time.monotonic()
+        if remaining <= 0:
+            raise subprocess.TimeoutExpired(TESSERACT_CMD, timeout)
+        time.sleep(min(interval, remaining))
+        interval = min(interval * 2, OCR_SLOT_POLL_MAX_INTERVAL)
+        slot_file = _try_slot()
+
+    try:
+        yield max(0.0, limit - time.monotonic())
+    finally:
+        slot_file.close()
+
+
+def run_tesseract(image_bytes, lang, timeout, dpi=None):
+    """
+    Reconhece o texto de uma imagem (PNG, JPEG, TIFF...) com o binário do Tesseract
+
+    A imagem vai pelo stdin e o texto volta pelo stdout, sem arquivos temporários.
+    OMP_THREAD_LIMIT=1 deixa o paralelismo a cargo do pool, e o processo só
+    sobe quando há vaga no limite do host (tesseract_slot); a espera conta no
+    timeout.
+    """
+    command = [TESSERACT_CMD, 'stdin', 'stdout', '-l', lang]
+    if dpi:
+        command += ['--dpi', str(dpi)]
+    if timeout <= 0:
+        raise subprocess.TimeoutExpired(command, timeout)
+    with tesseract_slot(timeout) as remaining:
+        completed = subprocess.run(
+            command, input=image_bytes, capture_output=True, timeout=remaining,
+            env=dict(os.environ, OMP_THREAD_LIMIT='1')
+        )
+    if completed.returncode != 0:
+        message = completed.stderr.decode('utf-8', 'replace').strip().splitlines()
+        raise Exception(f"Tesseract falhou: {message[-1] if message else completed.returncode}")
+    return completed.stdout.decode('utf-8', 'replace').strip()
+
+
+def recognize(image_bytes, lang=None, timeout=None, dpi=None):
+    """
+    Texto de uma imagem, consultando o cache antes de chamar o Tesseract
+
+    Returns:
+        Tupla (texto, veio do cache)
+    """
+    lang = lang or OCR_DEFAULT_LANG
+    key = cache_key(image_bytes, lang, dpi)
+    cached = OCR_CACHE.get(key)
+    if cached is not None:
+        return cached.decode('utf-8'), True
+
+    # timeout 0 (prazo da requisição esgotado) não pode virar o padrão
+    text = run_tesseract(image_bytes, lang, OCR_DEFAULT_TIMEOUT if timeout is None else timeout, dpi=dpi)
+    OCR_CACHE.put(key, text.encode('utf-8'))
+    return text, False
+
+
+def ocr_pdf_pages(doc, page_numbers, lang=None, timeout=None, dpi=OCR_DPI, document_hash=None):
+    """
+    OCR de páginas de um documento PyMuPDF em um pool limitado de processos tesseract
+
+    Além das OCR_WORKERS páginas por extração, os processos respeitam o limite
+    do host (tesseract_slot).
+
+    As páginas são renderizadas em tons de cinza no DPI do OCR na thread
+    atual (o PyMuPDF não é thread-safe) e só são renderizadas quando há vaga
+    no pool, para não acumular rasters em memória. Páginas que não terminarem
+    dentro do tempo máximo ficam com 'error', e as que faltarem quando o prazo
+    da requisição acabar não são processadas. Com document_hash, os rasters
+    vêm do cache de rasters e só o Tesseract roda de novo se o texto não
+    estiver em cache.
+
+    Args:
+        page_numbers: Índices (base 0) das páginas
+
+    Returns:
+        Lista de dicionários {'page', 'text', 'cached'} ou {'page', 'error'}, em ordem de página
+    """
+    lang = lang or OCR_DEFAULT_LANG
+    ocr_deadline = time.monotonic() + (OCR_DEFAULT_TIMEOUT if timeout is None else timeout)
+    results = {}
+    pending = {}
+
+    def collect(done):
+        for future in done:
+            page_number = pending.pop(future)
+            try:
+                text, cached = future.result()
+                results[page_number] = {'page': page_number + 1, 'text': text, 'cached': cached}
+            except subprocess.TimeoutExpired:
+                results[page_number] = {'page': page_number + 1, 'error': 'Tempo máximo de OCR excedido'}
+            except Exception as ocr_error:
+                logger.warning(f"Erro no OCR da página {page_number + 1}: {ocr_error}")
+                results[page_number] = {'page': page_number + 1, 'error': str(ocr_error)}
+
+    with ThreadPoolExecutor(max_workers=max(1, OCR_WORKERS)) as executor:
+        for page_number in page_numbers:
+            while len(pending) >= OCR_WORKERS:
+                collect(wait(pending, return_when=FIRST_COMPLETED).done)
+
+            if deadline.reached():
+                break
+
+            remaining = deadline.bounded(ocr_deadline - time.monotonic())
+            if remaining <= 0:
+                results[page_number] = {'page': page_number + 1, 'error': 'Tempo máximo de OCR excedido'}
+                continue
+
+            with timing.span('ocr_render', page=page_number + 1):
+                raster, _width, _height, _cached = render_page(
+                    doc, page_number, dpi, grayscale=True, document_hash=document_hash
+                )
+            pending[executor.submit(recognize, raster, lang, remaining, dpi)] = page_number
+
+        while pending:
+            collect(wait(pending, return_when=FIRST_COMPLETED).done)
+
+    return [results[page_number] for page_number in sorted(results)]
@@ -0,0 +1,195 @@
+import io
+import base64
+import logging
+import posixpath
+
+from lxml import etree
+
+from src.engines.image_probe import probe_image_header, probe_zip_member
+
+logger = logging.getLogger(__name__)
+
+# Namespaces comuns aos pacotes Office Open XML
+NS_PACKAGE_RELS = 'http://schemas.openxmlformats.org/package/2006/relationships'
+REL_OFFICE_DOCUMENT = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument'
+REL_CORE_PROPERTIES = 'http://schemas.openxmlformats.org/package/2006/relationships/metadata/core-properties'
+
+# Parser seguro e compatível com o usado por python-docx/python-pptx
+XML_PARSER_OPTIONS = {
+    'remove_blank_text': True,
+    'resolve_entities': False,
+    'no_network': True,
+    'huge_tree': True
+}
+
+
+def parse_xml_member(zip_file, member_name):
+    """Lê e faz o parse de um membro XML pequeno do pacote"""
+    parser = etree.XMLParser(**XML_PARSER_OPTIONS)
+    return etree.fromstring(zip_file.read(member_name), parser)
+
+
+def read_relationships(zip_file, rels_name):
+    """Retorna um dicionário {rId: (tipo, destino)} de um arquivo .rels"""
+    relationships = {}
+    if rels_name not in zip_file.NameToInfo:
+        return relationships
+
+    base_dir = posixpath.dirname(posixpath.dirname(rels_name))
+    for rel in parse_xml_member(zip_file, rels_name):
+        if rel.get('TargetMode') == 'External':
+            continue
+        target = rel.get('Target', '')
+        if target.startswith('/'):
+            target = target.lstrip('/')
+        else:
+            target = posixpath.normpath(posixpath.join(base_dir, target))
+        relationships[rel.get('Id')] = (rel.get('Type'), target)
+
+    return relationships
+
+
+def find_package_part(zip_file, rel_type, default_name):
+    """Localiza uma parte do pacote pelo tipo de relacionamento em _rels/.rels"""
+    try:
+        for part_type, target in read_relationships(zip_file, '_rels/.rels').values():
+            if part_type == rel_type and target in zip_file.NameToInfo:
+                return target
+    except Exception as rels_error:
+        logger.debug(f"Erro ao ler relacionamentos do pacote: {rels_error}")
+
+    return default_name if default_name in zip_file.NameToInfo else None
+
+
+def image_mime_type(img_format):
+    """Determina o tipo MIME a partir do formato da imagem"""
+    mime_type = f"image/{img_format.lower()}"
+    if img_format.upper() == 'JPEG':
+        mime_type = "image/jpeg"
+    elif img_format.upper() == 'PNG':
+        mime_type = "image/png"
+    return mime_type
+
+
+def probe_media_image(zip_file, media_file, img_data=None):
+    """
+    Obtém (formato, largura, altura) de uma mídia do pacote sem decodificar a imagem
+
+    Usa apenas os bytes de cabeçalho; o Pillow só é usado como fallback para
+    formatos que o prober não reconhece.
+    """
+    if img_data is not None:
+        probed = probe_image_header(img_data)
+    else:
+        probed = probe_zip_member(zip_file, media_file)
+    if probed is not None:
+        return probed
+
+    from PIL import Image
+
+    if img_data is None:
+        img_data = zip_file.read(media_file)
+    with Image.open(io.BytesIO(img_data)) as img:
+        width, height = img.size
+        return img.format or 'UNKNOWN', width, height
+
+
+def extract_media_images(zip_file, media_prefix, include_data=True, members=None, deduplicate=False):
+    """
+    Extrai as imagens de mídia (ex.: word/media/) de um pacote OOXML já aberto
+
+    Args:
+        zip_file: Pacote ZIP aberto
+        media_prefix: Prefixo dos membros de mídia
+        include_data: Se False, apenas o cabeçalho de cada mídia é lido e o
+            campo 'data' é retornado como None
+        members: Conjunto opcional de membros a considerar (ex.: mídias de slides selecionados)
+        deduplicate: Se True, mídias com mesmo CRC e tamanho são retornadas uma
+            única vez, com os nomes repetidos em 'duplicates'
+    """
+    images = []
+    seen_media = {}
+    media_files = [
+        f for f in zip_file.namelist()
+        if f.startswith(media_prefix) and (members is None or f in members)
+    ]
+
+    for idx, media_file in enumerate(media_files):
+        try:
+            if deduplicate:
+                # CRC e tamanho vêm do diretório central do ZIP, sem ler a mídia
+                info = zip_file.getinfo(media_file)
+                media_key = (info.CRC, info.file_size)
+                if media_key in seen_media:
+                    seen_media[media_key].setdefault('duplicates', []).append(media_file.split('/')[-1])
+                    continue
+
+            # Ler dados da imagem apenas quando o conteúdo for solicitado
+            img_data = zip_file.read(media_file) if include_data else None
+            size_bytes = len(img_data) if img_data is not None else zip_file.getinfo(media_file).file_size
+
+            # Verificar se é imagem válida
+            try:
+                img_format, width, height = probe_media_image(zip_file, media_file, img_data)
+
+                image_info = {
+                    'index': idx + 1,
+                    'filename': media_file.split('/')[-1],
+                    'format': img_format.upper(),
+                    'width': width,
+                    'height': height,
+                    'size_bytes': size_bytes,
+                    'data': base64.b64encode(img_data).decode('utf-8') if img_data is not None else None,
+                    'mime_type': image_mime_type(img_format)
+                }
+                images.append(image_info)
+                if deduplicate:
+                    seen_media[media_key] = image_info
+
+                logger.debug(f"Imagem extraída: {media_file} - {width}x{height} - {size_bytes} bytes")
+
+            except Exception as img_process_error:
+                logger.warning(f"Arquivo de mídia não é imagem válida: {media_file} - {img_process_error}")
+
+        except Exception as media_error:
+            logger.warning(f"Erro ao processar mídia {media_file}: {media_error}")
+
+    return images
+
+
+def read_core_properties(zip_file, library='docx'):
+    """
+    Lê docProps/core.xml com o parser da biblioteca correspondente ao formato
+
+    O python-docx retorna datas com fuso horário e o python-pptx datas sem fuso;
+    usar o mesmo parser mantém a saída idêntica à dos caminhos via biblioteca.
+
+    Returns:
+        Dicionário com title, author, subject, created e modified, ou None se ausente
+    """
+    core_name = find_package_part(zip_file, REL_CORE_PROPERTIES, 'docProps/core.xml')
+    if core_name is None:
+        return None
+    blob = zip_file.read(core_name)
+
+    if library == 'pptx':
+        from pptx.oxml import parse_xml
+        element = parse_xml(blob)
+        return {
+            'title': element.title_text,
+            'author': element.author_text,
+            'subject': element.subject_text,
+            'created': element.created_datetime,
+            'modified': element.modified_datetime
+        }
+
+    from docx.opc.coreprops import CoreProperties
+    from docx.oxml.parser import parse_xml
+    core_properties = CoreProperties(parse_xml(blob))
+    return {
+        'title': core_properties.title,
+        'author': core_properties.author,
+        'subject': core_properties.subject,
+        'created': core_properties.created,
+        'modified': core_properties.modified
+    }
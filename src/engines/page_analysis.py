@@ -0,0 +1,90 @@
+import os
+import logging
+
+from src.services import deadline, timing
+
+logger = logging.getLogger(__name__)
+
+# Detecção de páginas em branco antes da rasterização e do OCR (BLANK_PAGE_DETECTION=0 desliga)
+BLANK_PAGE_DETECTION = os.environ.get('BLANK_PAGE_DETECTION', '1') != '0'
+
+# Maior lado da miniatura analisada, em pixels
+THUMBNAIL_SIZE = 128
+
+# Fração de cada borda ignorada (sombra do scanner, furos, grampos)
+MARGIN_RATIO = 0.05
+
+# Pixel com "tinta": mais escuro que o fundo (percentil 90) por esta diferença
+INK_DELTA = 40
+
+# Página em branco: quase nenhuma tinta e pouca variação (ruído de digitalização)
+BLANK_MAX_INK_RATIO = 0.002
+BLANK_MAX_STD = 5.0
+
+
+def page_thumbnail(page, size=THUMBNAIL_SIZE):
+    """Miniatura em tons de cinza da página como array numpy (altura x largura)"""
+    import numpy as np
+    import pymupdf
+
+    zoom = size / max(page.rect.width, page.rect.height, 1)
+    pix = page.get_pixmap(matrix=pymupdf.Matrix(zoom, zoom), colorspace=pymupdf.csGRAY, alpha=False)
+    # stride pode ter preenchimento além da largura
+    pixels = np.frombuffer(pix.samples, dtype=np.uint8).reshape(pix.height, pix.stride)[:, :pix.width]
+    return pixels
+
+
+def is_blank(pixels):
+    """
+    Classifica uma miniatura em tons de cinza como página em branco
+
+    Returns:
+        Tupla (em branco, fração de tinta, desvio padrão)
+    """
+    import numpy as np
+
+    height, width = pixels.shape
+    margin_y, margin_x = int(height * MARGIN_RATIO), int(width * MARGIN_RATIO)
+    content = pixels[margin_y:height - margin_y, margin_x:width - margin_x].astype('float32')
+    if content.size == 0:
+        return True, 0.0, 0.0
+
+    background = float(np.percentile(content, 90))
+    ink_ratio = float((content < background - INK_DELTA).mean())
+    deviation = float(content.std())
+    return ink_ratio < BLANK_MAX_INK_RATIO and deviation < BLANK_MAX_STD, ink_ratio, deviation
+
+
+def detect_blank_pages(doc, page_numbers=None):
+    """
+    Páginas em branco ou quase em branco (separadores, versos vazios) de um documento PyMuPDF
+
+    Renderiza uma miniatura de cada página, bem mais barata que a rasterização
+    para visualização ou OCR, e classifica pelas estatísticas dos pixels.
+    Páginas com camada de texto nunca são consideradas em branco: uma única
+    linha (ex.: uma assinatura) fica abaixo dos limiares da miniatura.
+    Com o prazo da requisição esgotado, as páginas restantes não são analisadas.
+
+    Args:
+        page_numbers: Índices (base 0) a analisar (padrão: todas)
+
+    Returns:
+        Lista ordenada dos números (base 1) das páginas em branco
+    """
+    blank_pages = []
+    for page_number in (range(len(doc)) if page_numbers is None else page_numbers):
+        if deadline.reached():
+            break
+        try:
+            page = doc[page_number]
+            if page.get_text().strip():
+                continue
+            with timing.span('thumbnail', page=page_number + 1):
+                blank, ink_ratio, deviation = is_blank(page_thumbnail(page))
+        except Exception as analysis_error:
+            logger.debug(f"Erro ao analisar a página {page_number + 1}: {analysis_error}")
+            continue
+        if blank:
+            blank_pages.append(page_number + 1)
+            logger.debug(f"Página {page_number + 1} em branco (tinta {ink_ratio:.4f}, desvio {deviation:.2f})")
+    return blank_pages
@@ -0,0 +1,133 @@
+import os
+import hashlib
+import tempfile
+
+from src.engines.image_probe import probe_image_header
+from src.services import timing
+from src.services.disk_cache import DiskCache, make_key
+
+# Cache das páginas renderizadas e codificadas (PNG/JPEG), compartilhado entre os workers
+RASTER_CACHE_ENABLED = os.environ.get('RASTER_CACHE', '1') != '0'
+RASTER_CACHE = DiskCache(
+    'raster',
+    os.environ.get('RASTER_CACHE_DIR', os.path.join(tempfile.gettempdir(), 'extractor-raster-cache')),
+    int(os.environ.get('RASTER_CACHE_MAX_MB', '512')) * 1024 * 1024
+)
+
+# Qualidade das páginas em JPEG
+JPEG_QUALITY = 95
+
+# Blocos lidos ao calcular o hash do documento
+DIGEST_CHUNK_SIZE = 1024 * 1024
+
+# Hashes já calculados, por (caminho, tamanho, mtime): a chave do single-flight e o cache de
+# rasters usam o mesmo hash, e o worker da extração (fork) herda os calculados no servidor
+_DIGESTS = {}
+DIGEST_MEMO_SIZE = 64
+
+
+def file_digest(file_path):
+    """
+    Hash SHA-256 do conteúdo do arquivo (identifica o documento no cache, independente do nome)
+
+    O hash custa ~1 ms por MB; cada arquivo é lido uma única vez por requisição.
+    """
+    status = os.stat(file_path)
+    memo_key = (file_path, status.st_size, status.st_mtime_ns)
+    cached = _DIGESTS.get(memo_key)
+    if cached is not None:
+        return cached
+
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as source:
+        for chunk in iter(lambda: source.read(DIGEST_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    if len(_DIGESTS) >= DIGEST_MEMO_SIZE:
+        _DIGESTS.clear()
+    _DIGESTS[memo_key] = digest.hexdigest()
+    return _DIGESTS[memo_key]
+
+
+def raster_key(document_hash, page_number, dpi, image_format='PNG', quality=JPEG_QUALITY, grayscale=False):
+    """Chave do cache de rasters: (hash do documento, página, DPI, formato, qualidade)"""
+    image_format = image_format.upper()
+    variant = f"{image_format}{'-GRAY' if grayscale else ''}"
+    return make_key(document_hash, page_number + 1, dpi, variant, quality if image_format == 'JPEG' else None)
+
+
+def cached_page(key):
+    """Página do cache de rasters como (bytes da imagem, largura, altura), ou None"""
+    if not RASTER_CACHE_ENABLED:
+        return None
+    cached = RASTER_CACHE.get(key)
+    if cached is None:
+        return None
+    probed = probe_image_header(cached[:64 * 1024])
+    if probed is None:
+        return None
+    return cached, probed[1], probed[2]
+
+
+def encode_page(doc, page_number, dpi, image_format='PNG', quality=JPEG_QUALITY, grayscale=False):
+    """Renderiza e codifica uma página, sem consultar o cache; retorna (bytes da imagem, largura, altura)"""
+    import pymupdf
+
+    zoom = dpi / 72.0
+    with timing.span('render', page=page_number + 1):
+        pix = doc[page_number].get_pixmap(
+            matrix=pymupdf.Matrix(zoom, zoom), alpha=False,
+            colorspace=pymupdf.csGRAY if grayscale else pymupdf.csRGB
+        )
+    with timing.span('encode', page=page_number + 1):
+        if image_format.upper() == 'JPEG':
+            data = pix.tobytes('jpeg', jpg_quality=quality)
+        else:
+            data = pix.tobytes('png')
+    return data, pix.width, pix.height
+
+
+def render_page(doc, page_number, dpi, image_format='PNG', quality=JPEG_QUALITY, grayscale=False, document_hash=None):
+    """
+    Renderiza e codifica uma página, consultando antes o cache de rasters
+
+    A chave é (hash do documento, página, DPI, formato, qualidade); sem
+    document_hash o cache não é usado.
+
+    Args:
+        page_number: Índice da página (base 0)
+        image_format: 'PNG' ou 'JPEG'
+        grayscale: Renderiza em tons de cinza (rasters para OCR)
+
+    Returns:
+        Tupla (bytes da imagem, largura, altura, veio do cache)
+    """
+    use_cache = RASTER_CACHE_ENABLED and document_hash is not None
+    if use_cache:
+        key = raster_key(document_hash, page_number, dpi, image_format, quality, grayscale)
+        cached = cached_page(key)
+        if cached is not None:
+            return cached + (True,)
+
+    data, width, height = encode_page(doc, page_number, dpi, image_format, quality, grayscale)
+    if use_cache:
+        RASTER_CACHE.put(key, data)
+    return data, width, height, False
+
+
+def render_file_page(file_path, page_number, dpi, image_format='PNG', quality=JPEG_QUALITY, document_hash=None):
+    """
+    Renderiza uma página de um PDF em disco e a grava no cache de rasters
+
+    Usada por /render/page (no worker do governador) depois de o cache já ter
+    sido consultado, por isso não consulta o cache de novo.
+
+    Returns:
+        Tupla (bytes da imagem, largura, altura)
+    """
+    import pymupdf
+
+    with pymupdf.open(file_path) as doc:
+        data, width, height = encode_page(doc, page_number, dpi, image_format, quality)
+    if RASTER_CACHE_ENABLED and document_hash is not None:
+        RASTER_CACHE.put(raster_key(document_hash, page_number, dpi, image_format, quality), data)
+    return data, width, height
@@ -0,0 +1,442 @@
+import os
+import datetime
+import logging
+import posixpath
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+
+from lxml import etree
+
+from src.engines.ooxml import (
+    REL_OFFICE_DOCUMENT, XML_PARSER_OPTIONS, extract_media_images,
+    find_package_part, parse_xml_member, read_core_properties, read_relationships
+)
+from src.services import deadline, timing
+
+logger = logging.getLogger(__name__)
+
+P_NS = 'http://schemas.openxmlformats.org/presentationml/2006/main'
+A_NS = 'http://schemas.openxmlformats.org/drawingml/2006/main'
+R_NS = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships'
+
+P_SP_TREE = f'{{{P_NS}}}spTree'
+P_SP = f'{{{P_NS}}}sp'
+P_GRP_SP = f'{{{P_NS}}}grpSp'
+P_GRAPHIC_FRAME = f'{{{P_NS}}}graphicFrame'
+P_CXN_SP = f'{{{P_NS}}}cxnSp'
+P_PIC = f'{{{P_NS}}}pic'
+P_CONTENT_PART = f'{{{P_NS}}}contentPart'
+P_TX_BODY = f'{{{P_NS}}}txBody'
+P_SLD_ID_LST = f'{{{P_NS}}}sldIdLst'
+P_SLD_SZ = f'{{{P_NS}}}sldSz'
+A_P = f'{{{A_NS}}}p'
+A_R = f'{{{A_NS}}}r'
+A_BR = f'{{{A_NS}}}br'
+A_FLD = f'{{{A_NS}}}fld'
+A_T = f'{{{A_NS}}}t'
+A_TBL = f'{{{A_NS}}}tbl'
+A_TR = f'{{{A_NS}}}tr'
+A_TC = f'{{{A_NS}}}tc'
+A_TX_BODY = f'{{{A_NS}}}txBody'
+A_GRAPHIC_DATA = f'{{{A_NS}}}graphicData'
+R_ID = f'{{{R_NS}}}id'
+
+SHAPE_TAGS = (P_SP, P_GRP_SP, P_GRAPHIC_FRAME, P_CXN_SP, P_PIC, P_CONTENT_PART)
+
+GRAPHIC_DATA_URI_CHART = 'http://schemas.openxmlformats.org/drawingml/2006/chart'
+GRAPHIC_DATA_URI_TABLE = 'http://schemas.openxmlformats.org/drawingml/2006/table'
+GRAPHIC_DATA_URI_OLEOBJ = 'http://schemas.openxmlformats.org/presentationml/2006/ole'
+
+REL_SLIDE = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships/slide'
+
+# Decks com mais slides que o limite são processados em paralelo
+PARALLEL_SLIDE_THRESHOLD = 20
+MAX_SLIDE_WORKERS = min(4, os.cpu_count() or 1)
+
+
+def _shape_type_names():
+    """Nomes dos tipos de forma no mesmo formato de str(shape.shape_type) do python-pptx"""
+    from pptx.enum.shapes import MSO_SHAPE_TYPE
+    return {name: str(getattr(MSO_SHAPE_TYPE, name)) for name in (
+        'AUTO_SHAPE', 'CHART', 'EMBEDDED_OLE_OBJECT', 'FREEFORM', 'GROUP', 'LINE',
+        'LINKED_OLE_OBJECT', 'MEDIA', 'PICTURE', 'PLACEHOLDER', 'TABLE', 'TEXT_BOX'
+    )}
+
+
+def slide_ranges(value):
+    """
+    Intervalos de uma seleção de slides ('1-3,7', [1, 2], 5), sem expandi-los
+
+    Returns:
+        Lista de tuplas (início, fim), base 1 e inclusivas, ou None para todos os slides
+
+    Raises:
+        ValueError: Se a seleção for inválida
+    """
+    if value is None or value == '':
+        return None
+    if isinstance(value, bool):
+        raise ValueError(f"Seleção de slides inválida: {value}")
+    if isinstance(value, int):
+        items = [value]
+    else:
+        items = value if isinstance(value, (list, tuple)) else str(value).split(',')
+
+    ranges = []
+    for item in items:
+        item = str(item).strip()
+        if not item:
+            continue
+        start, _, end = item.partition('-')
+        try:
+            start = int(start)
+            end = int(end) if end else start
+        except ValueError:
+            raise ValueError(f"Seleção de slides inválida: {item}")
+        if start > end:
+            raise ValueError(f"Intervalo de slides inválido: {item}")
+        if start < 1:
+            raise ValueError("Números de slides devem começar em 1")
+        ranges.append((start, end))
+    return ranges or None
+
+
+def parse_slide_range(value, slide_count):
+    """
+    Converte uma seleção de slides ('1-3,7', [1, 2], 5) em um conjunto de números (base 1)
+
+    Os intervalos são limitados a slide_count antes de expandidos, então
+    '1-100000000' custa o mesmo que '1-{slide_count}'.
+
+    Returns:
+        Conjunto de números de slides (vazio se nenhum existir) ou None para todos os slides
+    """
+    ranges = slide_ranges(value)
+    if ranges is None:
+        return None
+    selected = set()
+    for start, end in ranges:
+        selected.update(range(start, min(end, slide_count) + 1))
+    return selected
+
+
+def slide_file_count(file_path):
+    """Quantidade de XMLs de slide no pacote (limite superior dos slides da apresentação), ou 0"""
+    try:
+        with zipfile.ZipFile(file_path) as pptx_zip:
+            return sum(
+                1 for name in pptx_zip.namelist()
+                if name.startswith('ppt/slides/slide') and name.endswith('.xml')
+            )
+    except (OSError, zipfile.BadZipFile):
+        return 0
+
+
+def text_body_text(tx_body):
+    """Texto de um txBody: parágrafos separados por \\n e quebras de linha como \\v"""
+    paragraphs = []
+    for p in tx_body:
+        if p.tag != A_P:
+            continue
+        parts = []
+        for child in p:
+            if child.tag == A_BR:
+                parts.append('\v')
+            elif child.tag in (A_R, A_FLD):
+                t = child.find(A_T)
+                parts.append((t.text or '') if t is not None else '')
+        paragraphs.append(''.join(parts))
+    return '\n'.join(paragraphs)
+
+
+def _has_placeholder(shape):
+    """Verifica se a forma possui o elemento p:ph em suas propriedades não visuais"""
+    return shape.find(f'*/{{{P_NS}}}nvPr/{{{P_NS}}}ph') is not None
+
+
+def shape_type_name(shape, names):
+    """Determina o tipo da forma com as mesmas regras do python-pptx"""
+    tag = shape.tag
+    if tag in (P_SP, P_PIC, P_GRAPHIC_FRAME) and _has_placeholder(shape):
+        return names['PLACEHOLDER']
+
+    if tag == P_SP:
+        sp_pr = shape.find(f'{{{P_NS}}}spPr')
+        if sp_pr is not None and sp_pr.find(f'{{{A_NS}}}custGeom') is not None:
+            return names['FREEFORM']
+        c_nv_sp_pr = shape.find(f'{{{P_NS}}}nvSpPr/{{{P_NS}}}cNvSpPr')
+        is_textbox = c_nv_sp_pr is not None and c_nv_sp_pr.get('txBox') in ('1', 'true')
+        if sp_pr is not None and sp_pr.find(f'{{{A_NS}}}prstGeom') is not None and not is_textbox:
+            return names['AUTO_SHAPE']
+        if is_textbox:
+            return names['TEXT_BOX']
+        return names['AUTO_SHAPE']
+    if tag == P_PIC:
+        video = shape.find(f'{{{P_NS}}}nvPicPr/{{{P_NS}}}nvPr/{{{A_NS}}}videoFile')
+        return names['MEDIA'] if video is not None else names['PICTURE']
+    if tag == P_GRAPHIC_FRAME:
+        graphic_data = shape.find(f'.//{{{A_NS}}}graphicData')
+        uri = graphic_data.get('uri') if graphic_data is not None else None
+        if uri == GRAPHIC_DATA_URI_CHART:
+            return names['CHART']
+        if uri == GRAPHIC_DATA_URI_TABLE:
+            return names['TABLE']
+        if uri == GRAPHIC_DATA_URI_OLEOBJ:
+            embedded = graphic_data.find(f'.//{{{P_NS}}}embed') is not None
+            return names['EMBEDDED_OLE_OBJECT'] if embedded else names['LINKED_OLE_OBJECT']
+        return 'None'
+    if tag == P_GRP_SP:
+        return names['GROUP']
+    if tag == P_CXN_SP:
+        return names['LINE']
+    return 'None'
+
+
+def table_text(graphic_frame):
+    """Texto de uma tabela: células não vazias separadas por ' | ', uma linha por linha"""
+    tbl = graphic_frame.find(f'.//{{{A_NS}}}tbl')
+    if tbl is None:
+        return ''
+    table_lines = []
+    for tr in tbl.iter(A_TR):
+        row_text = []
+        for tc in tr:
+            if tc.tag != A_TC:
+                continue
+            tx_body = tc.find(A_TX_BODY)
+            text = text_body_text(tx_body).strip() if tx_body is not None else ''
+            if text:
+                row_text.append(text)
+        if row_text:
+            table_lines.append(' | '.join(row_text))
+    return '\n'.join(table_lines)
+
+
+def parse_slide_xml(stream, names):
+    """
+    Percorre o XML de um slide em streaming coletando as formas de nível superior
+
+    Returns:
+        Tupla (textos do slide, formas com texto, total de formas)
+    """
+    slide_text = []
+    slide_shapes = []
+    shape_count = 0
+
+    context = etree.iterparse(stream, events=('end',), tag=SHAPE_TAGS, **XML_PARSER_OPTIONS)
+    for _, shape in context:
+        parent = shape.getparent()
+        if parent is None or parent.tag != P_SP_TREE:
+            # Formas dentro de grupos pertencem ao grupo de nível superior
+            continue
+
+        shape_count += 1
+        shape_info = {
+            'type': shape_type_name(shape, names),
+            'text': ''
+        }
+
+        if shape.tag == P_SP:
+            tx_body = shape.find(P_TX_BODY)
+            text = text_body_text(tx_body).strip() if tx_body is not None else ''
+            if text:
+                shape_info['text'] = text
+                slide_text.append(text)
+        elif shape.tag == P_GRAPHIC_FRAME:
+            table_content = table_text(shape)
+            if table_content:
+                shape_info['text'] = table_content
+                slide_text.append(table_content)
+
+        if shape_info['text']:
+            slide_shapes.append(shape_info)
+
+        # Liberar memória das formas já processadas
+        shape.clear()
+        while shape.getprevious() is not None:
+            del parent[0]
+
+    del context
+    return slide_text, slide_shapes, shape_count
+
+
+def slide_media_targets(zip_file, slide_name):
+    """Mídias (ppt/media/...) referenciadas pelos relacionamentos de um slide"""
+    rels_name = posixpath.join(posixpath.dirname(slide_name), '_rels', posixpath.basename(slide_name) + '.rels')
+    return {
+        target for _, target in read_relationships(zip_file, rels_name).values()
+        if target.startswith('ppt/media/')
+    }
+
+
+def process_slides(file_path, slide_jobs, names):
+    """
+    Processa uma lista de (número, nome do XML) abrindo o pacote uma vez por lote
+
+    Para no primeiro slide encontrado depois do prazo da requisição.
+    """
+    results = []
+    with zipfile.ZipFile(file_path, 'r') as pptx_zip:
+        for slide_number, slide_name in slide_jobs:
+            if deadline.reached():
+                break
+            with pptx_zip.open(slide_name) as stream:
+                slide_text, slide_shapes, shape_count = parse_slide_xml(stream, names)
+            results.append({
+                'slide_number': slide_number,
+                'text': '\n'.join(slide_text),
+                'shapes': slide_shapes,
+                'shape_count': shape_count,
+                'media': slide_media_targets(pptx_zip, slide_name)
+            })
+    return results
+
+
+def presentation_slides(zip_file):
+    """
+    Lista os slides na ordem da apresentação e o tamanho dos slides
+
+    Returns:
+        Tupla (lista de nomes dos XML de slides, largura, altura)
+    """
+    presentation_name = find_package_part(zip_file, REL_OFFICE_DOCUMENT, 'ppt/presentation.xml')
+    if presentation_name is None:
+        raise Exception("Arquivo não contém ppt/presentation.xml")
+
+    presentation = parse_xml_member(zip_file, presentation_name)
+    rels_name = posixpath.join(
+        posixpath.dirname(presentation_name), '_rels', posixpath.basename(presentation_name) + '.rels'
+    )
+    relationships = read_relationships(zip_file, rels_name)
+
+    slide_names = []
+    sld_id_lst = presentation.find(P_SLD_ID_LST)
+    if sld_id_lst is not None:
+        for sld_id in sld_id_lst:
+            rel = relationships.get(sld_id.get(R_ID))
+            if rel and rel[0] == REL_SLIDE and rel[1] in zip_file.NameToInfo:
+                slide_names.append(rel[1])
+
+    slide_width = slide_height = None
+    sld_sz = presentation.find(P_SLD_SZ)
+    if sld_sz is not None:
+        slide_width = int(sld_sz.get('cx'))
+        slide_height = int(sld_sz.get('cy'))
+
+    return slide_names, slide_width, slide_height
+
+
+def pptx_metadata(zip_file, slide_count, slide_width, slide_height):
+    """Metadados da apresentação (tamanho dos slides e propriedades do core.xml)"""
+    metadata = {
+        'slide_count': slide_count,
+        'slide_width': slide_width,
+        'slide_height': slide_height,
+    }
+
+    try:
+        core_props = read_core_properties(zip_file, library='pptx')
+        if core_props is None:
+            # Mesmo comportamento do python-pptx quando o pacote não possui core.xml
+            metadata.update({
+                'title': 'PowerPoint Presentation',
+                'author': '',
+                'subject': '',
+                'created': None,
+                'modified': datetime.datetime.now(datetime.timezone.utc).isoformat()
+            })
+        else:
+            metadata.update({
+                'title': core_props['title'] or '',
+                'author': core_props['author'] or '',
+                'subject': core_props['subject'] or '',
+                'created': core_props['created'].isoformat() if core_props['created'] else None,
+                'modified': core_props['modified'].isoformat() if core_props['modified'] else None
+            })
+    except Exception as props_error:
+        logger.warning(f"Erro ao extrair propriedades: {props_error}")
+
+    return metadata
+
+
+def parse_pptx(file_path, slides=None, include_image_data=True, dedupe_media=True,
+               parallel_threshold=PARALLEL_SLIDE_THRESHOLD, max_workers=MAX_SLIDE_WORKERS):
+    """
+    Extrai slides, formas, tabelas, mídia e metadados de um .pptx lendo o XML dos slides diretamente
+
+    Args:
+        file_path: Caminho do arquivo
+        slides: Conjunto de números de slides (base 1) a processar, ou None para todos
+        include_image_data: Se False, a mídia é descrita apenas pelo cabeçalho (sem base64)
+        dedupe_media: Se True, mídias com conteúdo idêntico são retornadas uma única vez
+        parallel_threshold: Quantidade de slides a partir da qual o processamento é paralelo
+        max_workers: Número máximo de threads para decks grandes
+
+    Returns:
+        Dicionário com 'slides', 'images', 'metadata', 'slide_count' e
+        'truncated' (slides faltando porque o prazo da requisição acabou; os
+        processados são sempre os primeiros, sem lacunas)
+    """
+    names = _shape_type_names()
+
+    with zipfile.ZipFile(file_path, 'r') as pptx_zip:
+        with timing.span('presentation'):
+            slide_names, slide_width, slide_height = presentation_slides(pptx_zip)
+        slide_count = len(slide_names)
+        with timing.span('metadata'):
+            metadata = pptx_metadata(pptx_zip, slide_count, slide_width, slide_height)
+
+    slide_jobs = [
+        (number, name) for number, name in enumerate(slide_names, start=1)
+        if slides is None or number in slides
+    ]
+
+    with timing.span('slides', count=len(slide_jobs)):
+        if len(slide_jobs) > parallel_threshold and max_workers > 1:
+            # Lotes contíguos, cada um com seu próprio handle do ZIP
+            batch_size = -(-len(slide_jobs) // max_workers)
+            batches = [slide_jobs[i:i + batch_size] for i in range(0, len(slide_jobs), batch_size)]
+            token = deadline.current()
+
+            def process_batch(batch):
+                # As threads do pool não veem o token da requisição
+                with deadline.bound(token):
+                    return process_slides(file_path, batch, names)
+
+            with ThreadPoolExecutor(max_workers=len(batches)) as executor:
+                slides_data = []
+                for batch, batch_slides in zip(batches, executor.map(process_batch, batches)):
+                    slides_data.extend(batch_slides)
+                    # Com o prazo esgotado cada lote para por conta própria: só o prefixo
+                    # contíguo é mantido, para o resultado parcial não ter lacunas
+                    if len(batch_slides) < len(batch):
+                        break
+        else:
+            slides_data = process_slides(file_path, slide_jobs, names)
+
+    media_members = None
+    if slides is not None:
+        # Apenas mídias referenciadas pelos slides selecionados
+        media_members = set()
+        for slide in slides_data:
+            media_members.update(slide['media'])
+    for slide in slides_data:
+        del slide['media']
+
+    with zipfile.ZipFile(file_path, 'r') as pptx_zip, timing.span('media'):
+        try:
+            images = extract_media_images(
+                pptx_zip, 'ppt/media/', include_data=include_image_data,
+                members=media_members, deduplicate=dedupe_media
+            )
+        except Exception as image_error:
+            logger.warning(f"Erro ao extrair imagens do PowerPoint: {image_error}")
+            images = []
+
+    return {
+        'slides': slides_data,
+        'images': images,
+        'metadata': metadata,
+        'slide_count': slide_count,
+        'truncated': len(slides_data) < len(slide_jobs)
+    }
@@ -0,0 +1,305 @@
+import os
+import re
+import mmap
+import zlib
+import logging
+import posixpath
+import zipfile
+
+from src.engines.image_probe import PROBE_MAX_SIZE, probe_image_header
+from src.engines.ooxml import REL_OFFICE_DOCUMENT, find_package_part, parse_xml_member, read_relationships
+from src.services import timing
+
+logger = logging.getLogger(__name__)
+
+# Páginas do PDF amostradas para estimar a chance de ser escaneado
+PDF_SCAN_SAMPLE_PAGES = 5
+
+# Página escaneada: pouco texto e imagens cobrindo quase toda a página (mesmos critérios de is_scanned_pdf)
+SCANNED_MAX_TEXT_CHARS = 50
+SCANNED_MIN_IMAGE_COVERAGE = 0.9
+
+# Varredura dos bytes do PDF (scan_pdf): limite do que é descompactado dos object streams
+PDF_SCAN_MAX_INFLATED = 16 * 1024 * 1024
+PDF_SCAN_CHUNK_SIZE = 256 * 1024
+
+# Distância máxima entre o dicionário de um object stream e o início dos seus dados
+PDF_STREAM_DICT_MAX = 1024
+
+PDF_PAGE_PATTERN = re.compile(rb'/Type\s*/Page(?![A-Za-z0-9])')
+PDF_PAGE_TREE_COUNT_PATTERN = re.compile(
+    rb'/Type\s*/Pages(?![A-Za-z0-9])[^>]*?/Count\s+(\d+)|/Count\s+(\d+)[^>]*?/Type\s*/Pages(?![A-Za-z0-9])'
+)
+PDF_IMAGE_PATTERN = re.compile(rb'/Subtype\s*/Image(?![A-Za-z0-9])')
+PDF_FONT_PATTERN = re.compile(rb'/Type\s*/Font(?![A-Za-z0-9])|/FontFile')
+PDF_OBJECT_STREAM_PATTERN = re.compile(rb'/Type\s*/ObjStm(?![A-Za-z0-9])')
+PDF_STREAM_START_PATTERN = re.compile(rb'stream\r?\n')
+
+# Bytes lidos do início de cada planilha para achar o elemento <dimension>
+SHEET_HEADER_READ_SIZE = 16 * 1024
+
+# Bytes lidos de CSV/TXT para estimar o número de linhas
+TEXT_SAMPLE_SIZE = 64 * 1024
+
+SPREADSHEET_NS = 'http://schemas.openxmlformats.org/spreadsheetml/2006/main'
+R_NS = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships'
+
+DIMENSION_PATTERN = re.compile(rb'<(?:\w+:)?dimension\s+ref="(([A-Z]+)(\d+)(?::([A-Z]+)(\d+))?)"')
+
+ROW_PATTERN = re.compile(rb'<(?:\w+:)?row[\s>]')
+CELL_PATTERN = re.compile(rb'<(?:\w+:)?c[\s>/]')
+
+IMAGE_EXTENSIONS = ('png', 'jpg', 'jpeg', 'bmp', 'tiff')
+
+
+def _column_number(letters):
+    number = 0
+    for letter in letters.decode('ascii'):
+        number = number * 26 + ord(letter) - ord('A') + 1
+    return number
+
+
+def probe_pdf(file_path):
+    """
+    Páginas, criptografia, imagens e chance de ser escaneado de um PDF
+
+    Lê a tabela de objetos (xref) para contar as imagens, sem interpretar as
+    páginas, e analisa só uma amostra de páginas espaçadas: as que têm pouco
+    texto e imagens cobrindo quase toda a área contam como escaneadas.
+    """
+    import pymupdf
+
+    with pymupdf.open(file_path) as doc:
+        info = {
+            'page_count': doc.page_count,
+            'encrypted': bool(doc.is_encrypted),
+            'needs_password': bool(doc.needs_pass)
+        }
+        if doc.needs_pass:
+            return info
+
+        image_count = 0
+        for xref in range(1, doc.xref_length()):
+            if doc.xref_get_key(xref, 'Subtype') == ('name', '/Image'):
+                image_count += 1
+        info['image_count'] = image_count
+
+        # Páginas espaçadas uniformemente; sem imagens no documento nenhuma pode ser escaneada
+        total_pages = doc.page_count
+        sample_size = min(PDF_SCAN_SAMPLE_PAGES, total_pages)
+        sample = sorted({index * total_pages // sample_size for index in range(sample_size)})
+        scanned_pages = 0
+        for page_number in sample if image_count else ():
+            page = doc[page_number]
+            page_area = abs(page.rect)
+            images = page.get_image_info()
+            if not images or not page_area:
+                continue
+            coverage = sum(abs(pymupdf.Rect(image['bbox']) & page.rect) for image in images) / page_area
+            if coverage >= SCANNED_MIN_IMAGE_COVERAGE and len(page.get_text().strip()) < SCANNED_MAX_TEXT_CHARS:
+                scanned_pages += 1
+
+        info['sampled_pages'] = len(sample)
+        info['scanned_likelihood'] = round(scanned_pages / len(sample), 2) if sample else 0.0
+        return info
+
+
+def _inflate(data, offset, limit):
+    """Descompacta (Flate) os dados de um stream a partir de offset, até limit bytes"""
+    decompressor = zlib.decompressobj()
+    chunks = []
+    size = 0
+    while offset < len(data) and size < limit and not decompressor.eof:
+        chunk = decompressor.decompress(data[offset:offset + PDF_SCAN_CHUNK_SIZE], limit - size)
+        offset += PDF_SCAN_CHUNK_SIZE
+        chunks.append(chunk)
+        size += len(chunk)
+    return b''.join(chunks)
+
+
+def _page_tree_count(data):
+    """Maior /Count entre os nós da árvore de páginas (o da raiz), ou 0"""
+    return max(
+        (int(match.group(1) or match.group(2)) for match in PDF_PAGE_TREE_COUNT_PATTERN.finditer(data)),
+        default=0
+    )
+
+
+def scan_pdf(file_path):
+    """
+    Páginas, imagens e páginas escaneadas de um PDF contadas direto nos bytes
+
+    Não interpreta o documento (o MuPDF não roda no processo do servidor):
+    as páginas vêm do maior /Count da árvore de páginas (ou, sem ele, dos
+    objetos /Type /Page), inclusive dos objetos guardados em object streams, e
+    as imagens dos objetos /Subtype /Image (streams nunca ficam dentro de
+    object streams). Sem nenhuma fonte no documento, todas as páginas contam
+    como escaneadas se houver imagens. Atualizações incrementais podem repetir
+    objetos, então os números são estimativas.
+
+    Returns:
+        Dicionário com page_count (None se nenhuma página foi encontrada),
+        image_count e scanned_pages
+    """
+    with open(file_path, 'rb') as source:
+        if not os.fstat(source.fileno()).st_size:
+            return {'page_count': None, 'image_count': 0, 'scanned_pages': 0}
+        data = mmap.mmap(source.fileno(), 0, access=mmap.ACCESS_READ)
+
+    with data:
+        counted = _page_tree_count(data)
+        pages = sum(1 for _ in PDF_PAGE_PATTERN.finditer(data))
+        images = sum(1 for _ in PDF_IMAGE_PATTERN.finditer(data))
+        fonts = PDF_FONT_PATTERN.search(data) is not None
+
+        budget = PDF_SCAN_MAX_INFLATED
+        for match in PDF_OBJECT_STREAM_PATTERN.finditer(data):
+            if budget <= 0:
+                break
+            start = PDF_STREAM_START_PATTERN.search(data, match.end(), match.end() + PDF_STREAM_DICT_MAX)
+            if start is None:
+                continue
+            try:
+                objects = _inflate(data, start.end(), budget)
+            except zlib.error:
+                # Object stream com outro filtro ou corrompido
+                continue
+            budget -= len(objects)
+            counted = max(counted, _page_tree_count(objects))
+            pages += sum(1 for _ in PDF_PAGE_PATTERN.finditer(objects))
+            fonts = fonts or PDF_FONT_PATTERN.search(objects) is not None
+
+    pages = counted or pages
+    return {
+        'page_count': pages or None,
+        'image_count': images,
+        'scanned_pages': pages if images and not fonts else 0
+    }
+
+
+def _estimate_dimensions(header, sheet_size):
+    """
+    Linhas e colunas estimadas pelas primeiras linhas da planilha
+
+    Usado quando o <dimension> não existe (ex.: arquivos gravados em modo
+    streaming): as linhas são extrapoladas pelo tamanho médio das linhas lidas.
+    """
+    row_starts = [match.start() for match in ROW_PATTERN.finditer(header)]
+    if len(row_starts) < 2:
+        return None
+    bytes_per_row = (row_starts[-1] - row_starts[0]) / (len(row_starts) - 1)
+    return {
+        'rows': max(len(row_starts) - 1, int((sheet_size - row_starts[0]) / bytes_per_row)),
+        'columns': len(CELL_PATTERN.findall(header, row_starts[0], row_starts[1])),
+        'estimated': True
+    }
+
+
+def _sheet_dimensions(archive, sheet_part):
+    """Linhas e colunas do <dimension> no início da planilha, ou estimadas se ele não existir"""
+    with archive.open(sheet_part) as stream:
+        header = stream.read(SHEET_HEADER_READ_SIZE)
+    match = DIMENSION_PATTERN.search(header)
+    if match is None:
+        return _estimate_dimensions(header, archive.NameToInfo[sheet_part].file_size)
+    ref, first_column, first_row, last_column, last_row = match.groups()
+    last_column, last_row = last_column or first_column, last_row or first_row
+    return {
+        'ref': ref.decode('ascii'),
+        'rows': int(last_row) - int(first_row) + 1,
+        'columns': _column_number(last_column) - _column_number(first_column) + 1
+    }
+
+
+def probe_xlsx(file_path):
+    """Nomes e dimensões das planilhas, lidos do workbook.xml e do início de cada planilha"""
+    with zipfile.ZipFile(file_path) as archive:
+        workbook_part = find_package_part(archive, REL_OFFICE_DOCUMENT, 'xl/workbook.xml')
+        rels_name = posixpath.join(posixpath.dirname(workbook_part), '_rels', posixpath.basename(workbook_part) + '.rels')
+        relationships = read_relationships(archive, rels_name)
+
+        sheets = []
+        for sheet in parse_xml_member(archive, workbook_part).iter(f'{{{SPREADSHEET_NS}}}sheet'):
+            entry = {'name': sheet.get('name')}
+            if sheet.get('state') in ('hidden', 'veryHidden'):
+                entry['hidden'] = True
+            _rel_type, sheet_part = relationships.get(sheet.get(f'{{{R_NS}}}id'), (None, None))
+            if sheet_part in archive.NameToInfo:
+                entry.update(_sheet_dimensions(archive, sheet_part) or {})
+                entry['size_bytes'] = archive.NameToInfo[sheet_part].file_size
+            sheets.append(entry)
+
+        return {
+            'sheet_count': len(sheets),
+            'sheets': sheets,
+            'total_cells': sum(sheet.get('rows', 0) * sheet.get('columns', 0) for sheet in sheets)
+        }
+
+
+def probe_ooxml_package(file_path, media_prefix):
+    """Quantidade de membros do pacote e tamanhos das mídias (DOCX/PPTX), só pelo diretório do ZIP"""
+    with zipfile.ZipFile(file_path) as archive:
+        members = archive.infolist()
+        media = [member for member in members if member.filename.startswith(media_prefix) and not member.is_dir()]
+        info = {
+            'member_count': len(members),
+            'uncompressed_bytes': sum(member.file_size for member in members),
+            'media_count': len(media),
+            'media_bytes': sum(member.file_size for member in media),
+            'largest_media_bytes': max((member.file_size for member in media), default=0)
+        }
+        if media_prefix.startswith('ppt/'):
+            info['slide_count'] = sum(
+                1 for member in members
+                if member.filename.startswith('ppt/slides/slide') and member.filename.endswith('.xml')
+            )
+        elif 'word/document.xml' in archive.NameToInfo:
+            info['document_xml_bytes'] = archive.NameToInfo['word/document.xml'].file_size
+        return info
+
+
+def probe_image(file_path):
+    """Formato e dimensões de uma imagem pelos bytes de cabeçalho"""
+    with open(file_path, 'rb') as source:
+        header = source.read(PROBE_MAX_SIZE)
+    probed = probe_image_header(header)
+    if probed is None:
+        return {'format': None}
+    image_format, width, height = probed
+    return {'format': image_format, 'width': width, 'height': height, 'megapixels': round(width * height / 1e6, 2)}
+
+
+def probe_text(file_path, size_bytes):
+    """Número de linhas estimado a partir de uma amostra do início do arquivo"""
+    with open(file_path, 'rb') as source:
+        sample = source.read(TEXT_SAMPLE_SIZE)
+    if not sample:
+        return {'estimated_lines': 0}
+    lines = sample.count(b'\n')
+    if len(sample) >= size_bytes:
+        return {'estimated_lines': lines + (0 if sample.endswith(b'\n') else 1)}
+    return {'estimated_lines': int(lines * size_bytes / len(sample))}
+
+
+def probe_file(file_extension, file_path, size_bytes):
+    """
+    Informações baratas de um documento, lidas só de cabeçalhos e índices
+
+    Returns:
+        Dicionário com as informações do formato; formatos sem prober
+        retornam um dicionário vazio
+    """
+    with timing.span('probe', format=file_extension):
+        if file_extension == 'pdf':
+            return probe_pdf(file_path)
+        if file_extension == 'xlsx':
+            return probe_xlsx(file_path)
+        if file_extension == 'docx':
+            return probe_ooxml_package(file_path, 'word/media/')
+        if file_extension == 'pptx':
+            return probe_ooxml_package(file_path, 'ppt/media/')
+        if file_extension in IMAGE_EXTENSIONS:
+            return probe_image(file_path)
+        if file_extension in ('csv', 'txt'):
+            return probe_text(file_path, size_bytes)
+        return {}
@@ -0,0 +1,148 @@
+import codecs
+import logging
+
+from src.services import deadline
+
+logger = logging.getLogger(__name__)
+
+# Tamanho do prefixo usado na detecção de encoding (em bytes)
+ENCODING_SAMPLE_SIZE = 64 * 1024
+
+# Tamanho de cada bloco lido durante o streaming (em caracteres)
+STREAM_CHUNK_SIZE = 1024 * 1024
+
+# Encodings com BOM reconhecidos no início do arquivo
+BOM_ENCODINGS = [
+    (codecs.BOM_UTF32_LE, 'utf-32'),
+    (codecs.BOM_UTF32_BE, 'utf-32'),
+    (codecs.BOM_UTF16_LE, 'utf-16'),
+    (codecs.BOM_UTF16_BE, 'utf-16'),
+]
+
+# Ordem de tentativa para arquivos sem BOM (latin-1 nunca falha)
+FALLBACK_ENCODINGS = ['utf-8', 'latin-1']
+
+
+def detect_encoding(file_path, sample_size=ENCODING_SAMPLE_SIZE):
+    """Detecta o encoding de um arquivo lendo apenas um prefixo"""
+    with open(file_path, 'rb') as file:
+        sample = file.read(sample_size)
+
+    for bom, encoding in BOM_ENCODINGS:
+        if sample.startswith(bom):
+            return encoding
+
+    for encoding in FALLBACK_ENCODINGS:
+        try:
+            # Decodificador incremental: um caractere multibyte cortado no
+            # fim do prefixo não deve invalidar o encoding
+            decoder = codecs.getincrementaldecoder(encoding)()
+            decoder.decode(sample, final=False)
+            return encoding
+        except UnicodeDecodeError:
+            continue
+
+    return FALLBACK_ENCODINGS[-1]
+
+
+def _scan_file(file_path, encoding, include_text, max_chars, chunk_size):
+    """Percorre o arquivo uma única vez acumulando contagens e texto"""
+    line_count = 1
+    non_empty_lines = 0
+    word_count = 0
+    char_count = 0
+    line_has_content = False
+    previous_ends_in_word = False
+    text_parts = []
+    kept_chars = 0
+    truncated = False
+    deadline_reached = False
+
+    with open(file_path, 'r', encoding=encoding) as file:
+        while True:
+            if deadline.reached():
+                deadline_reached = True
+                break
+
+            chunk = file.read(chunk_size)
+            if not chunk:
+                break
+
+            char_count += len(chunk)
+
+            # Palavras: uma palavra cortada entre dois blocos conta uma vez
+            word_count += len(chunk.split())
+            if previous_ends_in_word and not chunk[0].isspace():
+                word_count -= 1
+            previous_ends_in_word = not chunk[-1].isspace()
+
+            # Linhas: o primeiro pedaço continua a linha do bloco anterior
+            pieces = chunk.split('\n')
+            first = pieces[0]
+            if first and not first.isspace():
+                line_has_content = True
+            if len(pieces) > 1:
+                if line_has_content:
+                    non_empty_lines += 1
+                for piece in pieces[1:-1]:
+                    if piece and not piece.isspace():
+                        non_empty_lines += 1
+                last = pieces[-1]
+                line_has_content = bool(last) and not last.isspace()
+                line_count += len(pieces) - 1
+
+            if include_text and not truncated:
+                if max_chars is None:
+                    text_parts.append(chunk)
+                else:
+                    remaining = max_chars - kept_chars
+                    if len(chunk) > remaining:
+                        text_parts.append(chunk[:remaining])
+                        kept_chars = max_chars
+                        truncated = True
+                    else:
+                        text_parts.append(chunk)
+                        kept_chars += len(chunk)
+
+    if line_has_content:
+        non_empty_lines += 1
+
+    return {
+        'text': ''.join(text_parts) if include_text else None,
+        'lines': line_count,
+        'characters': char_count,
+        'words': word_count,
+        'paragraphs': non_empty_lines,
+        'empty_lines': line_count - non_empty_lines,
+        'truncated': truncated,
+        'deadline_reached': deadline_reached
+    }
+
+
+def stream_text_file(file_path, include_text=True, max_chars=None, chunk_size=STREAM_CHUNK_SIZE):
+    """
+    Lê um arquivo de texto em blocos calculando as estatísticas em uma única passada
+
+    Args:
+        file_path: Caminho do arquivo
+        include_text: Se False, apenas as estatísticas são calculadas
+        max_chars: Limite de caracteres do texto retornado (None = sem limite)
+        chunk_size: Quantidade de caracteres lida por bloco
+
+    Returns:
+        Dicionário com texto (opcional), contagens, encoding, indicador de
+        truncamento (max_chars) e 'deadline_reached' (leitura interrompida
+        pelo prazo da requisição; contagens parciais)
+    """
+    encoding = detect_encoding(file_path)
+
+    try:
+        result = _scan_file(file_path, encoding, include_text, max_chars, chunk_size)
+    except UnicodeDecodeError:
+        # O prefixo era UTF-8 válido, mas o restante do arquivo não
+        logger.info(f"Encoding {encoding} inválido após o prefixo, usando latin-1")
+        encoding = 'latin-1'
+        result = _scan_file(file_path, encoding, include_text, max_chars, chunk_size)
+
+    result['encoding'] = encoding
+    return result
@@ -11,6 +11,7 @@ class User(db.Model):
     email = db.Column(db.String(120), unique=True, nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    api_keys = db.relationship('ApiKey', backref='user', cascade='all, delete-orphan', lazy=True)
     
     def __repr__(self):
         return f'<User {self.username}>'
@@ -22,4 +23,44 @@ class User(db.Model):
             'email': self.email,
             'created_at': self.created_at.isoformat() if self.created_at else None,
             'updated_at': self.updated_at.isoformat() if self.updated_at else None
-        } 
\ No newline at end of file
+        } 
+
+class ApiKey(db.Model):
+    """Chave de API de um usuário/equipe, com cota de concorrência, peso na fila e contadores de uso"""
+    __tablename__ = 'api_keys'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    name = db.Column(db.String(80), nullable=False)
+    # Apenas o hash SHA-256 da chave é guardado; o prefixo identifica a chave nas listagens
+    key_hash = db.Column(db.String(64), unique=True, nullable=False, index=True)
+    prefix = db.Column(db.String(12), nullable=False)
+    max_concurrency = db.Column(db.Integer, nullable=False, default=2)
+    weight = db.Column(db.Float, nullable=False, default=1.0)
+    active = db.Column(db.Boolean, nullable=False, default=True)
+    documents = db.Column(db.Integer, nullable=False, default=0)
+    bytes_processed = db.Column(db.BigInteger, nullable=False, default=0)
+    cpu_seconds = db.Column(db.Float, nullable=False, default=0.0)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    last_used_at = db.Column(db.DateTime)
+    
+    def __repr__(self):
+        return f'<ApiKey {self.prefix}… ({self.name})>'
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'user_id': self.user_id,
+            'name': self.name,
+            'prefix': self.prefix,
+            'max_concurrency': self.max_concurrency,
+            'weight': self.weight,
+            'active': self.active,
+            'usage': {
+                'documents': self.documents,
+                'bytes': self.bytes_processed,
+                'cpu_seconds': round(self.cpu_seconds, 3)
+            },
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'last_used_at': self.last_used_at.isoformat() if self.last_used_at else None
+        }
\ No newline at end of file
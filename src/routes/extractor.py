@@ -3,29 +3,56 @@ import io
 import base64
 import mimetypes
 import time
-import requests
 import validators
-from urllib.parse import urlparse, unquote
-from flask import Blueprint, jsonify, request
+from urllib.parse import parse_qsl, urlparse, unquote
+from flask import Blueprint, Response, current_app, g, has_request_context, jsonify, request, stream_with_context
 from werkzeug.utils import secure_filename
 import tempfile
 import logging
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, as_completed, wait
 
-# Importações para extração de documentos
-import docx
-import pymupdf
-import openpyxl
-import pandas as pd
-from PIL import Image
 import zipfile
 import json
 
+from src.engines import ocr_engine
+from src.engines.docx_engine import parse_docx
+from src.engines.page_analysis import BLANK_PAGE_DETECTION, detect_blank_pages
+from src.engines.page_render import JPEG_QUALITY, RASTER_CACHE, cached_page, file_digest, raster_key, render_file_page, render_page
+from src.engines.ooxml import extract_media_images
+from src.engines.pptx_engine import parse_pptx, parse_slide_range, slide_file_count, slide_ranges
+from src.engines.probe import probe_file
+from src.engines.txt_engine import stream_text_file
+from src.services import admission, api_keys, backends, deadline, metrics, profiling, single_flight, timing
+from src.services.admission import AdmissionRejected, batch_endpoint
+from src.services.api_keys import public_endpoint
+from src.services.deadline import ExtractionCancelled
+from src.services.backends import LazyModule
+from src.services.fields import parse_fields, wants
+from src.services.disk_cache import make_key
+from src.services.governor import WALL_TIMEOUT_FACTOR, ResourceLimitExceeded, cpu_accounting, get_budget, run_with_budget
+from src.services.containers import (
+    ARCHIVE_ERRORS, ArchiveGuard, ArchiveLimitExceeded, container_kind, iter_container_members
+)
+from src.services.uploads import (
+    UploadRejected, accept_uploads, collect_upload_errors, spool_from_stream, spooled_path, upload_rejection
+)
+
+# Bibliotecas de extração carregadas apenas no primeiro uso (ver EXTRACTORS)
+docx = LazyModule('docx')
+pymupdf = LazyModule('pymupdf')
+pd = LazyModule('pandas')
+Image = LazyModule('PIL.Image')
+requests = LazyModule('requests')
+
 # Configurar logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 extractor_bp = Blueprint('extractor', __name__)
 
+# Chave de API (X-API-Key) identifica quem faz cada extração
+extractor_bp.before_request(api_keys.authenticate)
+
 # Configurações de upload expandidas
 ALLOWED_EXTENSIONS = {
     'txt': 'text/plain',
@@ -53,6 +80,21 @@ MAX_FILE_SIZES = {
     'default': 10 * 1024 * 1024  # 10MB
 }
 
+# Pacotes aceitos por /extract/archive e tamanho máximo do pacote compactado
+ARCHIVE_EXTENSIONS = ('zip', 'tar', 'gz', 'tgz')
+ARCHIVE_MAX_UPLOAD_SIZE = 50 * 1024 * 1024  # 50MB
+
+# Membros de um pacote extraídos em paralelo
+ARCHIVE_WORKERS = int(os.environ.get('ARCHIVE_WORKERS', min(4, os.cpu_count() or 1)))
+
+# Linhas por bloco na leitura de CSV com prazo (timeout_ms), verificado entre os blocos
+CSV_DEADLINE_CHUNK_ROWS = 50000
+
+# Renderização de uma página avulsa (/render/page): DPI padrão e faixa aceita
+RENDER_DEFAULT_DPI = 150
+RENDER_MIN_DPI = 36
+RENDER_MAX_DPI = 600
+
 def allowed_file(filename):
     """Verifica se o arquivo é permitido"""
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
@@ -99,6 +141,7 @@ def get_filename_from_url(url, content_disposition=None):
     except Exception:
         return "downloaded_document"
 
+@metrics.timed_phase('download')
 def download_file_from_url(url, max_size=50*1024*1024):
     """Baixa arquivo de uma URL com validações de segurança"""
     try:
@@ -165,6 +208,8 @@ def download_file_from_url(url, max_size=50*1024*1024):
                 extension = 'pdf'
             elif 'msword' in content_type or 'officedocument.wordprocessing' in content_type:
                 extension = 'docx' if 'openxmlformats' in content_type else 'doc'
+            elif 'officedocument.presentationml' in content_type:
+                extension = 'pptx'
             elif 'spreadsheet' in content_type or 'excel' in content_type:
                 extension = 'xlsx' if 'openxmlformats' in content_type else 'xls'
             elif 'text/plain' in content_type:
@@ -203,24 +248,247 @@ def download_file_from_url(url, max_size=50*1024*1024):
     except Exception as e:
         raise Exception(f"Erro ao baixar arquivo: {str(e)}")
 
+@extractor_bp.record_once
+def configure_upload_limits(state):
+    """Limites aplicados durante o recebimento dos uploads multipart (ver StreamingRequest)"""
+    state.app.config.setdefault('UPLOAD_SIZE_LIMITS', MAX_FILE_SIZES)
+    state.app.config.setdefault('UPLOAD_ALLOWED_EXTENSIONS', frozenset(ALLOWED_EXTENSIONS))
+
 def validate_file_size(file_size, file_extension):
     """Valida o tamanho do arquivo"""
     max_size = MAX_FILE_SIZES.get(file_extension, MAX_FILE_SIZES['default'])
     return file_size <= max_size
 
-def extract_text_from_docx(file_path):
-    """Extrai texto, imagens e metadados de documentos Word (.docx)"""
+def parse_bool_option(value, default=False):
+    """Converte valores de formulário/JSON ('true', '1', True...) em booleano"""
+    if value is None:
+        return default
+    if isinstance(value, bool):
+        return value
+    return str(value).strip().lower() in ('1', 'true', 'yes', 'sim', 'on')
+
+class InvalidOption(ValueError):
+    """Opção de extração inválida (responder 400 com o código de erro da opção)"""
+    
+    def __init__(self, message, error_code):
+        self.error_code = error_code
+        super().__init__(message)
+
+@extractor_bp.errorhandler(InvalidOption)
+def invalid_option_response(error):
+    """Resposta para opções de extração inválidas"""
+    return jsonify({
+        'success': False,
+        'error': str(error),
+        'error_code': error.error_code
+    }), 400
+
+def get_extraction_options(source):
+    """
+    Lê as opções de extração da requisição (formulário ou JSON)
+    
+    Opções reconhecidas:
+        include_text / max_chars: texto retornado de arquivos .txt
+        include_image_data: conteúdo base64 das mídias de DOCX/PPTX
+        slides / dedupe_media: seleção de slides e deduplicação de mídias de PPTX
+        fields: campos do resultado ('text,stats.page_count'); os extratores
+            de PDF e DOCX deixam de calcular as seções não pedidas
+        ocr / ocr_lang / ocr_timeout: OCR de PDFs escaneados e imagens
+            (liga/desliga, idioma do Tesseract e tempo máximo em segundos)
+        timeout_ms: prazo da requisição; ao esgotar, os extratores param na
+            próxima página/planilha/slide e devolvem o resultado parcial
+            marcado com stats.truncated
+    
+    Raises:
+        InvalidOption: Se a seleção de slides for inválida
+    """
+    options = {}
+    if not source:
+        return options
+    
+    if 'include_text' in source:
+        options['include_text'] = parse_bool_option(source.get('include_text'), default=True)
+    
+    max_chars = source.get('max_chars')
+    if max_chars not in (None, ''):
+        try:
+            max_chars = int(max_chars)
+            if max_chars >= 0:
+                options['max_chars'] = max_chars
+        except (ValueError, TypeError):
+            pass
+    
+    if 'include_image_data' in source:
+        options['include_image_data'] = parse_bool_option(source.get('include_image_data'), default=True)
+    
+    if source.get('slides') not in (None, ''):
+        try:
+            slide_ranges(source.get('slides'))
+        except ValueError as range_error:
+            raise InvalidOption(str(range_error), 'INVALID_SLIDES')
+        options['slides'] = source.get('slides')
+    
+    if 'dedupe_media' in source:
+        options['dedupe_media'] = parse_bool_option(source.get('dedupe_media'), default=True)
+    
+    fields = parse_fields(source.get('fields'))
+    if fields is not None:
+        options['fields'] = fields
+    
+    if 'ocr' in source:
+        options['ocr'] = parse_bool_option(source.get('ocr'), default=True)
+    
+    ocr_lang = ocr_engine.normalize_lang(source.get('ocr_lang'))
+    if ocr_lang is not None:
+        options['ocr_lang'] = ocr_lang
+    
+    ocr_timeout = ocr_engine.normalize_timeout(source.get('ocr_timeout'))
+    if ocr_timeout is not None:
+        options['ocr_timeout'] = ocr_timeout
+    
+    timeout_ms = deadline.normalize_timeout_ms(source.get('timeout_ms'))
+    if timeout_ms is not None:
+        options['timeout_ms'] = timeout_ms
+    
+    return options
+
+def timings_requested():
+    """
+    Verifica se a requisição pediu o detalhamento de tempos (?timings= ou header X-Timings)
+    
+    Roda antes da view, então não lê o corpo: ler o formulário ou o JSON aqui
+    forçaria o parse (e a gravação dos uploads) antes dos limites da view.
+    """
+    return parse_bool_option(request.args.get('timings', request.headers.get('X-Timings')), default=False)
+
+@extractor_bp.before_request
+def start_request_timings():
+    """Inicia o trace de tempos da requisição quando 'timings' for solicitado"""
+    if timings_requested():
+        g.timing_trace, g.timing_token = timing.start_trace(request.path)
+
+@extractor_bp.teardown_request
+def end_request_timings(error=None):
+    """Encerra o trace de tempos da requisição"""
+    token = g.pop('timing_token', None)
+    if token is not None:
+        timing.end_trace(token)
+
+@extractor_bp.before_request
+def start_request_deadline():
+    """
+    Cria o token de cancelamento da requisição
+    
+    O token detecta a desconexão do cliente desde já; o prazo (opção
+    timeout_ms) é aplicado por run_extractor e conta a partir daqui.
+    """
+    g.deadline = deadline.Deadline(connection=deadline.client_socket(request.environ))
+
+@extractor_bp.before_request
+def check_profiling_request():
+    """
+    Habilita o profiling da extração quando pedido por uma chave autorizada
+    
+    O modo vem do header X-Profile ou do parâmetro ?profile= ('cprofile' ou
+    'sample') e a chave do header X-Profile-Key ou de ?profile_key=.
+    """
+    try:
+        mode = profiling.requested_mode(request.headers.get('X-Profile') or request.args.get('profile'))
+    except ValueError as mode_error:
+        return jsonify({
+            'success': False,
+            'error': str(mode_error),
+            'error_code': 'INVALID_PROFILE_MODE'
+        }), 400
+    
+    if mode is None:
+        return None
+    
+    key = request.headers.get('X-Profile-Key') or request.args.get('profile_key')
+    if not profiling.is_authorized(key):
+        logger.warning(f"Profiling negado para {request.path}: chave não autorizada")
+        return jsonify({
+            'success': False,
+            'error': 'Profiling não autorizado para esta chave',
+            'error_code': 'PROFILING_FORBIDDEN'
+        }), 403
+    
+    g.profile_mode = mode
+    return None
+
+def build_docx_result(text_content, tables_data, images, metadata, paragraph_count, table_count):
+    """Monta o resultado padrão de documentos Word a partir das partes extraídas"""
+    # Texto combinado
+    combined_text = '\n'.join([item['text'] for item in text_content])
+    for table in tables_data:
+        combined_text += '\n\n' + table['text']
+    
+    # Adicionar informação sobre imagens no texto
+    if images:
+        combined_text += f"\n\n[INFO: Documento contém {len(images)} imagem(s) extraída(s)]"
+    
+    return {
+        'text': combined_text,
+        'paragraphs': text_content,
+        'tables': tables_data,
+        'images': images,
+        'metadata': metadata,
+        'stats': {
+            'paragraph_count': paragraph_count,
+            'table_count': table_count,
+            'image_count': len(images),
+            'character_count': len(combined_text),
+            'word_count': len(combined_text.split())
+        }
+    }
+
+def extract_text_from_docx(file_path, engine='fast', include_image_data=True, fields=None):
+    """
+    Extrai texto, imagens e metadados de documentos Word (.docx)
+    
+    Por padrão usa o engine rápido, que percorre word/document.xml em streaming
+    em uma única passada pelo ZIP. Se falhar, recorre ao python-docx.
+    Com fields, as partes não pedidas (ex.: formatação dos runs) não são processadas.
+    """
+    if engine == 'fast':
+        try:
+            parts = parse_docx(file_path, include_image_data=include_image_data, fields=fields)
+            result = build_docx_result(
+                parts['paragraphs'], parts['tables'], parts['images'], parts['metadata'],
+                parts['paragraph_count'], parts['table_count']
+            )
+            if parts['truncated']:
+                # O corpo é lido em streaming: o total de elementos não é conhecido
+                deadline.mark_truncated(result, 'elements', parts['paragraph_count'] + parts['table_count'], None)
+            return result
+        except ExtractionCancelled:
+            raise
+        except Exception as fast_error:
+            logger.warning(f"Engine rápido de DOCX falhou, usando python-docx: {fast_error}")
+    
+    return extract_text_from_docx_python_docx(file_path, include_image_data=include_image_data, fields=fields)
+
+def extract_text_from_docx_python_docx(file_path, include_image_data=True, fields=None):
+    """Extrai texto, imagens e metadados de documentos Word (.docx) via modelo de objetos do python-docx"""
     try:
         doc = docx.Document(file_path)
         text_content = []
         images = []
         
+        include_runs = wants(fields, 'paragraphs.runs')
+        truncated = False
+        processed = 0
+        
         # Extrair texto dos parágrafos
         for paragraph in doc.paragraphs:
+            if deadline.reached():
+                truncated = True
+                break
+            processed += 1
             if paragraph.text.strip():
                 # Incluir informações de formatação básica
                 runs_info = []
-                for run in paragraph.runs:
+                for run in (paragraph.runs if include_runs else ()):
                     if run.text.strip():
                         run_data = {
                             'text': run.text,
@@ -239,6 +507,10 @@ def extract_text_from_docx(file_path):
         # Extrair texto de tabelas
         tables_data = []
         for table_idx, table in enumerate(doc.tables):
+            if truncated or deadline.reached():
+                truncated = True
+                break
+            processed += 1
             table_rows = []
             for row in table.rows:
                 row_cells = []
@@ -257,55 +529,8 @@ def extract_text_from_docx(file_path):
         
         # Extrair imagens do documento
         try:
-            # Acessar o arquivo ZIP do documento Word
-            import zipfile
-            from PIL import Image
-            import io
-            
             with zipfile.ZipFile(file_path, 'r') as docx_zip:
-                # Listar arquivos de mídia
-                media_files = [f for f in docx_zip.namelist() if f.startswith('word/media/')]
-                
-                for idx, media_file in enumerate(media_files):
-                    try:
-                        # Ler dados da imagem
-                        img_data = docx_zip.read(media_file)
-                        
-                        # Verificar se é imagem válida
-                        try:
-                            img = Image.open(io.BytesIO(img_data))
-                            width, height = img.size
-                            img_format = img.format or 'UNKNOWN'
-                            
-                            # Converter para base64
-                            img_base64 = base64.b64encode(img_data).decode('utf-8')
-                            
-                            # Determinar tipo MIME
-                            mime_type = f"image/{img_format.lower()}"
-                            if img_format.upper() == 'JPEG':
-                                mime_type = "image/jpeg"
-                            elif img_format.upper() == 'PNG':
-                                mime_type = "image/png"
-                            
-                            images.append({
-                                'index': idx + 1,
-                                'filename': media_file.split('/')[-1],
-                                'format': img_format.upper(),
-                                'width': width,
-                                'height': height,
-                                'size_bytes': len(img_data),
-                                'data': img_base64,
-                                'mime_type': mime_type
-                            })
-                            
-                            logger.debug(f"Imagem extraída: {media_file} - {width}x{height} - {len(img_data)} bytes")
-                            
-                        except Exception as img_process_error:
-                            logger.warning(f"Arquivo de mídia não é imagem válida: {media_file} - {img_process_error}")
-                            
-                    except Exception as media_error:
-                        logger.warning(f"Erro ao processar mídia {media_file}: {media_error}")
-                        
+                images = extract_media_images(docx_zip, 'word/media/', include_data=include_image_data)
         except Exception as image_error:
             logger.warning(f"Erro ao extrair imagens do Word: {image_error}")
         
@@ -319,48 +544,112 @@ def extract_text_from_docx(file_path):
             'modified': core_properties.modified.isoformat() if core_properties.modified else None
         }
         
-        # Texto combinado
-        combined_text = '\n'.join([item['text'] for item in text_content])
-        for table in tables_data:
-            combined_text += '\n\n' + table['text']
-        
-        # Adicionar informação sobre imagens no texto
-        if images:
-            combined_text += f"\n\n[INFO: Documento contém {len(images)} imagem(s) extraída(s)]"
-        
-        return {
-            'text': combined_text,
-            'paragraphs': text_content,
-            'tables': tables_data,
-            'images': images,
-            'metadata': metadata,
-            'stats': {
-                'paragraph_count': len(doc.paragraphs),
-                'table_count': len(doc.tables),
-                'image_count': len(images),
-                'character_count': len(combined_text),
-                'word_count': len(combined_text.split())
-            }
-        }
+        result = build_docx_result(
+            text_content, tables_data, images, metadata,
+            len(doc.paragraphs), len(doc.tables)
+        )
+        if truncated:
+            deadline.mark_truncated(result, 'elements', processed, len(doc.paragraphs) + len(doc.tables))
+        return result
+    except ExtractionCancelled:
+        raise
     except Exception as e:
         logger.error(f"Erro ao extrair dados do Word: {str(e)}")
         raise Exception(f"Erro ao extrair dados do Word: {str(e)}")
 
-def extract_text_from_pptx(file_path):
-    """Extrai texto, imagens e metadados de apresentações PowerPoint (.pptx)"""
+def build_pptx_result(slides_data, images, metadata, slide_count, selected_slides=None):
+    """Monta o resultado padrão de apresentações PowerPoint a partir das partes extraídas"""
+    # Texto combinado
+    combined_text = ''
+    for slide_data in slides_data:
+        if slide_data['text']:
+            combined_text += f"--- Slide {slide_data['slide_number']} ---\n{slide_data['text']}\n\n"
+    
+    # Adicionar informação sobre imagens
+    if images:
+        combined_text += f"[INFO: Apresentação contém {len(images)} imagem(s) extraída(s)]"
+    
+    result = {
+        'text': combined_text.strip(),
+        'slides': slides_data,
+        'images': images,
+        'metadata': metadata,
+        'stats': {
+            'slide_count': slide_count,
+            'image_count': len(images),
+            'character_count': len(combined_text),
+            'word_count': len(combined_text.split()),
+            'total_shapes': sum(slide['shape_count'] for slide in slides_data)
+        }
+    }
+    
+    if selected_slides is not None:
+        result['stats']['selected_slides'] = [slide['slide_number'] for slide in slides_data]
+    
+    return result
+
+def extract_text_from_pptx(file_path, engine='fast', include_image_data=True, slides=None, dedupe_media=True):
+    """
+    Extrai texto, imagens e metadados de apresentações PowerPoint (.pptx)
+    
+    Por padrão usa o engine rápido, que lê o XML de cada slide diretamente
+    (em paralelo para decks grandes). Se falhar, recorre ao python-pptx.
+    
+    Args:
+        file_path: Caminho do arquivo
+        engine: 'fast' ou 'python-pptx'
+        include_image_data: Se False, as mídias não incluem o conteúdo base64
+        slides: Seleção de slides ('1-3,7') ou None para todos
+        dedupe_media: Se True, mídias idênticas são retornadas uma única vez
+    """
+    # Intervalos limitados aos slides do pacote antes de expandidos
+    selected_slides = parse_slide_range(slides, slide_file_count(file_path))
+    
+    if engine == 'fast':
+        try:
+            parts = parse_pptx(
+                file_path, slides=selected_slides,
+                include_image_data=include_image_data, dedupe_media=dedupe_media
+            )
+            result = build_pptx_result(
+                parts['slides'], parts['images'], parts['metadata'],
+                parts['slide_count'], selected_slides
+            )
+            if parts['truncated']:
+                total = parts['slide_count'] if selected_slides is None else len(
+                    [number for number in selected_slides if number <= parts['slide_count']]
+                )
+                deadline.mark_truncated(result, 'slides', len(parts['slides']), total)
+            return result
+        except ExtractionCancelled:
+            raise
+        except Exception as fast_error:
+            logger.warning(f"Engine rápido de PPTX falhou, usando python-pptx: {fast_error}")
+    
+    return extract_text_from_pptx_python_pptx(
+        file_path, include_image_data=include_image_data,
+        selected_slides=selected_slides, dedupe_media=dedupe_media
+    )
+
+def extract_text_from_pptx_python_pptx(file_path, include_image_data=True, selected_slides=None, dedupe_media=True):
+    """Extrai texto, imagens e metadados de apresentações PowerPoint (.pptx) via python-pptx"""
     try:
         from pptx import Presentation
-        import zipfile
-        from PIL import Image
-        import io
         
         prs = Presentation(file_path)
-        text_content = []
         images = []
         slides_data = []
+        truncated = False
         
         # Extrair texto e layout de cada slide
         for slide_idx, slide in enumerate(prs.slides):
+            if selected_slides is not None and slide_idx + 1 not in selected_slides:
+                continue
+            
+            if deadline.reached():
+                truncated = True
+                break
+            
             slide_text = []
             slide_shapes = []
             
@@ -376,8 +665,8 @@ def extract_text_from_pptx(file_path):
                     shape_info['text'] = shape.text.strip()
                     slide_text.append(shape.text.strip())
                 
-                # Verificar se é uma tabela
-                if hasattr(shape, "table"):
+                # Verificar se é uma tabela (has_table evita erro em gráficos)
+                if getattr(shape, "has_table", False):
                     table_text = []
                     for row in shape.table.rows:
                         row_text = []
@@ -404,59 +693,23 @@ def extract_text_from_pptx(file_path):
             }
             
             slides_data.append(slide_data)
-            
-            if slide_text:
-                text_content.append({
-                    'slide': slide_idx + 1,
-                    'text': '\n'.join(slide_text)
-                })
         
         # Extrair imagens do arquivo PPTX
         try:
             with zipfile.ZipFile(file_path, 'r') as pptx_zip:
-                # Listar arquivos de mídia
-                media_files = [f for f in pptx_zip.namelist() if f.startswith('ppt/media/')]
-                
-                for idx, media_file in enumerate(media_files):
-                    try:
-                        # Ler dados da imagem
-                        img_data = pptx_zip.read(media_file)
-                        
-                        # Verificar se é imagem válida
-                        try:
-                            img = Image.open(io.BytesIO(img_data))
-                            width, height = img.size
-                            img_format = img.format or 'UNKNOWN'
-                            
-                            # Converter para base64
-                            img_base64 = base64.b64encode(img_data).decode('utf-8')
-                            
-                            # Determinar tipo MIME
-                            mime_type = f"image/{img_format.lower()}"
-                            if img_format.upper() == 'JPEG':
-                                mime_type = "image/jpeg"
-                            elif img_format.upper() == 'PNG':
-                                mime_type = "image/png"
-                            
-                            images.append({
-                                'index': idx + 1,
-                                'filename': media_file.split('/')[-1],
-                                'format': img_format.upper(),
-                                'width': width,
-                                'height': height,
-                                'size_bytes': len(img_data),
-                                'data': img_base64,
-                                'mime_type': mime_type
-                            })
-                            
-                            logger.debug(f"Imagem extraída do PPTX: {media_file} - {width}x{height} - {len(img_data)} bytes")
-                            
-                        except Exception as img_process_error:
-                            logger.warning(f"Arquivo de mídia não é imagem válida: {media_file} - {img_process_error}")
-                            
-                    except Exception as media_error:
-                        logger.warning(f"Erro ao processar mídia {media_file}: {media_error}")
-                        
+                media_members = None
+                if selected_slides is not None:
+                    # Apenas mídias referenciadas pelos slides selecionados
+                    media_members = {
+                        rel.target_part.partname.lstrip('/')
+                        for slide_idx, slide in enumerate(prs.slides) if slide_idx + 1 in selected_slides
+                        for rel in slide.part.rels.values()
+                        if not rel.is_external and rel.target_part.partname.startswith('/ppt/media/')
+                    }
+                images = extract_media_images(
+                    pptx_zip, 'ppt/media/', include_data=include_image_data,
+                    members=media_members, deduplicate=dedupe_media
+                )
         except Exception as image_error:
             logger.warning(f"Erro ao extrair imagens do PowerPoint: {image_error}")
         
@@ -480,30 +733,16 @@ def extract_text_from_pptx(file_path):
         except Exception as props_error:
             logger.warning(f"Erro ao extrair propriedades: {props_error}")
         
-        # Texto combinado
-        combined_text = ''
-        for slide_data in slides_data:
-            if slide_data['text']:
-                combined_text += f"--- Slide {slide_data['slide_number']} ---\n{slide_data['text']}\n\n"
-        
-        # Adicionar informação sobre imagens
-        if images:
-            combined_text += f"[INFO: Apresentação contém {len(images)} imagem(s) extraída(s)]"
-        
-        return {
-            'text': combined_text.strip(),
-            'slides': slides_data,
-            'images': images,
-            'metadata': metadata,
-            'stats': {
-                'slide_count': len(prs.slides),
-                'image_count': len(images),
-                'character_count': len(combined_text),
-                'word_count': len(combined_text.split()),
-                'total_shapes': sum(slide['shape_count'] for slide in slides_data)
-            }
-        }
+        result = build_pptx_result(slides_data, images, metadata, len(prs.slides), selected_slides)
+        if truncated:
+            total = len(prs.slides) if selected_slides is None else len(
+                [number for number in selected_slides if number <= len(prs.slides)]
+            )
+            deadline.mark_truncated(result, 'slides', len(slides_data), total)
+        return result
         
+    except ExtractionCancelled:
+        raise
     except Exception as e:
         logger.error(f"Erro ao extrair dados do PowerPoint: {str(e)}")
         raise Exception(f"Erro ao extrair dados do PowerPoint: {str(e)}")
@@ -534,6 +773,13 @@ def is_scanned_pdf(doc):
         }
         
         for page_num in range(total_pages):
+            if deadline.reached():
+                # Prazo da requisição esgotado: decidir pelas páginas já analisadas
+                if page_num == 0:
+                    return False, 0.0
+                total_pages = page_num
+                break
+            
             page = doc[page_num]
             page_rect = page.rect
             page_area = abs(page_rect)
@@ -617,11 +863,14 @@ def is_scanned_pdf(doc):
         
         return is_scanned, confidence
         
+    except ExtractionCancelled:
+        raise
     except Exception as e:
         logger.error(f"Erro na detecção de PDF escaneado: {e}")
         return False, 0.0
 
-def pdf_pages_to_images(doc, dpi=200, image_format='PNG'):
+@metrics.timed_phase('rasterize')
+def pdf_pages_to_images(doc, dpi=200, image_format='PNG', skip_pages=(), document_hash=None):
     """
     Converte páginas do PDF em imagens base64 de alta qualidade
     
@@ -629,40 +878,56 @@ def pdf_pages_to_images(doc, dpi=200, image_format='PNG'):
         doc: Documento PyMuPDF
         dpi: Resolução das imagens (default: 200 DPI para boa qualidade)
         image_format: Formato de saída ('PNG' ou 'JPEG')
+        skip_pages: Números (base 1) de páginas em branco, que não são renderizadas;
+            no lugar delas vai um marcador com 'blank': True e 'data': None
+        document_hash: Hash do arquivo; com ele as páginas já renderizadas vêm
+            do cache de rasters (ver render_page)
     
     Returns:
-        Lista de dicionários com informações das imagens
+        Lista de dicionários com informações das imagens; com o prazo da
+        requisição esgotado, apenas das páginas convertidas até então
     """
     try:
         images = []
         
-        # Configurar matriz de zoom baseada no DPI
+        # Configurar zoom baseado no DPI
         zoom = dpi / 72.0  # 72 DPI é o padrão
-        mat = pymupdf.Matrix(zoom, zoom)
         
         for page_num in range(len(doc)):
+            if deadline.reached():
+                break
+            
             page = doc[page_num]
             
+            if page_num + 1 in skip_pages:
+                images.append({
+                    'page': page_num + 1,
+                    'blank': True,
+                    'width': round(page.rect.width * zoom),
+                    'height': round(page.rect.height * zoom),
+                    'dpi': dpi,
+                    'format': image_format.upper(),
+                    'size_bytes': 0,
+                    'data': None
+                })
+                continue
+            
             try:
-                # Renderizar página como imagem
-                pix = page.get_pixmap(matrix=mat, alpha=False)
-                
-                # Converter para bytes
-                if image_format.upper() == 'JPEG':
-                    img_data = pix.tobytes("jpeg", jpg_quality=95)
-                    mime_type = "image/jpeg"
-                else:
-                    img_data = pix.tobytes("png")
-                    mime_type = "image/png"
+                # Renderizar e codificar a página (ou reaproveitar do cache de rasters)
+                img_data, width, height, _cached = render_page(
+                    doc, page_num, dpi, image_format=image_format, document_hash=document_hash
+                )
+                mime_type = "image/jpeg" if image_format.upper() == 'JPEG' else "image/png"
                 
                 # Converter para base64
-                img_base64 = base64.b64encode(img_data).decode('utf-8')
+                with timing.span('base64', page=page_num + 1):
+                    img_base64 = base64.b64encode(img_data).decode('utf-8')
                 
                 # Informações da imagem
                 image_info = {
                     'page': page_num + 1,
-                    'width': pix.width,
-                    'height': pix.height,
+                    'width': width,
+                    'height': height,
                     'dpi': dpi,
                     'format': image_format.upper(),
                     'size_bytes': len(img_data),
@@ -671,9 +936,8 @@ def pdf_pages_to_images(doc, dpi=200, image_format='PNG'):
                 }
                 
                 images.append(image_info)
-                pix = None  # Liberar memória
                 
-                logger.debug(f"Página {page_num + 1} convertida: {pix.width}x{pix.height} - {len(img_data)} bytes")
+                logger.debug(f"Página {page_num + 1} convertida: {image_info['width']}x{image_info['height']} - {len(img_data)} bytes")
                 
             except Exception as page_error:
                 logger.error(f"Erro ao converter página {page_num + 1}: {page_error}")
@@ -688,12 +952,25 @@ def pdf_pages_to_images(doc, dpi=200, image_format='PNG'):
         
         return images
         
+    except ExtractionCancelled:
+        raise
     except Exception as e:
         logger.error(f"Erro ao converter PDF para imagens: {e}")
         raise Exception(f"Erro ao converter PDF para imagens: {e}")
 
-def extract_text_from_pdf(file_path):
-    """Extrai texto, imagens e metadados de documentos PDF com fallback para PDFs escaneados"""
+def extract_text_from_pdf(file_path, fields=None, ocr=True, ocr_lang=None, ocr_timeout=None):
+    """
+    Extrai texto, imagens e metadados de documentos PDF com fallback para PDFs escaneados
+    
+    Com fields, as seções não pedidas não são calculadas: fontes (get_text("dict")
+    de cada página), imagens embutidas, metadados, detecção de PDF escaneado e
+    imagens de páginas. Em PDFs escaneados, as páginas sem camada de texto passam
+    por OCR quando o Tesseract está disponível (ocr=True).
+    
+    Se o prazo da requisição (timeout_ms) acabar, as passadas pelas páginas
+    (texto, OCR, imagens de páginas) param e o resultado parcial é marcado
+    com stats.truncated, indicando em que etapa parou.
+    """
     try:
         text_content = []
         images = []
@@ -703,11 +980,23 @@ def extract_text_from_pdf(file_path):
         is_scanned = False
         scanned_confidence = 0.0
         fallback_images = []
+        # Etapa em que o prazo acabou: (etapa, páginas processadas, páginas da etapa)
+        truncation = None
+        
+        # Seções necessárias para os campos pedidos
+        text_wanted = wants(fields, 'text', 'pages_content', 'stats.character_count', 'stats.word_count')
+        fonts_wanted = wants(fields, 'fonts')
+        images_wanted = wants(fields, 'images')
+        page_images_wanted = wants(
+            fields, 'page_images', 'fallback_images', 'stats.page_images_count', 'stats.total_page_images_size',
+            'stats.total_page_images_size_mb', 'stats.is_fallback'
+        )
+        embedded_image_count = 0
         
         # Usar context manager para garantir fechamento correto
         with pymupdf.open(file_path) as doc:
             # Extrair metadados
-            metadata = {
+            metadata = {} if not wants(fields, 'metadata') else {
                 'title': doc.metadata.get('title', ''),
                 'author': doc.metadata.get('author', ''),
                 'subject': doc.metadata.get('subject', ''),
@@ -720,121 +1009,180 @@ def extract_text_from_pdf(file_path):
             
             total_pages = len(doc)
             
-            # DETECÇÃO DE PDF ESCANEADO
-            is_scanned, scanned_confidence = is_scanned_pdf(doc)
-            
             # Processamento normal de extração
             for page_num in range(len(doc)):
-                page = doc[page_num]
-                
-                # Extrair texto
-                text = page.get_text()
-                if text.strip():
-                    text_content.append({
-                        'page': page_num + 1,
-                        'text': text.strip()
-                    })
+                if deadline.reached():
+                    truncation = ('text', page_num, total_pages)
+                    break
                 
-                # Extrair informações de fontes
-                try:
-                    blocks = page.get_text("dict")
-                    page_fonts = set()
-                    for block in blocks.get("blocks", []):
-                        if "lines" in block:
-                            for line in block["lines"]:
-                                for span in line.get("spans", []):
-                                    font_info = f"{span.get('font', 'Unknown')} - {span.get('size', 'Unknown')}pt"
-                                    page_fonts.add(font_info)
-                    
-                    if page_fonts:
-                        fonts_info.append({
-                            'page': page_num + 1,
-                            'fonts': list(page_fonts)
-                        })
-                except Exception as font_error:
-                    logger.warning(f"Erro ao extrair fontes da página {page_num}: {font_error}")
+                page = doc[page_num]
                 
-                # Extrair imagens embutidas com melhor tratamento
-                try:
-                    image_list = page.get_images()
-                    logger.debug(f"Página {page_num + 1}: encontradas {len(image_list)} imagens embutidas")
+                with timing.span('page', page=page_num + 1):
+                    # Extrair texto
+                    if text_wanted:
+                        with timing.span('text'):
+                            text = page.get_text()
+                        if text.strip():
+                            text_content.append({
+                                'page': page_num + 1,
+                                'text': text.strip()
+                            })
                     
-                    for img_index, img in enumerate(image_list):
-                        try:
-                            xref = img[0]
-                            base_image = doc.extract_image(xref)
-                            
-                            if base_image:
-                                img_data = base_image["image"]
-                                img_ext = base_image["ext"]
-                                img_base64 = base64.b64encode(img_data).decode()
-                                
-                                # Obter dimensões usando Pixmap como fallback
-                                try:
-                                    pix = pymupdf.Pixmap(doc, xref)
-                                    width, height = pix.width, pix.height
-                                    pix = None
-                                except:
-                                    width, height = 0, 0
-                                
-                                # Determinar tipo MIME
-                                mime_type = f"image/{img_ext}"
-                                if img_ext.lower() in ['jpg', 'jpeg']:
-                                    mime_type = "image/jpeg"
-                                elif img_ext.lower() == 'png':
-                                    mime_type = "image/png"
-                                
-                                images.append({
-                                    'page': page_num + 1,
-                                    'index': img_index + 1,
-                                    'format': img_ext.upper(),
-                                    'data': img_base64,
-                                    'width': width,
-                                    'height': height,
-                                    'size_bytes': len(img_data),
-                                    'mime_type': mime_type,
-                                    'xref': xref
-                                })
-                                
-                                logger.debug(f"Imagem extraída: página {page_num + 1}, índice {img_index + 1}, {width}x{height}, {len(img_data)} bytes")
-                            
-                        except Exception as img_error:
-                            logger.warning(f"Erro ao extrair imagem {img_index} da página {page_num + 1}: {img_error}")
-                            # Tentar método alternativo com Pixmap
+                    # Extrair informações de fontes
+                    if fonts_wanted:
+                        with timing.span('fonts'):
                             try:
-                                xref = img[0]
-                                pix = pymupdf.Pixmap(doc, xref)
+                                blocks = page.get_text("dict")
+                                page_fonts = set()
+                                for block in blocks.get("blocks", []):
+                                    if "lines" in block:
+                                        for line in block["lines"]:
+                                            for span in line.get("spans", []):
+                                                font_info = f"{span.get('font', 'Unknown')} - {span.get('size', 'Unknown')}pt"
+                                                page_fonts.add(font_info)
                                 
-                                if pix.n - pix.alpha < 4:  # GRAY ou RGB
-                                    img_data = pix.tobytes("png")
-                                    img_base64 = base64.b64encode(img_data).decode()
-                                    
-                                    images.append({
+                                if page_fonts:
+                                    fonts_info.append({
                                         'page': page_num + 1,
-                                        'index': img_index + 1,
-                                        'format': 'PNG',
-                                        'data': img_base64,
-                                        'width': pix.width,
-                                        'height': pix.height,
-                                        'size_bytes': len(img_data),
-                                        'mime_type': 'image/png',
-                                        'extracted_method': 'pixmap_fallback'
+                                        'fonts': list(page_fonts)
                                     })
-                                    
-                                    logger.debug(f"Imagem extraída (fallback): página {page_num + 1}, {pix.width}x{pix.height}")
-                                
-                                pix = None
-                            except Exception as fallback_error:
-                                logger.warning(f"Falha também no método alternativo para imagem {img_index}: {fallback_error}")
+                            except Exception as font_error:
+                                logger.warning(f"Erro ao extrair fontes da página {page_num}: {font_error}")
+                    
+                    # Extrair imagens embutidas com melhor tratamento
+                    if images_wanted:
+                        with timing.span('images'):
+                            try:
+                                image_list = page.get_images()
+                                logger.debug(f"Página {page_num + 1}: encontradas {len(image_list)} imagens embutidas")
                                 
-                except Exception as page_error:
-                    logger.warning(f"Erro ao processar imagens da página {page_num + 1}: {page_error}")
+                                for img_index, img in enumerate(image_list):
+                                    try:
+                                        xref = img[0]
+                                        base_image = doc.extract_image(xref)
+                                        
+                                        if base_image:
+                                            img_data = base_image["image"]
+                                            img_ext = base_image["ext"]
+                                            with timing.span('base64'):
+                                                img_base64 = base64.b64encode(img_data).decode()
+                                            
+                                            # Obter dimensões usando Pixmap como fallback
+                                            try:
+                                                pix = pymupdf.Pixmap(doc, xref)
+                                                width, height = pix.width, pix.height
+                                                pix = None
+                                            except:
+                                                width, height = 0, 0
+                                            
+                                            # Determinar tipo MIME
+                                            mime_type = f"image/{img_ext}"
+                                            if img_ext.lower() in ['jpg', 'jpeg']:
+                                                mime_type = "image/jpeg"
+                                            elif img_ext.lower() == 'png':
+                                                mime_type = "image/png"
+                                            
+                                            images.append({
+                                                'page': page_num + 1,
+                                                'index': img_index + 1,
+                                                'format': img_ext.upper(),
+                                                'data': img_base64,
+                                                'width': width,
+                                                'height': height,
+                                                'size_bytes': len(img_data),
+                                                'mime_type': mime_type,
+                                                'xref': xref
+                                            })
+                                            
+                                            logger.debug(f"Imagem extraída: página {page_num + 1}, índice {img_index + 1}, {width}x{height}, {len(img_data)} bytes")
+                                    
+                                    except Exception as img_error:
+                                        logger.warning(f"Erro ao extrair imagem {img_index} da página {page_num + 1}: {img_error}")
+                                        # Tentar método alternativo com Pixmap
+                                        try:
+                                            xref = img[0]
+                                            pix = pymupdf.Pixmap(doc, xref)
+                                            
+                                            if pix.n - pix.alpha < 4:  # GRAY ou RGB
+                                                img_data = pix.tobytes("png")
+                                                img_base64 = base64.b64encode(img_data).decode()
+                                                
+                                                images.append({
+                                                    'page': page_num + 1,
+                                                    'index': img_index + 1,
+                                                    'format': 'PNG',
+                                                    'data': img_base64,
+                                                    'width': pix.width,
+                                                    'height': pix.height,
+                                                    'size_bytes': len(img_data),
+                                                    'mime_type': 'image/png',
+                                                    'extracted_method': 'pixmap_fallback'
+                                                })
+                                                
+                                                logger.debug(f"Imagem extraída (fallback): página {page_num + 1}, {pix.width}x{pix.height}")
+                                            
+                                            pix = None
+                                        except Exception as fallback_error:
+                                            logger.warning(f"Falha também no método alternativo para imagem {img_index}: {fallback_error}")
+                            
+                            except Exception as page_error:
+                                logger.warning(f"Erro ao processar imagens da página {page_num + 1}: {page_error}")
+                    else:
+                        # Só a contagem: listar os xrefs não decodifica as imagens
+                        embedded_image_count += len(page.get_images())
+            
+            image_count = len(images) if images_wanted else embedded_image_count
+            
+            # DETECÇÃO DE PDF ESCANEADO
+            # Para pedidos só de texto, a detecção roda apenas se o texto extraído
+            # for escasso (caso em que o texto de fallback é gerado)
+            sparse_text = text_wanted and sum(len(item['text']) for item in text_content) < 100 * total_pages
+            if page_images_wanted or sparse_text or wants(fields, 'stats.is_scanned', 'stats.scanned_confidence'):
+                with timing.span('is_scanned_pdf'):
+                    is_scanned, scanned_confidence = is_scanned_pdf(doc)
+            
+            ocr_wanted = text_wanted or wants(fields, 'ocr', 'stats.ocr_pages')
+            run_ocr = ocr and ocr_wanted and is_scanned and scanned_confidence >= 0.5 and ocr_engine.is_available()
+            rasterize = page_images_wanted and (image_count == 0 or is_scanned)
+            
+            # Páginas em branco: miniaturas analisadas antes do OCR e da rasterização, que as pulam
+            blank_pages = None
+            blank_wanted = fields is not None and fields.wants('stats.blank_pages')
+            if BLANK_PAGE_DETECTION and (run_ocr or rasterize or blank_wanted):
+                with timing.span('blank_pages'):
+                    blank_pages = detect_blank_pages(doc)
+            skip_pages = set(blank_pages or ())
+            
+            # Identifica o documento no cache de rasters (páginas renderizadas e rasters do OCR)
+            document_hash = file_digest(file_path) if run_ocr or rasterize else None
+            
+            # OCR das páginas sem camada de texto (no DPI do OCR, não no de visualização)
+            ocr_pages = []
+            if run_ocr:
+                text_pages = {item['page'] for item in text_content if len(item['text']) >= ocr_engine.OCR_MIN_TEXT_CHARS}
+                pending_pages = [
+                    page_num for page_num in range(total_pages)
+                    if page_num + 1 not in text_pages and page_num + 1 not in skip_pages
+                ]
+                with timing.span('ocr', pages=len(pending_pages)):
+                    ocr_pages = ocr_engine.ocr_pdf_pages(
+                        doc, pending_pages, lang=ocr_lang, timeout=ocr_timeout, document_hash=document_hash
+                    )
+                if len(ocr_pages) < len(pending_pages) and truncation is None:
+                    truncation = ('ocr', len(ocr_pages), len(pending_pages))
+                
+                # O texto reconhecido substitui a camada de texto (escassa) dessas páginas
+                recognized = {item['page']: item['text'] for item in ocr_pages if item.get('text')}
+                text_content = [item for item in text_content if item['page'] not in recognized]
+                text_content.extend({'page': page, 'text': text, 'source': 'ocr'} for page, text in recognized.items())
+                text_content.sort(key=lambda item: item['page'])
+            ocr_text_pages = sum(1 for item in ocr_pages if item.get('text'))
             
             # EXTRAÇÃO DE IMAGENS DE PÁGINAS (sempre ativar para visualização)
             page_images = []
             try:
                 # Configurar qualidade baseada no número de imagens embutidas
-                if len(images) == 0 or is_scanned:
+                if image_count == 0 or is_scanned:
                     # Se não há imagens embutidas ou é escaneado, converter páginas
                     if scanned_confidence >= 0.8:
                         dpi = 300  # Alta qualidade para PDFs claramente escaneados
@@ -846,21 +1194,33 @@ def extract_text_from_pdf(file_path):
                         dpi = 150  # Qualidade padrão para visualização
                         image_format = 'JPEG'
                     
-                    logger.info(f"Extraindo imagens de páginas com DPI {dpi} formato {image_format}")
-                    page_images = pdf_pages_to_images(doc, dpi=dpi, image_format=image_format)
+                    if page_images_wanted:
+                        logger.info(f"Extraindo imagens de páginas com DPI {dpi} formato {image_format}")
+                        page_images = pdf_pages_to_images(
+                            doc, dpi=dpi, image_format=image_format, skip_pages=skip_pages, document_hash=document_hash
+                        )
+                        if len(page_images) < total_pages and truncation is None:
+                            truncation = ('page_images', len(page_images), total_pages)
                     
                     if is_scanned and scanned_confidence >= 0.5:
                         logger.info(f"PDF detectado como escaneado (confiança: {scanned_confidence:.2f}). Páginas convertidas para preservar conteúdo.")
                         
                         # Criar texto indicativo do fallback para PDFs escaneados
-                        if len(text_content) == 0:
-                            fallback_text = f"[PDF DIGITALIZADO DETECTADO - {total_pages} páginas convertidas em imagens]\n\n"
+                        if ocr_text_pages:
+                            combined_text = '\n\n'.join([f"--- Página {item['page']} ---\n{item['text']}" for item in text_content])
+                            combined_text += f"\n\n[INFO: Texto de {ocr_text_pages} página(s) obtido por OCR.]"
+                        elif len(text_content) == 0:
+                            converted = ' convertidas em imagens' if page_images else ''
+                            fallback_text = f"[PDF DIGITALIZADO DETECTADO - {total_pages} páginas{converted}]\n\n"
                             fallback_text += f"Este documento foi identificado como digitalizado/escaneado.\n"
                             fallback_text += f"Confiança na detecção: {scanned_confidence:.1%}\n"
-                            fallback_text += f"As páginas foram convertidas em imagens de {dpi} DPI para preservar o conteúdo.\n\n"
+                            if page_images:
+                                fallback_text += f"As páginas foram convertidas em imagens de {dpi} DPI para preservar o conteúdo.\n\n"
                             
                             for i, img in enumerate(page_images):
-                                if 'error' not in img:
+                                if img.get('blank'):
+                                    fallback_text += f"--- Página {img['page']} (em branco) ---\n\n"
+                                elif 'error' not in img:
                                     fallback_text += f"--- Página {img['page']} (Imagem {img['width']}x{img['height']}) ---\n"
                                     fallback_text += f"[Imagem disponível em formato {img['format']} - {img['size_bytes']} bytes]\n\n"
                             
@@ -869,7 +1229,9 @@ def extract_text_from_pdf(file_path):
                             # Se há algum texto, adicionar aviso sobre fallback
                             combined_text = '\n\n'.join([f"--- Página {item['page']} ---\n{item['text']}" for item in text_content])
                             combined_text += f"\n\n[AVISO: PDF detectado como possivelmente escaneado (confiança: {scanned_confidence:.1%})."
-                            combined_text += f" Imagens de páginas foram geradas para garantir preservação do conteúdo.]"
+                            if page_images:
+                                combined_text += f" Imagens de páginas foram geradas para garantir preservação do conteúdo."
+                            combined_text += "]"
                     else:
                         # PDF normal com imagens de páginas para visualização
                         combined_text = '\n\n'.join([f"--- Página {item['page']} ---\n{item['text']}" for item in text_content])
@@ -879,6 +1241,8 @@ def extract_text_from_pdf(file_path):
                     # PDF normal com imagens embutidas - só texto
                     combined_text = '\n\n'.join([f"--- Página {item['page']} ---\n{item['text']}" for item in text_content])
                     
+            except ExtractionCancelled:
+                raise
             except Exception as page_img_error:
                 logger.error(f"Erro ao extrair imagens de páginas: {page_img_error}")
                 # Continuar com extração normal em caso de erro
@@ -894,7 +1258,7 @@ def extract_text_from_pdf(file_path):
             'metadata': metadata,
             'stats': {
                 'page_count': total_pages,
-                'image_count': len(images),
+                'image_count': image_count,
                 'character_count': len(combined_text),
                 'word_count': len(combined_text.split()),
                 'is_scanned': is_scanned,
@@ -902,6 +1266,22 @@ def extract_text_from_pdf(file_path):
             }
         }
         
+        if blank_pages is not None:
+            result['stats']['blank_pages'] = blank_pages
+        
+        if ocr_pages:
+            result['ocr'] = {
+                'engine': 'tesseract',
+                'lang': ocr_lang or ocr_engine.OCR_DEFAULT_LANG,
+                'dpi': ocr_engine.OCR_DPI,
+                'pages': [
+                    {'page': item['page'], 'character_count': len(item['text']), 'cached': item['cached']}
+                    if 'text' in item else item
+                    for item in ocr_pages
+                ]
+            }
+            result['stats']['ocr_pages'] = ocr_text_pages
+        
         # Adicionar imagens de páginas se disponíveis
         if page_images:
             result['page_images'] = page_images
@@ -919,20 +1299,36 @@ def extract_text_from_pdf(file_path):
             else:
                 result['stats']['is_fallback'] = False
         
+        if truncation is not None:
+            stage, processed, stage_total = truncation
+            deadline.mark_truncated(result, 'pages', processed, stage_total, stage=stage)
+        
         return result
+    except ExtractionCancelled:
+        raise
     except Exception as e:
         logger.error(f"Erro ao extrair dados do PDF: {str(e)}")
         raise Exception(f"Erro ao extrair dados do PDF: {str(e)}")
 
 def extract_data_from_excel(file_path):
-    """Extrai dados de planilhas Excel com análise avançada"""
+    """
+    Extrai dados de planilhas Excel com análise avançada
+    
+    Com o prazo da requisição esgotado, as planilhas restantes não são lidas.
+    """
     try:
         # Usar context manager para garantir fechamento correto
         with pd.ExcelFile(file_path) as excel_file:
             sheets_data = {}
+            truncated = False
             
             for sheet_name in excel_file.sheet_names:
-                df = pd.read_excel(excel_file, sheet_name=sheet_name)
+                if deadline.reached():
+                    truncated = True
+                    break
+                
+                with timing.span('read_sheet', sheet=sheet_name):
+                    df = pd.read_excel(excel_file, sheet_name=sheet_name)
                 
                 # Análise básica dos dados
                 sheet_analysis = {
@@ -946,13 +1342,15 @@ def extract_data_from_excel(file_path):
                 # Estatísticas para colunas numéricas
                 numeric_columns = df.select_dtypes(include=['number']).columns
                 if len(numeric_columns) > 0:
-                    sheet_analysis['numeric_stats'] = df[numeric_columns].describe().to_dict()
+                    with timing.span('describe', sheet=sheet_name):
+                        sheet_analysis['numeric_stats'] = df[numeric_columns].describe().to_dict()
                 
                 # Converter DataFrame para texto estruturado
                 text_content = f"=== Planilha: {sheet_name} ===\n"
                 text_content += f"Linhas: {len(df)}, Colunas: {len(df.columns)}\n"
                 text_content += f"Colunas: {', '.join(df.columns.tolist())}\n\n"
-                text_content += df.to_string(index=False, max_rows=1000)  # Limitar a 1000 linhas
+                with timing.span('to_string', sheet=sheet_name):
+                    text_content += df.to_string(index=False, max_rows=1000)  # Limitar a 1000 linhas
                 
                 sheets_data[sheet_name] = {
                     'text': text_content,
@@ -964,7 +1362,7 @@ def extract_data_from_excel(file_path):
             combined_text = '\n\n'.join([data['text'] for data in sheets_data.values()])
             total_sheets = len(excel_file.sheet_names)
             
-            return {
+            result = {
                 'text': combined_text,
                 'sheets': sheets_data,
                 'stats': {
@@ -975,10 +1373,36 @@ def extract_data_from_excel(file_path):
                     'word_count': len(combined_text.split())
                 }
             }
+            if truncated:
+                deadline.mark_truncated(result, 'sheets', len(sheets_data), total_sheets)
+            return result
+    except ExtractionCancelled:
+        raise
     except Exception as e:
         logger.error(f"Erro ao extrair dados do Excel: {str(e)}")
         raise Exception(f"Erro ao extrair dados do Excel: {str(e)}")
 
+def read_csv_until_deadline(file_path, encoding):
+    """
+    Lê o CSV inteiro ou, com prazo na requisição, em blocos de CSV_DEADLINE_CHUNK_ROWS linhas
+    
+    Returns:
+        Tupla (DataFrame, se a leitura parou no prazo com linhas ainda por ler)
+    """
+    if not deadline.limited():
+        return pd.read_csv(file_path, encoding=encoding), False
+    
+    chunks = []
+    with pd.read_csv(file_path, encoding=encoding, chunksize=CSV_DEADLINE_CHUNK_ROWS) as reader:
+        for chunk in reader:
+            # Verificado depois de ler o bloco seguinte: só é truncado se ainda havia linhas
+            if chunks and deadline.reached():
+                return pd.concat(chunks), True
+            chunks.append(chunk)
+    if not chunks:
+        return pd.read_csv(file_path, encoding=encoding), False
+    return pd.concat(chunks), False
+
 def extract_text_from_csv(file_path):
     """Extrai dados de arquivos CSV"""
     try:
@@ -986,10 +1410,12 @@ def extract_text_from_csv(file_path):
         encodings = ['utf-8', 'latin-1', 'cp1252', 'iso-8859-1']
         df = None
         used_encoding = None
+        truncated = False
         
         for encoding in encodings:
             try:
-                df = pd.read_csv(file_path, encoding=encoding)
+                with timing.span('read_csv', encoding=encoding):
+                    df, truncated = read_csv_until_deadline(file_path, encoding)
                 used_encoding = encoding
                 break
             except UnicodeDecodeError:
@@ -1011,16 +1437,18 @@ def extract_text_from_csv(file_path):
         # Estatísticas para colunas numéricas
         numeric_columns = df.select_dtypes(include=['number']).columns
         if len(numeric_columns) > 0:
-            analysis['numeric_stats'] = df[numeric_columns].describe().to_dict()
+            with timing.span('describe'):
+                analysis['numeric_stats'] = df[numeric_columns].describe().to_dict()
         
         # Converter para texto
         text_content = f"=== Arquivo CSV ===\n"
         text_content += f"Linhas: {len(df)}, Colunas: {len(df.columns)}\n"
         text_content += f"Encoding: {used_encoding}\n"
         text_content += f"Colunas: {', '.join(df.columns.tolist())}\n\n"
-        text_content += df.to_string(index=False, max_rows=1000)
+        with timing.span('to_string'):
+            text_content += df.to_string(index=False, max_rows=1000)
         
-        return {
+        result = {
             'text': text_content,
             'analysis': analysis,
             'sample_data': df.head(10).to_dict('records') if len(df) > 0 else [],
@@ -1032,59 +1460,68 @@ def extract_text_from_csv(file_path):
                 'encoding_used': used_encoding
             }
         }
+        if truncated:
+            # O total de linhas só seria conhecido lendo o arquivo até o fim
+            deadline.mark_truncated(result, 'rows', len(df), None)
+        return result
+    except ExtractionCancelled:
+        raise
     except Exception as e:
         logger.error(f"Erro ao extrair dados do CSV: {str(e)}")
         raise Exception(f"Erro ao extrair dados do CSV: {str(e)}")
 
-def extract_text_from_txt(file_path):
-    """Extrai texto de arquivos de texto simples com detecção de encoding"""
+def extract_text_from_txt(file_path, include_text=True, max_chars=None):
+    """Extrai texto de arquivos de texto simples com detecção de encoding por prefixo e leitura em streaming"""
     try:
-        # Tentar diferentes encodings
-        encodings = ['utf-8', 'latin-1', 'cp1252', 'iso-8859-1']
-        content = None
-        used_encoding = None
-        
-        for encoding in encodings:
-            try:
-                with open(file_path, 'r', encoding=encoding) as file:
-                    content = file.read()
-                    used_encoding = encoding
-                    break
-            except UnicodeDecodeError:
-                continue
-        
-        if content is None:
-            raise Exception("Não foi possível decodificar o arquivo de texto")
+        with timing.span('scan'):
+            scan = stream_text_file(file_path, include_text=include_text, max_chars=max_chars)
+        used_encoding = scan['encoding']
         
-        lines = content.split('\n')
-        
-        # Análise do conteúdo
+        # Análise do conteúdo (calculada em uma única passada)
         analysis = {
-            'lines': len(lines),
-            'characters': len(content),
-            'words': len(content.split()),
-            'paragraphs': len([line for line in lines if line.strip()]),
+            'lines': scan['lines'],
+            'characters': scan['characters'],
+            'words': scan['words'],
+            'paragraphs': scan['paragraphs'],
             'encoding_used': used_encoding,
-            'empty_lines': len([line for line in lines if not line.strip()])
+            'empty_lines': scan['empty_lines']
         }
         
-        return {
-            'text': content,
+        result = {
+            'text': scan['text'] if include_text else '',
             'analysis': analysis,
             'stats': {
-                'lines': len(lines),
-                'characters': len(content),
-                'words': len(content.split()),
+                'lines': scan['lines'],
+                'characters': scan['characters'],
+                'words': scan['words'],
                 'encoding_used': used_encoding
             }
         }
         
+        if not include_text:
+            result['stats']['text_included'] = False
+        if scan['truncated']:
+            result['stats']['truncated'] = True
+            result['stats']['max_chars'] = max_chars
+        if scan['deadline_reached']:
+            # Contagens parciais: apenas o trecho lido até o prazo
+            deadline.mark_truncated(result, 'characters', scan['characters'], None)
+        
+        return result
+        
+    except ExtractionCancelled:
+        raise
     except Exception as e:
         logger.error(f"Erro ao extrair texto: {str(e)}")
         raise Exception(f"Erro ao extrair texto: {str(e)}")
 
-def extract_text_from_image(file_path):
-    """Extrai metadados e dados de imagens em formato padronizado"""
+def extract_text_from_image(file_path, ocr=True, ocr_lang=None, ocr_timeout=None):
+    """
+    Extrai metadados e dados de imagens em formato padronizado
+    
+    Com o Tesseract disponível (e ocr=True), o texto da imagem é reconhecido por OCR.
+    O OCR não passa do prazo da requisição e é pulado se ele já tiver acabado.
+    """
     try:
         with Image.open(file_path) as img:
             # Metadados básicos
@@ -1100,7 +1537,8 @@ def extract_text_from_image(file_path):
             # Ler arquivo original para base64
             with open(file_path, 'rb') as img_file:
                 img_data = img_file.read()
-                img_base64 = base64.b64encode(img_data).decode('utf-8')
+                with timing.span('base64'):
+                    img_base64 = base64.b64encode(img_data).decode('utf-8')
             
             # Determinar tipo MIME
             mime_type = f"image/{img.format.lower()}" if img.format else "image/unknown"
@@ -1124,10 +1562,30 @@ def extract_text_from_image(file_path):
             
             # Texto descritivo
             description = f"Imagem detectada: {img.format} {img.width}x{img.height} pixels, Modo: {img.mode}"
-            ocr_note = "[OCR não configurado - Para extrair texto de imagens, configure o Tesseract OCR]"
+            ocr_info = None
+            ocr_skipped = ocr and ocr_engine.is_available() and deadline.reached()
+            if ocr_skipped:
+                ocr_note = "[OCR não executado: prazo da requisição esgotado]"
+            elif ocr and ocr_engine.is_available():
+                ocr_info = {'engine': 'tesseract', 'lang': ocr_lang or ocr_engine.OCR_DEFAULT_LANG}
+                try:
+                    with timing.span('ocr'):
+                        ocr_text, ocr_info['cached'] = ocr_engine.recognize(
+                            img_data, lang=ocr_lang, timeout=deadline.bounded(ocr_timeout or ocr_engine.OCR_DEFAULT_TIMEOUT)
+                        )
+                    ocr_info['character_count'] = len(ocr_text)
+                    ocr_note = f"--- Texto (OCR) ---\n{ocr_text}" if ocr_text else "[OCR não encontrou texto na imagem]"
+                except Exception as ocr_error:
+                    logger.warning(f"Erro no OCR da imagem: {ocr_error}")
+                    ocr_info['error'] = str(ocr_error)
+                    ocr_note = f"[Erro no OCR: {ocr_error}]"
+            elif ocr:
+                ocr_note = "[OCR não configurado - Para extrair texto de imagens, configure o Tesseract OCR]"
+            else:
+                ocr_note = "[OCR desabilitado nesta requisição]"
             combined_text = f"{description}\n\n{ocr_note}\n\n[INFO: Imagem incluída em base64 para visualização]"
             
-            return {
+            result = {
                 'text': combined_text,
                 'images': [image_data],
                 'metadata': metadata,
@@ -1142,35 +1600,272 @@ def extract_text_from_image(file_path):
                     'word_count': len(combined_text.split())
                 }
             }
+            if ocr_info is not None:
+                result['ocr'] = ocr_info
+            if ocr_skipped:
+                deadline.mark_truncated(result, 'images', 0, 1, stage='ocr')
+            return result
+    except ExtractionCancelled:
+        raise
     except Exception as e:
         logger.error(f"Erro ao processar imagem: {str(e)}")
         raise Exception(f"Erro ao processar imagem: {str(e)}")
 
-@extractor_bp.route('/extract', methods=['POST'])
-def extract_document():
-    """Endpoint principal para extração de documentos com validações aprimoradas"""
-    try:
-        # Verificar se um arquivo foi enviado
-        if 'file' not in request.files:
-            return jsonify({
-                'success': False,
-                'error': 'Nenhum arquivo foi enviado',
-                'error_code': 'NO_FILE'
-            }), 400
-        
-        file = request.files['file']
-        
-        if file.filename == '':
-            return jsonify({
-                'success': False,
-                'error': 'Nenhum arquivo selecionado',
-                'error_code': 'EMPTY_FILENAME'
-            }), 400
-        
-        # Validar tipo de arquivo
-        if not allowed_file(file.filename):
-            return jsonify({
-                'success': False,
+# Opções aceitas pelos extratores que fazem OCR
+OCR_OPTIONS = ('ocr', 'ocr_lang', 'ocr_timeout')
+
+# Registro de extratores por extensão: (função, opções aceitas, backends usados)
+EXTRACTORS = {
+    'docx': (extract_text_from_docx, ('include_image_data', 'fields'), ('docx',)),
+    'pptx': (extract_text_from_pptx, ('include_image_data', 'slides', 'dedupe_media'), ('pptx',)),
+    'pdf': (extract_text_from_pdf, ('fields',) + OCR_OPTIONS, ('pymupdf', 'numpy')),
+    'xlsx': (extract_data_from_excel, (), ('pandas', 'openpyxl')),
+    'xls': (extract_data_from_excel, (), ('pandas',)),
+    'csv': (extract_text_from_csv, (), ('pandas',)),
+    'txt': (extract_text_from_txt, ('include_text', 'max_chars'), ()),
+    'png': (extract_text_from_image, OCR_OPTIONS, ('PIL.Image',)),
+    'jpg': (extract_text_from_image, OCR_OPTIONS, ('PIL.Image',)),
+    'jpeg': (extract_text_from_image, OCR_OPTIONS, ('PIL.Image',)),
+    'bmp': (extract_text_from_image, OCR_OPTIONS, ('PIL.Image',)),
+    'tiff': (extract_text_from_image, OCR_OPTIONS, ('PIL.Image',))
+}
+
+def warm_up_backends(spec):
+    """
+    Pré-carrega backends de extração (ex.: antes de atender requisições)
+    
+    Args:
+        spec: 'all', ou lista separada por vírgulas de extensões ('pdf,docx')
+            e/ou nomes de módulos ('pandas')
+    """
+    names = []
+    for item in [part.strip() for part in (spec or '').split(',') if part.strip()]:
+        if item == 'all':
+            names.extend(name for _, _, modules in EXTRACTORS.values() for name in modules)
+        elif item in EXTRACTORS:
+            names.extend(EXTRACTORS[item][2])
+        else:
+            names.append(item)
+    
+    for name in dict.fromkeys(names):
+        try:
+            backends.load_backend(name)
+        except ImportError as import_error:
+            logger.warning(f"Não foi possível pré-carregar o backend {name}: {import_error}")
+
+def run_extractor(file_extension, file_path, options=None):
+    """
+    Executa o extrator registrado para a extensão, repassando apenas as opções que ele aceita
+
+    A extração roda sob o orçamento de memória/CPU do formato; se o orçamento
+    for excedido, ResourceLimitExceeded é lançada. Antes, passa pelo controle
+    de admissão, que lança AdmissionRejected se o servidor estiver sobrecarregado. Se a requisição habilitou o
+    profiling, o relatório do perfil é incluído no resultado em 'profile'.
+    
+    Fora do profiling, extrações idênticas simultâneas (mesmo conteúdo,
+    formato e opções) são coalescidas: apenas uma roda e as demais recebem
+    uma cópia do resultado.
+    
+    O uso (documentos, bytes e tempo de CPU) é contabilizado na chave de API
+    da requisição; quem recebe o resultado coalescido não paga a CPU.
+    
+    Com a opção timeout_ms, a extração roda com prazo (contado do início da
+    requisição) e pode devolver um resultado parcial marcado com
+    stats.truncated; essas extrações não são coalescidas. Se o cliente
+    desconectar, ExtractionCancelled é lançada e o worker é encerrado.
+    """
+    extractor, accepted_options, required_backends = EXTRACTORS[file_extension]
+    kwargs = {name: value for name, value in (options or {}).items() if name in accepted_options}
+    budget = get_budget(file_extension)
+    
+    # Importar no servidor (uma única vez) para que os workers herdem o módulo já carregado
+    backends.ensure_loaded(required_backends)
+    
+    profile_mode = g.get('profile_mode') if has_request_context() else None
+    if profile_mode:
+        target = profiling.profile_call
+        target_args = (extractor, (file_path,), kwargs)
+        target_kwargs = {'mode': profile_mode, 'label': file_extension}
+        budget = profiling.profiling_budget(budget)
+    else:
+        target, target_args, target_kwargs = extractor, (file_path,), kwargs
+    
+    fields = (options or {}).get('fields')
+    tenant = api_keys.current_tenant()
+    # O custo na admissão inclui as páginas escaneadas quando a extração vai fazer OCR
+    ocr = 'ocr' in accepted_options and kwargs.get('ocr', True) and ocr_engine.is_available()
+    
+    token = deadline.current()
+    timeout_ms = (options or {}).get('timeout_ms')
+    if token is not None and timeout_ms:
+        token.limit(timeout_ms)
+    # Cliente que já desconectou (ex.: no meio de um lote) não inicia nova extração
+    deadline.check()
+    
+    def extract():
+        # Só a extração que vai rodar ocupa capacidade (quem aguarda o single-flight não)
+        with admission.admitted(file_extension, file_path, tenant, ocr=ocr) as lane:
+            # Workers da faixa batch rodam com prioridade de CPU menor
+            worker_budget = dict(budget, nice=lane.nice) if lane is not None and lane.nice else budget
+            start = time.perf_counter()
+            account = None
+            try:
+                with metrics.phase('extract', format=file_extension), cpu_accounting() as account:
+                    result = run_with_budget(target, args=target_args, kwargs=target_kwargs, budget=worker_budget)
+            except Exception as e:
+                metrics.record_extraction(file_extension, processing_error_code(e), time.perf_counter() - start)
+                raise
+            finally:
+                # A CPU gasta é cobrada mesmo quando a extração falha ou estoura o orçamento
+                if account is not None:
+                    api_keys.USAGE.record(tenant, cpu_seconds=account.seconds)
+        
+        metrics.record_extraction(file_extension, 'success', time.perf_counter() - start)
+        
+        if profile_mode:
+            result, report = result
+        
+        truncation = deadline.truncation(result)
+        if truncation:
+            deadline.record_truncation(file_extension)
+        
+        # Extratores sem suporte a fields calculam tudo; o resultado é recortado aqui
+        if fields is not None:
+            result = fields.project(result)
+            # O aviso de resultado parcial é mantido mesmo fora dos campos pedidos
+            if truncation:
+                result['stats'] = dict(result.get('stats', {}), **truncation)
+        
+        if profile_mode:
+            result['profile'] = report
+        return result
+    
+    if profile_mode or not single_flight.SINGLE_FLIGHT_ENABLED or (token is not None and token.expires_at is not None):
+        result = extract()
+    else:
+        # A espera nunca passa do tempo máximo do worker que está extraindo
+        key = extraction_key(file_extension, file_path, kwargs, fields)
+        result = single_flight.run(key, extract, timeout=budget['cpu_seconds'] * WALL_TIMEOUT_FACTOR, label=file_extension)
+    
+    api_keys.USAGE.record(tenant, documents=1, size_bytes=os.path.getsize(file_path))
+    return result
+
+def extraction_key(file_extension, file_path, kwargs, fields):
+    """Chave de coalescência: hash do conteúdo, formato e opções que mudam o resultado"""
+    with timing.span('digest'):
+        digest = file_digest(file_path)
+    return make_key(digest, file_extension, sorted(kwargs.items()), fields)
+
+def processing_error_code(error, default='PROCESSING_ERROR'):
+    """Código de erro de uma falha de processamento"""
+    if isinstance(error, ResourceLimitExceeded):
+        return 'RESOURCE_LIMIT'
+    if isinstance(error, AdmissionRejected):
+        return 'OVERLOADED'
+    if isinstance(error, ExtractionCancelled):
+        return 'CLIENT_DISCONNECTED'
+    if isinstance(error, InvalidOption):
+        return error.error_code
+    return default
+
+def store_upload(file, file_extension):
+    """
+    Caminho em disco e tamanho de um arquivo enviado via multipart
+    
+    Com StreamingRequest o arquivo já foi gravado no destino final durante o
+    recebimento; caso contrário é copiado para um arquivo temporário.
+    """
+    spool_path = spooled_path(file)
+    if spool_path is not None:
+        return spool_path, file.stream.size
+    
+    with tempfile.NamedTemporaryFile(delete=False, suffix=f'.{file_extension}') as temp_file:
+        file.save(temp_file.name)
+        temp_file_path = temp_file.name
+    return temp_file_path, os.path.getsize(temp_file_path)
+
+@extractor_bp.errorhandler(UploadRejected)
+def upload_rejected_response(error):
+    """Resposta para uploads recusados durante o recebimento (tipo, conteúdo ou tamanho)"""
+    response = {
+        'success': False,
+        'error': str(error),
+        'error_code': error.error_code
+    }
+    if error.error_code == 'UNSUPPORTED_TYPE':
+        response['supported_types'] = list(ALLOWED_EXTENSIONS.keys())
+    if error.max_size is not None:
+        response['max_size_mb'] = error.max_size // (1024*1024)
+    return jsonify(response), error.status
+
+def resource_limit_response(error, **extra):
+    """
+    Resposta padrão para extrações interrompidas pelo governador de recursos
+    
+    O arquivo já passou pelas verificações de tamanho, então não é 413: um
+    documento que estoura o orçamento de memória ou CPU gera 422 (repetir não
+    adianta); tempo de parede esgotado ou worker morto pelo sistema geram 503.
+    """
+    logger.warning(f"Extração interrompida por limite de recursos: {error.limit}")
+    status = 422 if error.limit in ResourceLimitExceeded.DOCUMENT_LIMITS else 503
+    return jsonify({
+        'success': False,
+        'error': str(error),
+        'error_code': 'RESOURCE_LIMIT',
+        'limit': error.limit,
+        **extra
+    }), status
+
+def admission_rejected_response(error):
+    """Resposta 429 para extrações recusadas pelo controle de admissão"""
+    response = jsonify({
+        'success': False,
+        'error': str(error),
+        'error_code': 'OVERLOADED',
+        'retry_after': error.retry_after
+    })
+    response.headers['Retry-After'] = str(error.retry_after)
+    return response, 429
+
+def extraction_cancelled_response(error):
+    """
+    Resposta para extrações canceladas porque o cliente desconectou
+    
+    Ninguém vai ler a resposta: o status 499 (convenção do nginx) serve aos
+    logs de acesso e às métricas, e o cancelamento não é tratado como erro.
+    """
+    logger.info(f"{error} ({request.path})")
+    return jsonify({
+        'success': False,
+        'error': str(error),
+        'error_code': 'CLIENT_DISCONNECTED'
+    }), 499
+
+@extractor_bp.route('/extract', methods=['POST'])
+def extract_document():
+    """Endpoint principal para extração de documentos com validações aprimoradas"""
+    try:
+        # Verificar se um arquivo foi enviado
+        if 'file' not in request.files:
+            return jsonify({
+                'success': False,
+                'error': 'Nenhum arquivo foi enviado',
+                'error_code': 'NO_FILE'
+            }), 400
+        
+        file = request.files['file']
+        
+        if file.filename == '':
+            return jsonify({
+                'success': False,
+                'error': 'Nenhum arquivo selecionado',
+                'error_code': 'EMPTY_FILENAME'
+            }), 400
+        
+        # Validar tipo de arquivo
+        if not allowed_file(file.filename):
+            return jsonify({
+                'success': False,
                 'error': 'Tipo de arquivo não suportado',
                 'error_code': 'UNSUPPORTED_TYPE',
                 'supported_types': list(ALLOWED_EXTENSIONS.keys())
@@ -1178,47 +1873,22 @@ def extract_document():
         
         filename = secure_filename(file.filename)
         file_extension = filename.rsplit('.', 1)[1].lower()
+        extraction_options = get_extraction_options(request.form)
         
-        # Validar tamanho do arquivo
-        file.seek(0, 2)  # Mover para o final
-        file_size = file.tell()
-        file.seek(0)  # Voltar ao início
-        
-        if not validate_file_size(file_size, file_extension):
-            max_size = MAX_FILE_SIZES.get(file_extension, MAX_FILE_SIZES['default'])
-            return jsonify({
-                'success': False,
-                'error': f'Arquivo muito grande. Tamanho máximo: {max_size // (1024*1024)}MB',
-                'error_code': 'FILE_TOO_LARGE',
-                'max_size_mb': max_size // (1024*1024)
-            }), 413
-        
-        # Salvar arquivo temporariamente
-        with tempfile.NamedTemporaryFile(delete=False, suffix=f'.{file_extension}') as temp_file:
-            file.save(temp_file.name)
-            temp_file_path = temp_file.name
+        # Tamanho e magic bytes já foram conferidos durante o recebimento (ver StreamingRequest)
+        temp_file_path, file_size = store_upload(file, file_extension)
         
         try:
             # Processar arquivo baseado na extensão
-            if file_extension == 'docx':
-                result = extract_text_from_docx(temp_file_path)
-            elif file_extension == 'pdf':
-                result = extract_text_from_pdf(temp_file_path)
-            elif file_extension in ['xlsx', 'xls']:
-                result = extract_data_from_excel(temp_file_path)
-            elif file_extension == 'csv':
-                result = extract_text_from_csv(temp_file_path)
-            elif file_extension == 'txt':
-                result = extract_text_from_txt(temp_file_path)
-            elif file_extension in ['png', 'jpg', 'jpeg', 'bmp', 'tiff']:
-                result = extract_text_from_image(temp_file_path)
-            else:
+            if file_extension not in EXTRACTORS:
                 return jsonify({
                     'success': False,
                     'error': f'Processamento para {file_extension} não implementado',
                     'error_code': 'PROCESSING_NOT_IMPLEMENTED'
                 }), 400
             
+            result = run_extractor(file_extension, temp_file_path, extraction_options)
+            
             # Adicionar informações do arquivo
             result['file_info'] = {
                 'filename': filename,
@@ -1242,6 +1912,21 @@ def extract_document():
             if os.path.exists(temp_file_path):
                 os.unlink(temp_file_path)
     
+    except UploadRejected as e:
+        return upload_rejected_response(e)
+    
+    except ResourceLimitExceeded as e:
+        return resource_limit_response(e)
+    
+    except AdmissionRejected as e:
+        return admission_rejected_response(e)
+    
+    except ExtractionCancelled as e:
+        return extraction_cancelled_response(e)
+    
+    except InvalidOption as e:
+        return invalid_option_response(e)
+    
     except Exception as e:
         logger.error(f"Erro no processamento: {str(e)}")
         return jsonify({
@@ -1251,6 +1936,8 @@ def extract_document():
         }), 500
 
 @extractor_bp.route('/extract/bulk', methods=['POST'])
+@batch_endpoint
+@collect_upload_errors
 def extract_multiple_documents():
     """Endpoint para processamento em lote de múltiplos documentos"""
     try:
@@ -1273,6 +1960,7 @@ def extract_multiple_documents():
         results = []
         errors = []
         total_processing_time = 0
+        extraction_options = get_extraction_options(request.form)
         
         for i, file in enumerate(files):
             start_time = time.time()
@@ -1285,54 +1973,34 @@ def extract_multiple_documents():
                     })
                     continue
                 
-                # Verificar se o arquivo é permitido
-                if not allowed_file(file.filename):
+                # Uploads recusados durante o recebimento (tipo, conteúdo ou tamanho)
+                rejection = upload_rejection(file)
+                if rejection is not None:
                     errors.append({
                         'index': i,
                         'filename': file.filename,
-                        'error': 'Tipo de arquivo não suportado',
-                        'error_code': 'UNSUPPORTED_TYPE'
+                        'error': str(rejection),
+                        'error_code': rejection.error_code
                     })
                     continue
                 
-                filename = secure_filename(file.filename)
-                file_extension = filename.rsplit('.', 1)[1].lower()
-                
-                # Validar tamanho do arquivo
-                file.seek(0, 2)  # Mover para o final
-                file_size = file.tell()
-                file.seek(0)  # Voltar ao início
-                
-                if not validate_file_size(file_size, file_extension):
-                    max_size = MAX_FILE_SIZES.get(file_extension, MAX_FILE_SIZES['default'])
+                # Verificar se o arquivo é permitido
+                if not allowed_file(file.filename):
                     errors.append({
                         'index': i,
                         'filename': file.filename,
-                        'error': f'Arquivo muito grande. Máximo: {max_size // (1024*1024)}MB',
-                        'error_code': 'FILE_TOO_LARGE'
+                        'error': 'Tipo de arquivo não suportado',
+                        'error_code': 'UNSUPPORTED_TYPE'
                     })
                     continue
                 
-                # Salvar arquivo temporariamente
-                with tempfile.NamedTemporaryFile(delete=False, suffix=f'.{file_extension}') as temp_file:
-                    file.save(temp_file.name)
-                    temp_file_path = temp_file.name
+                filename = secure_filename(file.filename)
+                file_extension = filename.rsplit('.', 1)[1].lower()
+                temp_file_path, file_size = store_upload(file, file_extension)
                 
                 try:
                     # Processar arquivo baseado na extensão
-                    if file_extension == 'docx':
-                        result = extract_text_from_docx(temp_file_path)
-                    elif file_extension == 'pdf':
-                        result = extract_text_from_pdf(temp_file_path)
-                    elif file_extension in ['xlsx', 'xls']:
-                        result = extract_data_from_excel(temp_file_path)
-                    elif file_extension == 'csv':
-                        result = extract_text_from_csv(temp_file_path)
-                    elif file_extension == 'txt':
-                        result = extract_text_from_txt(temp_file_path)
-                    elif file_extension in ['png', 'jpg', 'jpeg', 'bmp', 'tiff']:
-                        result = extract_text_from_image(temp_file_path)
-                    else:
+                    if file_extension not in EXTRACTORS:
                         errors.append({
                             'index': i,
                             'filename': file.filename,
@@ -1341,6 +2009,8 @@ def extract_multiple_documents():
                         })
                         continue
                     
+                    result = run_extractor(file_extension, temp_file_path, extraction_options)
+                    
                     # Calcular tempo de processamento
                     processing_time = time.time() - start_time
                     total_processing_time += processing_time
@@ -1379,7 +2049,7 @@ def extract_multiple_documents():
                     'index': i,
                     'filename': file.filename,
                     'error': str(e),
-                    'error_code': 'PROCESSING_ERROR',
+                    'error_code': processing_error_code(e),
                     'processing_time': round(processing_time, 2)
                 })
         
@@ -1403,6 +2073,9 @@ def extract_multiple_documents():
             }
         })
         
+    except InvalidOption as e:
+        return invalid_option_response(e)
+    
     except Exception as e:
         logger.error(f"Erro no processamento em lote: {str(e)}")
         return jsonify({
@@ -1412,6 +2085,7 @@ def extract_multiple_documents():
         }), 500
 
 @extractor_bp.route('/supported-types', methods=['GET'])
+@public_endpoint
 def get_supported_types():
     """Retorna os tipos de arquivo suportados com informações detalhadas"""
     return jsonify({
@@ -1425,6 +2099,7 @@ def get_supported_types():
         'features_by_type': {
             'pdf': ['texto', 'imagens', 'metadados', 'fontes'],
             'docx': ['texto', 'formatação', 'tabelas', 'metadados'],
+            'pptx': ['texto', 'slides', 'tabelas', 'imagens', 'metadados'],
             'xlsx': ['dados', 'múltiplas planilhas', 'estatísticas', 'tipos de dados'],
             'csv': ['dados tabulares', 'detecção de encoding', 'estatísticas'],
             'txt': ['texto simples', 'detecção de encoding', 'análise básica'],
@@ -1433,6 +2108,7 @@ def get_supported_types():
     })
 
 @extractor_bp.route('/health', methods=['GET'])
+@public_endpoint
 def health_check():
     """Endpoint de verificação de saúde da API"""
     import datetime
@@ -1443,36 +2119,165 @@ def health_check():
         'features': [
             'Extração de texto de PDF',
             'Extração de texto de Word',
+            'Extração de texto de PowerPoint',
             'Extração de dados de Excel',
             'Extração de dados de CSV',
             'Processamento de imagens',
             'Análise de metadados',
-            'Validação de arquivos'
+            'Validação de arquivos',
+            'Métricas no formato Prometheus (/metrics)'
         ],
+        'uptime_seconds': round(metrics.uptime_seconds(), 1),
+        'requests_in_flight': metrics.HTTP_IN_FLIGHT.values().get((), 0),
+        'backends_loaded': backends.import_times(),
         'timestamp': datetime.datetime.now().isoformat()
     })
 
 @extractor_bp.route('/stats', methods=['GET'])
 def get_extraction_stats():
-    """Endpoint para estatísticas de uso da API"""
-    # Este endpoint pode ser expandido para incluir estatísticas reais
+    """
+    Endpoint para estatísticas de uso da API
+    
+    Resumo em JSON das métricas coletadas desde o início do processo; a série
+    completa está em /metrics no formato do Prometheus.
+    """
+    stats = metrics.summary()
+    stats['supported_formats'] = len(ALLOWED_EXTENSIONS)
+    stats['backends_import_ms'] = backends.import_times()
+    stats['admission'] = admission.ADMISSION.snapshot()
+    stats['disk_caches'] = {
+        'raster': RASTER_CACHE.usage(),
+        'ocr': ocr_engine.OCR_CACHE.usage()
+    }
+    stats['max_file_size_mb'] = max(MAX_FILE_SIZES.values()) // (1024*1024)
+    
     return jsonify({
         'success': True,
-        'stats': {
-            'supported_formats': len(ALLOWED_EXTENSIONS),
-            'max_file_size_mb': max(MAX_FILE_SIZES.values()) // (1024*1024),
-            'features': {
-                'text_extraction': True,
-                'image_extraction': True,
-                'metadata_extraction': True,
-                'bulk_processing': True,
-                'format_validation': True,
-                'size_validation': True,
-                'url_extraction': True
-            }
-        }
+        'stats': stats
     })
 
+def decode_file_data(file_data, encoding):
+    """Bytes de 'file_data' em base64 (com ou sem prefixo data URI) ou binary"""
+    if encoding == 'base64':
+        if ',' in file_data:
+            file_data = file_data.split(',')[1]
+        return base64.b64decode(file_data)
+    if encoding == 'binary':
+        return file_data.encode('latin-1') if isinstance(file_data, str) else file_data
+    raise ValueError('Encoding deve ser "base64" ou "binary"')
+
+@extractor_bp.route('/probe', methods=['POST'])
+def probe_document():
+    """
+    Estimativa barata do custo de extração de um documento
+    
+    Aceita o arquivo como os endpoints de extração: upload multipart ('file'),
+    ou JSON com 'url' ou com 'file_data' + 'filename' (+ 'encoding'). Só
+    cabeçalhos e índices do arquivo são lidos (tabela xref do PDF, diretório
+    do ZIP, workbook.xml, cabeçalho da imagem); nada é extraído.
+    """
+    start_time = time.perf_counter()
+    temp_file_path = None
+    try:
+        data = request.get_json(silent=True) if request.is_json else None
+        
+        if 'file' in request.files:
+            file = request.files['file']
+            filename = secure_filename(file.filename or '')
+        elif data and data.get('url'):
+            url = str(data['url']).strip()
+            try:
+                downloaded_file = download_file_from_url(url)
+            except Exception as e:
+                logger.error(f"Erro ao baixar arquivo de {url}: {str(e)}")
+                return jsonify({
+                    'success': False,
+                    'error': str(e),
+                    'error_code': 'DOWNLOAD_ERROR',
+                    'url': url
+                }), 400
+            filename = downloaded_file['filename']
+        elif data and 'file_data' in data:
+            if 'filename' not in data:
+                return jsonify({
+                    'success': False,
+                    'error': 'Campo "filename" é obrigatório',
+                    'error_code': 'MISSING_FILENAME'
+                }), 400
+            filename = secure_filename(data['filename'])
+        else:
+            return jsonify({
+                'success': False,
+                'error': 'Envie um arquivo ("file"), uma URL ("url") ou dados ("file_data" e "filename")',
+                'error_code': 'NO_FILE'
+            }), 400
+        
+        if not allowed_file(filename):
+            return jsonify({
+                'success': False,
+                'error': 'Tipo de arquivo não suportado',
+                'error_code': 'UNSUPPORTED_TYPE',
+                'supported_types': list(ALLOWED_EXTENSIONS.keys())
+            }), 400
+        
+        file_extension = filename.rsplit('.', 1)[1].lower()
+        
+        if 'file' in request.files:
+            temp_file_path, file_size = store_upload(file, file_extension)
+        else:
+            if data.get('url'):
+                file_bytes = downloaded_file['content'].getvalue()
+            else:
+                try:
+                    file_bytes = decode_file_data(data['file_data'], data.get('encoding', 'base64'))
+                except Exception as e:
+                    return jsonify({
+                        'success': False,
+                        'error': f'Erro ao decodificar dados: {str(e)}',
+                        'error_code': 'DECODE_ERROR'
+                    }), 400
+            with tempfile.NamedTemporaryFile(delete=False, suffix=f'.{file_extension}') as temp_file:
+                temp_file.write(file_bytes)
+                temp_file_path = temp_file.name
+            file_size = len(file_bytes)
+        
+        info = probe_file(file_extension, temp_file_path, file_size)
+        # Mesmo cálculo da admissão, para que custo e faixa coincidam com os do escalonador
+        estimated_cost = round(admission.estimate_file_cost(file_extension, temp_file_path, ocr_engine.is_available()), 3)
+        
+        return jsonify({
+            'success': True,
+            'data': {
+                'file_info': {
+                    'filename': filename,
+                    'type': file_extension,
+                    'mime_type': ALLOWED_EXTENSIONS.get(file_extension, 'unknown'),
+                    'size_bytes': file_size,
+                    'size_mb': round(file_size / (1024*1024), 2),
+                    'within_size_limit': validate_file_size(file_size, file_extension)
+                },
+                'probe': info,
+                'estimated_cost': estimated_cost,
+                'lane': admission.ADMISSION.lane_for(estimated_cost).name,
+                'probe_time_ms': round((time.perf_counter() - start_time) * 1000, 2)
+            }
+        })
+    
+    except UploadRejected as e:
+        return upload_rejected_response(e)
+    
+    except Exception as e:
+        logger.error(f"Erro no probe do documento: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': str(e),
+            'error_code': 'PROBE_ERROR'
+        }), 400
+    
+    finally:
+        if temp_file_path and os.path.exists(temp_file_path):
+            os.unlink(temp_file_path)
+
 @extractor_bp.route('/extract/url', methods=['POST'])
 def extract_document_from_url():
     """Extrai dados de documento a partir de uma URL"""
@@ -1510,6 +2315,7 @@ def extract_document_from_url():
         except (ValueError, TypeError):
             max_size_mb = 50  # Valor padrão em caso de erro
         max_size = max_size_mb * 1024 * 1024  # Converter MB para bytes
+        extraction_options = get_extraction_options(data)
         
         logger.info(f"Iniciando download de: {url}")
         
@@ -1562,19 +2368,7 @@ def extract_document_from_url():
         
         try:
             # Processar arquivo baseado na extensão
-            if file_extension == 'docx':
-                result = extract_text_from_docx(temp_file_path)
-            elif file_extension == 'pdf':
-                result = extract_text_from_pdf(temp_file_path)
-            elif file_extension in ['xlsx', 'xls']:
-                result = extract_data_from_excel(temp_file_path)
-            elif file_extension == 'csv':
-                result = extract_text_from_csv(temp_file_path)
-            elif file_extension == 'txt':
-                result = extract_text_from_txt(temp_file_path)
-            elif file_extension in ['png', 'jpg', 'jpeg', 'bmp', 'tiff']:
-                result = extract_text_from_image(temp_file_path)
-            else:
+            if file_extension not in EXTRACTORS:
                 return jsonify({
                     'success': False,
                     'error': f'Processamento para {file_extension} não implementado',
@@ -1583,6 +2377,8 @@ def extract_document_from_url():
                     'filename': filename
                 }), 400
             
+            result = run_extractor(file_extension, temp_file_path, extraction_options)
+            
             processing_time = time.time() - start_time
             
             # Adicionar informações do arquivo e download
@@ -1614,6 +2410,18 @@ def extract_document_from_url():
             if os.path.exists(temp_file_path):
                 os.unlink(temp_file_path)
     
+    except ResourceLimitExceeded as e:
+        return resource_limit_response(e)
+    
+    except AdmissionRejected as e:
+        return admission_rejected_response(e)
+    
+    except ExtractionCancelled as e:
+        return extraction_cancelled_response(e)
+    
+    except InvalidOption as e:
+        return invalid_option_response(e)
+    
     except Exception as e:
         logger.error(f"Erro na extração via URL: {str(e)}")
         return jsonify({
@@ -1654,6 +2462,7 @@ def extract_document_from_data():
         filename = secure_filename(data['filename'])
         file_data = data['file_data']
         encoding = data.get('encoding', 'base64')  # base64 ou binary
+        extraction_options = get_extraction_options(data)
         
         # Validar tipo de arquivo
         if not allowed_file(filename):
@@ -1674,7 +2483,8 @@ def extract_document_from_data():
                     file_data = file_data.split(',')[1]
                 
                 # Decodificar base64
-                file_bytes = base64.b64decode(file_data)
+                with metrics.phase('decode'):
+                    file_bytes = base64.b64decode(file_data)
             elif encoding == 'binary':
                 # Assumir que os dados são bytes diretos
                 if isinstance(file_data, str):
@@ -1714,25 +2524,15 @@ def extract_document_from_data():
         
         try:
             # Processar arquivo baseado na extensão
-            if file_extension == 'docx':
-                result = extract_text_from_docx(temp_file_path)
-            elif file_extension == 'pdf':
-                result = extract_text_from_pdf(temp_file_path)
-            elif file_extension in ['xlsx', 'xls']:
-                result = extract_data_from_excel(temp_file_path)
-            elif file_extension == 'csv':
-                result = extract_text_from_csv(temp_file_path)
-            elif file_extension == 'txt':
-                result = extract_text_from_txt(temp_file_path)
-            elif file_extension in ['png', 'jpg', 'jpeg', 'bmp', 'tiff']:
-                result = extract_text_from_image(temp_file_path)
-            else:
+            if file_extension not in EXTRACTORS:
                 return jsonify({
                     'success': False,
                     'error': f'Processamento para {file_extension} não implementado',
                     'error_code': 'PROCESSING_NOT_IMPLEMENTED'
                 }), 400
             
+            result = run_extractor(file_extension, temp_file_path, extraction_options)
+            
             # Adicionar informações do arquivo
             result['file_info'] = {
                 'filename': filename,
@@ -1756,6 +2556,18 @@ def extract_document_from_data():
             if os.path.exists(temp_file_path):
                 os.unlink(temp_file_path)
     
+    except ResourceLimitExceeded as e:
+        return resource_limit_response(e)
+    
+    except AdmissionRejected as e:
+        return admission_rejected_response(e)
+    
+    except ExtractionCancelled as e:
+        return extraction_cancelled_response(e)
+    
+    except InvalidOption as e:
+        return invalid_option_response(e)
+    
     except Exception as e:
         logger.error(f"Erro no processamento de dados: {str(e)}")
         return jsonify({
@@ -1765,6 +2577,7 @@ def extract_document_from_data():
         }), 500
 
 @extractor_bp.route('/extract/data/bulk', methods=['POST'])
+@batch_endpoint
 def extract_multiple_documents_from_data():
     """Endpoint para processamento em lote de múltiplos documentos a partir de dados"""
     try:
@@ -1819,6 +2632,7 @@ def extract_multiple_documents_from_data():
                 filename = secure_filename(doc['filename'])
                 file_data = doc['file_data']
                 encoding = doc.get('encoding', 'base64')
+                extraction_options = get_extraction_options(doc)
                 
                 # Validar tipo de arquivo
                 if not allowed_file(filename):
@@ -1838,7 +2652,8 @@ def extract_multiple_documents_from_data():
                         # Remover prefixos data URI se presente
                         if ',' in file_data:
                             file_data = file_data.split(',')[1]
-                        file_bytes = base64.b64decode(file_data)
+                        with metrics.phase('decode'):
+                            file_bytes = base64.b64decode(file_data)
                     elif encoding == 'binary':
                         if isinstance(file_data, str):
                             file_bytes = file_data.encode('latin-1')
@@ -1882,19 +2697,7 @@ def extract_multiple_documents_from_data():
                 
                 try:
                     # Processar arquivo baseado na extensão
-                    if file_extension == 'docx':
-                        result = extract_text_from_docx(temp_file_path)
-                    elif file_extension == 'pdf':
-                        result = extract_text_from_pdf(temp_file_path)
-                    elif file_extension in ['xlsx', 'xls']:
-                        result = extract_data_from_excel(temp_file_path)
-                    elif file_extension == 'csv':
-                        result = extract_text_from_csv(temp_file_path)
-                    elif file_extension == 'txt':
-                        result = extract_text_from_txt(temp_file_path)
-                    elif file_extension in ['png', 'jpg', 'jpeg', 'bmp', 'tiff']:
-                        result = extract_text_from_image(temp_file_path)
-                    else:
+                    if file_extension not in EXTRACTORS:
                         errors.append({
                             'index': i,
                             'filename': filename,
@@ -1903,6 +2706,8 @@ def extract_multiple_documents_from_data():
                         })
                         continue
                     
+                    result = run_extractor(file_extension, temp_file_path, extraction_options)
+                    
                     # Calcular tempo de processamento
                     processing_time = time.time() - start_time
                     total_processing_time += processing_time
@@ -1934,7 +2739,7 @@ def extract_multiple_documents_from_data():
                     'index': i,
                     'filename': doc.get('filename', 'unknown'),
                     'error': str(e),
-                    'error_code': 'PROCESSING_ERROR'
+                    'error_code': processing_error_code(e)
                 })
         
         # Estatísticas
@@ -1960,6 +2765,9 @@ def extract_multiple_documents_from_data():
             'message': f'Processamento concluído: {successful_documents}/{total_documents} documentos processados com sucesso'
         })
     
+    except InvalidOption as e:
+        return invalid_option_response(e)
+    
     except Exception as e:
         logger.error(f"Erro no processamento em lote de dados: {str(e)}")
         return jsonify({
@@ -1968,7 +2776,656 @@ def extract_multiple_documents_from_data():
             'error_code': 'BULK_PROCESSING_ERROR'
         }), 500
 
+def raw_request_options():
+    """
+    Opções de extração de requisições com corpo binário
+    
+    Vêm do header X-Extraction-Options (no formato de query string, ex.:
+    'include_image_data=false&slides=1-3') e dos parâmetros da URL, que têm precedência.
+    """
+    options = dict(parse_qsl(request.headers.get('X-Extraction-Options', '')))
+    options.update(request.args.to_dict())
+    return options
+
+def process_spooled_entry(index, name, spool, extraction_options, start_time):
+    """
+    Extrai um documento já gravado em disco (membro de lote binário)
+    
+    Returns:
+        Tupla (resultado, erro); apenas um dos dois é preenchido
+    """
+    filename = secure_filename(os.path.basename(name))
+    
+    if spool.rejection is not None:
+        return None, {
+            'index': index,
+            'filename': name,
+            'error': str(spool.rejection),
+            'error_code': spool.rejection.error_code
+        }
+    
+    if not allowed_file(filename):
+        return None, {
+            'index': index,
+            'filename': name,
+            'error': 'Tipo de arquivo não suportado',
+            'error_code': 'UNSUPPORTED_TYPE'
+        }
+    
+    file_extension = filename.rsplit('.', 1)[1].lower()
+    if file_extension not in EXTRACTORS:
+        return None, {
+            'index': index,
+            'filename': name,
+            'error': f'Processamento para {file_extension} não implementado',
+            'error_code': 'PROCESSING_NOT_IMPLEMENTED'
+        }
+    
+    result = run_extractor(file_extension, spool.path, extraction_options)
+    processing_time = time.time() - start_time
+    
+    result['file_info'] = {
+        'filename': filename,
+        'original_filename': name,
+        'type': file_extension,
+        'mime_type': ALLOWED_EXTENSIONS.get(file_extension, 'unknown'),
+        'size_bytes': spool.size,
+        'size_mb': round(spool.size / (1024*1024), 2),
+        'encoding_used': 'raw',
+        'processing_time_seconds': round(processing_time, 3)
+    }
+    
+    return {
+        'index': index,
+        'filename': name,
+        'success': True,
+        'data': result
+    }, None
+
+@extractor_bp.route('/extract/raw', methods=['POST'])
+def extract_document_from_raw():
+    """
+    Endpoint para extração a partir do corpo binário da requisição (application/octet-stream)
+    
+    Alternativa ao /extract/data sem base64: o nome do arquivo vem do header
+    X-Filename ou do parâmetro ?filename=, e o corpo é gravado em disco em
+    blocos, com limite de tamanho e magic bytes conferidos durante a leitura.
+    """
+    try:
+        raw_filename = request.headers.get('X-Filename') or request.args.get('filename')
+        if not raw_filename:
+            return jsonify({
+                'success': False,
+                'error': 'Nome do arquivo é obrigatório (header X-Filename ou parâmetro filename)',
+                'error_code': 'MISSING_FILENAME'
+            }), 400
+        
+        filename = secure_filename(raw_filename)
+        
+        # Validar tipo de arquivo
+        if not allowed_file(filename):
+            return jsonify({
+                'success': False,
+                'error': 'Tipo de arquivo não suportado',
+                'error_code': 'UNSUPPORTED_TYPE',
+                'supported_types': list(ALLOWED_EXTENSIONS.keys())
+            }), 400
+        
+        file_extension = filename.rsplit('.', 1)[1].lower()
+        extraction_options = get_extraction_options(raw_request_options())
+        
+        # Recusar pelo Content-Length antes de ler o corpo
+        max_size = MAX_FILE_SIZES.get(file_extension, MAX_FILE_SIZES['default'])
+        if request.content_length is not None and request.content_length > max_size:
+            return jsonify({
+                'success': False,
+                'error': f'Arquivo muito grande. Tamanho máximo: {max_size // (1024*1024)}MB',
+                'error_code': 'FILE_TOO_LARGE',
+                'max_size_mb': max_size // (1024*1024)
+            }), 413
+        
+        spool = spool_from_stream(filename, request.stream)
+        
+        try:
+            if spool.rejection is not None:
+                return upload_rejected_response(spool.rejection)
+            
+            if spool.size == 0:
+                return jsonify({
+                    'success': False,
+                    'error': 'Corpo da requisição vazio',
+                    'error_code': 'EMPTY_BODY'
+                }), 400
+            
+            if file_extension not in EXTRACTORS:
+                return jsonify({
+                    'success': False,
+                    'error': f'Processamento para {file_extension} não implementado',
+                    'error_code': 'PROCESSING_NOT_IMPLEMENTED'
+                }), 400
+            
+            result = run_extractor(file_extension, spool.path, extraction_options)
+            
+            # Adicionar informações do arquivo
+            result['file_info'] = {
+                'filename': filename,
+                'original_filename': raw_filename,
+                'type': file_extension,
+                'mime_type': ALLOWED_EXTENSIONS.get(file_extension, 'unknown'),
+                'size_bytes': spool.size,
+                'size_mb': round(spool.size / (1024*1024), 2),
+                'encoding_used': 'raw'
+            }
+            
+            logger.info(f"Arquivo processado com sucesso via corpo binário: {filename} ({spool.size} bytes)")
+            
+            return jsonify({
+                'success': True,
+                'data': result,
+                'message': 'Documento processado com sucesso'
+            })
+        
+        finally:
+            spool.discard()
+    
+    except ResourceLimitExceeded as e:
+        return resource_limit_response(e)
+    
+    except AdmissionRejected as e:
+        return admission_rejected_response(e)
+    
+    except ExtractionCancelled as e:
+        return extraction_cancelled_response(e)
+    
+    except InvalidOption as e:
+        return invalid_option_response(e)
+    
+    except Exception as e:
+        logger.error(f"Erro no processamento do corpo binário: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': str(e),
+            'error_code': 'PROCESSING_ERROR'
+        }), 500
+
+def render_options(args):
+    """
+    Página, DPI, formato e qualidade de /render/page
+    
+    Raises:
+        ValueError: Com a mensagem de erro, se algum parâmetro for inválido
+    """
+    try:
+        page = int(args.get('page', ''))
+        dpi = int(args.get('dpi', RENDER_DEFAULT_DPI))
+        quality = int(args.get('quality', JPEG_QUALITY))
+    except ValueError:
+        raise ValueError('page, dpi e quality devem ser inteiros')
+    
+    image_format = str(args.get('format', 'png')).strip().upper()
+    if image_format == 'JPG':
+        image_format = 'JPEG'
+    if image_format not in ('PNG', 'JPEG'):
+        raise ValueError('format deve ser png ou jpeg')
+    if page < 1:
+        raise ValueError('page deve ser >= 1')
+    if not RENDER_MIN_DPI <= dpi <= RENDER_MAX_DPI:
+        raise ValueError(f'dpi deve estar entre {RENDER_MIN_DPI} e {RENDER_MAX_DPI}')
+    if not 1 <= quality <= 100:
+        raise ValueError('quality deve estar entre 1 e 100')
+    return page, dpi, image_format, quality
+
+@extractor_bp.route('/render/page', methods=['POST'])
+def render_single_page():
+    """
+    Endpoint para renderizar uma única página de um PDF (corpo binário)
+    
+    Parâmetros na URL: page (base 1, obrigatório), dpi, format (png ou jpeg) e
+    quality (JPEG). A resposta é a própria imagem. As páginas usam o mesmo
+    cache de rasters da extração completa: um acerto é servido sem abrir o
+    PDF e sem passar pelo escalonador; o header X-Raster-Cache indica
+    'hit' ou 'miss'.
+    """
+    try:
+        try:
+            page, dpi, image_format, quality = render_options(request.args)
+        except ValueError as option_error:
+            return jsonify({
+                'success': False,
+                'error': str(option_error),
+                'error_code': 'INVALID_RENDER_OPTIONS'
+            }), 400
+        
+        max_size = MAX_FILE_SIZES['pdf']
+        if request.content_length is not None and request.content_length > max_size:
+            return jsonify({
+                'success': False,
+                'error': f'Arquivo muito grande. Tamanho máximo: {max_size // (1024*1024)}MB',
+                'error_code': 'FILE_TOO_LARGE',
+                'max_size_mb': max_size // (1024*1024)
+            }), 413
+        
+        # Os magic bytes de PDF são conferidos durante a leitura
+        spool = spool_from_stream('document.pdf', request.stream)
+        
+        try:
+            if spool.rejection is not None:
+                return upload_rejected_response(spool.rejection)
+            
+            if spool.size == 0:
+                return jsonify({
+                    'success': False,
+                    'error': 'Corpo da requisição vazio',
+                    'error_code': 'EMPTY_BODY'
+                }), 400
+            
+            tenant = api_keys.current_tenant()
+            with timing.span('digest'):
+                document_hash = file_digest(spool.path)
+            key = raster_key(document_hash, page - 1, dpi, image_format, quality)
+            rendered = cached_page(key)
+            cache_status = 'hit'
+            
+            if rendered is None:
+                cache_status = 'miss'
+                page_count = admission.page_count('pdf', spool.path)
+                if page_count is None:
+                    return jsonify({
+                        'success': False,
+                        'error': 'Não foi possível abrir o PDF',
+                        'error_code': 'INVALID_PDF'
+                    }), 400
+                if page > page_count:
+                    return jsonify({
+                        'success': False,
+                        'error': f'Página {page} não existe (o documento tem {page_count} páginas)',
+                        'error_code': 'INVALID_PAGE',
+                        'page_count': page_count
+                    }), 400
+                
+                account = None
+                try:
+                    with admission.admitted('pdf', spool.path, tenant), cpu_accounting() as account:
+                        rendered = run_with_budget(
+                            render_file_page, (spool.path, page - 1, dpi, image_format, quality, document_hash),
+                            budget=get_budget('pdf')
+                        )
+                finally:
+                    if account is not None:
+                        api_keys.USAGE.record(tenant, cpu_seconds=account.seconds)
+            
+            api_keys.USAGE.record(tenant, documents=1, size_bytes=spool.size)
+            data, width, height = rendered
+            response = Response(data, mimetype='image/jpeg' if image_format == 'JPEG' else 'image/png')
+            response.headers['X-Raster-Cache'] = cache_status
+            response.headers['X-Image-Width'] = str(width)
+            response.headers['X-Image-Height'] = str(height)
+            return response
+        
+        finally:
+            spool.discard()
+    
+    except ResourceLimitExceeded as e:
+        return resource_limit_response(e)
+    
+    except AdmissionRejected as e:
+        return admission_rejected_response(e)
+    
+    except ExtractionCancelled as e:
+        return extraction_cancelled_response(e)
+    
+    except Exception as e:
+        logger.error(f"Erro ao renderizar página: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': str(e),
+            'error_code': processing_error_code(e)
+        }), 500
+
+def iter_raw_bulk_entries(kind):
+    """Entradas (nome, UploadSpool) de um lote binário: partes multipart ou membros de tar/zip"""
+    if kind == 'multipart':
+        # Cada parte já foi gravada em disco durante o recebimento (ver StreamingRequest)
+        for _, file in request.files.items(multi=True):
+            if file.filename:
+                yield file.filename, file.stream
+        return
+    yield from iter_container_members(kind, request.stream)
+
+@extractor_bp.route('/extract/raw/bulk', methods=['POST'])
+@batch_endpoint
+@collect_upload_errors
+def extract_multiple_documents_from_raw():
+    """
+    Endpoint para lote binário: multipart/form-data, tar (opcionalmente gzip) ou zip
+    
+    Cada entrada é gravada em disco e extraída antes da próxima ser lida (o tar
+    é lido em streaming; o zip é gravado em disco por exigir acesso aleatório).
+    As opções de extração seguem as regras de /extract/raw.
+    """
+    try:
+        if request.mimetype == 'multipart/form-data':
+            kind = 'multipart'
+        else:
+            kind = container_kind(request.mimetype, request.headers.get('X-Filename') or request.args.get('filename'))
+        
+        if kind is None:
+            return jsonify({
+                'success': False,
+                'error': 'Envie multipart/form-data, application/x-tar (ou gzip) ou application/zip',
+                'error_code': 'UNSUPPORTED_CONTAINER'
+            }), 415
+        
+        extraction_options = get_extraction_options(raw_request_options())
+        results = []
+        errors = []
+        total_processing_time = 0
+        
+        entries = iter_raw_bulk_entries(kind)
+        try:
+            for index, (name, spool) in enumerate(entries):
+                start_time = time.time()
+                try:
+                    if index >= 10:  # Limitar a 10 documentos por vez
+                        errors.append({
+                            'index': index,
+                            'filename': name,
+                            'error': 'Máximo de 10 documentos por vez',
+                            'error_code': 'TOO_MANY_DOCUMENTS'
+                        })
+                        break
+                    
+                    try:
+                        result, error = process_spooled_entry(index, name, spool, extraction_options, start_time)
+                    except Exception as e:
+                        logger.error(f"Erro ao processar entrada {name}: {str(e)}")
+                        result, error = None, {
+                            'index': index,
+                            'filename': name,
+                            'error': str(e),
+                            'error_code': processing_error_code(e)
+                        }
+                    
+                    if result is not None:
+                        results.append(result)
+                    else:
+                        errors.append(error)
+                finally:
+                    spool.discard()
+                    total_processing_time += time.time() - start_time
+        
+        except ArchiveLimitExceeded as e:
+            errors.append({
+                'index': len(results) + len(errors),
+                'error': str(e),
+                'error_code': 'ARCHIVE_LIMIT',
+                'limit': e.limit
+            })
+        
+        except ARCHIVE_ERRORS as e:
+            if not results and not errors:
+                return jsonify({
+                    'success': False,
+                    'error': f'Arquivo compactado inválido: {str(e)}',
+                    'error_code': 'INVALID_ARCHIVE'
+                }), 400
+            errors.append({
+                'index': len(results) + len(errors),
+                'error': f'Arquivo compactado inválido: {str(e)}',
+                'error_code': 'INVALID_ARCHIVE'
+            })
+        
+        finally:
+            entries.close()
+        
+        total_documents = len(results) + len(errors)
+        if total_documents == 0:
+            return jsonify({
+                'success': False,
+                'error': 'Nenhum documento foi enviado',
+                'error_code': 'NO_DOCUMENTS'
+            }), 400
+        
+        successful_documents = len(results)
+        failed_documents = len(errors)
+        
+        logger.info(f"Processamento em lote binário ({kind}): {successful_documents}/{total_documents} sucessos")
+        
+        return jsonify({
+            'success': True,
+            'data': {
+                'results': results,
+                'errors': errors,
+                'statistics': {
+                    'container': kind,
+                    'total_documents': total_documents,
+                    'successful': successful_documents,
+                    'failed': failed_documents,
+                    'success_rate': round((successful_documents / total_documents) * 100, 2),
+                    'total_processing_time_seconds': round(total_processing_time, 3)
+                }
+            },
+            'message': f'Processamento concluído: {successful_documents}/{total_documents} documentos processados com sucesso'
+        })
+    
+    except InvalidOption as e:
+        return invalid_option_response(e)
+    
+    except Exception as e:
+        logger.error(f"Erro no processamento em lote binário: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': str(e),
+            'error_code': 'BULK_PROCESSING_ERROR'
+        }), 500
+
+def extract_archive_member(index, name, spool, extraction_options, tenant, token):
+    """Extrai um membro de /extract/archive (executado no pool de threads) e libera o arquivo em disco"""
+    start_time = time.time()
+    try:
+        with admission.batch_work(), api_keys.acting_as(tenant), deadline.bound(token):
+            result, error = process_spooled_entry(index, name, spool, extraction_options, start_time)
+        if result is not None:
+            return result
+        error['success'] = False
+        return error
+    except ExtractionCancelled as e:
+        logger.info(f"{str(e)} (membro {name})")
+        return {
+            'index': index,
+            'filename': name,
+            'success': False,
+            'error': str(e),
+            'error_code': 'CLIENT_DISCONNECTED',
+            'processing_time_seconds': round(time.time() - start_time, 3)
+        }
+    except Exception as e:
+        logger.error(f"Erro ao processar membro {name}: {str(e)}")
+        return {
+            'index': index,
+            'filename': name,
+            'success': False,
+            'error': str(e),
+            'error_code': processing_error_code(e),
+            'processing_time_seconds': round(time.time() - start_time, 3)
+        }
+    finally:
+        spool.discard()
+
+def stream_archive_results(kind, stream, extraction_options):
+    """
+    Gera as linhas NDJSON de /extract/archive
+    
+    Os membros são lidos em sequência e extraídos em paralelo (ARCHIVE_WORKERS);
+    no máximo 2 × ARCHIVE_WORKERS membros ficam em disco aguardando extração.
+    Cada resultado é enviado assim que termina, e a última linha traz o 'summary'.
+    """
+    start_time = time.time()
+    guard = ArchiveGuard()
+    counts = {'processed': 0, 'failed': 0}
+    archive_error = None
+    # As threads do pool não veem o contexto da requisição
+    tenant = api_keys.current_tenant()
+    token = deadline.current()
+    
+    def to_line(entry):
+        counts['processed' if entry.get('success') else 'failed'] += 1
+        return current_app.json.dumps(entry) + '\n'
+    
+    pending = set()
+    with ThreadPoolExecutor(max_workers=ARCHIVE_WORKERS) as executor:
+        entries = iter_container_members(kind, stream, guard)
+        try:
+            for index, (name, spool) in enumerate(entries):
+                pending.add(executor.submit(extract_archive_member, index, name, spool, extraction_options, tenant, token))
+                
+                # Limitar os membros gravados em disco à espera de extração
+                if len(pending) >= ARCHIVE_WORKERS * 2:
+                    wait(pending, return_when=FIRST_COMPLETED)
+                for future in [future for future in pending if future.done()]:
+                    pending.discard(future)
+                    yield to_line(future.result())
+        
+        except ArchiveLimitExceeded as e:
+            logger.warning(f"Arquivo compactado interrompido por limite: {e.limit}")
+            archive_error = {
+                'error': str(e),
+                'error_code': 'ARCHIVE_LIMIT',
+                'limit': e.limit
+            }
+        
+        except ARCHIVE_ERRORS as e:
+            archive_error = {
+                'error': f'Arquivo compactado inválido: {str(e)}',
+                'error_code': 'INVALID_ARCHIVE'
+            }
+        
+        except ExtractionCancelled as e:
+            logger.info(f"{str(e)} (leitura do arquivo compactado)")
+            archive_error = {
+                'error': str(e),
+                'error_code': 'CLIENT_DISCONNECTED'
+            }
+        
+        except Exception as e:
+            logger.error(f"Erro ao ler arquivo compactado: {str(e)}")
+            archive_error = {
+                'error': str(e),
+                'error_code': 'PROCESSING_ERROR'
+            }
+        
+        finally:
+            entries.close()
+        
+        for future in as_completed(pending):
+            yield to_line(future.result())
+    
+    summary = {
+        'container': kind,
+        'members': guard.members,
+        'processed': counts['processed'],
+        'failed': counts['failed'],
+        'uncompressed_bytes': guard.total_bytes,
+        'complete': archive_error is None,
+        'total_processing_time_seconds': round(time.time() - start_time, 3)
+    }
+    if archive_error is not None:
+        summary.update(archive_error)
+    
+    logger.info(f"Arquivo compactado ({kind}) processado: {counts['processed']}/{guard.members} membros")
+    yield current_app.json.dumps({'success': archive_error is None, 'summary': summary}) + '\n'
+
+@extractor_bp.route('/extract/archive', methods=['POST'])
+@batch_endpoint
+@accept_uploads(ARCHIVE_EXTENSIONS, ARCHIVE_MAX_UPLOAD_SIZE)
+def extract_archive():
+    """
+    Endpoint para pacotes zip/tar: extrai cada membro suportado e devolve os resultados em streaming
+    
+    O pacote pode vir no corpo (application/zip, application/x-tar ou gzip), via
+    multipart no campo 'file' ou por URL (JSON {"url": ...}). A resposta é NDJSON
+    (application/x-ndjson): uma linha por membro, na ordem em que as extrações
+    terminam, e uma linha final com 'summary'. Limites de membros, de tamanho
+    descompactado e de razão de compressão protegem contra zip bombs.
+    """
+    try:
+        if request.is_json:
+            data = request.get_json(silent=True) or {}
+            url = str(data.get('url') or '').strip()
+            if not url:
+                return jsonify({
+                    'success': False,
+                    'error': 'URL é obrigatória',
+                    'error_code': 'MISSING_URL'
+                }), 400
+            
+            try:
+                downloaded_file = download_file_from_url(url, ARCHIVE_MAX_UPLOAD_SIZE)
+            except Exception as e:
+                logger.error(f"Erro ao baixar arquivo de {url}: {str(e)}")
+                return jsonify({
+                    'success': False,
+                    'error': str(e),
+                    'error_code': 'DOWNLOAD_ERROR',
+                    'url': url
+                }), 400
+            
+            content_type = (downloaded_file['content_type'] or '').split(';')[0].strip()
+            kind = container_kind(content_type, downloaded_file['filename'])
+            stream = downloaded_file['content']
+            stream.seek(0)
+            extraction_options = get_extraction_options(data)
+        
+        elif request.mimetype == 'multipart/form-data':
+            if 'file' not in request.files or not request.files['file'].filename:
+                return jsonify({
+                    'success': False,
+                    'error': 'Nenhum arquivo foi enviado',
+                    'error_code': 'NO_FILE'
+                }), 400
+            
+            # Gravado em disco durante o recebimento (ver StreamingRequest)
+            file = request.files['file']
+            kind = container_kind(file.mimetype, file.filename)
+            stream = file.stream
+            extraction_options = get_extraction_options(request.form)
+        
+        else:
+            kind = container_kind(request.mimetype, request.headers.get('X-Filename') or request.args.get('filename'))
+            stream = request.stream
+            extraction_options = get_extraction_options(raw_request_options())
+        
+        if kind is None:
+            return jsonify({
+                'success': False,
+                'error': 'Envie um arquivo zip ou tar (opcionalmente gzip)',
+                'error_code': 'UNSUPPORTED_CONTAINER'
+            }), 415
+        
+        return Response(
+            stream_with_context(stream_archive_results(kind, stream, extraction_options)),
+            mimetype='application/x-ndjson'
+        )
+    
+    except UploadRejected as e:
+        return upload_rejected_response(e)
+    
+    except ExtractionCancelled as e:
+        return extraction_cancelled_response(e)
+    
+    except InvalidOption as e:
+        return invalid_option_response(e)
+    
+    except Exception as e:
+        logger.error(f"Erro no processamento do arquivo compactado: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': str(e),
+            'error_code': 'PROCESSING_ERROR'
+        }), 500
+
 @extractor_bp.route('/extract/url/bulk', methods=['POST'])
+@batch_endpoint
 def extract_multiple_documents_from_urls():
     """Extrai dados de múltiplos documentos a partir de URLs"""
     try:
@@ -2014,6 +3471,7 @@ def extract_multiple_documents_from_urls():
         except (ValueError, TypeError):
             max_size_mb = 50  # Valor padrão em caso de erro
         max_size = max_size_mb * 1024 * 1024
+        extraction_options = get_extraction_options(data)
         
         results = []
         errors = []
@@ -2080,19 +3538,7 @@ def extract_multiple_documents_from_urls():
                 
                 try:
                     # Extrair dados baseado na extensão
-                    if file_extension == 'docx':
-                        result = extract_text_from_docx(temp_file_path)
-                    elif file_extension == 'pdf':
-                        result = extract_text_from_pdf(temp_file_path)
-                    elif file_extension in ['xlsx', 'xls']:
-                        result = extract_data_from_excel(temp_file_path)
-                    elif file_extension == 'csv':
-                        result = extract_text_from_csv(temp_file_path)
-                    elif file_extension == 'txt':
-                        result = extract_text_from_txt(temp_file_path)
-                    elif file_extension in ['png', 'jpg', 'jpeg', 'bmp', 'tiff']:
-                        result = extract_text_from_image(temp_file_path)
-                    else:
+                    if file_extension not in EXTRACTORS:
                         errors.append({
                             'index': i,
                             'url': url,
@@ -2102,6 +3548,8 @@ def extract_multiple_documents_from_urls():
                         })
                         continue
                     
+                    result = run_extractor(file_extension, temp_file_path, extraction_options)
+                    
                     processing_time = time.time() - start_time
                     total_processing_time += processing_time
                     
@@ -2145,7 +3593,7 @@ def extract_multiple_documents_from_urls():
                     'index': i,
                     'url': url,
                     'error': str(e),
-                    'error_code': 'PROCESSING_ERROR',
+                    'error_code': processing_error_code(e),
                     'processing_time': round(processing_time, 2)
                 })
         
@@ -2169,6 +3617,9 @@ def extract_multiple_documents_from_urls():
             }
         })
     
+    except InvalidOption as e:
+        return invalid_option_response(e)
+    
     except Exception as e:
         logger.error(f"Erro no processamento em lote de URLs: {str(e)}")
         return jsonify({
@@ -0,0 +1,63 @@
+import time
+from flask import Blueprint, Response, g, request
+
+from src.services import metrics
+
+metrics_bp = Blueprint('metrics', __name__)
+
+PROMETHEUS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def _endpoint_label():
+    """Rótulo do endpoint: a regra de rota (ex.: /api/extract) em vez da URL concreta"""
+    if request.url_rule is not None:
+        return request.url_rule.rule
+    return 'unmatched'
+
+
+@metrics_bp.before_app_request
+def start_request_metrics():
+    """Marca o início da requisição"""
+    g.metrics_start = time.perf_counter()
+    g.metrics_in_flight = True
+    metrics.HTTP_IN_FLIGHT.inc()
+
+
+@metrics_bp.after_app_request
+def record_request_metrics(response):
+    """Registra contagem, latência, bytes e error_code da requisição"""
+    start = g.get('metrics_start')
+    if start is None:
+        return response
+
+    endpoint = _endpoint_label()
+    metrics.HTTP_REQUESTS.inc(endpoint=endpoint, method=request.method, status=response.status_code)
+    metrics.HTTP_LATENCY.observe(time.perf_counter() - start, endpoint=endpoint)
+
+    if request.content_length:
+        metrics.BYTES_RECEIVED.inc(request.content_length, endpoint=endpoint)
+    if not response.is_streamed:
+        sent = response.calculate_content_length()
+        if sent:
+            metrics.BYTES_SENT.inc(sent, endpoint=endpoint)
+
+    if response.status_code >= 400 and response.is_json and not response.is_streamed:
+        # Respostas de erro são pequenas; ler o error_code não pesa no caminho feliz
+        body = response.get_json(silent=True)
+        if isinstance(body, dict) and body.get('error_code'):
+            metrics.HTTP_ERRORS.inc(endpoint=endpoint, error_code=body['error_code'])
+
+    return response
+
+
+@metrics_bp.teardown_app_request
+def finish_request_metrics(error=None):
+    """Decrementa as requisições em andamento mesmo se a view lançar exceção"""
+    if g.pop('metrics_in_flight', False):
+        metrics.HTTP_IN_FLIGHT.dec()
+
+
+@metrics_bp.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    """Métricas da aplicação no formato texto do Prometheus"""
+    return Response(metrics.REGISTRY.render(), mimetype=PROMETHEUS_CONTENT_TYPE)
@@ -1,5 +1,6 @@
 from flask import Blueprint, jsonify, request
-from src.models.user import User, db
+from src.models.user import ApiKey, User, db
+from src.services import api_keys
 
 user_bp = Blueprint('user', __name__)
 
@@ -107,9 +108,17 @@ def update_user(user_id):
 def delete_user(user_id):
     """Remove um usuário"""
     try:
-        user = User.query.get_or_404(user_id)
+        user = db.session.get(User, user_id)
+        if user is None:
+            return jsonify({
+                'success': False,
+                'error': 'Usuário não encontrado'
+            }), 404
+        
         db.session.delete(user)
         db.session.commit()
+        # As chaves do usuário são removidas junto (cascade): nenhum worker pode continuar aceitando-as
+        api_keys.invalidate_cache()
         
         return jsonify({
             'success': True,
@@ -121,4 +130,111 @@ def delete_user(user_id):
         return jsonify({
             'success': False,
             'error': str(e)
-        }), 500 
\ No newline at end of file
+        }), 500 
+
+@user_bp.route('/users/<int:user_id>/api-keys', methods=['POST'])
+@api_keys.admin_required
+def create_api_key(user_id):
+    """Cria uma chave de API para o usuário (a chave só é mostrada nesta resposta)"""
+    try:
+        user = db.session.get(User, user_id)
+        if user is None:
+            return jsonify({
+                'success': False,
+                'error': 'Usuário não encontrado'
+            }), 404
+        
+        data = request.json or {}
+        
+        if not data.get('name'):
+            return jsonify({
+                'success': False,
+                'error': 'Nome da chave é obrigatório'
+            }), 400
+        
+        try:
+            max_concurrency = int(data.get('max_concurrency', 2))
+            weight = float(data.get('weight', 1.0))
+        except (TypeError, ValueError):
+            return jsonify({
+                'success': False,
+                'error': 'max_concurrency e weight devem ser numéricos'
+            }), 400
+        
+        if max_concurrency < 0 or weight <= 0:
+            return jsonify({
+                'success': False,
+                'error': 'max_concurrency deve ser >= 0 (0 = sem limite) e weight > 0'
+            }), 400
+        
+        key = api_keys.generate_key()
+        api_key = ApiKey(
+            user_id=user.id,
+            name=data['name'],
+            key_hash=api_keys.hash_key(key),
+            prefix=key[:api_keys.KEY_PREFIX_LENGTH],
+            max_concurrency=max_concurrency,
+            weight=weight
+        )
+        db.session.add(api_key)
+        db.session.commit()
+        
+        return jsonify({
+            'success': True,
+            'api_key': api_key.to_dict(),
+            'key': key
+        }), 201
+        
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@user_bp.route('/api-keys', methods=['GET'])
+@api_keys.admin_required
+def get_api_keys():
+    """Lista as chaves de API com o uso acumulado"""
+    try:
+        # Incluir o uso ainda não gravado pela gravação agrupada
+        api_keys.USAGE.flush()
+        keys = ApiKey.query.order_by(ApiKey.id).all()
+        return jsonify({
+            'success': True,
+            'api_keys': [api_key.to_dict() for api_key in keys],
+            'total': len(keys)
+        })
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@user_bp.route('/api-keys/<int:key_id>', methods=['DELETE'])
+@api_keys.admin_required
+def revoke_api_key(key_id):
+    """Revoga uma chave de API (o histórico de uso é mantido)"""
+    try:
+        api_key = db.session.get(ApiKey, key_id)
+        if api_key is None:
+            return jsonify({
+                'success': False,
+                'error': 'Chave de API não encontrada'
+            }), 404
+        
+        api_key.active = False
+        db.session.commit()
+        api_keys.invalidate_cache()
+        
+        return jsonify({
+            'success': True,
+            'message': 'Chave de API revogada com sucesso'
+        })
+        
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
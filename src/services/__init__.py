@@ -0,0 +1 @@
+# Módulo de serviços de infraestrutura da aplicação
\ No newline at end of file
@@ -0,0 +1,382 @@
+import os
+import math
+import time
+import logging
+import zipfile
+import threading
+import contextvars
+from contextlib import contextmanager
+
+from flask import current_app, has_request_context, request
+
+from src.engines.probe import IMAGE_EXTENSIONS, scan_pdf
+from src.services import metrics
+from src.services.api_keys import ANONYMOUS as ANONYMOUS_TENANT
+
+logger = logging.getLogger(__name__)
+
+# Controle de admissão das extrações (ADMISSION_CONTROL=0 desliga)
+ADMISSION_ENABLED = os.environ.get('ADMISSION_CONTROL', '1') != '0'
+
+# Extrações com custo até este valor (e fora de endpoints de lote) vão para a faixa interativa
+ADMISSION_INTERACTIVE_MAX_COST = float(os.environ.get('ADMISSION_INTERACTIVE_MAX_COST', '1.0'))
+
+# Extrações simultâneas por faixa
+ADMISSION_INTERACTIVE_WORKERS = int(os.environ.get('ADMISSION_INTERACTIVE_WORKERS', os.cpu_count() or 1))
+ADMISSION_BATCH_WORKERS = int(os.environ.get('ADMISSION_BATCH_WORKERS', max(1, (os.cpu_count() or 1) // 2)))
+
+# Custo máximo em andamento na faixa batch (unidades ≈ segundos de CPU estimados)
+ADMISSION_CAPACITY = float(os.environ.get('ADMISSION_CAPACITY', 8 * (os.cpu_count() or 1)))
+
+# Extrações aguardando vaga por faixa e tempo máximo de espera antes da recusa (429)
+ADMISSION_QUEUE_MAX = int(os.environ.get('ADMISSION_QUEUE_MAX', '32'))
+ADMISSION_QUEUE_TIMEOUT = float(os.environ.get('ADMISSION_QUEUE_TIMEOUT', '10'))
+ADMISSION_BATCH_QUEUE_TIMEOUT = float(os.environ.get('ADMISSION_BATCH_QUEUE_TIMEOUT', '60'))
+
+# Envelhecimento na fila: cada segundo de espera desconta este custo da prioridade
+ADMISSION_AGING_RATE = float(os.environ.get('ADMISSION_AGING_RATE', '0.5'))
+
+# Prioridade de CPU (nice) dos workers da faixa batch
+ADMISSION_BATCH_NICE = int(os.environ.get('ADMISSION_BATCH_NICE', '10'))
+
+# Custo por formato: (fixo, por MB, por página)
+FORMAT_COSTS = {
+    'pdf': (0.2, 0.5, 0.01),
+    'pptx': (0.2, 0.2, 0.01),
+    'docx': (0.1, 0.2, 0),
+    'xlsx': (0.3, 2.0, 0),
+    'xls': (0.3, 2.0, 0),
+    'csv': (0.1, 0.5, 0),
+    'txt': (0.01, 0.05, 0)
+}
+DEFAULT_FORMAT_COST = (0.1, 0.5, 0)
+
+# Custo adicional por página que passa pelo OCR
+OCR_PAGE_COST = 1.0
+
+# Limites do Retry-After sugerido nas recusas (s)
+RETRY_AFTER_MIN = 1
+RETRY_AFTER_MAX = 60
+
+# Peso da última extração na média móvel da duração
+DURATION_SMOOTHING = 0.2
+
+ADMISSION_QUEUE_DEPTH = metrics.REGISTRY.register(metrics.Gauge(
+    'extractor_admission_queue_depth', 'Extrações aguardando vaga no controle de admissão', ('lane',)
+))
+ADMISSION_IN_FLIGHT_COST = metrics.REGISTRY.register(metrics.Gauge(
+    'extractor_admission_in_flight_cost', 'Custo estimado das extrações em andamento', ('lane',)
+))
+ADMISSION_REJECTIONS = metrics.REGISTRY.register(metrics.Counter(
+    'extractor_admission_rejections_total', 'Extrações recusadas pelo controle de admissão', ('lane', 'reason')
+))
+ADMISSION_WAIT = metrics.REGISTRY.register(metrics.Histogram(
+    'extractor_admission_wait_seconds', 'Espera na fila do controle de admissão', ('lane',)
+))
+
+
+class AdmissionRejected(Exception):
+    """Extração recusada por falta de capacidade (responder 429 com Retry-After)"""
+
+    def __init__(self, reason, retry_after):
+        self.reason = reason
+        self.retry_after = retry_after
+        super().__init__(f"Servidor sobrecarregado; tente novamente em {retry_after}s")
+
+
+def batch_endpoint(view):
+    """Marca uma view de lote: suas extrações vão para a faixa batch independente do custo"""
+    view.batch_lane = True
+    return view
+
+
+# Marca extrações de lote feitas fora do contexto da requisição (threads de /extract/archive)
+_batch_work = contextvars.ContextVar('batch_work', default=False)
+
+
+@contextmanager
+def batch_work():
+    """Extrações feitas dentro do bloco vão para a faixa batch"""
+    token = _batch_work.set(True)
+    try:
+        yield
+    finally:
+        _batch_work.reset(token)
+
+
+def _is_batch_request():
+    if _batch_work.get():
+        return True
+    if not has_request_context() or request.endpoint is None:
+        return False
+    return getattr(current_app.view_functions.get(request.endpoint), 'batch_lane', False)
+
+
+def document_pages(file_extension, file_path):
+    """
+    Páginas do documento e quantas delas devem passar pelo OCR
+
+    Roda no processo do servidor, então nada é interpretado: o PDF é só
+    varrido (scan_pdf) e do PPTX lê-se o diretório do ZIP. Retorna
+    (None, 0) quando não dá para contar.
+    """
+    try:
+        if file_extension == 'pdf':
+            info = scan_pdf(file_path)
+            return info['page_count'], info['scanned_pages']
+        if file_extension == 'pptx':
+            with zipfile.ZipFile(file_path) as archive:
+                return sum(
+                    1 for name in archive.namelist()
+                    if name.startswith('ppt/slides/slide') and name.endswith('.xml')
+                ), 0
+        if file_extension in IMAGE_EXTENSIONS:
+            return 1, 1
+    except Exception as count_error:
+        logger.debug(f"Não foi possível contar as páginas de {file_path}: {count_error}")
+    return None, 0
+
+
+def page_count(file_extension, file_path):
+    """Páginas (PDF) ou slides (PPTX) contados sem abrir o documento, ou None"""
+    return document_pages(file_extension, file_path)[0]
+
+
+def estimate_cost(file_extension, size_bytes, pages=None, ocr_pages=0):
+    """Custo estimado de uma extração a partir do formato, tamanho e número de páginas"""
+    fixed, per_mb, per_page = FORMAT_COSTS.get(file_extension, DEFAULT_FORMAT_COST)
+    return fixed + per_mb * size_bytes / (1024 * 1024) + per_page * (pages or 0) + OCR_PAGE_COST * ocr_pages
+
+
+def estimate_file_cost(file_extension, file_path, ocr=False):
+    """
+    Custo estimado da extração de um arquivo (o mesmo para a admissão e o /probe)
+
+    Com ocr=True (OCR pedido e disponível), cada página que deve passar pelo
+    OCR soma OCR_PAGE_COST.
+    """
+    pages, ocr_pages = document_pages(file_extension, file_path)
+    return estimate_cost(file_extension, os.path.getsize(file_path), pages, ocr_pages if ocr else 0)
+
+
+class Lane:
+    """Faixa do escalonador: capacidade (custo e extrações simultâneas), fila e estado"""
+
+    def __init__(self, name, capacity, workers, queue_max, queue_timeout, nice=0):
+        self.name = name
+        self.capacity = capacity
+        self.workers = workers
+        self.queue_max = queue_max
+        self.queue_timeout = queue_timeout
+        self.nice = nice
+        self.in_flight = 0.0
+        self.running = 0
+        self.queue = []
+        self.queued_cost = 0.0
+        self.average_seconds = None
+        # Fila justa entre chaves: serviço recebido por chave (custo / peso) e tempo virtual da faixa
+        self.tenant_service = {}
+        self.virtual_time = 0.0
+
+    def fits(self, cost):
+        return self.running < self.workers and self.in_flight + cost <= self.capacity
+
+    def join(self, tenant):
+        """Chave que volta a disputar a faixa não acumula crédito do tempo em que ficou ociosa"""
+        self.tenant_service[tenant.key_id] = max(self.tenant_service.get(tenant.key_id, 0.0), self.virtual_time)
+
+    def charge(self, tenant, cost):
+        """Registra o serviço de uma extração despachada para a chave"""
+        service = self.tenant_service.get(tenant.key_id, self.virtual_time)
+        self.virtual_time = service
+        self.tenant_service[tenant.key_id] = service + cost / tenant.weight
+
+    def next_ticket(self, eligible):
+        """
+        Próxima extração da faixa: a chave que recebeu menos serviço (ponderado
+        pelo peso) e, dentro dela, a de menor custo com envelhecimento. Chaves
+        no limite de concorrência são puladas.
+        """
+        candidates = [ticket for ticket in self.queue if eligible(ticket.tenant)]
+        if not candidates:
+            return None
+        return min(candidates, key=lambda ticket: (self.tenant_service.get(ticket.tenant.key_id, 0.0), ticket.priority))
+
+    def retry_after(self):
+        """Estimativa (s) para a fila atual escoar, a partir da duração média das extrações"""
+        average = self.average_seconds or RETRY_AFTER_MIN
+        estimate = average * (1 + max(len(self.queue) / self.workers, self.queued_cost / self.capacity))
+        return int(min(RETRY_AFTER_MAX, max(RETRY_AFTER_MIN, math.ceil(estimate))))
+
+    def snapshot(self):
+        return {
+            'capacity': self.capacity,
+            'workers': self.workers,
+            'running': self.running,
+            'in_flight_cost': round(self.in_flight, 3),
+            'queue_depth': len(self.queue),
+            'queue_max': self.queue_max,
+            'queue_timeout_seconds': self.queue_timeout
+        }
+
+
+class _Ticket:
+    __slots__ = ('cost', 'tenant', 'priority')
+
+    def __init__(self, cost, tenant, aging_rate):
+        self.cost = cost
+        self.tenant = tenant
+        # Esperar t segundos equivale a custar aging_rate * t a menos: como todos
+        # envelhecem no mesmo ritmo, basta fixar a prioridade na entrada da fila
+        self.priority = cost + aging_rate * time.monotonic()
+
+
+class AdmissionController:
+    """
+    Escalonador das extrações do processo em duas faixas: interativa e batch
+
+    Extrações baratas (até ADMISSION_INTERACTIVE_MAX_COST) vão para a faixa
+    interativa; as caras e as de endpoints de lote (batch_endpoint) vão para a
+    faixa batch. Cada faixa tem seus próprios workers e capacidade de custo, de
+    modo que documentos pequenos não esperam atrás de lotes e PDFs enormes.
+    Dentro da faixa, a fila é justa entre chaves de API (quem recebeu menos
+    serviço ponderado pelo peso da chave vai primeiro, e chaves no limite de
+    concorrência esperam sem bloquear as demais) e, para a mesma chave,
+    atendida pelo menor custo (shortest job first), com envelhecimento para
+    que extrações caras não esperem para sempre.
+    Fila cheia ou espera esgotada geram AdmissionRejected com o Retry-After
+    sugerido. Uma extração mais cara que a capacidade da faixa conta como a
+    capacidade, para poder rodar sozinha.
+    """
+
+    def __init__(self, lanes, interactive_max_cost, aging_rate):
+        self.lanes = {lane.name: lane for lane in lanes}
+        self.interactive_max_cost = interactive_max_cost
+        self.aging_rate = aging_rate
+        self._condition = threading.Condition()
+        # Extrações em andamento por chave (todas as faixas), para a cota de concorrência
+        self._tenant_running = {}
+        self._tenant_names = {}
+
+    def lane_for(self, cost, batch=False):
+        """Faixa de uma extração pelo custo estimado e pela origem (endpoint de lote)"""
+        if batch or cost > self.interactive_max_cost:
+            return self.lanes['batch']
+        return self.lanes['interactive']
+
+    def _eligible(self, tenant):
+        return not tenant.max_concurrency or self._tenant_running.get(tenant.key_id, 0) < tenant.max_concurrency
+
+    def _reject(self, lane, reason):
+        ADMISSION_REJECTIONS.inc(lane=lane.name, reason=reason)
+        retry_after = lane.retry_after()
+        logger.warning(f"Extração recusada na faixa {lane.name} ({reason}); Retry-After {retry_after}s")
+        raise AdmissionRejected(reason, retry_after)
+
+    def _wait_turn(self, lane, cost, tenant):
+        """Espera até ser a próxima da faixa e caber nela (chamado com a condição adquirida)"""
+        if len(lane.queue) >= lane.queue_max:
+            self._reject(lane, 'queue_full')
+
+        ticket = _Ticket(cost, tenant, self.aging_rate)
+        lane.queue.append(ticket)
+        lane.queued_cost += cost
+        ADMISSION_QUEUE_DEPTH.set(len(lane.queue), lane=lane.name)
+        deadline = time.monotonic() + lane.queue_timeout
+        try:
+            while not (lane.next_ticket(self._eligible) is ticket and lane.fits(cost)):
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._reject(lane, 'timeout')
+                self._condition.wait(remaining)
+        finally:
+            lane.queue.remove(ticket)
+            lane.queued_cost -= cost
+            ADMISSION_QUEUE_DEPTH.set(len(lane.queue), lane=lane.name)
+            # A próxima da fila pode caber agora
+            self._condition.notify_all()
+
+    @contextmanager
+    def admit(self, cost, batch=False, tenant=None):
+        """Reserva o custo na faixa durante o bloco, esperando na fila se preciso; produz a faixa"""
+        lane = self.lane_for(cost, batch)
+        tenant = tenant or ANONYMOUS_TENANT
+        cost = min(cost, lane.capacity)
+        start = time.monotonic()
+        with self._condition:
+            lane.join(tenant)
+            if lane.queue or not lane.fits(cost) or not self._eligible(tenant):
+                self._wait_turn(lane, cost, tenant)
+            lane.charge(tenant, cost)
+            lane.in_flight += cost
+            lane.running += 1
+            self._tenant_running[tenant.key_id] = self._tenant_running.get(tenant.key_id, 0) + 1
+            self._tenant_names[tenant.key_id] = tenant.name
+            ADMISSION_IN_FLIGHT_COST.set(round(lane.in_flight, 3), lane=lane.name)
+        ADMISSION_WAIT.observe(time.monotonic() - start, lane=lane.name)
+
+        started = time.monotonic()
+        try:
+            yield lane
+        finally:
+            elapsed = time.monotonic() - started
+            with self._condition:
+                lane.in_flight -= cost
+                lane.running -= 1
+                self._tenant_running[tenant.key_id] -= 1
+                if not self._tenant_running[tenant.key_id]:
+                    del self._tenant_running[tenant.key_id]
+                ADMISSION_IN_FLIGHT_COST.set(round(lane.in_flight, 3), lane=lane.name)
+                if lane.average_seconds is None:
+                    lane.average_seconds = elapsed
+                else:
+                    lane.average_seconds += DURATION_SMOOTHING * (elapsed - lane.average_seconds)
+                self._condition.notify_all()
+
+    def snapshot(self):
+        """Estado atual para /api/stats"""
+        rejections = {}
+        for (lane_name, reason), value in ADMISSION_REJECTIONS.values().items():
+            rejections.setdefault(lane_name, {})[reason] = value
+        with self._condition:
+            lanes = {name: lane.snapshot() for name, lane in self.lanes.items()}
+            running_by_key = {self._tenant_names[key_id]: count for key_id, count in self._tenant_running.items()}
+        for name, lane in lanes.items():
+            lane['rejections'] = rejections.get(name, {})
+        return {
+            'interactive_max_cost': self.interactive_max_cost,
+            'aging_rate': self.aging_rate,
+            'lanes': lanes,
+            'running_by_key': running_by_key
+        }
+
+
+ADMISSION = AdmissionController(
+    [
+        Lane(
+            'interactive', ADMISSION_INTERACTIVE_WORKERS * ADMISSION_INTERACTIVE_MAX_COST,
+            ADMISSION_INTERACTIVE_WORKERS, ADMISSION_QUEUE_MAX, ADMISSION_QUEUE_TIMEOUT
+        ),
+        Lane(
+            'batch', ADMISSION_CAPACITY, ADMISSION_BATCH_WORKERS, ADMISSION_QUEUE_MAX,
+            ADMISSION_BATCH_QUEUE_TIMEOUT, nice=ADMISSION_BATCH_NICE
+        )
+    ],
+    ADMISSION_INTERACTIVE_MAX_COST, ADMISSION_AGING_RATE
+)
+
+
+@contextmanager
+def admitted(file_extension, file_path, tenant=None, ocr=False):
+    """
+    Executa o bloco dentro do escalonador, com o custo estimado do arquivo
+
+    ocr indica se a extração vai passar as páginas escaneadas pelo OCR. Produz a faixa em que a extração foi admitida (None com o controle desligado).
+    """
+    if not ADMISSION_ENABLED:
+        yield None
+        return
+
+    cost = estimate_file_cost(file_extension, file_path, ocr)
+    with ADMISSION.admit(cost, batch=_is_batch_request(), tenant=tenant) as lane:
+        yield lane
@@ -0,0 +1,302 @@
+import os
+import hmac
+import time
+import atexit
+import hashlib
+import functools
+import logging
+import secrets
+import tempfile
+import threading
+import contextvars
+from datetime import datetime
+from contextlib import contextmanager
+
+from flask import current_app, g, has_request_context, jsonify, request
+
+from src.models.user import ApiKey, db
+
+logger = logging.getLogger(__name__)
+
+# Header com a chave de API das requisições de extração
+API_KEY_HEADER = 'X-API-Key'
+
+# Exigir chave nas rotas de extração (sem ela, as requisições entram como 'anonymous')
+API_KEYS_REQUIRED = os.environ.get('API_KEYS_REQUIRED', '0') != '0'
+
+# Por quanto tempo (s) uma chave resolvida fica em memória antes de ser consultada de novo no banco
+API_KEY_CACHE_SECONDS = 30
+
+# Arquivo tocado a cada revogação: os demais workers descartam o cache ao ver a mudança
+REVOCATION_STAMP = os.environ.get(
+    'API_KEY_REVOCATION_STAMP', os.path.join(tempfile.gettempdir(), 'extractor-api-keys.revoked')
+)
+
+# Header e chaves autorizadas a gerenciar as chaves de API (variável API_KEY_ADMIN_KEYS, separadas por vírgula)
+ADMIN_KEY_HEADER = 'X-Admin-Key'
+ADMIN_KEYS_ENV = 'API_KEY_ADMIN_KEYS'
+
+# Intervalo (s) entre as gravações agrupadas dos contadores de uso
+USAGE_FLUSH_INTERVAL = float(os.environ.get('API_KEY_USAGE_FLUSH_SECONDS', '5'))
+
+KEY_PREFIX = 'dx_'
+KEY_PREFIX_LENGTH = 10
+
+# Menor peso aceito (evita divisão por zero na fila justa)
+MIN_WEIGHT = 0.01
+
+
+class Tenant:
+    """Quem fez a requisição, do ponto de vista do escalonador: chave, peso na fila e cota de concorrência"""
+
+    def __init__(self, key_id, name, weight=1.0, max_concurrency=0):
+        self.key_id = key_id
+        self.name = name
+        self.weight = max(weight or 1.0, MIN_WEIGHT)
+        # 0 = sem limite
+        self.max_concurrency = max_concurrency or 0
+
+    def __repr__(self):
+        return f"Tenant({self.name})"
+
+
+ANONYMOUS = Tenant(None, 'anonymous')
+
+
+def generate_key():
+    """Nova chave de API (mostrada apenas na criação; o banco guarda só o hash)"""
+    return KEY_PREFIX + secrets.token_urlsafe(32)
+
+
+def hash_key(key):
+    return hashlib.sha256(key.encode('utf-8')).hexdigest()
+
+
+_cache = {}
+_cache_lock = threading.Lock()
+_seen_stamp = None
+
+
+def _revocation_stamp():
+    try:
+        return os.stat(REVOCATION_STAMP).st_mtime_ns
+    except OSError:
+        return None
+
+
+def resolve(key):
+    """
+    Tenant da chave, ou None se ela não existir ou estiver revogada
+
+    O resultado fica em cache por API_KEY_CACHE_SECONDS; uma revogação feita
+    em outro worker descarta o cache pelo REVOCATION_STAMP (um stat por
+    requisição). Entre hosts diferentes, que não compartilham o arquivo, a
+    chave revogada ainda vale até o cache expirar.
+    """
+    global _seen_stamp
+    key_hash = hash_key(key)
+    now = time.monotonic()
+    stamp = _revocation_stamp()
+    with _cache_lock:
+        if stamp != _seen_stamp:
+            _cache.clear()
+            _seen_stamp = stamp
+        cached = _cache.get(key_hash)
+    if cached is not None and cached[1] > now:
+        return cached[0]
+
+    api_key = ApiKey.query.filter_by(key_hash=key_hash).first()
+    tenant = None
+    if api_key is not None and api_key.active:
+        tenant = Tenant(api_key.id, api_key.name, api_key.weight, api_key.max_concurrency)
+    with _cache_lock:
+        _cache[key_hash] = (tenant, now + API_KEY_CACHE_SECONDS)
+    return tenant
+
+
+def invalidate_cache():
+    """Descarta as chaves resolvidas (após revogar ou alterar uma chave) neste e nos demais workers"""
+    try:
+        with open(REVOCATION_STAMP, 'a'):
+            os.utime(REVOCATION_STAMP)
+    except OSError as stamp_error:
+        logger.warning(f"Não foi possível sinalizar a revogação aos demais workers: {stamp_error}")
+    with _cache_lock:
+        _cache.clear()
+
+
+# Tenant das extrações feitas fora do contexto da requisição (threads de /extract/archive)
+_tenant = contextvars.ContextVar('tenant', default=None)
+
+
+@contextmanager
+def acting_as(tenant):
+    """Extrações feitas dentro do bloco são atribuídas ao tenant"""
+    token = _tenant.set(tenant)
+    try:
+        yield
+    finally:
+        _tenant.reset(token)
+
+
+def current_tenant():
+    """Tenant da extração atual (ANONYMOUS sem chave)"""
+    tenant = _tenant.get()
+    if tenant is None and has_request_context():
+        tenant = g.get('tenant')
+    return tenant or ANONYMOUS
+
+
+def public_endpoint(view):
+    """Marca uma view que dispensa chave de API (ex.: health check)"""
+    view.public_endpoint = True
+    return view
+
+
+def is_admin(key):
+    """Verifica se a chave está entre as chaves de administração (comparação em tempo constante)"""
+    if not key:
+        return False
+    allowed_keys = [k.strip() for k in os.environ.get(ADMIN_KEYS_ENV, '').split(',') if k.strip()]
+    return any(hmac.compare_digest(key.encode(), allowed.encode()) for allowed in allowed_keys)
+
+
+def admin_required(view):
+    """
+    Restringe uma view de gerenciamento de chaves a quem envia uma chave de administração
+
+    Sem API_KEY_ADMIN_KEYS configurada, o gerenciamento fica desabilitado (403).
+    """
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        if not is_admin(request.headers.get(ADMIN_KEY_HEADER)):
+            logger.warning(f"Gerenciamento de chaves negado para {request.path}: chave de administração inválida")
+            return jsonify({
+                'success': False,
+                'error': f'Chave de administração obrigatória (header {ADMIN_KEY_HEADER})',
+                'error_code': 'ADMIN_FORBIDDEN'
+            }), 403
+        return view(*args, **kwargs)
+    return wrapper
+
+
+def authenticate():
+    """
+    Hook before_request: identifica a chave de API da requisição em g.tenant
+
+    Chave inválida ou revogada gera 401; sem chave, a requisição entra como
+    ANONYMOUS, ou gera 401 se API_KEYS_REQUIRED estiver ligado.
+    """
+    view = current_app.view_functions.get(request.endpoint) if request.endpoint else None
+    if getattr(view, 'public_endpoint', False):
+        return None
+
+    key = request.headers.get(API_KEY_HEADER)
+    if not key:
+        if API_KEYS_REQUIRED:
+            return jsonify({
+                'success': False,
+                'error': f'Chave de API obrigatória (header {API_KEY_HEADER})',
+                'error_code': 'MISSING_API_KEY'
+            }), 401
+        g.tenant = ANONYMOUS
+        return None
+
+    tenant = resolve(key.strip())
+    if tenant is None:
+        return jsonify({
+            'success': False,
+            'error': 'Chave de API inválida ou revogada',
+            'error_code': 'INVALID_API_KEY'
+        }), 401
+    g.tenant = tenant
+    return None
+
+
+class UsageRecorder:
+    """
+    Contadores de uso por chave (documentos, bytes, segundos de CPU) com gravação agrupada
+
+    As extrações só somam em memória; uma thread grava o acumulado a cada
+    USAGE_FLUSH_INTERVAL em uma única transação (um UPDATE incremental por
+    chave), para o SQLite não ficar no caminho de cada requisição.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending = {}
+        self._thread = None
+
+    def record(self, tenant, documents=0, size_bytes=0, cpu_seconds=0.0):
+        if tenant is None or tenant.key_id is None:
+            return
+        with self._lock:
+            entry = self._pending.setdefault(tenant.key_id, [0, 0, 0.0])
+            entry[0] += documents
+            entry[1] += size_bytes
+            entry[2] += cpu_seconds
+
+    def flush(self):
+        """Grava os contadores pendentes (requer app context); em caso de erro eles voltam para a fila"""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return
+
+        now = datetime.utcnow()
+        try:
+            for key_id, (documents, size_bytes, cpu_seconds) in pending.items():
+                ApiKey.query.filter_by(id=key_id).update({
+                    ApiKey.documents: ApiKey.documents + documents,
+                    ApiKey.bytes_processed: ApiKey.bytes_processed + size_bytes,
+                    ApiKey.cpu_seconds: ApiKey.cpu_seconds + cpu_seconds,
+                    ApiKey.last_used_at: now
+                }, synchronize_session=False)
+            db.session.commit()
+        except Exception as flush_error:
+            db.session.rollback()
+            logger.warning(f"Não foi possível gravar o uso das chaves de API: {flush_error}")
+            with self._lock:
+                for key_id, counts in pending.items():
+                    entry = self._pending.setdefault(key_id, [0, 0, 0.0])
+                    for index, value in enumerate(counts):
+                        entry[index] += value
+
+    def start(self, app):
+        """Inicia a thread de gravação periódica (uma vez por processo)"""
+        if self._thread is not None:
+            return
+
+        def flush_periodically():
+            while True:
+                time.sleep(USAGE_FLUSH_INTERVAL)
+                with app.app_context():
+                    self.flush()
+
+        self._thread = threading.Thread(target=flush_periodically, name='api-key-usage', daemon=True)
+        self._thread.start()
+
+        def flush_at_exit():
+            with app.app_context():
+                self.flush()
+
+        atexit.register(flush_at_exit)
+
+
+USAGE = UsageRecorder()
+
+
+def _reinit_locks_after_fork():
+    # Workers do governador (fork) não herdam locks detidos por outras threads do servidor
+    global _cache_lock
+    _cache_lock = threading.Lock()
+    USAGE._lock = threading.Lock()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reinit_locks_after_fork)
+
+
+def init_app(app):
+    """Inicia a gravação agrupada dos contadores de uso das chaves"""
+    USAGE.start(app)
@@ -0,0 +1,98 @@
+import os
+import sys
+import time
+import logging
+import importlib
+import threading
+
+from src.services import metrics
+
+logger = logging.getLogger(__name__)
+
+# Tempo de import (segundos) de cada backend carregado por este módulo
+IMPORT_TIMES = {}
+
+_import_lock = threading.Lock()
+
+
+def _reinit_lock_after_fork():
+    # Outra requisição pode estar importando um backend no momento do fork do worker
+    global _import_lock
+    _import_lock = threading.Lock()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reinit_lock_after_fork)
+
+BACKEND_IMPORT_SECONDS = metrics.REGISTRY.register(metrics.Gauge(
+    'extractor_backend_import_seconds', 'Tempo de import de cada backend de extração', ('module',)
+))
+
+
+def load_backend(name):
+    """
+    Importa um backend registrando o tempo de import
+
+    Se o módulo já tiver sido importado por outro caminho, o tempo registrado é 0.
+    """
+    module = sys.modules.get(name)
+    if module is not None and name in IMPORT_TIMES:
+        return module
+
+    with _import_lock:
+        if name in IMPORT_TIMES:
+            return sys.modules[name]
+
+        already_loaded = name in sys.modules
+        start = time.perf_counter()
+        module = importlib.import_module(name)
+        elapsed = 0.0 if already_loaded else time.perf_counter() - start
+
+        IMPORT_TIMES[name] = elapsed
+        BACKEND_IMPORT_SECONDS.set(elapsed, module=name)
+        logger.info(f"Backend {name} carregado em {elapsed * 1000:.1f}ms")
+        return module
+
+
+def ensure_loaded(names):
+    """Garante que os backends estejam importados (ex.: antes do fork dos workers)"""
+    for name in names:
+        load_backend(name)
+
+
+def is_loaded(name):
+    return name in IMPORT_TIMES
+
+
+class LazyModule:
+    """
+    Proxy de módulo importado apenas no primeiro acesso a um atributo
+
+    Uso: pd = LazyModule('pandas'); pd.read_csv(...) importa o pandas na primeira chamada.
+    """
+
+    def __init__(self, name):
+        object.__setattr__(self, '_name', name)
+        object.__setattr__(self, '_module', None)
+
+    def _load(self):
+        module = self._module
+        if module is None:
+            module = load_backend(self._name)
+            object.__setattr__(self, '_module', module)
+        return module
+
+    def __getattr__(self, attribute):
+        return getattr(self._load(), attribute)
+
+    def __setattr__(self, attribute, value):
+        setattr(self._load(), attribute, value)
+
+    def __repr__(self):
+        state = 'carregado' if self._module is not None else 'não carregado'
+        return f"<LazyModule {self._name} ({state})>"
+
+
+def import_times():
+    """Tempos de import em ms, para /api/stats e /api/health"""
+    return {name: round(seconds * 1000, 1) for name, seconds in IMPORT_TIMES.items()}
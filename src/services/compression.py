@@ -0,0 +1,184 @@
+import os
+import zlib
+import logging
+
+from flask import request
+
+from src.services import metrics
+
+try:
+    import brotli
+except ImportError:  # Brotli é opcional
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # zstd é opcional
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+COMPRESSION_ENABLED = os.environ.get('RESPONSE_COMPRESSION', '1') != '0'
+
+# Respostas menores que isto não compensam o custo da compressão
+COMPRESSION_MIN_BYTES = int(os.environ.get('COMPRESSION_MIN_BYTES', 1024))
+
+# Tamanho dos blocos do corpo entregues ao compressor
+COMPRESSION_CHUNK_SIZE = 64 * 1024
+
+# Apenas conteúdo textual é comprimido; imagens, PDFs, zips etc. já são comprimidos
+COMPRESSIBLE_MIMETYPES = (
+    'application/json',
+    'application/x-ndjson',
+    'application/javascript',
+    'application/xml',
+    'image/svg+xml'
+)
+
+
+class _Encoder:
+    """Interface comum dos compressores: compress(), flush() (sync) e finish()"""
+
+    def __init__(self, compress, flush, finish):
+        self.compress = compress
+        self.flush = flush
+        self.finish = finish
+
+
+def _gzip_encoder():
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits 31: cabeçalho gzip
+    return _Encoder(compressor.compress, lambda: compressor.flush(zlib.Z_SYNC_FLUSH), compressor.flush)
+
+
+def _brotli_encoder():
+    compressor = brotli.Compressor(quality=5)
+    return _Encoder(compressor.process, compressor.flush, compressor.finish)
+
+
+def _zstd_encoder():
+    compressor = zstandard.ZstdCompressor(level=3).compressobj()
+    return _Encoder(
+        compressor.compress,
+        lambda: compressor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK),
+        compressor.flush
+    )
+
+
+# Codificações disponíveis, em ordem de preferência do servidor
+ENCODERS = {}
+if zstandard is not None:
+    ENCODERS['zstd'] = _zstd_encoder
+if brotli is not None:
+    ENCODERS['br'] = _brotli_encoder
+ENCODERS['gzip'] = _gzip_encoder
+
+
+def negotiate(accept_encoding):
+    """
+    Escolhe a codificação pelo header Accept-Encoding
+
+    Maior qvalue entre as codificações disponíveis; empates seguem a ordem
+    de preferência de ENCODERS. Retorna None se nenhuma for aceita.
+    """
+    accepted = {}
+    for item in (accept_encoding or '').split(','):
+        parts = [part.strip() for part in item.split(';')]
+        name = parts[0].lower()
+        if not name:
+            continue
+        quality = 1.0
+        for parameter in parts[1:]:
+            if parameter.startswith('q='):
+                try:
+                    quality = float(parameter[2:])
+                except ValueError:
+                    quality = 0.0
+        accepted[name] = quality
+
+    best, best_quality = None, 0.0
+    for name in ENCODERS:
+        quality = accepted.get(name, accepted.get('*', 0.0))
+        if quality > best_quality:
+            best, best_quality = name, quality
+    return best
+
+
+def is_compressible(mimetype):
+    return bool(mimetype) and (mimetype.startswith('text/') or mimetype in COMPRESSIBLE_MIMETYPES)
+
+
+def _body_chunks(body):
+    for start in range(0, len(body), COMPRESSION_CHUNK_SIZE):
+        yield body[start:start + COMPRESSION_CHUNK_SIZE]
+
+
+def compress_stream(chunks, encoding, flush_each=False):
+    """
+    Comprime um iterável de blocos em streaming
+
+    Com flush_each cada bloco é liberado imediatamente (respostas em streaming,
+    como NDJSON, continuam chegando linha a linha ao cliente). O tamanho antes
+    e depois da compressão é registrado nas métricas ao final.
+    """
+    encoder = ENCODERS[encoding]()
+    original_bytes = compressed_bytes = 0
+    try:
+        for chunk in chunks:
+            if isinstance(chunk, str):
+                chunk = chunk.encode('utf-8')
+            original_bytes += len(chunk)
+            data = encoder.compress(chunk)
+            if flush_each:
+                data += encoder.flush()
+            if data:
+                compressed_bytes += len(data)
+                yield data
+        tail = encoder.finish()
+        compressed_bytes += len(tail)
+        yield tail
+        metrics.record_compression(encoding, original_bytes, compressed_bytes)
+    finally:
+        close = getattr(chunks, 'close', None)
+        if close is not None:
+            close()
+
+
+def compress_response(response):
+    """
+    Hook after_request: comprime a resposta conforme o Accept-Encoding
+
+    Respostas já codificadas, binárias (send_file, imagens, arquivos
+    compactados), menores que COMPRESSION_MIN_BYTES ou sem corpo não são
+    alteradas.
+    """
+    if not COMPRESSION_ENABLED or request.method == 'HEAD':
+        return response
+    if response.status_code < 200 or response.status_code in (204, 304):
+        return response
+    if response.direct_passthrough or 'Content-Encoding' in response.headers:
+        return response
+    if not is_compressible(response.mimetype):
+        return response
+
+    response.vary.add('Accept-Encoding')
+    encoding = negotiate(request.headers.get('Accept-Encoding'))
+    if encoding is None:
+        return response
+
+    if response.is_streamed:
+        chunks, flush_each = response.response, True
+    else:
+        body = response.get_data()
+        if len(body) < COMPRESSION_MIN_BYTES:
+            return response
+        chunks, flush_each = _body_chunks(body), False
+
+    response.response = compress_stream(chunks, encoding, flush_each=flush_each)
+    response.headers['Content-Encoding'] = encoding
+    response.headers.pop('Content-Length', None)
+    return response
+
+
+def init_app(app):
+    """Registra a compressão de respostas no app"""
+    app.after_request(compress_response)
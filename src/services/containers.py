@@ -0,0 +1,234 @@
+import os
+import shutil
+import logging
+import tarfile
+import zipfile
+import tempfile
+
+from src.services.uploads import COPY_CHUNK_SIZE, UPLOAD_SPOOL_DIR, spool_from_stream
+
+logger = logging.getLogger(__name__)
+
+# Content-Types aceitos para lotes em arquivo compactado
+TAR_MIMETYPES = (
+    'application/x-tar',
+    'application/tar',
+    'application/gzip',
+    'application/x-gzip',
+    'application/x-gtar',
+    'application/x-compressed-tar'
+)
+ZIP_MIMETYPES = ('application/zip', 'application/x-zip-compressed')
+
+TAR_SUFFIXES = ('.tar', '.tar.gz', '.tgz', '.tar.bz2', '.tar.xz')
+
+# Erros de leitura de um container corrompido ou de outro formato
+ARCHIVE_ERRORS = (tarfile.TarError, zipfile.BadZipFile, EOFError)
+
+# Limites de ingestão de arquivos compactados (proteção contra zip bombs)
+DEFAULT_ARCHIVE_LIMITS = {
+    'max_members': 500,
+    'max_total_bytes': 512 * 1024 * 1024,  # Soma dos membros descompactados
+    'max_ratio': 100  # Bytes descompactados por byte compactado
+}
+
+# Abaixo deste volume descompactado a razão não é verificada (arquivos pequenos e repetitivos comprimem muito)
+RATIO_GRACE_BYTES = 4 * 1024 * 1024
+
+
+class ArchiveLimitExceeded(Exception):
+    """Arquivo compactado excedeu o limite de membros, de tamanho descompactado ou de razão de compressão"""
+
+    MESSAGES = {
+        'members': 'Arquivo compactado com membros demais',
+        'total_size': 'Tamanho descompactado do arquivo compactado excede o limite',
+        'ratio': 'Razão de compressão suspeita (possível zip bomb)'
+    }
+
+    def __init__(self, limit, limits=None):
+        self.limit = limit
+        self.limits = limits or {}
+        super().__init__(self.MESSAGES.get(limit, 'Limite de arquivo compactado excedido'))
+
+
+def get_archive_limits():
+    """
+    Limites de ingestão de arquivos compactados
+
+    As variáveis ARCHIVE_MAX_MEMBERS, ARCHIVE_MAX_TOTAL_MB e ARCHIVE_MAX_RATIO
+    substituem os valores padrão.
+    """
+    limits = dict(DEFAULT_ARCHIVE_LIMITS)
+
+    members_override = os.environ.get('ARCHIVE_MAX_MEMBERS')
+    if members_override:
+        limits['max_members'] = int(members_override)
+
+    total_override = os.environ.get('ARCHIVE_MAX_TOTAL_MB')
+    if total_override:
+        limits['max_total_bytes'] = int(total_override) * 1024 * 1024
+
+    ratio_override = os.environ.get('ARCHIVE_MAX_RATIO')
+    if ratio_override:
+        limits['max_ratio'] = float(ratio_override)
+
+    return limits
+
+
+class ArchiveGuard:
+    """
+    Contabiliza membros e bytes descompactados de um container durante a leitura
+
+    A razão de compressão é o total descompactado sobre o total compactado
+    consumido até o momento (corpo lido, no tar; compress_size dos membros, no zip).
+    """
+
+    def __init__(self, limits=None):
+        self.limits = limits or get_archive_limits()
+        self.members = 0
+        self.total_bytes = 0
+        self.compressed_bytes = 0
+
+    def start_member(self):
+        if self.members >= self.limits['max_members']:
+            raise ArchiveLimitExceeded('members', self.limits)
+        self.members += 1
+
+    def consume(self, size):
+        self.total_bytes += size
+        if self.total_bytes > self.limits['max_total_bytes']:
+            raise ArchiveLimitExceeded('total_size', self.limits)
+        if (self.total_bytes > RATIO_GRACE_BYTES
+                and self.total_bytes > self.limits['max_ratio'] * max(self.compressed_bytes, 1)):
+            raise ArchiveLimitExceeded('ratio', self.limits)
+
+
+class CountingReader:
+    """Stream que conta os bytes lidos (corpo compactado consumido pelo tarfile)"""
+
+    def __init__(self, stream, guard):
+        self.stream = stream
+        self.guard = guard
+
+    def read(self, size=-1):
+        data = self.stream.read(size)
+        self.guard.compressed_bytes += len(data)
+        return data
+
+
+class GuardedReader:
+    """Stream de um membro que aplica os limites do ArchiveGuard a cada bloco descompactado"""
+
+    def __init__(self, stream, guard):
+        self.stream = stream
+        self.guard = guard
+
+    def read(self, size=-1):
+        data = self.stream.read(size)
+        self.guard.consume(len(data))
+        return data
+
+
+def container_kind(mimetype, filename=None):
+    """'tar', 'zip' ou None a partir do Content-Type (ou, na falta dele, do nome do arquivo)"""
+    if mimetype in TAR_MIMETYPES:
+        return 'tar'
+    if mimetype in ZIP_MIMETYPES:
+        return 'zip'
+    name = (filename or '').lower()
+    if name.endswith(TAR_SUFFIXES):
+        return 'tar'
+    if name.endswith('.zip'):
+        return 'zip'
+    return None
+
+
+def is_ignored_member(name):
+    """Entradas que não são documentos (metadados do macOS, arquivos ocultos)"""
+    base_name = os.path.basename(name.rstrip('/'))
+    return name.startswith('__MACOSX/') or base_name.startswith('.') or not base_name
+
+
+def iter_tar_members(stream, guard=None):
+    """
+    Percorre um tar (opcionalmente gzip/bz2/xz) em modo streaming
+
+    Cada membro é gravado em disco à medida que o corpo é lido, sem acesso
+    aleatório nem buffer do arquivo inteiro.
+
+    Yields:
+        (nome do membro, UploadSpool); o chamador deve chamar discard()
+
+    Raises:
+        ArchiveLimitExceeded: Se o container exceder os limites do guard
+    """
+    guard = guard or ArchiveGuard()
+    with tarfile.open(fileobj=CountingReader(stream, guard), mode='r|*') as archive:
+        for member in archive:
+            if not member.isfile() or is_ignored_member(member.name):
+                continue
+            guard.start_member()
+            member_stream = GuardedReader(archive.extractfile(member), guard)
+            yield member.name, spool_from_stream(os.path.basename(member.name), member_stream)
+
+
+def _check_zip_directory(members, guard):
+    """Recusa o zip pelo diretório central, antes de descompactar qualquer membro"""
+    limits = guard.limits
+    if len(members) > limits['max_members']:
+        raise ArchiveLimitExceeded('members', limits)
+
+    declared_total = sum(info.file_size for info in members)
+    if declared_total > limits['max_total_bytes']:
+        raise ArchiveLimitExceeded('total_size', limits)
+
+    declared_compressed = sum(info.compress_size for info in members)
+    if declared_total > RATIO_GRACE_BYTES and declared_total > limits['max_ratio'] * max(declared_compressed, 1):
+        raise ArchiveLimitExceeded('ratio', limits)
+
+
+def iter_zip_members(stream, guard=None):
+    """
+    Percorre os membros de um zip
+
+    O diretório central do zip fica no fim do arquivo, então o corpo é
+    gravado em disco (em blocos, sem passar pela memória) antes da leitura.
+    Os tamanhos declarados no diretório central são conferidos primeiro e,
+    como podem ser falsos, os limites também valem durante a descompactação.
+
+    Yields:
+        (nome do membro, UploadSpool); o chamador deve chamar discard()
+
+    Raises:
+        ArchiveLimitExceeded: Se o container exceder os limites do guard
+    """
+    guard = guard or ArchiveGuard()
+    handle, archive_path = tempfile.mkstemp(suffix='.zip', prefix='bundle-', dir=UPLOAD_SPOOL_DIR)
+    try:
+        with os.fdopen(handle, 'wb') as archive_file:
+            shutil.copyfileobj(stream, archive_file, COPY_CHUNK_SIZE)
+
+        with zipfile.ZipFile(archive_path) as archive:
+            members = [
+                info for info in archive.infolist()
+                if not info.is_dir() and not is_ignored_member(info.filename)
+            ]
+            _check_zip_directory(members, guard)
+
+            for info in members:
+                guard.start_member()
+                guard.compressed_bytes += info.compress_size
+                with archive.open(info) as member:
+                    spool = spool_from_stream(os.path.basename(info.filename), GuardedReader(member, guard))
+                yield info.filename, spool
+    finally:
+        os.unlink(archive_path)
+
+
+def iter_container_members(kind, stream, guard=None):
+    """Membros de um container 'tar' ou 'zip' (ver iter_tar_members e iter_zip_members)"""
+    if kind == 'tar':
+        return iter_tar_members(stream, guard)
+    if kind == 'zip':
+        return iter_zip_members(stream, guard)
+    raise ValueError(f"Tipo de container não suportado: {kind}")
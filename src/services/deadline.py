@@ -0,0 +1,221 @@
+import time
+import select
+import socket
+import logging
+import contextvars
+from contextlib import contextmanager
+
+from flask import g, has_request_context
+
+from src.services import metrics
+
+logger = logging.getLogger(__name__)
+
+# Teto aceito para a opção timeout_ms (10 minutos)
+MAX_TIMEOUT_MS = 10 * 60 * 1000
+
+# Intervalo mínimo (s) entre duas verificações do socket do cliente
+DISCONNECT_POLL_INTERVAL = 0.1
+
+# Folga (s) após o prazo para o worker devolver o resultado parcial antes de ser encerrado
+DEADLINE_GRACE_SECONDS = 5
+
+# Chaves do socket do cliente no environ WSGI (servidor de desenvolvimento e gunicorn)
+SOCKET_ENVIRON_KEYS = ('werkzeug.socket', 'gunicorn.socket')
+
+TRUNCATIONS = metrics.REGISTRY.register(metrics.Counter(
+    'extractor_truncated_extractions_total', 'Extrações interrompidas pelo prazo da requisição (timeout_ms)', ('format',)
+))
+
+
+class ExtractionCancelled(Exception):
+    """Extração abandonada porque o cliente desconectou"""
+
+    def __init__(self):
+        super().__init__('Extração cancelada: o cliente desconectou')
+
+
+def normalize_timeout_ms(value):
+    """Prazo da requisição em milissegundos (limitado a MAX_TIMEOUT_MS), ou None se inválido"""
+    try:
+        timeout_ms = int(value)
+    except (TypeError, ValueError):
+        return None
+    if timeout_ms <= 0:
+        return None
+    return min(timeout_ms, MAX_TIMEOUT_MS)
+
+
+def client_socket(environ):
+    """Socket da conexão do cliente, quando o servidor WSGI o expõe"""
+    for key in SOCKET_ENVIRON_KEYS:
+        connection = environ.get(key)
+        if isinstance(connection, socket.socket):
+            return connection
+    return None
+
+
+def _peer_closed(connection):
+    """
+    Verifica, sem consumir dados, se o cliente fechou a conexão
+
+    Com a requisição já lida, o socket só fica legível quando o cliente
+    fecha (recv devolve b'') ou envia algo inesperado (não é desconexão).
+    """
+    try:
+        readable, _, _ = select.select([connection], [], [], 0)
+        if not readable:
+            return False
+        return connection.recv(1, socket.MSG_PEEK) == b''
+    except ValueError:
+        # Socket já fechado do nosso lado, ou TLS (sem MSG_PEEK)
+        return False
+    except OSError:
+        return True
+
+
+class Deadline:
+    """
+    Token de cancelamento de uma requisição: prazo (timeout_ms) e desconexão do cliente
+
+    O prazo conta do início da requisição. O relógio monotônico é o mesmo nos
+    workers criados via fork e o socket é herdado por eles, então o token
+    funciona tanto no servidor quanto dentro do worker de extração.
+    """
+
+    def __init__(self, connection=None, started=None):
+        self.started = time.monotonic() if started is None else started
+        self.connection = connection
+        self.timeout_ms = None
+        self.expires_at = None
+        self._disconnected = False
+        self._next_poll = 0.0
+
+    def limit(self, timeout_ms):
+        """Define o prazo da requisição (o menor vence, se chamado mais de uma vez)"""
+        expires_at = self.started + timeout_ms / 1000
+        if self.expires_at is None or expires_at < self.expires_at:
+            self.timeout_ms = timeout_ms
+            self.expires_at = expires_at
+
+    def remaining(self):
+        """Segundos até o prazo (None sem prazo)"""
+        if self.expires_at is None:
+            return None
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def expired(self):
+        return self.expires_at is not None and time.monotonic() >= self.expires_at
+
+    def disconnected(self):
+        """True se o cliente fechou a conexão (o socket é consultado no máximo a cada DISCONNECT_POLL_INTERVAL)"""
+        if self._disconnected or self.connection is None:
+            return self._disconnected
+        now = time.monotonic()
+        if now >= self._next_poll:
+            self._next_poll = now + DISCONNECT_POLL_INTERVAL
+            self._disconnected = _peer_closed(self.connection)
+            if self._disconnected:
+                logger.info("Cliente desconectou; extração em andamento será abandonada")
+        return self._disconnected
+
+
+# Token das extrações feitas fora do contexto da requisição (threads de /extract/archive e do PPTX)
+_deadline = contextvars.ContextVar('deadline', default=None)
+
+
+@contextmanager
+def bound(token):
+    """Checkpoints executados dentro do bloco consultam o token"""
+    reset = _deadline.set(token)
+    try:
+        yield
+    finally:
+        _deadline.reset(reset)
+
+
+def current():
+    """Token da extração atual (None fora de requisições)"""
+    token = _deadline.get()
+    if token is None and has_request_context():
+        token = g.get('deadline')
+    return token
+
+
+def limited():
+    """True se a extração atual tem prazo (timeout_ms)"""
+    token = current()
+    return token is not None and token.expires_at is not None
+
+
+def remaining():
+    """Segundos até o prazo da extração atual (None sem prazo)"""
+    token = current()
+    return token.remaining() if token is not None else None
+
+
+def bounded(timeout):
+    """Tempo máximo de uma etapa (ex.: OCR) limitado ao que resta do prazo da extração atual"""
+    request_remaining = remaining()
+    if request_remaining is None:
+        return timeout
+    return request_remaining if timeout is None else min(timeout, request_remaining)
+
+
+def check():
+    """Lança ExtractionCancelled se o cliente da extração atual desconectou"""
+    token = current()
+    if token is not None and token.disconnected():
+        raise ExtractionCancelled()
+
+
+def reached():
+    """
+    Checkpoint dos extratores, chamado antes de cada página, planilha, slide ou bloco
+
+    Lança ExtractionCancelled se o cliente desconectou; retorna True se o
+    prazo acabou, caso em que o extrator para e devolve o resultado parcial
+    marcado com mark_truncated().
+    """
+    token = current()
+    if token is None:
+        return False
+    if token.disconnected():
+        raise ExtractionCancelled()
+    return token.expired()
+
+
+def mark_truncated(result, unit, processed, total, stage=None):
+    """
+    Marca o resultado como parcial: stats.truncated e o progresso em stats.truncation
+
+    Args:
+        unit: O que o extrator percorre ('pages', 'sheets', 'slides', ...)
+        processed / total: Unidades processadas e existentes (total None se desconhecido)
+        stage: Etapa em que o prazo acabou, para extratores com várias passadas (PDF)
+    """
+    token = current()
+    stats = result.setdefault('stats', {})
+    stats['truncated'] = True
+    stats['truncation'] = {
+        'reason': 'timeout',
+        'timeout_ms': token.timeout_ms if token is not None else None,
+        'unit': unit,
+        'processed': processed,
+        'total': total
+    }
+    if stage is not None:
+        stats['truncation']['stage'] = stage
+    return result
+
+
+def truncation(result):
+    """Campos de truncamento de stats (para preservá-los no recorte de fields)"""
+    stats = result.get('stats') if isinstance(result, dict) else None
+    if not isinstance(stats, dict) or 'truncation' not in stats:
+        return {}
+    return {'truncated': True, 'truncation': stats['truncation']}
+
+
+def record_truncation(file_extension):
+    TRUNCATIONS.inc(format=file_extension)
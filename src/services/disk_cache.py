@@ -0,0 +1,194 @@
+import os
+import stat
+import hashlib
+import logging
+import tempfile
+from contextlib import contextmanager
+
+from src.services import metrics
+
+try:
+    import fcntl
+except ImportError:  # Windows: sem trava entre processos
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# Ao estourar o orçamento, as entradas menos usadas são removidas até esta fração dele
+EVICTION_TARGET_RATIO = 0.9
+
+DISK_CACHE_EVICTIONS = metrics.REGISTRY.register(metrics.Counter(
+    'extractor_disk_cache_evictions_total', 'Entradas removidas dos caches em disco por falta de espaço', ('cache',)
+))
+
+LOCK_FILE = '.lock'
+USAGE_FILE = '.usage'
+
+
+def ensure_private_directory(path):
+    """
+    Cria (se preciso) um diretório acessível só pelo usuário do processo
+
+    Os caminhos padrão ficam em /tmp, onde outro usuário local poderia criar
+    o diretório antes e plantar entradas. Diretório de outro dono (ou que não
+    seja um diretório) é recusado com PermissionError; um nosso com permissões
+    abertas é restrito a 0o700.
+    """
+    os.makedirs(path, mode=0o700, exist_ok=True)
+    status = os.lstat(path)
+    if not stat.S_ISDIR(status.st_mode):
+        raise PermissionError(f"{path} não é um diretório")
+    if hasattr(os, 'getuid') and status.st_uid != os.getuid():
+        raise PermissionError(f"{path} pertence a outro usuário (uid {status.st_uid})")
+    if stat.S_IMODE(status.st_mode) & 0o077:
+        os.chmod(path, 0o700)
+
+
+def make_key(*parts):
+    """Chave de cache a partir das partes que identificam a entrada"""
+    return hashlib.sha256('|'.join(str(part) for part in parts).encode('utf-8')).hexdigest()
+
+
+class DiskCache:
+    """
+    Cache de bytes em disco compartilhado entre processos, com orçamento de bytes e despejo LRU
+
+    Cada entrada é um arquivo gravado de forma atômica (arquivo temporário +
+    rename), então leitores nunca veem uma entrada pela metade. A recência é o
+    mtime, atualizado a cada acerto. O total ocupado fica em um arquivo de
+    contagem atualizado sob flock; só quando ele passa do orçamento o
+    diretório é percorrido e as entradas mais antigas são removidas.
+    """
+
+    def __init__(self, name, directory, max_bytes):
+        self.name = name
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._usable = None
+
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], key)
+
+    def _ready(self):
+        """Confere uma vez por processo se o diretório é nosso e privado; senão o cache fica desligado"""
+        if self._usable is None:
+            try:
+                ensure_private_directory(self.directory)
+                self._usable = True
+            except OSError as directory_error:
+                logger.warning(f"Cache {self.name} desabilitado: {directory_error}")
+                self._usable = False
+        return self._usable
+
+    def get(self, key):
+        """Conteúdo da entrada, ou None (registra acerto/falha em metrics.record_cache)"""
+        if not self._ready():
+            metrics.record_cache(self.name, False)
+            return None
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as cached:
+                data = cached.read()
+        except OSError:
+            metrics.record_cache(self.name, False)
+            return None
+
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        metrics.record_cache(self.name, True)
+        return data
+
+    @contextmanager
+    def _locked(self):
+        with open(os.path.join(self.directory, LOCK_FILE), 'a+') as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _read_usage(self):
+        try:
+            with open(os.path.join(self.directory, USAGE_FILE)) as usage_file:
+                return int(usage_file.read() or 0)
+        except (OSError, ValueError):
+            return None
+
+    def _write_usage(self, usage):
+        with open(os.path.join(self.directory, USAGE_FILE), 'w') as usage_file:
+            usage_file.write(str(usage))
+
+    def usage(self):
+        """Bytes ocupados e orçamento, para /api/stats (o total vale para todos os processos)"""
+        return {'bytes': self._read_usage() or 0, 'max_bytes': self.max_bytes}
+
+    def put(self, key, data):
+        """Grava a entrada; falhas de disco são apenas registradas no log"""
+        if self.max_bytes <= 0 or len(data) > self.max_bytes or not self._ready():
+            return
+        path = self._path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            handle, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+            with os.fdopen(handle, 'wb') as temp_file:
+                temp_file.write(data)
+
+            with self._locked():
+                try:
+                    replaced = os.path.getsize(path)
+                except OSError:
+                    replaced = 0
+                os.replace(temp_path, path)
+
+                usage = self._read_usage()
+                if usage is None:
+                    usage = self._scan_usage()
+                else:
+                    usage += len(data) - replaced
+                if usage > self.max_bytes:
+                    usage = self._evict()
+                self._write_usage(usage)
+        except OSError as cache_error:
+            logger.warning(f"Não foi possível gravar no cache {self.name}: {cache_error}")
+
+    def _entries(self):
+        entries = []
+        for shard in os.scandir(self.directory):
+            if not shard.is_dir():
+                continue
+            for entry in os.scandir(shard.path):
+                if entry.name.endswith('.tmp'):
+                    continue
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+        return entries
+
+    def _scan_usage(self):
+        return sum(size for _, size, _ in self._entries())
+
+    def _evict(self):
+        """Remove as entradas usadas há mais tempo até EVICTION_TARGET_RATIO do orçamento (sob a trava)"""
+        entries = sorted(self._entries())
+        usage = sum(size for _, size, _ in entries)
+        target = self.max_bytes * EVICTION_TARGET_RATIO
+        evicted = 0
+        for _, size, path in entries:
+            if usage <= target:
+                break
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+            usage -= size
+            evicted += 1
+        if evicted:
+            DISK_CACHE_EVICTIONS.inc(evicted, cache=self.name)
+            logger.info(f"Cache {self.name}: {evicted} entrada(s) removida(s) por falta de espaço")
+        return usage
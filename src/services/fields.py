@@ -0,0 +1,91 @@
+import re
+
+# Caminho de campo: nomes separados por ponto (ex.: 'text', 'stats.page_count')
+FIELD_PATH_PATTERN = re.compile(r'^[A-Za-z0-9_]+(\.[A-Za-z0-9_]+)*$')
+
+
+class FieldSelection:
+    """
+    Campos do resultado pedidos pelo cliente (opção 'fields')
+
+    Os extratores consultam wants() para pular o trabalho das seções que
+    ninguém pediu; project() remove do resultado o que sobrar. Caminhos
+    aplicados a listas valem para cada item (ex.: 'page_images.page').
+    """
+
+    def __init__(self, paths):
+        self.paths = tuple(dict.fromkeys(paths))
+        self.tree = {}
+        for path in self.paths:
+            if self._covers(path, exclude_self=True):
+                # Pedir a seção inteira já cobre o subcampo
+                continue
+            node = self.tree
+            for part in path.split('.'):
+                node = node.setdefault(part, {})
+            node.clear()
+
+    def _covers(self, path, exclude_self=False):
+        """O caminho foi pedido por inteiro (ele mesmo ou um ancestral)"""
+        parts = path.split('.')
+        last = len(parts) - 1 if exclude_self else len(parts)
+        return any('.'.join(parts[:size]) in self.paths for size in range(1, last + 1))
+
+    def wants(self, *paths):
+        """
+        True se algum dos caminhos é necessário no resultado
+
+        Um caminho é necessário se foi pedido, se está dentro de uma seção
+        pedida ('stats' cobre 'stats.page_count') ou se contém um campo
+        pedido ('stats' é necessário para 'stats.page_count').
+        """
+        for path in paths:
+            if self._covers(path):
+                return True
+            prefix = f'{path}.'
+            if any(requested.startswith(prefix) for requested in self.paths):
+                return True
+        return False
+
+    def project(self, result):
+        """Cópia rasa do resultado apenas com os campos pedidos"""
+        return _project(result, self.tree)
+
+    def __repr__(self):
+        return f"FieldSelection({','.join(self.paths)})"
+
+
+def _project(value, tree):
+    if not tree:
+        return value
+    if isinstance(value, dict):
+        return {key: _project(value[key], subtree) for key, subtree in tree.items() if key in value}
+    if isinstance(value, list):
+        return [_project(item, tree) for item in value]
+    return value
+
+
+def parse_fields(value):
+    """
+    Converte a opção 'fields' ('text,stats.page_count' ou lista) em FieldSelection
+
+    Caminhos inválidos são ignorados.
+
+    Returns:
+        FieldSelection, ou None se nenhum campo válido foi pedido (resultado completo)
+    """
+    if value is None:
+        return None
+    if isinstance(value, str):
+        value = value.split(',')
+    if not isinstance(value, (list, tuple)):
+        return None
+
+    paths = [str(path).strip() for path in value if isinstance(path, str)]
+    paths = [path for path in paths if FIELD_PATH_PATTERN.match(path)]
+    return FieldSelection(paths) if paths else None
+
+
+def wants(fields, *paths):
+    """fields.wants(*paths), tratando fields=None como 'todos os campos'"""
+    return fields is None or fields.wants(*paths)
@@ -0,0 +1,318 @@
+import os
+import time
+import signal
+import logging
+import contextvars
+import multiprocessing
+from contextlib import contextmanager
+
+from src.services import deadline, metrics, timing
+
+try:
+    import resource
+except ImportError:  # Plataformas sem rlimits (ex.: Windows)
+    resource = None
+
+logger = logging.getLogger(__name__)
+
+# Orçamento padrão de uma extração: memória adicional (MB) e tempo de CPU (s)
+DEFAULT_BUDGET = {
+    'memory_mb': 1024,
+    'cpu_seconds': 60
+}
+
+# Formatos que rasterizam páginas ou carregam planilhas inteiras recebem mais folga
+FORMAT_BUDGETS = {
+    'pdf': {'memory_mb': 2048, 'cpu_seconds': 120},
+    'xlsx': {'memory_mb': 1536, 'cpu_seconds': 90},
+    'xls': {'memory_mb': 1536, 'cpu_seconds': 90}
+}
+
+# Tolerância entre o limite soft (SIGXCPU) e o hard (SIGKILL) de CPU
+CPU_HARD_LIMIT_GRACE = 5
+
+# Tempo de parede máximo em relação ao orçamento de CPU (cobre I/O e espera)
+WALL_TIMEOUT_FACTOR = 2
+
+# Intervalo (s) entre as verificações de desconexão do cliente enquanto o worker extrai
+CANCEL_POLL_INTERVAL = 0.1
+
+SANDBOX_ENABLED = (
+    os.environ.get('EXTRACTION_SANDBOX', '1') != '0'
+    and resource is not None
+    and 'fork' in multiprocessing.get_all_start_methods()
+)
+
+
+# Conta que acumula o tempo de CPU das extrações feitas dentro de cpu_accounting()
+_cpu_account = contextvars.ContextVar('cpu_account', default=None)
+
+
+class CpuAccount:
+    """Tempo de CPU (s) acumulado pelas extrações de um bloco cpu_accounting()"""
+
+    def __init__(self):
+        self.seconds = 0.0
+
+
+@contextmanager
+def cpu_accounting():
+    """Acumula na conta produzida o tempo de CPU das chamadas a run_with_budget do bloco"""
+    account = CpuAccount()
+    token = _cpu_account.set(account)
+    try:
+        yield account
+    finally:
+        _cpu_account.reset(token)
+
+
+def _charge(seconds):
+    account = _cpu_account.get()
+    if account is not None and seconds:
+        account.seconds += seconds
+
+
+def _process_cpu_seconds():
+    """CPU do processo atual e dos subprocessos já encerrados (ex.: tesseract)"""
+    own = resource.getrusage(resource.RUSAGE_SELF)
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return own.ru_utime + own.ru_stime + children.ru_utime + children.ru_stime
+
+
+class ResourceLimitExceeded(Exception):
+    """Extração interrompida por exceder o orçamento de memória, CPU ou tempo"""
+
+    MESSAGES = {
+        'memory': 'Limite de memória excedido durante a extração',
+        'cpu': 'Limite de tempo de CPU excedido durante a extração',
+        'time': 'Tempo máximo de processamento excedido durante a extração',
+        'killed': 'Processo de extração encerrado pelo sistema (SIGKILL)'
+    }
+
+    # Limites do documento (o mesmo arquivo falharia de novo) x limites do servidor no momento
+    DOCUMENT_LIMITS = ('memory', 'cpu')
+
+    def __init__(self, limit, budget=None):
+        self.limit = limit
+        self.budget = budget or {}
+        super().__init__(self.MESSAGES.get(limit, 'Limite de recursos excedido durante a extração'))
+
+
+def get_budget(file_extension):
+    """
+    Orçamento de recursos para um formato
+
+    As variáveis EXTRACTION_MEMORY_LIMIT_MB e EXTRACTION_CPU_LIMIT_SECONDS
+    substituem os valores padrão de todos os formatos.
+    """
+    budget = dict(FORMAT_BUDGETS.get(file_extension, DEFAULT_BUDGET))
+
+    memory_override = os.environ.get('EXTRACTION_MEMORY_LIMIT_MB')
+    if memory_override:
+        budget['memory_mb'] = int(memory_override)
+
+    cpu_override = os.environ.get('EXTRACTION_CPU_LIMIT_SECONDS')
+    if cpu_override:
+        budget['cpu_seconds'] = int(cpu_override)
+
+    return budget
+
+
+def _current_address_space():
+    """Espaço de endereçamento atual do processo em bytes (0 se indisponível)"""
+    try:
+        with open('/proc/self/statm') as statm:
+            return int(statm.read().split()[0]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        return 0
+
+
+def _apply_limits(budget):
+    """Aplica os rlimits do orçamento ao processo atual (worker)"""
+    # O limite de memória é relativo ao que o processo já herdou do servidor
+    memory_limit = _current_address_space() + budget['memory_mb'] * 1024 * 1024
+    resource.setrlimit(resource.RLIMIT_AS, (memory_limit, memory_limit))
+
+    cpu_limit = budget['cpu_seconds']
+    resource.setrlimit(resource.RLIMIT_CPU, (cpu_limit, cpu_limit + CPU_HARD_LIMIT_GRACE))
+
+    # Evitar core dumps quando o worker é encerrado por SIGXCPU
+    resource.setrlimit(resource.RLIMIT_CORE, (0, 0))
+
+    # Workers de lote cedem CPU às extrações interativas
+    if budget.get('nice'):
+        os.nice(budget['nice'])
+
+
+def _is_memory_error(error):
+    """
+    Detecta falhas de alocação, inclusive as reportadas por bibliotecas nativas (MuPDF)
+
+    Os extratores relançam erros como Exception("Erro ao ..."), então a cadeia
+    de exceções (__cause__/__context__) também é verificada.
+    """
+    seen = set()
+    while error is not None and id(error) not in seen:
+        seen.add(id(error))
+        if isinstance(error, MemoryError):
+            return True
+        message = str(error).lower()
+        if 'out of memory' in message or ('malloc' in message and 'failed' in message):
+            return True
+        error = error.__cause__ or error.__context__
+    return False
+
+
+def _worker(conn, func, args, kwargs, budget):
+    """
+    Ponto de entrada do processo worker: aplica os limites, executa e devolve
+    o resultado junto com as observações de métricas, o span e o tempo de CPU do worker
+    """
+    worker_span = None
+    try:
+        _apply_limits(budget)
+        metrics.start_capture()
+        with timing.span('worker', pid=os.getpid()) as worker_span:
+            result = func(*args, **kwargs)
+        conn.send(('ok', result, metrics.drain_capture(), worker_span, _process_cpu_seconds()))
+    except BaseException as error:
+        try:
+            if isinstance(error, deadline.ExtractionCancelled):
+                conn.send(('cancelled', None, metrics.drain_capture(), worker_span, _process_cpu_seconds()))
+            elif _is_memory_error(error):
+                conn.send(('limit', 'memory', metrics.drain_capture(), worker_span, _process_cpu_seconds()))
+            else:
+                conn.send(('error', str(error), metrics.drain_capture(), worker_span, _process_cpu_seconds()))
+        except BaseException:
+            pass
+    finally:
+        conn.close()
+
+
+# Contador de mortes pelo OOM killer no cgroup do container (cgroup v2)
+CGROUP_MEMORY_EVENTS = '/sys/fs/cgroup/memory.events'
+
+
+def _oom_kills():
+    """Quantas vezes o OOM killer agiu no cgroup (None se o contador não estiver disponível)"""
+    try:
+        with open(CGROUP_MEMORY_EVENTS) as events:
+            for line in events:
+                name, _, value = line.partition(' ')
+                if name == 'oom_kill':
+                    return int(value)
+    except (OSError, ValueError):
+        pass
+    return None
+
+
+def _limit_from_exitcode(exitcode, oom_kills_before):
+    """
+    Traduz o sinal que encerrou o worker no tipo de limite atingido
+
+    Os limites que o próprio servidor aplica (tempo de parede, desconexão)
+    são tratados antes de o worker ser encerrado e não chegam aqui. O estouro
+    de RLIMIT_AS chega pelo pipe como MemoryError e o de RLIMIT_CPU, como
+    SIGXCPU; um SIGKILL só é atribuído à memória se o contador do OOM killer
+    do cgroup tiver aumentado durante a extração.
+    """
+    if exitcode == -signal.SIGXCPU:
+        return 'cpu'
+    if exitcode == -signal.SIGKILL:
+        oom_kills = _oom_kills()
+        if oom_kills is not None and oom_kills_before is not None and oom_kills > oom_kills_before:
+            return 'memory'
+        return 'killed'
+    return None
+
+
+def _stop(process):
+    """Aguarda o término do worker, encerrando-o se ainda estiver vivo"""
+    process.join(timeout=1)
+    if process.is_alive():
+        process.kill()
+        process.join()
+
+
+def run_with_budget(func, args=(), kwargs=None, budget=None):
+    """
+    Executa func(*args, **kwargs) sob um orçamento de memória e CPU
+
+    Com o sandbox habilitado a chamada roda em um processo worker criado via
+    fork, com RLIMIT_AS/RLIMIT_CPU aplicados; se o worker estourar o orçamento
+    ou for morto, apenas ele é perdido e o servidor continua saudável.
+
+    Enquanto o worker extrai, o servidor verifica se o cliente desconectou e,
+    nesse caso, encerra o worker na hora. Com prazo na requisição (timeout_ms),
+    o worker devolve o resultado parcial sozinho; se não o fizer até
+    DEADLINE_GRACE_SECONDS depois do prazo, é encerrado como no limite de tempo.
+
+    Raises:
+        ResourceLimitExceeded: Se algum limite do orçamento for atingido
+        ExtractionCancelled: Se o cliente desconectar durante a extração
+        Exception: Com a mensagem original, se a extração falhar por outro motivo
+    """
+    kwargs = kwargs or {}
+    budget = budget or dict(DEFAULT_BUDGET)
+    token = deadline.current()
+    deadline.check()
+
+    if not SANDBOX_ENABLED:
+        start_cpu = time.thread_time()
+        try:
+            return func(*args, **kwargs)
+        except Exception as error:
+            if _is_memory_error(error):
+                raise ResourceLimitExceeded('memory', budget)
+            raise
+        finally:
+            _charge(time.thread_time() - start_cpu)
+
+    oom_kills_before = _oom_kills()
+    context = multiprocessing.get_context('fork')
+    parent_conn, child_conn = context.Pipe(duplex=False)
+    process = context.Process(target=_worker, args=(child_conn, func, args, kwargs, budget))
+    process.start()
+    child_conn.close()
+
+    wall_timeout = budget['cpu_seconds'] * WALL_TIMEOUT_FACTOR
+    remaining = token.remaining() if token is not None else None
+    if remaining is not None:
+        wall_timeout = min(wall_timeout, remaining + deadline.DEADLINE_GRACE_SECONDS)
+    wall_deadline = time.monotonic() + wall_timeout
+
+    try:
+        while not parent_conn.poll(min(CANCEL_POLL_INTERVAL, max(0.0, wall_deadline - time.monotonic()))):
+            if token is not None and token.disconnected():
+                process.kill()
+                raise deadline.ExtractionCancelled()
+            if time.monotonic() >= wall_deadline:
+                logger.warning(f"Worker de extração excedeu {wall_timeout:.1f}s e será encerrado")
+                raise ResourceLimitExceeded('time', budget)
+
+        try:
+            status, payload, events, worker_span, cpu_seconds = parent_conn.recv()
+        except EOFError:
+            # Worker morreu sem responder (sinal de limite ou crash nativo)
+            process.join()
+            limit = _limit_from_exitcode(process.exitcode, oom_kills_before)
+            if limit is not None:
+                logger.warning(f"Worker de extração encerrado pelo limite de {limit} (exitcode {process.exitcode})")
+                raise ResourceLimitExceeded(limit, budget)
+            raise Exception(f"Processo de extração encerrado inesperadamente (exitcode {process.exitcode})")
+    finally:
+        parent_conn.close()
+        _stop(process)
+
+    metrics.REGISTRY.replay(events)
+    timing.attach(worker_span)
+    _charge(cpu_seconds)
+
+    if status == 'ok':
+        return payload
+    if status == 'limit':
+        logger.warning(f"Worker de extração atingiu o limite de {payload}")
+        raise ResourceLimitExceeded(payload, budget)
+    if status == 'cancelled':
+        raise deadline.ExtractionCancelled()
+    raise Exception(payload)
@@ -0,0 +1,239 @@
+import json
+import time
+import decimal
+import dataclasses
+from datetime import date
+from uuid import UUID
+
+from flask import g, has_request_context, stream_with_context
+from flask.json.provider import DefaultJSONProvider
+from werkzeug.http import http_date
+
+from src.services import metrics, timing
+
+try:
+    import orjson
+except ImportError:  # Sem orjson o FastJSONProvider usa o encoder da stdlib
+    orjson = None
+
+# Corpos maiores que isto são enviados em streaming, à medida que são serializados
+STREAM_THRESHOLD_BYTES = 1024 * 1024
+
+# Blocos enviados ao cliente em respostas em streaming
+STREAM_CHUNK_BYTES = 256 * 1024
+
+# Profundidade até a qual dicts/listas são serializados item a item no streaming
+# (resposta -> data -> pages/page_images/sheets -> itens)
+STREAM_DEPTH = 3
+
+
+class InstrumentedJSONProvider(DefaultJSONProvider):
+    """
+    Provider JSON do Flask que mede a serialização das respostas (fase serialize)
+
+    Quando a requisição pediu 'timings', o trace é anexado ao objeto JSON
+    depois da serialização, para que inclua o próprio tempo de serialização.
+    """
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        dump_args = {}
+
+        if (self.compact is None and self._app.debug) or self.compact is False:
+            dump_args.setdefault("indent", 2)
+        else:
+            dump_args.setdefault("separators", (",", ":"))
+
+        with metrics.phase('serialize'):
+            body = self.dumps(obj, **dump_args)
+
+        trace = g.get('timing_trace') if has_request_context() else None
+        if trace is not None and isinstance(obj, dict) and obj:
+            timings = self.dumps(trace.to_dict(), **dump_args)
+            body = f'{body[:-1].rstrip()},"timings":{timings}}}'
+
+        return self._app.response_class(f"{body}\n", mimetype=self.mimetype)
+
+
+def _is_special_float(value):
+    return value != value or value in (float('inf'), float('-inf'))
+
+
+def _default(value):
+    """
+    Tipos fora do JSON nativo: os mesmos do provider padrão do Flask e os
+    escalares/arrays do numpy e pandas (describe(), null_counts, sample_data)
+    """
+    if isinstance(value, date):
+        if type(value).__name__ == 'NaTType':
+            return None
+        return http_date(value)
+    if isinstance(value, (decimal.Decimal, UUID)):
+        return str(value)
+    if dataclasses.is_dataclass(value) and not isinstance(value, type):
+        return dataclasses.asdict(value)
+    if hasattr(value, '__html__'):
+        return str(value.__html__())
+    if type(value).__name__ in ('NAType', 'NaTType'):
+        return None
+    if hasattr(value, 'tolist') and hasattr(value, 'dtype'):
+        # Escalares e arrays numpy (int64, float32, bool_, ndarray...)
+        converted = value.tolist()
+        if isinstance(converted, float) and _is_special_float(converted):
+            return None
+        return converted
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def encode(value):
+    """Serializa um valor em bytes JSON, com as mesmas conversões das respostas (fora do contexto do app)"""
+    if orjson is not None:
+        options = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+        return orjson.dumps(value, default=_default, option=options)
+    return json.dumps(value, default=_default, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def decode(data):
+    return orjson.loads(data) if orjson is not None else json.loads(data)
+
+
+class FastJSONProvider(InstrumentedJSONProvider):
+    """
+    Provider JSON rápido: orjson (quando instalado) com suporte a tipos numpy/pandas
+
+    Corpos grandes são serializados em partes e enviados em streaming, sem
+    montar a string inteira em memória; corpos pequenos seguem o caminho normal.
+    A indentação (debug ou compact=False) vale só para os corpos pequenos: os
+    grandes são sempre compactos, para não perder o streaming.
+    Mantém a fase serialize e o 'timings' do InstrumentedJSONProvider.
+
+    Diferenças em relação ao provider padrão: a saída é UTF-8 (sem escapes
+    \\uXXXX) e, com orjson, NaN/Infinity viram null, já que não são JSON válido.
+    """
+
+    def _orjson_options(self, indent=False):
+        options = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+        if self.sort_keys:
+            options |= orjson.OPT_SORT_KEYS
+        if indent:
+            options |= orjson.OPT_INDENT_2
+        return options
+
+    def _encode(self, value, indent=False):
+        """Serializa um valor em bytes"""
+        if orjson is not None:
+            return orjson.dumps(value, default=_default, option=self._orjson_options(indent))
+        return json.dumps(
+            value, default=_default, sort_keys=self.sort_keys, ensure_ascii=False,
+            indent=2 if indent else None, separators=None if indent else (',', ':')
+        ).encode('utf-8')
+
+    def dumps(self, obj, **kwargs):
+        return self._encode(obj, indent=bool(kwargs.get('indent'))).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        # Corpos JSON grandes (file_data em base64) são lidos bem mais rápido pelo orjson
+        if orjson is not None and not kwargs:
+            return orjson.loads(s)
+        return super().loads(s, **kwargs)
+
+    def iter_encode(self, value, depth=0, trailer=None):
+        """
+        Serializa em partes: dicts e listas até STREAM_DEPTH item a item
+
+        Args:
+            trailer: Função chamada ao fim do objeto raiz; os bytes retornados
+                são inseridos antes do '}' final (usado para o 'timings')
+        """
+        if depth < STREAM_DEPTH and isinstance(value, dict) and value:
+            items = sorted(value.items()) if self.sort_keys else value.items()
+            separator = b'{'
+            for key, item in items:
+                yield separator + self._encode(key if isinstance(key, str) else str(key)) + b':'
+                yield from self.iter_encode(item, depth + 1)
+                separator = b','
+            if trailer is not None:
+                yield trailer()
+            yield b'}'
+        elif depth < STREAM_DEPTH and isinstance(value, (list, tuple)) and value:
+            separator = b'['
+            for item in value:
+                yield separator
+                yield from self.iter_encode(item, depth + 1)
+                separator = b','
+            yield b']'
+        else:
+            yield self._encode(value)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = (self.compact is None and self._app.debug) or self.compact is False
+        trace = g.get('timing_trace') if has_request_context() else None
+
+        if not isinstance(obj, dict) or not obj:
+            with metrics.phase('serialize'):
+                body = self._encode(obj, indent=indent)
+            if trace is not None and isinstance(obj, dict) and obj:
+                body = body[:-1].rstrip() + b',"timings":' + self._encode(trace.to_dict(), indent=indent) + b'}'
+            return self._app.response_class(body + b'\n', mimetype=self.mimetype)
+
+        serialize_span = timing.Span('serialize')
+        elapsed = [0.0]
+
+        def timings_trailer():
+            # O tempo de serialização fica registrado no próprio trace enviado
+            serialize_span.duration = elapsed[0]
+            trace.children.append(serialize_span)
+            return b',"timings":' + self._encode(trace.to_dict())
+
+        parts = self.iter_encode(obj, trailer=timings_trailer if trace is not None else None)
+
+        def next_part():
+            start = time.perf_counter()
+            try:
+                return next(parts, None)
+            finally:
+                elapsed[0] += time.perf_counter() - start
+
+        # Serializar até o limite: se o corpo terminar antes, a resposta é comum
+        head = []
+        head_size = 0
+        part = next_part()
+        while part is not None and head_size <= STREAM_THRESHOLD_BYTES:
+            head.append(part)
+            head_size += len(part)
+            part = next_part()
+
+        if part is None:
+            body = b''.join(head)
+            if indent:
+                # Corpo pequeno: formatado como pedido (debug/compact=False)
+                start = time.perf_counter()
+                body = self._encode(obj, indent=True)
+                if trace is not None:
+                    body = body[:-1].rstrip() + b',"timings":' + self._encode(trace.to_dict(), indent=True) + b'}'
+                elapsed[0] += time.perf_counter() - start
+            metrics.PHASE_LATENCY.observe(elapsed[0], phase='serialize')
+            return self._app.response_class(body + b'\n', mimetype=self.mimetype)
+
+        serialize_span.attributes['streamed'] = True
+
+        def generate():
+            buffer = head
+            buffer.append(part)
+            size = sum(len(chunk) for chunk in buffer)
+            while True:
+                chunk = next_part()
+                if chunk is None:
+                    break
+                buffer.append(chunk)
+                size += len(chunk)
+                if size >= STREAM_CHUNK_BYTES:
+                    yield b''.join(buffer)
+                    buffer, size = [], 0
+            buffer.append(b'\n')
+            yield b''.join(buffer)
+            metrics.PHASE_LATENCY.observe(elapsed[0], phase='serialize')
+
+        body = stream_with_context(generate()) if has_request_context() else generate()
+        return self._app.response_class(body, mimetype=self.mimetype)
@@ -0,0 +1,379 @@
+import os
+import time
+import bisect
+import weakref
+import threading
+import functools
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+
+from src.services import timing
+
+# Limites padrão (em segundos) dos buckets dos histogramas de latência
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+PROCESS_START_TIME = time.time()
+
+# Quando não é None, as observações são acumuladas aqui em vez de aplicadas
+# (usado nos workers do governador, que devolvem as observações ao servidor)
+_capture = None
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+def _escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=None):
+    pairs = [f'{name}="{_escape_label(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(f'{extra[0]}="{_escape_label(extra[1])}"')
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+# Todas as métricas criadas, para recriar os locks no processo filho após um fork
+_metrics = weakref.WeakSet()
+
+
+def _reinit_locks_after_fork():
+    """
+    Os workers do governador são criados via fork de um servidor com threads:
+    um lock detido por outra thread no momento do fork ficaria preso no filho
+    """
+    for metric in list(_metrics):
+        metric._lock = threading.Lock()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reinit_locks_after_fork)
+
+
+class Metric(ABC):
+    """Base das métricas: nome, descrição, rótulos e lock próprio (cada tipo implementa _apply)"""
+
+    metric_type = 'untyped'
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values = {}
+        _metrics.add(self)
+
+    def _key(self, labels):
+        return tuple(str(labels.get(name, '')) for name in self.labelnames)
+
+    def _record(self, key, value):
+        if _capture is not None:
+            _capture.append((self.name, key, value))
+            return
+        self._apply(key, value)
+
+    @abstractmethod
+    def _apply(self, key, value):
+        """Aplica uma observação aos valores da métrica (fora dos workers, que só capturam)"""
+
+    def values(self):
+        """Cópia dos valores atuais por combinação de rótulos"""
+        with self._lock:
+            return dict(self._values)
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.metric_type}']
+        lines.extend(self._render_samples())
+        return lines
+
+    def _render_samples(self):
+        return [
+            f'{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}'
+            for key, value in sorted(self.values().items())
+        ]
+
+
+class Counter(Metric):
+    """Contador monotônico"""
+
+    metric_type = 'counter'
+
+    def inc(self, amount=1, **labels):
+        self._record(self._key(labels), amount)
+
+    def _apply(self, key, value):
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + value
+
+
+class Gauge(Metric):
+    """Valor instantâneo (não é capturado nos workers)"""
+
+    metric_type = 'gauge'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    def set(self, value, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def _apply(self, key, value):
+        with self._lock:
+            self._values[key] = value
+
+
+class Histogram(Metric):
+    """Histograma cumulativo com buckets fixos"""
+
+    metric_type = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        self._record(self._key(labels), value)
+
+    def _apply(self, key, value):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    def values(self):
+        """Cópia de {rótulos: (contagens por bucket, soma, total)}"""
+        with self._lock:
+            return {key: (list(state[0]), state[1], state[2]) for key, state in self._values.items()}
+
+    def _render_samples(self):
+        lines = []
+        for key, (counts, total_sum, count) in sorted(self.values().items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += bucket_count
+                labels = _format_labels(self.labelnames, key, ('le', _format_value(float(bound))))
+                lines.append(f'{self.name}_bucket{labels} {cumulative}')
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f'{self.name}_sum{labels} {_format_value(total_sum)}')
+            lines.append(f'{self.name}_count{labels} {count}')
+        return lines
+
+
+class Registry:
+    """Conjunto de métricas expostas no formato texto do Prometheus"""
+
+    def __init__(self):
+        self._metrics = {}
+
+    def register(self, metric):
+        self._metrics[metric.name] = metric
+        return metric
+
+    def get(self, name):
+        return self._metrics.get(name)
+
+    def replay(self, events):
+        """Aplica observações capturadas em um worker"""
+        for name, key, value in events or ():
+            metric = self._metrics.get(name)
+            if metric is not None:
+                metric._apply(key, value)
+
+    def render(self):
+        lines = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+HTTP_REQUESTS = REGISTRY.register(Counter(
+    'extractor_http_requests_total', 'Requisições HTTP por endpoint, método e status',
+    ('endpoint', 'method', 'status')
+))
+HTTP_ERRORS = REGISTRY.register(Counter(
+    'extractor_http_errors_total', 'Respostas de erro por endpoint e error_code',
+    ('endpoint', 'error_code')
+))
+HTTP_LATENCY = REGISTRY.register(Histogram(
+    'extractor_http_request_duration_seconds', 'Latência das requisições HTTP por endpoint',
+    ('endpoint',)
+))
+HTTP_IN_FLIGHT = REGISTRY.register(Gauge(
+    'extractor_http_requests_in_flight', 'Requisições HTTP em andamento'
+))
+BYTES_RECEIVED = REGISTRY.register(Counter(
+    'extractor_bytes_received_total', 'Bytes recebidos no corpo das requisições', ('endpoint',)
+))
+BYTES_SENT = REGISTRY.register(Counter(
+    'extractor_bytes_sent_total', 'Bytes enviados no corpo das respostas', ('endpoint',)
+))
+EXTRACTIONS = REGISTRY.register(Counter(
+    'extractor_extractions_total', 'Extrações por formato e resultado (success ou error_code)',
+    ('format', 'status')
+))
+EXTRACTION_LATENCY = REGISTRY.register(Histogram(
+    'extractor_extraction_duration_seconds', 'Duração das extrações por formato', ('format',)
+))
+PHASE_LATENCY = REGISTRY.register(Histogram(
+    'extractor_phase_duration_seconds', 'Duração por fase (download, decode, extract, rasterize, serialize)',
+    ('phase',)
+))
+CACHE_REQUESTS = REGISTRY.register(Counter(
+    'extractor_cache_requests_total', 'Consultas aos caches por resultado (hit ou miss)',
+    ('cache', 'result')
+))
+COMPRESSED_RESPONSES_BYTES_IN = REGISTRY.register(Counter(
+    'extractor_response_uncompressed_bytes_total', 'Bytes das respostas comprimidas antes da compressão',
+    ('encoding',)
+))
+COMPRESSED_RESPONSES_BYTES_OUT = REGISTRY.register(Counter(
+    'extractor_response_compressed_bytes_total', 'Bytes das respostas comprimidas após a compressão',
+    ('encoding',)
+))
+COMPRESSION_RATIO = REGISTRY.register(Histogram(
+    'extractor_response_compression_ratio', 'Razão entre o tamanho original e o comprimido das respostas',
+    ('encoding',), buckets=(1.0, 1.5, 2.0, 3.0, 5.0, 10.0, 20.0, 50.0)
+))
+
+
+@contextmanager
+def phase(name, **attributes):
+    """
+    Mede a duração de um bloco como uma fase do processamento
+
+    A fase também vira um span do trace da requisição (com os atributos
+    informados), quando houver.
+    """
+    start = time.perf_counter()
+    try:
+        with timing.span(name, **attributes):
+            yield
+    finally:
+        PHASE_LATENCY.observe(time.perf_counter() - start, phase=name)
+
+
+def timed_phase(name):
+    """Decorator equivalente a phase() para funções inteiras"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with phase(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def record_extraction(file_extension, status, seconds):
+    """Registra o resultado e a duração de uma extração"""
+    EXTRACTIONS.inc(format=file_extension, status=status)
+    EXTRACTION_LATENCY.observe(seconds, format=file_extension)
+
+
+def record_cache(cache, hit):
+    """Registra uma consulta a um cache"""
+    CACHE_REQUESTS.inc(cache=cache, result='hit' if hit else 'miss')
+
+
+def record_compression(encoding, original_bytes, compressed_bytes):
+    """Registra o tamanho de uma resposta antes e depois da compressão"""
+    COMPRESSED_RESPONSES_BYTES_IN.inc(original_bytes, encoding=encoding)
+    COMPRESSED_RESPONSES_BYTES_OUT.inc(compressed_bytes, encoding=encoding)
+    if compressed_bytes:
+        COMPRESSION_RATIO.observe(original_bytes / compressed_bytes, encoding=encoding)
+
+
+def start_capture():
+    """Passa a acumular as observações deste processo (workers do governador)"""
+    global _capture
+    _capture = []
+
+
+def drain_capture():
+    """Retorna e limpa as observações acumuladas"""
+    global _capture
+    events = _capture or []
+    _capture = []
+    return events
+
+
+def uptime_seconds():
+    return time.time() - PROCESS_START_TIME
+
+
+def summary():
+    """Resumo das métricas em formato JSON para /api/stats"""
+    requests_by_endpoint = {}
+    for (endpoint, _method, _status), value in HTTP_REQUESTS.values().items():
+        requests_by_endpoint[endpoint] = requests_by_endpoint.get(endpoint, 0) + value
+
+    errors_by_code = {}
+    for (_endpoint, error_code), value in HTTP_ERRORS.values().items():
+        errors_by_code[error_code] = errors_by_code.get(error_code, 0) + value
+
+    extractions_by_format = {}
+    for (file_format, status), value in EXTRACTIONS.values().items():
+        entry = extractions_by_format.setdefault(file_format, {'success': 0, 'failed': 0})
+        entry['success' if status == 'success' else 'failed'] += value
+
+    phases = {
+        phase_name: {
+            'count': count,
+            'average_seconds': round(total_sum / count, 4) if count else 0
+        }
+        for (phase_name,), (_counts, total_sum, count) in PHASE_LATENCY.values().items()
+    }
+
+    caches = {}
+    for (cache, result), value in CACHE_REQUESTS.values().items():
+        entry = caches.setdefault(cache, {'hits': 0, 'misses': 0})
+        entry['hits' if result == 'hit' else 'misses'] += value
+    for entry in caches.values():
+        lookups = entry['hits'] + entry['misses']
+        entry['hit_ratio'] = round(entry['hits'] / lookups, 4) if lookups else 0
+
+    compression = {}
+    compressed_out = COMPRESSED_RESPONSES_BYTES_OUT.values()
+    for (encoding,), (_counts, _total, count) in COMPRESSION_RATIO.values().items():
+        original = COMPRESSED_RESPONSES_BYTES_IN.values().get((encoding,), 0)
+        compressed = compressed_out.get((encoding,), 0)
+        compression[encoding] = {
+            'responses': count,
+            'bytes_in': original,
+            'bytes_out': compressed,
+            'ratio': round(original / compressed, 2) if compressed else 0
+        }
+
+    return {
+        'uptime_seconds': round(uptime_seconds(), 1),
+        'requests': {
+            'total': sum(requests_by_endpoint.values()),
+            'in_flight': HTTP_IN_FLIGHT.values().get((), 0),
+            'by_endpoint': requests_by_endpoint
+        },
+        'errors': errors_by_code,
+        'extractions': extractions_by_format,
+        'phases': phases,
+        'bytes': {
+            'received': sum(BYTES_RECEIVED.values().values()),
+            'sent': sum(BYTES_SENT.values().values())
+        },
+        'caches': caches,
+        'compression': compression
+    }
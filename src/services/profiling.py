@@ -0,0 +1,214 @@
+import os
+import hmac
+import time
+import uuid
+import pstats
+import signal
+import logging
+import tempfile
+import cProfile
+import threading
+import tracemalloc
+from collections import Counter
+
+logger = logging.getLogger(__name__)
+
+# Modos de profiling aceitos: determinístico (cProfile) ou por amostragem de pilhas
+PROFILE_MODES = ('cprofile', 'sample')
+
+# Chaves autorizadas a pedir profiling (variável PROFILING_KEYS, separadas por vírgula)
+PROFILING_KEYS_ENV = 'PROFILING_KEYS'
+
+# Diretório onde os perfis (.pstats / .collapsed) são gravados
+PROFILE_DIR = os.environ.get('PROFILE_DIR', os.path.join(tempfile.gettempdir(), 'extractor-profiles'))
+
+# Intervalo de amostragem (segundos de CPU) do modo 'sample'
+SAMPLE_INTERVAL = 0.005
+
+# Quantidade de entradas retornadas na resposta
+TOP_ENTRIES = 25
+
+# Profiling e tracemalloc deixam a extração mais lenta e pesada
+PROFILING_BUDGET_FACTOR = 2
+
+
+def requested_mode(value):
+    """
+    Normaliza o modo pedido (header X-Profile ou parâmetro profile)
+
+    Returns:
+        'cprofile', 'sample' ou None se o profiling não foi pedido
+
+    Raises:
+        ValueError: Se o modo não for reconhecido
+    """
+    if value is None or str(value).strip() == '':
+        return None
+    mode = str(value).strip().lower()
+    if mode in ('1', 'true', 'on', 'yes', 'sim'):
+        return 'cprofile'
+    if mode not in PROFILE_MODES:
+        raise ValueError(f"Modo de profiling inválido: {value}. Use {', '.join(PROFILE_MODES)}")
+    return mode
+
+
+def is_authorized(key):
+    """Verifica se a chave está na lista de chaves autorizadas (comparação em tempo constante)"""
+    if not key:
+        return False
+    allowed_keys = [k.strip() for k in os.environ.get(PROFILING_KEYS_ENV, '').split(',') if k.strip()]
+    return any(hmac.compare_digest(key.encode(), allowed.encode()) for allowed in allowed_keys)
+
+
+def profiling_budget(budget):
+    """Orçamento do governador ampliado para cobrir o custo do profiler"""
+    return {name: value * PROFILING_BUDGET_FACTOR for name, value in budget.items()}
+
+
+class StackSampler:
+    """Profiler por amostragem: coleta a pilha Python a cada SIGPROF (tempo de CPU)"""
+
+    def __init__(self, stop_code, interval=SAMPLE_INTERVAL):
+        self.stop_code = stop_code
+        self.interval = interval
+        self.counts = Counter()
+        self._previous_handler = None
+
+    def _sample(self, signum, frame):
+        stack = []
+        while frame is not None and frame.f_code is not self.stop_code:
+            code = frame.f_code
+            stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+            frame = frame.f_back
+        if stack:
+            self.counts[';'.join(reversed(stack))] += 1
+
+    def start(self):
+        self._previous_handler = signal.signal(signal.SIGPROF, self._sample)
+        signal.setitimer(signal.ITIMER_PROF, self.interval, self.interval)
+
+    def stop(self):
+        signal.setitimer(signal.ITIMER_PROF, 0, 0)
+        signal.signal(signal.SIGPROF, self._previous_handler or signal.SIG_DFL)
+
+    def collapsed(self):
+        """Pilhas no formato 'collapsed' (flamegraph.pl / speedscope)"""
+        return '\n'.join(f"{stack} {count}" for stack, count in self.counts.most_common()) + '\n'
+
+
+def _top_functions(profiler):
+    stats = pstats.Stats(profiler)
+    entries = []
+    for (filename, line, function), (calls, _primitive, tottime, cumtime, _callers) in stats.stats.items():
+        entries.append({
+            'function': function,
+            'file': filename,
+            'line': line,
+            'calls': calls,
+            'tottime_ms': round(tottime * 1000, 3),
+            'cumtime_ms': round(cumtime * 1000, 3)
+        })
+    entries.sort(key=lambda entry: entry['cumtime_ms'], reverse=True)
+    return entries[:TOP_ENTRIES]
+
+
+def _top_allocations(snapshot):
+    snapshot = snapshot.filter_traces((
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+        tracemalloc.Filter(False, __file__)
+    ))
+    return [
+        {
+            'location': f"{stat.traceback[0].filename}:{stat.traceback[0].lineno}",
+            'size_bytes': stat.size,
+            'count': stat.count
+        }
+        for stat in snapshot.statistics('lineno')[:TOP_ENTRIES]
+    ]
+
+
+def _write_profile(profile_id, suffix, writer):
+    """Grava um artefato do perfil em PROFILE_DIR; retorna o caminho ou None"""
+    try:
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        path = os.path.join(PROFILE_DIR, f"{profile_id}.{suffix}")
+        writer(path)
+        return path
+    except OSError as write_error:
+        logger.warning(f"Não foi possível gravar o perfil {profile_id}.{suffix}: {write_error}")
+        return None
+
+
+def profile_call(func, args, kwargs, mode='cprofile', label='extraction'):
+    """
+    Executa func(*args, **kwargs) sob o profiler pedido e o tracemalloc
+
+    O perfil completo é gravado em PROFILE_DIR (.pstats para cProfile,
+    .collapsed para amostragem) e um resumo acompanha o resultado.
+    tracemalloc enxerga apenas alocações feitas pelo Python, não as de
+    bibliotecas nativas como o MuPDF.
+
+    Returns:
+        Tupla (resultado, relatório do perfil)
+    """
+    if mode == 'sample' and threading.current_thread() is not threading.main_thread():
+        # SIGPROF só pode ser tratado na thread principal (ex.: sandbox desabilitado)
+        logger.info("Profiling por amostragem indisponível fora da thread principal; usando cProfile")
+        mode = 'cprofile'
+
+    profile_id = f"{time.strftime('%Y%m%d-%H%M%S')}-{label}-{uuid.uuid4().hex[:8]}"
+    profiler = cProfile.Profile() if mode == 'cprofile' else None
+    sampler = StackSampler(profile_call.__code__) if mode == 'sample' else None
+
+    tracemalloc_was_tracing = tracemalloc.is_tracing()
+    if not tracemalloc_was_tracing:
+        tracemalloc.start()
+    tracemalloc.reset_peak()
+
+    start = time.perf_counter()
+    if profiler is not None:
+        profiler.enable()
+    else:
+        sampler.start()
+    try:
+        result = func(*args, **kwargs)
+    finally:
+        if profiler is not None:
+            profiler.disable()
+        else:
+            sampler.stop()
+        duration = time.perf_counter() - start
+        current_memory, peak_memory = tracemalloc.get_traced_memory()
+        snapshot = tracemalloc.take_snapshot()
+        if not tracemalloc_was_tracing:
+            tracemalloc.stop()
+
+    report = {
+        'profile_id': profile_id,
+        'mode': mode,
+        'duration_ms': round(duration * 1000, 3),
+        'memory': {
+            'python_current_bytes': current_memory,
+            'python_peak_bytes': peak_memory,
+            'top_allocations': _top_allocations(snapshot)
+        }
+    }
+
+    if profiler is not None:
+        report['top_functions'] = _top_functions(profiler)
+        report['file'] = _write_profile(profile_id, 'pstats', profiler.dump_stats)
+    else:
+        collapsed = sampler.collapsed()
+        report['samples'] = sum(sampler.counts.values())
+        report['top_stacks'] = [
+            {'stack': stack, 'samples': count} for stack, count in sampler.counts.most_common(TOP_ENTRIES)
+        ]
+
+        def write_collapsed(path):
+            with open(path, 'w', encoding='utf-8') as collapsed_file:
+                collapsed_file.write(collapsed)
+
+        report['file'] = _write_profile(profile_id, 'collapsed', write_collapsed)
+
+    return result, report
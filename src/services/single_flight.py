@@ -0,0 +1,180 @@
+import os
+import time
+import logging
+import tempfile
+
+from src.services import json_provider, metrics, timing
+from src.services.disk_cache import ensure_private_directory
+
+try:
+    import fcntl
+except ImportError:  # Windows: sem trava entre processos, cada requisição extrai por conta própria
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# Extrações idênticas simultâneas (mesmo conteúdo e opções) rodam uma única vez
+SINGLE_FLIGHT_ENABLED = os.environ.get('SINGLE_FLIGHT', '1') != '0' and fcntl is not None
+
+# Diretório local das travas e resultados, compartilhado pelos processos do host
+SINGLE_FLIGHT_DIR = os.environ.get('SINGLE_FLIGHT_DIR', os.path.join(tempfile.gettempdir(), 'extractor-inflight'))
+
+# Por quanto tempo um resultado fica disponível para quem esperava por ele
+RESULT_TTL_SECONDS = 60
+
+# Intervalo máximo entre tentativas de obter a trava enquanto espera
+POLL_MAX_INTERVAL = 0.1
+
+
+def _sweep(now):
+    """
+    Remove resultados, marcadores e travas antigos (chamado por quem executa a extração)
+
+    Uma trava ainda em uso não é removida: quem chegasse depois criaria um
+    novo arquivo, obteria a trava na hora e repetiria a extração em andamento.
+    """
+    try:
+        entries = list(os.scandir(SINGLE_FLIGHT_DIR))
+    except FileNotFoundError:
+        return
+    for entry in entries:
+        try:
+            if now - entry.stat().st_mtime <= RESULT_TTL_SECONDS:
+                continue
+            if entry.name.endswith('.lock'):
+                _unlink_idle_lock(entry.path)
+            else:
+                os.unlink(entry.path)
+        except FileNotFoundError:
+            pass
+
+
+def _unlink_idle_lock(path):
+    """Remove o arquivo de trava se ninguém a detém (a trava é mantida durante a remoção)"""
+    with open(path, 'a+') as lock_file:
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            return
+        os.unlink(path)
+
+
+def _is_current(lock_file, path):
+    """True se o arquivo aberto ainda é o do caminho (não foi removido pela limpeza)"""
+    try:
+        return os.fstat(lock_file.fileno()).st_ino == os.stat(path).st_ino
+    except FileNotFoundError:
+        return False
+
+
+def _touch(path):
+    """Cria o arquivo ou atualiza o mtime dele"""
+    with open(path, 'a'):
+        os.utime(path)
+
+
+def _read_result(path, since):
+    """Resultado gravado depois de `since` (isto é, por uma execução que a espera acompanhou)"""
+    try:
+        if os.stat(path).st_mtime < since:
+            return None
+        with open(path, 'rb') as result_file:
+            return json_provider.decode(result_file.read())
+    except (OSError, ValueError):
+        return None
+
+
+def _write_result(path, result):
+    """Grava o resultado em JSON (nunca pickle: ler o arquivo não pode executar código)"""
+    data = json_provider.encode(result)
+    handle, temp_path = tempfile.mkstemp(dir=SINGLE_FLIGHT_DIR, suffix='.tmp')
+    try:
+        with os.fdopen(handle, 'wb') as temp_file:
+            temp_file.write(data)
+        os.replace(temp_path, path)
+    except Exception:
+        try:
+            os.unlink(temp_path)
+        except FileNotFoundError:
+            pass
+        raise
+
+
+def run(key, func, timeout, label='extraction'):
+    """
+    Executa func() uma única vez por chave entre as chamadas simultâneas do host
+
+    Quem obtém a trava da chave executa; quem chega enquanto isso deixa um
+    marcador de espera e aguarda a trava ser liberada para ler o resultado.
+    O resultado só é gravado em disco se houver marcador, então uma extração
+    sem concorrentes não paga a serialização. Se a execução falhar, nada é
+    gravado e o próximo da fila executa por conta própria. Se a espera passar
+    de `timeout` segundos, a chamada executa func() sem esperar.
+
+    Returns:
+        Resultado de func() (de uma cópia, para quem esperou)
+    """
+    if not SINGLE_FLIGHT_ENABLED:
+        return func()
+
+    lock_path = os.path.join(SINGLE_FLIGHT_DIR, f'{key}.lock')
+    try:
+        ensure_private_directory(SINGLE_FLIGHT_DIR)
+        lock_file = open(lock_path, 'a+')
+    except OSError as lock_error:
+        logger.warning(f"Single-flight indisponível: {lock_error}")
+        return func()
+
+    result_path = os.path.join(SINGLE_FLIGHT_DIR, f'{key}.result')
+    waiting_path = os.path.join(SINGLE_FLIGHT_DIR, f'{key}.waiting')
+    waiting_since = time.time()
+    deadline = time.monotonic() + timeout
+    waited = False
+
+    try:
+        interval = 0.005
+        while True:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                if _is_current(lock_file, lock_path):
+                    break
+                # A limpeza removeu o arquivo entre o open e o flock: usar o arquivo atual
+                lock_file.close()
+                lock_file = open(lock_path, 'a+')
+                continue
+            except BlockingIOError:
+                if not waited:
+                    waited = True
+                    logger.info(f"Extração idêntica em andamento ({label}); aguardando o resultado")
+                    try:
+                        _touch(waiting_path)
+                    except OSError as marker_error:
+                        logger.warning(f"Não foi possível sinalizar a espera pelo resultado: {marker_error}")
+                if time.monotonic() >= deadline:
+                    logger.warning(f"Espera pela extração idêntica excedeu {timeout}s; extraindo em paralelo")
+                    metrics.record_cache('single_flight', False)
+                    return func()
+                with timing.span('single_flight_wait'):
+                    time.sleep(interval)
+                interval = min(interval * 2, POLL_MAX_INTERVAL)
+
+        if waited:
+            shared = _read_result(result_path, waiting_since)
+            if shared is not None:
+                metrics.record_cache('single_flight', True)
+                return shared
+
+        # Trava recém-obtida com mtime atual, para a limpeza não tomá-la por abandonada
+        os.utime(lock_file.fileno())
+        metrics.record_cache('single_flight', False)
+        result = func()
+        if os.path.exists(waiting_path):
+            try:
+                os.unlink(waiting_path)
+                _write_result(result_path, result)
+            except (OSError, TypeError, ValueError) as write_error:
+                logger.warning(f"Não foi possível compartilhar o resultado da extração: {write_error}")
+        _sweep(time.time())
+        return result
+    finally:
+        lock_file.close()
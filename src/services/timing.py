@@ -0,0 +1,102 @@
+import time
+import functools
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+# Span ativo no contexto atual; None quando a requisição não pediu timings
+_current_span = ContextVar('timing_current_span', default=None)
+
+
+class Span:
+    """Trecho cronometrado do processamento, com sub-trechos aninhados"""
+
+    def __init__(self, name, **attributes):
+        self.name = name
+        self.attributes = attributes
+        self.children = []
+        self.start = time.perf_counter()
+        self.duration = None
+
+    def finish(self):
+        if self.duration is None:
+            self.duration = time.perf_counter() - self.start
+        return self
+
+    def to_dict(self):
+        """Representação JSON: nome, duração em ms, atributos e filhos"""
+        duration = self.duration if self.duration is not None else time.perf_counter() - self.start
+        data = {'name': self.name, 'ms': round(duration * 1000, 3)}
+        data.update(self.attributes)
+        if self.children:
+            data['children'] = [child.to_dict() for child in self.children]
+        return data
+
+
+def is_active():
+    """Indica se há um trace coletando spans no contexto atual"""
+    return _current_span.get() is not None
+
+
+def current_span():
+    return _current_span.get()
+
+
+def start_trace(name='request'):
+    """
+    Inicia um trace no contexto atual
+
+    Returns:
+        Tupla (span raiz, token) - o token deve ser passado para end_trace()
+    """
+    root = Span(name)
+    return root, _current_span.set(root)
+
+
+def end_trace(token):
+    """Encerra o trace iniciado por start_trace() e restaura o contexto anterior"""
+    root = _current_span.get()
+    _current_span.reset(token)
+    if root is not None:
+        root.finish()
+    return root
+
+
+@contextmanager
+def span(name, **attributes):
+    """
+    Cronometra um bloco como filho do span atual
+
+    Sem trace ativo não cria nada e devolve None, então pode ficar no caminho
+    quente dos extratores sem custo relevante.
+    """
+    parent = _current_span.get()
+    if parent is None:
+        yield None
+        return
+
+    child = Span(name, **attributes)
+    parent.children.append(child)
+    token = _current_span.set(child)
+    try:
+        yield child
+    finally:
+        child.finish()
+        _current_span.reset(token)
+
+
+def timed(name):
+    """Decorator equivalente a span() para funções inteiras"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def attach(child):
+    """Anexa ao span atual um span concluído em outro lugar (ex.: worker do governador)"""
+    parent = _current_span.get()
+    if parent is not None and child is not None:
+        parent.children.append(child)
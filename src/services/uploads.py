@@ -0,0 +1,311 @@
+import io
+import os
+import logging
+import tempfile
+
+from flask import Request, current_app
+
+from src.engines.txt_engine import BOM_ENCODINGS
+
+logger = logging.getLogger(__name__)
+
+# Diretório onde os uploads são gravados durante o recebimento (padrão: temporário do sistema)
+UPLOAD_SPOOL_DIR = os.environ.get('UPLOAD_SPOOL_DIR') or None
+
+# Bytes iniciais inspecionados para identificar o conteúdo
+SNIFF_BYTES = 1024
+
+# Tamanho dos blocos copiados de streams (corpo binário, membros de arquivos compactados)
+COPY_CHUNK_SIZE = 256 * 1024
+
+# Assinaturas (magic bytes) aceitas por extensão
+OLE_SIGNATURE = b'\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1'
+ZIP_SIGNATURES = (b'PK\x03\x04', b'PK\x05\x06')
+
+MAGIC_SIGNATURES = {
+    'docx': ZIP_SIGNATURES,
+    'pptx': ZIP_SIGNATURES,
+    'xlsx': ZIP_SIGNATURES,
+    'doc': (OLE_SIGNATURE,),
+    'xls': (OLE_SIGNATURE,),
+    'png': (b'\x89PNG\r\n\x1a\n',),
+    'jpg': (b'\xff\xd8\xff',),
+    'jpeg': (b'\xff\xd8\xff',),
+    'bmp': (b'BM',),
+    'tiff': (b'II*\x00', b'MM\x00*'),
+    'rtf': (b'{\\rtf',),
+    'zip': ZIP_SIGNATURES,
+    'gz': (b'\x1f\x8b',),
+    'tgz': (b'\x1f\x8b',)
+}
+
+# Formatos de texto: sem assinatura, mas não podem conter bytes nulos (exceto UTF-16/32 com BOM)
+TEXT_EXTENSIONS = ('txt', 'csv')
+
+
+class UploadRejected(Exception):
+    """Upload recusado durante o recebimento (tipo, conteúdo ou tamanho)"""
+
+    STATUS = {
+        'UNSUPPORTED_TYPE': 400,
+        'CONTENT_MISMATCH': 400,
+        'FILE_TOO_LARGE': 413
+    }
+
+    def __init__(self, error_code, message, filename=None, max_size=None):
+        self.error_code = error_code
+        self.filename = filename
+        self.max_size = max_size
+        self.status = self.STATUS.get(error_code, 400)
+        super().__init__(message)
+
+
+def sniff_content(extension, head, complete=False):
+    """
+    Confere os bytes iniciais de um arquivo com a extensão declarada
+
+    Args:
+        extension: Extensão declarada (sem ponto)
+        head: Primeiros bytes recebidos
+        complete: True se head já contém o arquivo inteiro
+
+    Returns:
+        True/False, ou None enquanto não houver bytes suficientes para decidir
+    """
+    if extension == 'pdf':
+        # A especificação tolera lixo antes do cabeçalho dentro do primeiro KB
+        if b'%PDF-' in head[:SNIFF_BYTES]:
+            return True
+        return False if complete or len(head) >= SNIFF_BYTES else None
+
+    if extension in TEXT_EXTENSIONS:
+        if any(head.startswith(bom) for bom, _ in BOM_ENCODINGS):
+            return True
+        if b'\x00' in head[:SNIFF_BYTES]:
+            return False
+        return True if complete or len(head) >= SNIFF_BYTES else None
+
+    signatures = MAGIC_SIGNATURES.get(extension)
+    if not signatures:
+        return True
+    if any(head.startswith(signature) for signature in signatures):
+        return True
+    if complete or len(head) >= max(len(signature) for signature in signatures):
+        return False
+    return None
+
+
+def file_extension_of(filename):
+    if not filename or '.' not in filename:
+        return None
+    return filename.rsplit('.', 1)[1].lower()
+
+
+class UploadSpool:
+    """
+    Destino de um arquivo de upload multipart, gravado direto em disco
+
+    Conta os bytes e confere os magic bytes à medida que os blocos chegam.
+    Em modo estrito a primeira violação interrompe o parse do corpo com
+    UploadRejected; caso contrário o restante do arquivo é descartado e a
+    recusa fica em `rejection` para a view reportar por item.
+    """
+
+    def __init__(self, filename, max_size=None, allowed_extensions=None, strict=True):
+        self.filename = filename
+        self.extension = file_extension_of(filename)
+        self.max_size = max_size
+        self.strict = strict
+        self.size = 0
+        self.rejection = None
+        self._head = b''
+        self._sniffed = False
+        self._finished = False
+
+        if allowed_extensions is not None and self.extension not in allowed_extensions:
+            # Nada é gravado em disco para tipos não suportados
+            self.path = None
+            self._file = io.BytesIO()
+            self.rejection = UploadRejected('UNSUPPORTED_TYPE', 'Tipo de arquivo não suportado', filename=filename)
+            return
+
+        suffix = f'.{self.extension}' if self.extension else ''
+        handle, self.path = tempfile.mkstemp(suffix=suffix, prefix='upload-', dir=UPLOAD_SPOOL_DIR)
+        self._file = os.fdopen(handle, 'w+b')
+
+    def _reject(self, error_code, message, **extra):
+        if self.rejection is not None:
+            return
+        self.rejection = UploadRejected(error_code, message, filename=self.filename, **extra)
+        # Libera o que já foi gravado; os próximos blocos são descartados
+        self._file.truncate(0)
+        logger.info(f"Upload recusado durante o recebimento: {self.filename} ({error_code})")
+        if self.strict:
+            raise self.rejection
+
+    def _sniff(self, complete=False):
+        verdict = sniff_content(self.extension, self._head, complete=complete)
+        if verdict is None:
+            return
+        self._sniffed = True
+        self._head = b''
+        if verdict is False:
+            self._reject('CONTENT_MISMATCH', f'Conteúdo do arquivo não corresponde ao tipo {self.extension}')
+
+    def write(self, data):
+        if self.rejection is not None:
+            return len(data)
+
+        self.size += len(data)
+        if self.max_size is not None and self.size > self.max_size:
+            self._reject(
+                'FILE_TOO_LARGE',
+                f'Arquivo muito grande. Tamanho máximo: {self.max_size // (1024*1024)}MB',
+                max_size=self.max_size
+            )
+            return len(data)
+
+        if not self._sniffed:
+            self._head += data[:SNIFF_BYTES]
+            self._sniff()
+            if self.rejection is not None:
+                return len(data)
+
+        return self._file.write(data)
+
+    def seek(self, offset, whence=0):
+        # O parser do Werkzeug chama seek(0) ao fim de cada arquivo: último ponto para decidir arquivos curtos
+        if not self._finished:
+            self._finished = True
+            if not self._sniffed and self.rejection is None:
+                self._sniff(complete=True)
+            self._file.flush()
+        return self._file.seek(offset, whence)
+
+    def __getattr__(self, attribute):
+        if attribute == '_file':
+            raise AttributeError(attribute)
+        return getattr(self._file, attribute)
+
+    def __iter__(self):
+        return iter(self._file)
+
+    def discard(self):
+        """Fecha e remove o arquivo em disco"""
+        self._file.close()
+        if self.path is not None:
+            try:
+                os.unlink(self.path)
+            except FileNotFoundError:
+                pass
+
+
+def open_spool(filename, strict=True, allowed_extensions=None, max_size=None):
+    """
+    UploadSpool com os limites configurados no app (UPLOAD_SIZE_LIMITS e UPLOAD_ALLOWED_EXTENSIONS)
+
+    allowed_extensions e max_size substituem a configuração (ver accept_uploads).
+    """
+    config = current_app.config
+    limits = config.get('UPLOAD_SIZE_LIMITS') or {}
+    extension = file_extension_of(filename)
+    return UploadSpool(
+        filename,
+        max_size=max_size or limits.get(extension, limits.get('default')),
+        allowed_extensions=allowed_extensions or config.get('UPLOAD_ALLOWED_EXTENSIONS'),
+        strict=strict
+    )
+
+
+def spool_from_stream(filename, stream, chunk_size=COPY_CHUNK_SIZE):
+    """
+    Grava um stream em disco bloco a bloco, aplicando os limites durante a cópia
+
+    A leitura para na primeira violação: o restante do stream não é consumido.
+    O chamador confere `rejection` e deve chamar discard() ao terminar.
+    """
+    spool = open_spool(filename, strict=False)
+    try:
+        while spool.rejection is None:
+            chunk = stream.read(chunk_size)
+            if not chunk:
+                break
+            spool.write(chunk)
+        spool.seek(0)
+    except Exception:
+        spool.discard()
+        raise
+    return spool
+
+
+def collect_upload_errors(view):
+    """
+    Marca uma view de lote: uploads recusados não interrompem o parse do corpo
+
+    Cada arquivo recusado fica com `rejection` preenchido (ver upload_rejection).
+    """
+    view.collects_upload_errors = True
+    return view
+
+
+def accept_uploads(extensions, max_size):
+    """
+    Marca uma view que recebe tipos próprios via multipart (ex.: arquivos compactados)
+
+    Os arquivos dessa view são validados contra `extensions` e `max_size` em
+    vez de UPLOAD_ALLOWED_EXTENSIONS e UPLOAD_SIZE_LIMITS.
+    """
+    def decorator(view):
+        view.upload_extensions = frozenset(extensions)
+        view.upload_max_size = max_size
+        return view
+    return decorator
+
+
+def upload_rejection(file_storage):
+    """Recusa registrada durante o upload de um FileStorage, ou None"""
+    return getattr(file_storage.stream, 'rejection', None)
+
+
+def spooled_path(file_storage):
+    """Caminho em disco de um upload já gravado por UploadSpool, ou None"""
+    stream = file_storage.stream
+    return stream.path if isinstance(stream, UploadSpool) else None
+
+
+class StreamingRequest(Request):
+    """
+    Request que grava cada arquivo multipart direto no destino final
+
+    Os limites vêm de app.config: UPLOAD_SIZE_LIMITS ({extensão: bytes, 'default': bytes})
+    e UPLOAD_ALLOWED_EXTENSIONS. Os arquivos gravados são removidos ao fim da requisição.
+    """
+
+    def _view_attribute(self, name, default=None):
+        view = current_app.view_functions.get(self.endpoint) if self.endpoint else None
+        return getattr(view, name, default)
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        if not filename:
+            # Campo de arquivo vazio: sem extensão nem conteúdo para validar
+            return super()._get_file_stream(total_content_length, content_type, filename, content_length)
+
+        spool = open_spool(
+            filename,
+            strict=not self._view_attribute('collects_upload_errors', False),
+            allowed_extensions=self._view_attribute('upload_extensions'),
+            max_size=self._view_attribute('upload_max_size')
+        )
+        if not hasattr(self, '_upload_spools'):
+            self._upload_spools = []
+        self._upload_spools.append(spool)
+        if spool.strict and spool.rejection is not None:
+            raise spool.rejection
+        return spool
+
+    def close(self):
+        try:
+            super().close()
+        finally:
+            for spool in getattr(self, '_upload_spools', ()):
+                spool.discard()
@@ -0,0 +1,37 @@
+import os
+import sys
+
+import pytest
+from flask import Flask
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.models.user import db
+from src.routes.extractor import extractor_bp
+from src.routes.user import user_bp
+from src.services.json_provider import FastJSONProvider
+from src.services.uploads import StreamingRequest
+
+
+@pytest.fixture
+def app(tmp_path):
+    """App com os mesmos blueprints do main.py, mas com banco SQLite temporário"""
+    app = Flask(__name__)
+    app.json = FastJSONProvider(app)
+    app.request_class = StreamingRequest
+    app.config.update(
+        TESTING=True,
+        SQLALCHEMY_DATABASE_URI=f"sqlite:///{tmp_path / 'app.db'}",
+        SQLALCHEMY_TRACK_MODIFICATIONS=False
+    )
+    app.register_blueprint(user_bp, url_prefix='/api')
+    app.register_blueprint(extractor_bp, url_prefix='/api')
+    db.init_app(app)
+    with app.app_context():
+        db.create_all()
+    return app
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
@@ -0,0 +1,223 @@
+import pymupdf
+import pytest
+
+from src.engines.probe import scan_pdf
+from src.services import admission
+from src.services.admission import AdmissionController, AdmissionRejected, Lane, _Ticket
+from src.services.api_keys import Tenant
+
+
+def write_pdf(tmp_path, doc, **save_options):
+    path = tmp_path / 'documento.pdf'
+    with doc:
+        path.write_bytes(doc.tobytes(**save_options))
+    return str(path)
+
+
+def text_pdf(pages):
+    doc = pymupdf.open()
+    for number in range(pages):
+        doc.new_page().insert_text((72, 72), f'Página {number + 1}')
+    return doc
+
+
+def scanned_pdf(pages, image_rect=(0, 0, 595, 842)):
+    pixmap = pymupdf.Pixmap(pymupdf.csRGB, pymupdf.IRect(0, 0, 50, 50), False)
+    pixmap.clear_with(255)
+    image = pixmap.tobytes('png')
+    doc = pymupdf.open()
+    for _ in range(pages):
+        doc.new_page().insert_image(pymupdf.Rect(image_rect), stream=image)
+    return doc
+
+
+def forbid_mupdf(monkeypatch):
+    """Falha se alguém abrir o PDF com o MuPDF no processo do servidor"""
+    def forbidden(*args, **kwargs):
+        raise AssertionError('pymupdf.open chamado no processo do servidor')
+    monkeypatch.setattr(pymupdf, 'open', forbidden)
+
+
+@pytest.mark.parametrize('save_options', [{}, {'garbage': 4, 'deflate': True, 'use_objstms': True}])
+def test_scan_counts_pages_without_mupdf(tmp_path, save_options):
+    text = scan_pdf(write_pdf(tmp_path, text_pdf(7), **save_options))
+    assert (text['page_count'], text['scanned_pages']) == (7, 0)
+
+    scanned = scan_pdf(write_pdf(tmp_path, scanned_pdf(3), **save_options))
+    assert (scanned['page_count'], scanned['scanned_pages']) == (3, 3)
+
+
+def test_unreadable_pdf_has_no_page_count(tmp_path):
+    path = tmp_path / 'documento.pdf'
+    path.write_bytes(b'')
+    assert admission.page_count('pdf', str(path)) is None
+    path.write_bytes(b'isto n\xe3o \xe9 um PDF')
+    assert admission.page_count('pdf', str(path)) is None
+
+
+def test_admission_cost_includes_ocr_pages(tmp_path, monkeypatch):
+    path = write_pdf(tmp_path, scanned_pdf(4))
+    forbid_mupdf(monkeypatch)
+    without_ocr = admission.estimate_file_cost('pdf', path)
+    with_ocr = admission.estimate_file_cost('pdf', path, ocr=True)
+    assert with_ocr == pytest.approx(without_ocr + 4 * admission.OCR_PAGE_COST)
+    # Um PDF escaneado de várias páginas não cabe na faixa interativa
+    assert admission.ADMISSION.lane_for(with_ocr).name == 'batch'
+    assert admission.ADMISSION.lane_for(without_ocr).name == 'interactive'
+
+
+def test_admitted_uses_the_ocr_aware_cost(tmp_path, monkeypatch):
+    admitted_costs = []
+    original_admit = admission.ADMISSION.admit
+
+    def admit(cost, **kwargs):
+        admitted_costs.append(cost)
+        return original_admit(cost, **kwargs)
+
+    monkeypatch.setattr(admission, 'ADMISSION_ENABLED', True)
+    monkeypatch.setattr(admission.ADMISSION, 'admit', admit)
+    path = write_pdf(tmp_path, scanned_pdf(2))
+    forbid_mupdf(monkeypatch)
+    with admission.admitted('pdf', path, ocr=True) as lane:
+        assert lane.name == 'batch'
+    assert admitted_costs == [admission.estimate_file_cost('pdf', path, ocr=True)]
+
+
+def test_probe_reports_the_admission_cost_and_lane(client, tmp_path, monkeypatch):
+    from src.engines import ocr_engine
+    monkeypatch.setattr(ocr_engine, 'is_available', lambda: True)
+    # Imagens pequenas: o probe do MuPDF não vê a página como escaneada, mas a admissão cobra o OCR
+    path = write_pdf(tmp_path, scanned_pdf(3, image_rect=(0, 0, 200, 200)))
+    with open(path, 'rb') as source:
+        response = client.post('/api/probe', data={'file': (source, 'documento.pdf')})
+    assert response.status_code == 200
+
+    data = response.get_json()['data']
+    admission_cost = admission.estimate_file_cost('pdf', path, ocr=True)
+    assert data['estimated_cost'] == round(admission_cost, 3)
+    assert data['lane'] == admission.ADMISSION.lane_for(admission_cost).name == 'batch'
+
+
+class FakeClock:
+    """Relógio do escalonador controlado pelo teste"""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(admission, 'time', fake)
+    return fake
+
+
+def make_lane(name='batch', workers=2, queue_max=4, queue_timeout=0.0):
+    return Lane(name, capacity=10, workers=workers, queue_max=queue_max, queue_timeout=queue_timeout)
+
+
+def make_controller(aging_rate=0.5, **lane_options):
+    return AdmissionController(
+        [make_lane('interactive', **lane_options), make_lane('batch', **lane_options)],
+        interactive_max_cost=1.0, aging_rate=aging_rate
+    )
+
+
+def enqueue(lane, cost, tenant=admission.ANONYMOUS_TENANT, aging_rate=0.5):
+    ticket = _Ticket(cost, tenant, aging_rate)
+    lane.queue.append(ticket)
+    return ticket
+
+
+def test_lane_selection_by_cost_and_origin():
+    controller = make_controller()
+    assert controller.lane_for(0.5).name == 'interactive'
+    assert controller.lane_for(1.0).name == 'interactive'
+    assert controller.lane_for(1.01).name == 'batch'
+    assert controller.lane_for(0.1, batch=True).name == 'batch'
+
+
+def test_shortest_job_first_within_a_tenant(clock):
+    lane = make_lane()
+    enqueue(lane, 5)
+    cheapest = enqueue(lane, 1)
+    enqueue(lane, 3)
+    assert lane.next_ticket(lambda tenant: True) is cheapest
+
+
+def test_aging_lets_an_old_expensive_job_overtake_newer_cheap_ones(clock):
+    lane = make_lane()
+    expensive = enqueue(lane, 5)
+
+    # Pouco depois, a barata ainda passa na frente
+    clock.now += 2
+    cheap = enqueue(lane, 1)
+    assert lane.next_ticket(lambda tenant: True) is cheap
+
+    # Depois de esperar o bastante (0.5 de custo por segundo), a cara vai primeiro
+    lane.queue.remove(cheap)
+    clock.now += 20
+    newer_cheap = enqueue(lane, 1)
+    assert expensive.priority < newer_cheap.priority
+    assert lane.next_ticket(lambda tenant: True) is expensive
+
+
+def test_tenants_at_their_quota_are_skipped(clock):
+    lane = make_lane()
+    limited = Tenant(1, 'limitada', max_concurrency=1)
+    other = Tenant(2, 'outra')
+    enqueue(lane, 1, limited)
+    other_ticket = enqueue(lane, 4, other)
+    assert lane.next_ticket(lambda tenant: tenant is not limited) is other_ticket
+    assert lane.next_ticket(lambda tenant: False) is None
+
+
+def test_fair_queueing_prefers_the_tenant_with_less_service(clock):
+    lane = make_lane()
+    busy = Tenant(1, 'ocupada')
+    idle = Tenant(2, 'ociosa')
+    lane.charge(busy, 3)
+    enqueue(lane, 1, busy)
+    idle_ticket = enqueue(lane, 4, idle)
+    assert lane.next_ticket(lambda tenant: True) is idle_ticket
+
+
+def test_full_queue_is_rejected_with_retry_after(clock):
+    controller = make_controller(workers=1, queue_max=0)
+    lane = controller.lanes['interactive']
+    lane.average_seconds = 3
+    with controller.admit(0.5):
+        with pytest.raises(AdmissionRejected) as rejected:
+            with controller.admit(0.5):
+                pass
+    assert rejected.value.reason == 'queue_full'
+    # Fila vazia: a estimativa é a duração média das extrações
+    assert rejected.value.retry_after == lane.retry_after() == 3
+    assert lane.queue == []
+
+
+def test_queue_timeout_is_rejected_with_retry_after(clock):
+    controller = make_controller(workers=1, queue_max=4, queue_timeout=0.0)
+    with controller.admit(0.5):
+        with pytest.raises(AdmissionRejected) as rejected:
+            with controller.admit(0.5):
+                pass
+    assert rejected.value.reason == 'timeout'
+    assert admission.RETRY_AFTER_MIN <= rejected.value.retry_after <= admission.RETRY_AFTER_MAX
+    # A espera recusada sai da fila e não reserva capacidade
+    assert controller.lanes['interactive'].queue == []
+    assert controller.lanes['interactive'].running == 0
+
+
+def test_rejection_is_a_429_with_retry_after(client, clock, monkeypatch):
+    controller = make_controller(workers=1, queue_max=0)
+    monkeypatch.setattr(admission, 'ADMISSION', controller)
+    monkeypatch.setattr(admission, 'ADMISSION_ENABLED', True)
+    with controller.admit(0.5):
+        response = client.post('/api/extract/raw?filename=a.txt', data=b'texto')
+    assert response.status_code == 429
+    assert response.get_json()['error_code'] == 'OVERLOADED'
+    assert response.headers['Retry-After'] == str(response.get_json()['retry_after'])
@@ -0,0 +1,132 @@
+import threading
+
+import pytest
+
+from src.models.user import ApiKey, db
+from src.services import api_keys
+from src.services.admission import AdmissionController, AdmissionRejected, Lane
+from src.services.api_keys import Tenant
+
+ADMIN = {'X-Admin-Key': 'admin-secret'}
+
+
+@pytest.fixture(autouse=True)
+def admin_keys(monkeypatch, tmp_path):
+    monkeypatch.setenv(api_keys.ADMIN_KEYS_ENV, 'admin-secret')
+    monkeypatch.setattr(api_keys, 'REVOCATION_STAMP', str(tmp_path / 'revoked'))
+
+
+@pytest.fixture
+def user_id(client):
+    response = client.post('/api/users', json={'username': 'ana', 'email': 'ana@example.com'})
+    return response.get_json()['user']['id']
+
+
+def create_key(client, user_id, **fields):
+    response = client.post(f'/api/users/{user_id}/api-keys', json={'name': 'equipe', **fields}, headers=ADMIN)
+    assert response.status_code == 201
+    return response.get_json()
+
+
+def extract(client, key=None):
+    headers = {'X-API-Key': key} if key else {}
+    return client.post('/api/extract/raw?filename=a.txt', data=b'texto', content_type='text/plain', headers=headers)
+
+
+@pytest.mark.parametrize('headers', [{}, {'X-Admin-Key': 'errada'}])
+def test_key_management_requires_admin_key(client, user_id, headers):
+    create = client.post(f'/api/users/{user_id}/api-keys', json={'name': 'x', 'max_concurrency': 0}, headers=headers)
+    assert create.status_code == 403
+    assert create.get_json()['error_code'] == 'ADMIN_FORBIDDEN'
+    assert client.get('/api/api-keys', headers=headers).status_code == 403
+    assert client.delete('/api/api-keys/1', headers=headers).status_code == 403
+
+
+def test_key_management_disabled_without_admin_keys(client, user_id, monkeypatch):
+    monkeypatch.delenv(api_keys.ADMIN_KEYS_ENV)
+    assert client.get('/api/api-keys', headers=ADMIN).status_code == 403
+
+
+def test_created_key_authenticates_and_can_be_revoked(client, user_id):
+    created = create_key(client, user_id, max_concurrency=1, weight=2)
+    assert created['api_key']['max_concurrency'] == 1
+
+    assert extract(client, created['key']).status_code == 200
+    assert extract(client).status_code == 200
+    assert extract(client, 'dx_inexistente').get_json()['error_code'] == 'INVALID_API_KEY'
+
+    listed = client.get('/api/api-keys', headers=ADMIN).get_json()
+    assert listed['api_keys'][0]['usage']['documents'] == 1
+
+    assert client.delete(f"/api/api-keys/{created['api_key']['id']}", headers=ADMIN).status_code == 200
+    assert extract(client, created['key']).status_code == 401
+
+
+def test_revocation_in_another_worker_clears_the_cache(app, client, user_id):
+    created = create_key(client, user_id)
+    with app.app_context():
+        assert api_keys.resolve(created['key']) is not None
+
+        # Outro worker revoga: grava no banco e toca o arquivo de revogação, sem acesso a este cache
+        ApiKey.query.filter_by(id=created['api_key']['id']).update({'active': False})
+        db.session.commit()
+        with open(api_keys.REVOCATION_STAMP, 'a'):
+            pass
+
+        assert api_keys.resolve(created['key']) is None
+
+
+def test_deleting_the_user_drops_its_cached_keys(client, user_id):
+    created = create_key(client, user_id)
+    assert extract(client, created['key']).status_code == 200
+
+    assert client.delete(f'/api/users/{user_id}').status_code == 200
+    assert extract(client, created['key']).status_code == 401
+
+
+def test_missing_user_or_key_is_not_found(client):
+    assert client.post('/api/users/999/api-keys', json={'name': 'equipe'}, headers=ADMIN).status_code == 404
+    assert client.delete('/api/api-keys/999', headers=ADMIN).status_code == 404
+    assert client.delete('/api/users/999').status_code == 404
+
+
+def make_controller(queue_timeout):
+    return AdmissionController([
+        Lane('interactive', capacity=10, workers=4, queue_max=10, queue_timeout=queue_timeout),
+        Lane('batch', capacity=10, workers=4, queue_max=10, queue_timeout=queue_timeout)
+    ], interactive_max_cost=5, aging_rate=0.0)
+
+
+def test_concurrency_quota_blocks_only_the_tenant_at_its_limit():
+    controller = make_controller(queue_timeout=0.2)
+    limited = Tenant(1, 'limitada', max_concurrency=1)
+    other = Tenant(2, 'outra', max_concurrency=1)
+
+    with controller.admit(1, tenant=limited):
+        with pytest.raises(AdmissionRejected):
+            with controller.admit(1, tenant=limited):
+                pass
+        with controller.admit(1, tenant=other):
+            assert controller.snapshot()['running_by_key'] == {'limitada': 1, 'outra': 1}
+
+
+def test_queued_extraction_runs_when_the_tenant_frees_a_slot():
+    controller = make_controller(queue_timeout=5)
+    tenant = Tenant(1, 'limitada', max_concurrency=1)
+    release = threading.Event()
+    admitted = threading.Event()
+
+    def hold():
+        with controller.admit(1, tenant=tenant):
+            admitted.set()
+            release.wait(5)
+
+    holder = threading.Thread(target=hold)
+    holder.start()
+    assert admitted.wait(5)
+
+    timer = threading.Timer(0.1, release.set)
+    timer.start()
+    with controller.admit(1, tenant=tenant):
+        assert release.is_set()
+    holder.join()
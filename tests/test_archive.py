@@ -0,0 +1,47 @@
+import io
+import json
+import zipfile
+
+from src.routes import extractor
+
+
+def make_zip(members):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w') as archive:
+        for name, content in members.items():
+            archive.writestr(name, content)
+    return buffer.getvalue()
+
+
+def ndjson(response):
+    return [json.loads(line) for line in response.get_data(as_text=True).splitlines() if line.strip()]
+
+
+def test_archive_from_url(client, monkeypatch):
+    payload = make_zip({'a.txt': 'primeiro arquivo', 'b.txt': 'segundo arquivo'})
+
+    def fake_download(url, max_size):
+        # Mesmo formato de download_file_from_url: conteúdo em BytesIO já lido até o fim
+        content = io.BytesIO()
+        content.write(payload)
+        return {'content': content, 'content_type': 'application/zip', 'filename': 'pacote.zip', 'size': len(payload)}
+
+    monkeypatch.setattr(extractor, 'download_file_from_url', fake_download)
+    response = client.post('/api/extract/archive', json={'url': 'https://example.com/pacote.zip'})
+
+    assert response.status_code == 200
+    lines = ndjson(response)
+    members = {line['filename']: line for line in lines if 'filename' in line}
+    assert set(members) == {'a.txt', 'b.txt'}
+    assert all(line['success'] for line in members.values())
+    assert lines[-1]['success']
+    assert lines[-1]['summary']['processed'] == 2
+
+
+def test_archive_from_body(client):
+    payload = make_zip({'a.txt': 'conteúdo'})
+    response = client.post('/api/extract/archive', data=payload, content_type='application/zip')
+
+    assert response.status_code == 200
+    lines = ndjson(response)
+    assert lines[-1]['summary']['processed'] == 1
@@ -0,0 +1,43 @@
+import io
+import json
+import logging
+import zipfile
+
+import pytest
+
+from src.routes import extractor
+from src.services.deadline import ExtractionCancelled
+
+
+@pytest.fixture(autouse=True)
+def disconnected(monkeypatch):
+    def cancelled(*args, **kwargs):
+        raise ExtractionCancelled()
+    monkeypatch.setattr(extractor, 'run_with_budget', cancelled)
+
+
+def assert_not_logged_as_error(caplog):
+    assert not [record for record in caplog.records if record.levelno >= logging.ERROR]
+
+
+@pytest.mark.parametrize('path, kwargs', [
+    ('/api/extract', {'data': {'file': (io.BytesIO(b'conteudo'), 'a.txt')}}),
+    ('/api/extract/data', {'json': {'filename': 'a.txt', 'file_data': 'Y29udGV1ZG8='}}),
+    ('/api/extract/raw?filename=a.txt', {'data': b'conteudo'})
+])
+def test_cancelled_extraction_is_not_a_processing_error(client, caplog, path, kwargs):
+    response = client.post(path, **kwargs)
+    assert response.status_code == 499
+    assert response.get_json()['error_code'] == 'CLIENT_DISCONNECTED'
+    assert_not_logged_as_error(caplog)
+
+
+def test_cancelled_archive_member(client, caplog):
+    archive = io.BytesIO()
+    with zipfile.ZipFile(archive, 'w') as container:
+        container.writestr('a.txt', 'conteudo')
+    response = client.post('/api/extract/archive', data=archive.getvalue(), content_type='application/zip')
+    member, summary = [json.loads(line) for line in response.data.splitlines()]
+    assert member['error_code'] == 'CLIENT_DISCONNECTED'
+    assert summary['summary']['failed'] == 1
+    assert_not_logged_as_error(caplog)
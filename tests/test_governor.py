@@ -0,0 +1,82 @@
+import os
+import signal
+import threading
+import time
+
+import pytest
+
+from src.routes.extractor import resource_limit_response
+from src.services import governor
+from src.services.governor import ResourceLimitExceeded, run_with_budget
+
+pytestmark = pytest.mark.skipif(not governor.SANDBOX_ENABLED, reason='sandbox indisponível')
+
+BUDGET = {'memory_mb': 512, 'cpu_seconds': 5}
+
+
+@pytest.fixture
+def memory_events(monkeypatch, tmp_path):
+    path = tmp_path / 'memory.events'
+    path.write_text('low 0\noom 0\noom_kill 0\n')
+    monkeypatch.setattr(governor, 'CGROUP_MEMORY_EVENTS', str(path))
+    return path
+
+
+def killed_by_system(memory_events, oom):
+    if oom:
+        memory_events.write_text('low 0\noom 1\noom_kill 1\n')
+    os.kill(os.getpid(), signal.SIGKILL)
+
+
+def test_sigkill_without_oom_is_not_reported_as_memory(memory_events):
+    with pytest.raises(ResourceLimitExceeded) as error:
+        run_with_budget(killed_by_system, (memory_events, False), budget=BUDGET)
+    assert error.value.limit == 'killed'
+
+
+def test_sigkill_by_the_oom_killer_is_reported_as_memory(memory_events):
+    with pytest.raises(ResourceLimitExceeded) as error:
+        run_with_budget(killed_by_system, (memory_events, True), budget=BUDGET)
+    assert error.value.limit == 'memory'
+
+
+def test_wall_timeout_is_reported_as_time():
+    with pytest.raises(ResourceLimitExceeded) as error:
+        run_with_budget(time.sleep, (5,), budget={'memory_mb': 512, 'cpu_seconds': 1})
+    assert error.value.limit == 'time'
+
+
+@pytest.mark.parametrize('limit, status', [('memory', 422), ('cpu', 422), ('time', 503), ('killed', 503)])
+def test_resource_limit_status(app, limit, status):
+    with app.test_request_context():
+        response, response_status = resource_limit_response(ResourceLimitExceeded(limit))
+    assert response_status == status
+    assert response.get_json()['error_code'] == 'RESOURCE_LIMIT'
+
+
+def test_worker_does_not_inherit_locks_held_by_other_threads():
+    from src.services import backends, metrics
+
+    gauge = metrics.Gauge('test_fork_gauge', 'Gauge de teste')
+    held = threading.Event()
+    release = threading.Event()
+
+    def hold_locks():
+        # Outra requisição importando um backend e atualizando um gauge no momento do fork
+        with backends._import_lock, gauge._lock:
+            held.set()
+            release.wait(10)
+
+    holder = threading.Thread(target=hold_locks)
+    holder.start()
+    assert held.wait(5)
+    try:
+        def touch_locks():
+            backends.load_backend('colorsys')
+            gauge.set(1)
+            return 'ok'
+
+        assert run_with_budget(touch_locks, budget={'memory_mb': 512, 'cpu_seconds': 2}) == 'ok'
+    finally:
+        release.set()
+        holder.join()
@@ -0,0 +1,42 @@
+import json
+
+import pytest
+
+from src.services.json_provider import STREAM_THRESHOLD_BYTES
+
+
+@pytest.fixture
+def debug_app(app):
+    # Mesma configuração do entrypoint: main.py roda app.run(debug=True)
+    app.debug = True
+    return app
+
+
+def payload(pages):
+    return {'success': True, 'data': {'pages': [{'page': n, 'text': 'x' * 1000} for n in range(pages)]}}
+
+
+def test_large_body_is_streamed_in_debug(debug_app):
+    pages = 3 * STREAM_THRESHOLD_BYTES // 1000
+    with debug_app.test_request_context():
+        response = debug_app.json.response(payload(pages))
+        assert response.is_streamed
+        body = json.loads(b''.join(response.response))
+
+    assert len(body['data']['pages']) == pages
+
+
+def test_small_body_keeps_indentation_in_debug(debug_app):
+    with debug_app.test_request_context():
+        response = debug_app.json.response(payload(2))
+
+    assert not response.is_streamed
+    assert response.get_data(as_text=True).startswith('{\n  "')
+    assert len(response.get_json()['data']['pages']) == 2
+
+
+def test_small_body_is_compact_without_debug(app):
+    with app.test_request_context():
+        response = app.json.response(payload(2))
+
+    assert response.get_data(as_text=True).startswith('{"')
@@ -0,0 +1,20 @@
+import pytest
+
+from src.services import metrics
+
+
+def test_metric_types_must_implement_apply():
+    class Incomplete(metrics.Metric):
+        pass
+
+    with pytest.raises(TypeError):
+        Incomplete('extractor_incomplete', 'Sem _apply')
+    with pytest.raises(TypeError):
+        metrics.Metric('extractor_untyped', 'Base')
+
+
+def test_counter_applies_observations():
+    counter = metrics.Counter('extractor_test_total', 'Teste', ('format',))
+    counter.inc(format='pdf')
+    counter.inc(2, format='pdf')
+    assert counter.values() == {('pdf',): 3}
@@ -0,0 +1,72 @@
+import fcntl
+import subprocess
+import sys
+
+import pytest
+
+from src.engines import ocr_engine
+
+
+@pytest.fixture
+def slots(monkeypatch, tmp_path):
+    monkeypatch.setattr(ocr_engine, 'OCR_MAX_PROCESSES', 1)
+    monkeypatch.setattr(ocr_engine, 'OCR_SLOTS_DIR', str(tmp_path / 'slots'))
+    return tmp_path / 'slots'
+
+
+@pytest.fixture
+def tesseract_calls(monkeypatch, tmp_path):
+    calls = []
+
+    def fake_run(command, **kwargs):
+        calls.append(kwargs['timeout'])
+        return subprocess.CompletedProcess(command, 0, stdout=b'texto', stderr=b'')
+
+    monkeypatch.setattr(ocr_engine.subprocess, 'run', fake_run)
+    monkeypatch.setattr(ocr_engine, 'OCR_CACHE', ocr_engine.DiskCache('ocr', str(tmp_path / 'ocr'), 1024 * 1024))
+    return calls
+
+
+def test_expired_deadline_does_not_fall_back_to_the_default_timeout(tesseract_calls):
+    with pytest.raises(subprocess.TimeoutExpired):
+        ocr_engine.recognize(b'imagem', timeout=0.0)
+    assert tesseract_calls == []
+
+    assert ocr_engine.recognize(b'imagem') == ('texto', False)
+    assert tesseract_calls == [pytest.approx(ocr_engine.OCR_DEFAULT_TIMEOUT, abs=1)]
+
+
+def test_tesseract_waits_for_a_host_slot(slots, tesseract_calls):
+    # Outro worker ocupando a única vaga do host
+    with ocr_engine.tesseract_slot(1):
+        holder = open(slots / 'slot-0.lock')
+        with pytest.raises(BlockingIOError):
+            fcntl.flock(holder, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        with pytest.raises(subprocess.TimeoutExpired):
+            ocr_engine.run_tesseract(b'imagem', 'por', timeout=0.05)
+        assert tesseract_calls == []
+
+    # Vaga liberada: o processo sobe com o tempo que restou do timeout
+    fcntl.flock(holder, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    holder.close()
+    assert ocr_engine.run_tesseract(b'imagem', 'por', timeout=5) == 'texto'
+    assert 0 < tesseract_calls[0] <= 5
+
+
+def test_slot_is_released_when_the_worker_dies(slots):
+    with ocr_engine.tesseract_slot(1):
+        pass
+    # Worker que morre segurando a vaga (SIGKILL do governor) não a deixa presa
+    holder = subprocess.Popen([
+        sys.executable, '-c',
+        'import fcntl, sys, time; f = open(sys.argv[1], "a+"); fcntl.flock(f, fcntl.LOCK_EX); print(flush=True); time.sleep(60)',
+        str(slots / 'slot-0.lock')
+    ], stdout=subprocess.PIPE)
+    holder.stdout.readline()
+    with pytest.raises(subprocess.TimeoutExpired):
+        with ocr_engine.tesseract_slot(0.05):
+            pass
+    holder.kill()
+    holder.wait()
+    with ocr_engine.tesseract_slot(1) as remaining:
+        assert remaining > 0
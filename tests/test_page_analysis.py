@@ -0,0 +1,44 @@
+import pymupdf
+
+from src.engines.page_analysis import detect_blank_pages
+
+
+def make_pdf(pages):
+    """PDF em memória; cada item é o texto da página (None = página vazia)"""
+    doc = pymupdf.open()
+    for text in pages:
+        page = doc.new_page()
+        if text:
+            page.insert_text((72, 400), text, fontsize=9)
+    return doc
+
+
+def test_empty_page_is_blank():
+    doc = make_pdf([None, 'Conteúdo ' * 40])
+    assert detect_blank_pages(doc) == [1]
+
+
+def test_page_with_only_a_short_text_line_is_not_blank():
+    doc = make_pdf(['Assinatura: Joao da Silva', None])
+    assert detect_blank_pages(doc) == [2]
+
+
+def test_blank_detection_respects_page_numbers():
+    doc = make_pdf([None, None, 'Texto'])
+    assert detect_blank_pages(doc, page_numbers=[1, 2]) == [2]
+
+
+def test_signature_page_is_rendered_in_page_images(client):
+    doc = make_pdf(['Assinatura: Joao da Silva', None])
+    response = client.post(
+        '/api/extract/raw?filename=contrato.pdf',
+        data=doc.tobytes(),
+        content_type='application/pdf'
+    )
+
+    assert response.status_code == 200
+    data = response.get_json()['data']
+    assert data['stats']['blank_pages'] == [2]
+    page_images = {item['page']: item for item in data['page_images']}
+    assert page_images[1]['data']
+    assert page_images[2]['data'] is None
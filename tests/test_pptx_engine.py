@@ -0,0 +1,63 @@
+import pytest
+from pptx import Presentation
+
+from src.engines import pptx_engine
+from src.engines.pptx_engine import parse_pptx
+
+
+@pytest.fixture
+def deck(tmp_path):
+    presentation = Presentation()
+    for number in range(1, 13):
+        slide = presentation.slides.add_slide(presentation.slide_layouts[5])
+        slide.shapes.title.text = f'Slide {number}'
+    path = tmp_path / 'deck.pptx'
+    presentation.save(path)
+    return str(path)
+
+
+def test_all_slides_without_deadline(deck):
+    parts = parse_pptx(deck, parallel_threshold=0, max_workers=3)
+    assert [slide['slide_number'] for slide in parts['slides']] == list(range(1, 13))
+    assert parts['slides'][4]['text'] == 'Slide 5'
+    assert not parts['truncated']
+
+
+def test_parallel_truncation_keeps_a_contiguous_prefix(deck, monkeypatch):
+    process_slides = pptx_engine.process_slides
+
+    def stops_midway(file_path, slide_jobs, names):
+        # Cada lote para depois de 2 slides, como quando o prazo acaba durante a extração
+        return process_slides(file_path, slide_jobs[:2], names)
+
+    monkeypatch.setattr(pptx_engine, 'process_slides', stops_midway)
+    # 3 lotes de 4 slides: 1-2, 5-6 e 9-10 seriam extraídos
+    parts = parse_pptx(deck, parallel_threshold=0, max_workers=3)
+
+    assert parts['truncated']
+    assert [slide['slide_number'] for slide in parts['slides']] == [1, 2]
+
+
+def test_slide_ranges_are_clamped_before_expanding():
+    assert pptx_engine.parse_slide_range('1-100000000', 12) == set(range(1, 13))
+    assert pptx_engine.parse_slide_range('2,5-6,40', 12) == {2, 5, 6}
+    assert pptx_engine.parse_slide_range('40', 12) == set()
+    assert pptx_engine.parse_slide_range('', 12) is None
+
+
+@pytest.mark.parametrize('value', ['abc', '3-1', '0', '1-x', [1, 'dois']])
+def test_invalid_slide_ranges(value):
+    with pytest.raises(ValueError):
+        pptx_engine.slide_ranges(value)
+
+
+def test_invalid_slides_option_is_a_client_error(client, deck):
+    with open(deck, 'rb') as source:
+        body = source.read()
+    response = client.post('/api/extract/raw?filename=deck.pptx&slides=abc', data=body)
+    assert response.status_code == 400
+    assert response.get_json()['error_code'] == 'INVALID_SLIDES'
+
+    response = client.post('/api/extract/raw?filename=deck.pptx&slides=11-100000000', data=body)
+    assert response.status_code == 200
+    assert response.get_json()['data']['stats']['selected_slides'] == [11, 12]
@@ -0,0 +1,77 @@
+import os
+
+import pymupdf
+import pytest
+
+from src.engines import page_render
+from src.services.disk_cache import DiskCache
+
+
+@pytest.fixture(autouse=True)
+def raster_cache(monkeypatch, tmp_path):
+    cache = DiskCache('raster', str(tmp_path / 'raster'), 16 * 1024 * 1024)
+    monkeypatch.setattr(page_render, 'RASTER_CACHE', cache)
+    monkeypatch.setattr(page_render, 'RASTER_CACHE_ENABLED', True)
+    return cache
+
+
+@pytest.fixture
+def pdf_bytes():
+    doc = pymupdf.open()
+    for number in range(1, 4):
+        doc.new_page().insert_text((72, 72), f'Página {number}')
+    return doc.tobytes()
+
+
+def render(client, body, **params):
+    return client.post('/api/render/page', query_string=params, data=body, content_type='application/pdf')
+
+
+def test_single_page_render_uses_the_raster_cache(client, pdf_bytes):
+    first = render(client, pdf_bytes, page=2, dpi=72)
+    assert first.status_code == 200
+    assert first.mimetype == 'image/png'
+    assert first.headers['X-Raster-Cache'] == 'miss'
+    assert first.headers['X-Image-Width'] == '595'
+
+    second = render(client, pdf_bytes, page=2, dpi=72)
+    assert second.headers['X-Raster-Cache'] == 'hit'
+    assert second.data == first.data
+
+    jpeg = render(client, pdf_bytes, page=2, dpi=72, format='jpeg')
+    assert jpeg.headers['X-Raster-Cache'] == 'miss'
+    assert jpeg.mimetype == 'image/jpeg'
+
+
+def test_single_page_shares_the_cache_with_full_extraction(client, pdf_bytes):
+    # Extração completa com page_images grava as páginas no cache (PDF sem imagens: 150 DPI, JPEG)
+    extraction = client.post('/api/extract/raw?filename=a.pdf', data=pdf_bytes, content_type='application/pdf')
+    assert extraction.status_code == 200
+
+    response = render(client, pdf_bytes, page=1, dpi=150, format='jpeg')
+    assert response.headers['X-Raster-Cache'] == 'hit'
+
+
+@pytest.mark.parametrize('params, error_code', [
+    ({}, 'INVALID_RENDER_OPTIONS'),
+    ({'page': 1, 'dpi': 5000}, 'INVALID_RENDER_OPTIONS'),
+    ({'page': 1, 'format': 'gif'}, 'INVALID_RENDER_OPTIONS'),
+    ({'page': 9}, 'INVALID_PAGE')
+])
+def test_invalid_render_requests(client, pdf_bytes, params, error_code):
+    response = render(client, pdf_bytes, **params)
+    assert response.status_code == 400
+    assert response.get_json()['error_code'] == error_code
+
+
+@pytest.mark.skipif(not hasattr(os, 'geteuid') or os.geteuid() != 0, reason='requer root para trocar o dono')
+def test_raster_cache_in_a_directory_of_another_user_is_disabled(tmp_path):
+    directory = tmp_path / 'alheio'
+    (directory / 'ab').mkdir(parents=True)
+    (directory / 'ab' / 'ab12').write_bytes(b'imagem plantada')
+    os.chown(directory, 65534, 65534)
+
+    cache = DiskCache('raster', str(directory), 1024 * 1024)
+    assert cache.get('ab12') is None
+    cache.put('cd34', b'dados')
+    assert not (directory / 'cd' / 'cd34').exists()
@@ -0,0 +1,144 @@
+import os
+import threading
+import time
+
+import pytest
+
+from src.services import single_flight
+
+
+@pytest.fixture(autouse=True)
+def flight_dir(monkeypatch, tmp_path):
+    monkeypatch.setattr(single_flight, 'SINGLE_FLIGHT_DIR', str(tmp_path))
+    monkeypatch.setattr(single_flight, 'SINGLE_FLIGHT_ENABLED', True)
+    return tmp_path
+
+
+def test_identical_concurrent_calls_run_once(flight_dir):
+    calls = []
+    started = threading.Event()
+
+    def extract():
+        calls.append(1)
+        started.set()
+        time.sleep(0.3)
+        return {'text': 'resultado'}
+
+    results = []
+    leader = threading.Thread(target=lambda: results.append(single_flight.run('doc', extract, timeout=5)))
+    leader.start()
+    assert started.wait(5)
+    followers = [
+        threading.Thread(target=lambda: results.append(single_flight.run('doc', extract, timeout=5)))
+        for _ in range(3)
+    ]
+    for follower in followers:
+        follower.start()
+    for thread in [leader] + followers:
+        thread.join()
+
+    assert len(calls) == 1
+    assert results == [{'text': 'resultado'}] * 4
+
+
+def test_result_not_written_without_waiters(flight_dir):
+    assert single_flight.run('sozinha', lambda: {'text': 'x'}, timeout=5) == {'text': 'x'}
+    assert not (flight_dir / 'sozinha.result').exists()
+
+
+def test_failed_leader_lets_the_waiter_extract(flight_dir):
+    started = threading.Event()
+
+    def failing():
+        started.set()
+        time.sleep(0.2)
+        raise RuntimeError('falhou')
+
+    def run_leader():
+        with pytest.raises(RuntimeError):
+            single_flight.run('doc', failing, timeout=5)
+
+    leader = threading.Thread(target=run_leader)
+    leader.start()
+    assert started.wait(5)
+    assert single_flight.run('doc', lambda: 'próprio', timeout=5) == 'próprio'
+    leader.join()
+
+
+def test_sweep_keeps_held_locks_and_removes_idle_ones(flight_dir):
+    old = time.time() - single_flight.RESULT_TTL_SECONDS - 10
+    for name in ('held.lock', 'idle.lock', 'old.result'):
+        (flight_dir / name).touch()
+        os.utime(flight_dir / name, (old, old))
+
+    with open(flight_dir / 'held.lock', 'a+') as held:
+        single_flight.fcntl.flock(held, single_flight.fcntl.LOCK_EX | single_flight.fcntl.LOCK_NB)
+        single_flight._sweep(time.time())
+
+        assert (flight_dir / 'held.lock').exists()
+        assert not (flight_dir / 'idle.lock').exists()
+        assert not (flight_dir / 'old.result').exists()
+
+
+def test_long_extraction_of_an_old_key_is_not_duplicated(flight_dir):
+    # Trava criada há mais que o TTL (chave vista antes): a limpeza de outra extração não pode removê-la
+    lock_path = flight_dir / 'doc.lock'
+    lock_path.touch()
+    old = time.time() - single_flight.RESULT_TTL_SECONDS - 10
+    os.utime(lock_path, (old, old))
+
+    calls = []
+    started = threading.Event()
+
+    def extract():
+        calls.append(1)
+        started.set()
+        time.sleep(0.3)
+        return 'resultado'
+
+    leader = threading.Thread(target=single_flight.run, args=('doc', extract, 5))
+    leader.start()
+    assert started.wait(5)
+    os.utime(lock_path, (old, old))
+    single_flight.run('outra', lambda: None, timeout=5)
+
+    assert single_flight.run('doc', extract, timeout=5) == 'resultado'
+    leader.join()
+    assert len(calls) == 1
+
+
+def test_directory_is_private(flight_dir, monkeypatch):
+    directory = flight_dir / 'novo'
+    monkeypatch.setattr(single_flight, 'SINGLE_FLIGHT_DIR', str(directory))
+    assert single_flight.run('doc', lambda: 1, timeout=5) == 1
+    assert directory.stat().st_mode & 0o777 == 0o700
+
+
+@pytest.mark.skipif(not hasattr(os, 'geteuid') or os.geteuid() != 0, reason='requer root para trocar o dono')
+def test_directory_of_another_user_is_refused(flight_dir, monkeypatch):
+    directory = flight_dir / 'alheio'
+    directory.mkdir()
+    os.chown(directory, 65534, 65534)
+    monkeypatch.setattr(single_flight, 'SINGLE_FLIGHT_DIR', str(directory))
+
+    assert single_flight.run('doc', lambda: 'extraído', timeout=5) == 'extraído'
+    assert not (directory / 'doc.lock').exists()
+
+
+def test_results_are_shared_as_json(flight_dir):
+    started = threading.Event()
+
+    def extract():
+        started.set()
+        time.sleep(0.3)
+        return {'pages': [{'page': 1, 'text': 'a'}], 'count': 1}
+
+    leader = threading.Thread(target=single_flight.run, args=('doc', extract, 5))
+    leader.start()
+    assert started.wait(5)
+    assert single_flight.run('doc', extract, timeout=5) == {'pages': [{'page': 1, 'text': 'a'}], 'count': 1}
+    leader.join()
+
+    # Arquivo plantado que não é JSON (ex.: pickle) não é aceito como resultado
+    (flight_dir / 'doc.result').write_bytes(b'\x80\x04K\x01.')
+    assert single_flight._read_result(str(flight_dir / 'doc.result'), 0) is None
@@ -0,0 +1,26 @@
+import io
+
+from flask import request
+
+from src.routes.extractor import timings_requested
+
+
+def extract(client, **kwargs):
+    return client.post('/api/extract', data={'file': (io.BytesIO(b'conteudo'), 'a.txt'), **kwargs.pop('form', {})}, **kwargs)
+
+
+def test_timings_from_query_string_or_header(client):
+    by_query = extract(client, query_string={'timings': '1'}).get_json()
+    assert by_query['timings']['name'] == '/api/extract'
+
+    by_header = extract(client, headers={'X-Timings': '1'}).get_json()
+    assert 'timings' in by_header
+
+
+def test_timings_are_not_read_from_the_body(app, client):
+    assert 'timings' not in extract(client, form={'timings': 'true'}).get_json()
+
+    # O hook roda antes da view e não pode forçar o parse do multipart
+    with app.test_request_context('/api/extract', method='POST', data={'timings': 'true'}):
+        assert not timings_requested()
+        assert 'form' not in request.__dict__
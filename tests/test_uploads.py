@@ -0,0 +1,80 @@
+import io
+import json
+import os
+import zipfile
+
+import pytest
+from flask import request
+
+from src.services import uploads
+
+
+@pytest.fixture
+def spool_dir(monkeypatch, tmp_path):
+    directory = tmp_path / 'spool'
+    directory.mkdir()
+    monkeypatch.setattr(uploads, 'UPLOAD_SPOOL_DIR', str(directory))
+    return directory
+
+
+@pytest.fixture
+def small_limits(app):
+    app.config['UPLOAD_SIZE_LIMITS'] = {'default': 16}
+
+
+def zip_bytes():
+    archive = io.BytesIO()
+    with zipfile.ZipFile(archive, 'w') as container:
+        container.writestr('a.txt', 'conteudo')
+    return archive.getvalue()
+
+
+def test_strict_view_rejects_the_whole_request(client, spool_dir, small_limits):
+    response = client.post('/api/extract', data={'file': (io.BytesIO(b'x' * 64), 'a.txt')})
+    assert response.status_code == 413
+    assert response.get_json()['error_code'] == 'FILE_TOO_LARGE'
+    assert os.listdir(spool_dir) == []
+
+
+def test_bulk_view_rejects_per_item(client, spool_dir, small_limits):
+    response = client.post('/api/extract/bulk', data={'files': [
+        (io.BytesIO(b'x' * 64), 'grande.txt'),
+        (io.BytesIO(b'pequeno'), 'pequeno.txt'),
+        (io.BytesIO(b'%PDF-1.7'), 'falso.docx')
+    ]})
+    assert response.status_code == 200
+    data = response.get_json()
+    assert [result['filename'] for result in data['results']] == ['pequeno.txt']
+    assert {error['filename']: error['error_code'] for error in data['errors']} == {
+        'grande.txt': 'FILE_TOO_LARGE',
+        'falso.docx': 'CONTENT_MISMATCH'
+    }
+    assert os.listdir(spool_dir) == []
+
+
+def test_accept_uploads_replaces_the_global_limits(app, client, spool_dir, monkeypatch):
+    # Arquivos compactados não estão em UPLOAD_ALLOWED_EXTENSIONS, mas a view os aceita
+    response = client.post('/api/extract/archive', data={'file': (io.BytesIO(zip_bytes()), 'pacote.zip')})
+    assert response.status_code == 200
+    summary = json.loads(response.data.splitlines()[-1])['summary']
+    assert summary['processed'] == 1
+
+    # E recusa os tipos aceitos pelas demais views
+    response = client.post('/api/extract/archive', data={'file': (io.BytesIO(b'texto'), 'a.txt')})
+    assert response.get_json()['error_code'] == 'UNSUPPORTED_TYPE'
+
+    # O tamanho máximo também é o da view
+    view = app.view_functions['extractor.extract_archive']
+    monkeypatch.setattr(view, 'upload_max_size', 16)
+    response = client.post('/api/extract/archive', data={'file': (io.BytesIO(zip_bytes()), 'pacote.zip')})
+    assert response.status_code == 413
+    assert os.listdir(spool_dir) == []
+
+
+def test_spools_are_removed_when_the_request_closes(app, spool_dir):
+    with app.test_request_context('/api/extract', method='POST', data={'file': (io.BytesIO(b'conteudo'), 'a.txt')}):
+        spool_path = uploads.spooled_path(request.files['file'])
+        assert os.path.dirname(spool_path) == str(spool_dir)
+        assert os.path.exists(spool_path)
+        request.close()
+        assert not os.path.exists(spool_path)